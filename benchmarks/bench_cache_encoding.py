@@ -0,0 +1,168 @@
+"""Compare the per-entity Redis records with the old pickle blobs.
+
+A synthetic world of ``--clubs`` clubs with ``--members`` players each and
+``--matches`` approved matches per club is built in memory. For each format
+the script reports:
+
+* ``write``: bytes and time to serialize what one write stored. The pickle
+  format re-pickled the whole ``(clubs, players)`` graph into ``tennis:data``
+  plus the written club; the record format encodes the club, its members and
+  the new match.
+* ``read club``: bytes and time to rebuild one club with its members and
+  their histories from Redis in a fresh process.
+* ``total``: size of everything cached for the whole world.
+
+Usage::
+
+    python benchmarks/bench_cache_encoding.py
+    python benchmarks/bench_cache_encoding.py --clubs 200 --members 50 --matches 2000
+
+No database is needed; Redis is replaced by ``fakeredis`` so the timings
+include serialization but no network latency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import pickle
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fakeredis  # noqa: E402
+
+from tennis import cache_codec, storage  # noqa: E402
+from tennis.models import Club, Match, Player  # noqa: E402
+
+
+def _build_world(clubs: int, members: int, matches: int) -> tuple[dict, dict]:
+    rng = random.Random(0)
+    players: dict[str, Player] = {}
+    world: dict[str, Club] = {}
+    next_id = 1
+    start = datetime.date(2020, 1, 1)
+    for c in range(clubs):
+        club = Club(club_id=f"c{c}", name=f"Club {c}", leader_id=f"p{c}_0")
+        for i in range(members):
+            p = Player(f"p{c}_{i}", f"P{c}_{i}", singles_rating=1000.0, doubles_rating=1000.0)
+            players[p.user_id] = p
+            club.members[p.user_id] = p
+            club.member_joined[p.user_id] = start
+        roster = list(club.members.values())
+        for _ in range(matches):
+            a, b = rng.sample(roster, 2)
+            m = Match(
+                id=next_id,
+                date=start + datetime.timedelta(days=next_id % 1500),
+                player_a=a,
+                player_b=b,
+                score_a=6,
+                score_b=rng.randrange(5),
+                club_id=club.club_id,
+                rating_a_before=1000.0,
+                rating_b_before=1000.0,
+                rating_a_after=1004.2,
+                rating_b_after=995.8,
+            )
+            m.approved_ts = datetime.datetime.combine(m.date, datetime.time(12))
+            next_id += 1
+            club.matches.append(m)
+            a.singles_matches.append(m)
+            b.singles_matches.append(m)
+        world[club.club_id] = club
+    return world, players
+
+
+def _reset(client) -> None:
+    storage._redis = client
+    storage.invalidate_cache()
+    storage._cached_match_ids.clear()
+
+
+def _records_bytes(client) -> int:
+    return sum(
+        len(v) for key in storage.CACHE_HASHES.values() for v in client.hgetall(key).values()
+    )
+
+
+def _timed(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def run(clubs: int, members: int, matches: int, repeat: int) -> None:
+    world, players = _build_world(clubs, members, matches)
+    club = world["c0"]
+    new_match = club.matches[-1]
+
+    # --- pickle blobs (previous format)
+    blob = pickle.dumps((world, players))
+    club_blob = pickle.dumps(club)
+    pickle_write = _timed(lambda: (pickle.dumps((world, players)), pickle.dumps(club)), repeat)
+    pickle_read = _timed(lambda: pickle.loads(club_blob), repeat)
+
+    # --- per-entity records
+    client = fakeredis.FakeRedis()
+    _reset(client)
+    storage._hydrated_players.update(players)
+    for c in world.values():
+        storage._cache_matches(c.matches, c.club_id)
+        storage._save_cache("clubs", {c.club_id: storage._club_record(c)})
+        storage._cache_players(c.members.values(), histories=True)
+    total = _records_bytes(client)
+
+    def write() -> None:
+        storage._cached_match_ids.discard(new_match.id)
+        storage._cache_matches([new_match], club.club_id)
+        storage._save_cache("clubs", {club.club_id: storage._club_record(club)})
+        storage._cache_players(club.members.values())
+
+    write_bytes = (
+        len(cache_codec.encode(storage._club_record(club)))
+        + len(cache_codec.encode(storage._match_record(new_match)))
+        + sum(len(cache_codec.encode(list(storage._player_values(p)))) for p in club.members.values())
+    )
+    record_write = _timed(write, repeat)
+
+    def read() -> None:
+        storage.invalidate_cache()
+        assert storage._club_from_cache(club.club_id) is not None
+
+    read_bytes = 0
+    for kind, ids in (
+        ("clubs", [club.club_id]),
+        ("players", list(club.members)),
+        ("histories", list(club.members)),
+        ("matches", [m.id for m in club.matches]),
+    ):
+        read_bytes += sum(len(v or b"") for v in client.hmget(storage.CACHE_HASHES[kind], [str(i) for i in ids]))
+    record_read = _timed(read, repeat)
+
+    print(f"{clubs} clubs x {members} members, {matches} matches per club")
+    print(f"{'':<10} {'format':<8} {'bytes':>12} {'time':>12}")
+    print(f"{'write':<10} {'pickle':<8} {len(blob) + len(club_blob):>12} {pickle_write * 1000:>10.2f}ms")
+    print(f"{'':<10} {'records':<8} {write_bytes:>12} {record_write * 1000:>10.2f}ms")
+    print(f"{'read club':<10} {'pickle':<8} {len(club_blob):>12} {pickle_read * 1000:>10.2f}ms")
+    print(f"{'':<10} {'records':<8} {read_bytes:>12} {record_read * 1000:>10.2f}ms")
+    print(f"{'total':<10} {'pickle':<8} {len(blob):>12}")
+    print(f"{'':<10} {'records':<8} {total:>12}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clubs", type=int, default=50)
+    parser.add_argument("--members", type=int, default=40)
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+    run(args.clubs, args.members, args.matches, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
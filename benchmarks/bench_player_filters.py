@@ -0,0 +1,154 @@
+"""Compare filtered player searches with and without the leaderboard index.
+
+A synthetic world of ``--players`` players spread over clubs of
+``--members`` members is built in memory, with random gender, age, a
+two-level region (``province/city``) and ratings. Each query is run as
+
+* ``scan``: the loop ``/players`` used before, testing every member of every
+  club against the filters and sorting the matches;
+* ``index``: :meth:`tennis.leaderboard.LeaderboardIndex.page`, which
+  intersects the gender, region and age indexes and ranks the result.
+
+Both return the first ``--limit`` rows; the script checks they agree.
+
+Usage::
+
+    python benchmarks/bench_player_filters.py
+    python benchmarks/bench_player_filters.py --players 100000 --members 50 --repeat 20
+
+No database is needed; :func:`tennis.storage.load_data` is replaced by the
+synthetic world.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tennis import leaderboard, storage  # noqa: E402
+from tennis.models import Club, Player  # noqa: E402
+from tennis.rating import weighted_doubles_matches, weighted_singles_matches  # noqa: E402
+
+PROVINCES = [f"P{i:02d}" for i in range(30)]
+CITIES = 10
+
+QUERIES = {
+    "gender": {"gender": "F"},
+    "region": {"region": "P03/C04"},
+    "gender+age": {"gender": "M", "min_age": 30, "max_age": 32},
+    "region+gender+age": {"region": "P07", "gender": "F", "min_age": 20, "max_age": 29},
+    "rating range": {"min_rating": 1495.0, "max_rating": 1500.0},
+    "all filters": {"region": "P11", "gender": "M", "min_age": 40, "max_age": 50, "min_rating": 1200.0},
+}
+
+
+def _build_world(players: int, members: int) -> tuple[dict, dict]:
+    rng = random.Random(0)
+    everyone: dict[str, Player] = {}
+    world: dict[str, Club] = {}
+    joined = datetime.date(2020, 1, 1)
+    for i in range(players):
+        p = Player(
+            f"p{i}",
+            f"P{i}",
+            singles_rating=round(rng.uniform(500, 2000), 1),
+            doubles_rating=round(rng.uniform(500, 2000), 1),
+            age=rng.randrange(16, 70),
+            gender=rng.choice(("M", "F")),
+            region=f"{rng.choice(PROVINCES)}/C{rng.randrange(CITIES):02d}",
+        )
+        everyone[p.user_id] = p
+        cid = f"c{i // members}"
+        club = world.get(cid)
+        if club is None:
+            club = world[cid] = Club(club_id=cid, name=cid)
+        club.members[p.user_id] = p
+        club.member_joined[p.user_id] = joined
+    return world, everyone
+
+
+def _scan(world: dict, players: dict, limit: int, **filters) -> list[str]:
+    """The previous ``/players`` loop for the singles rating order."""
+    region = filters.get("region")
+    found: dict[str, float | None] = {}
+    candidates = [p for c in world.values() for p in c.members.values()]
+    for p in candidates:
+        rating = p.singles_rating
+        weighted_singles_matches(p)
+        weighted_doubles_matches(p)
+        if filters.get("min_rating") is not None and (rating is None or rating < filters["min_rating"]):
+            continue
+        if filters.get("max_rating") is not None and (rating is None or rating > filters["max_rating"]):
+            continue
+        if filters.get("min_age") is not None and (p.age is None or p.age < filters["min_age"]):
+            continue
+        if filters.get("max_age") is not None and (p.age is None or p.age > filters["max_age"]):
+            continue
+        if filters.get("gender") is not None and p.gender != filters["gender"]:
+            continue
+        if region and not (p.region and p.region.startswith(region)):
+            continue
+        found.setdefault(p.user_id, rating)
+    ranked = sorted(found.items(), key=lambda x: (-x[1], x[0]))
+    return [uid for uid, _ in ranked[:limit]]
+
+
+def _timed(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def run(players: int, members: int, limit: int, repeat: int) -> None:
+    world, everyone = _build_world(players, members)
+    storage.load_data = lambda: (world, everyone)
+    index = leaderboard.LeaderboardIndex()
+    t0 = time.perf_counter()
+    index.page(None, False, limit=1)
+    build = time.perf_counter() - t0
+
+    print(f"{players} players in {len(world)} clubs, first {limit} rows, index built in {build * 1000:.0f}ms")
+    print(f"{'query':<20} {'matches':>8} {'scan':>10} {'index':>10} {'speedup':>8}")
+    for name, filters in QUERIES.items():
+        expected = _scan(world, everyone, limit, **filters)
+        rows = index.page(None, False, limit=limit, **filters)
+        assert [r.player.user_id for r in rows] == expected, name
+        matches = len(_scan(world, everyone, players, **filters))
+        scan = _timed(lambda: _scan(world, everyone, limit, **filters), max(1, repeat // 5))
+        indexed = _timed(lambda: index.page(None, False, limit=limit, **filters), repeat)
+        print(
+            f"{name:<20} {matches:>8} {scan * 1000:>8.2f}ms {indexed * 1000:>8.3f}ms"
+            f" {scan / indexed:>7.0f}x"
+        )
+
+    # an update moves one player in every structure it is indexed in
+    p = everyone["p0"]
+
+    def update() -> None:
+        p.singles_rating += 0.1
+        p.age = 16 + (p.age - 15) % 54
+        index.touch("players", ["p0"])
+        index.page(None, False, limit=1)
+
+    print(f"{'update one player':<20} {'':>8} {'':>10} {_timed(update, repeat) * 1000:>8.3f}ms")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=100_000)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+    run(args.players, args.members, args.limit, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Time a full rating replay over a synthetic match history.
+
+A history of ``--matches`` approved matches between ``--players`` players
+is generated in memory, a quarter of them doubles, in the row layout of
+:func:`tennis.storage.replay_rows`. It is then
+
+* replayed with :func:`tennis.replay.replay` over the compact
+  :class:`tennis.replay.MatchLog`;
+* for the first ``--objects`` matches, also replayed by building
+  :class:`tennis.models.Match` objects and calling ``update_ratings`` and
+  ``update_doubles_ratings``, as the request handlers do. The script checks
+  both give the same ratings and reports the time per match of each.
+
+Usage::
+
+    python benchmarks/bench_replay.py
+    python benchmarks/bench_replay.py --matches 1000000 --players 20000
+
+No database is needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tennis import replay  # noqa: E402
+from tennis.models import DoublesMatch, Match, Player  # noqa: E402
+from tennis.rating import FORMAT_WEIGHTS, update_doubles_ratings, update_ratings  # noqa: E402
+
+FORMATS = list(FORMAT_WEIGHTS)
+NAN = math.nan
+
+
+def _rows(matches: int, players: int) -> list[tuple]:
+    rng = random.Random(0)
+    rows = []
+    for i in range(matches):
+        fmt = rng.choice(FORMATS)
+        score_a, score_b = rng.randrange(7), rng.randrange(7)
+        if i % 4 == 3:
+            ids = [f"p{j}" for j in rng.sample(range(players), 4)]
+            mtype = "doubles"
+        else:
+            a, b = rng.sample(range(players), 2)
+            ids = [f"p{a}", None, f"p{b}", None]
+            mtype = "singles"
+        # every player starts from the default rating
+        stored = [None] * 8
+        rows.append((i + 1, mtype, "c1", *ids, score_a, score_b, FORMAT_WEIGHTS[fmt], fmt, *stored))
+    return rows
+
+
+def _objects(rows: list[tuple]) -> dict[str, Player]:
+    players: dict[str, Player] = {}
+
+    def get(uid: str) -> Player:
+        if uid not in players:
+            players[uid] = Player(uid, uid)
+        return players[uid]
+
+    date = datetime.date(2024, 1, 1)
+    for row in rows:
+        _, mtype, _, a1, a2, b1, b2, score_a, score_b, weight = row[:10]
+        if mtype == "doubles":
+            m = DoublesMatch(date, get(a1), get(a2), get(b1), get(b2), score_a, score_b, format_weight=weight)
+            update_doubles_ratings(m)
+        else:
+            m = Match(date, get(a1), get(b1), score_a, score_b, format_weight=weight)
+            update_ratings(m)
+    return players
+
+
+def run(matches: int, players: int, objects: int) -> None:
+    rows = _rows(matches, players)
+
+    t0 = time.perf_counter()
+    log = replay.MatchLog.from_rows(rows)
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    result = replay.replay(log)
+    arrays = time.perf_counter() - t0
+
+    sample = rows[:objects]
+    t0 = time.perf_counter()
+    expected = _objects(sample)
+    models = time.perf_counter() - t0
+    check = replay.replay(replay.MatchLog.from_rows(sample))
+    for number, uid in enumerate(check.log.players):
+        p = expected[uid]
+        for got, want in ((check.singles[number], p.singles_rating), (check.doubles[number], p.doubles_rating)):
+            assert (got is None and want is None) or math.isclose(got, want, rel_tol=1e-12), uid
+
+    print(f"{matches} matches, {len(log.players)} players")
+    print(f"log built in {build:.2f}s, replayed in {arrays:.2f}s ({arrays / matches * 1e6:.2f}us per match)")
+    print(f"model objects: {models / len(sample) * 1e6:.2f}us per match over {len(sample)} matches")
+    print(f"final rating of p0: singles {result.singles[log.players.index('p0')]}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--players", type=int, default=20_000)
+    parser.add_argument("--objects", type=int, default=100_000)
+    args = parser.parse_args(argv)
+    run(args.matches, args.players, args.objects)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Measure ``save_club`` write cost as a club's match history grows.
+
+Each round submits a pending match, saves the club, approves the match and
+saves again, which mirrors what the API does for a normal singles result. With
+delta persistence the time per save should stay roughly constant no matter how
+many historical matches the club already has.
+
+Usage::
+
+    python benchmarks/bench_save_club.py
+    python benchmarks/bench_save_club.py --sizes 100 1000 10000 --rounds 50
+
+A throw-away SQLite database is used unless ``--database-url`` points at a
+scratch PostgreSQL database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tennis import storage  # noqa: E402
+from tennis.models import Club, Match, Player  # noqa: E402
+
+
+def _use_database(url: str | None, tmpdir: str) -> None:
+    if url is None:
+        url = f"sqlite:///{Path(tmpdir) / 'bench.db'}"
+    storage.DATABASE_URL = url
+    storage.IS_PG = url.lower().startswith("postgres")
+    storage._redis = None
+    storage.invalidate_cache()
+
+
+def _reset_tables() -> None:
+    conn = storage._connect()
+    cur = conn.cursor()
+    for table in (
+        "clubs",
+        "club_meta",
+        "club_members",
+        "players",
+        "matches",
+        "pending_matches",
+        "appointments",
+    ):
+        cur.execute(f"DELETE FROM {table}")
+    conn.commit()
+    conn.close()
+    storage.invalidate_cache()
+
+
+def _build_club(club_id: str, members: int, history: int) -> Club:
+    club = Club(club_id=club_id, name=club_id, leader_id="p0")
+    for i in range(members):
+        p = Player(f"p{i}", f"P{i}", singles_rating=1000.0, doubles_rating=1000.0)
+        club.members[p.user_id] = p
+        club.member_joined[p.user_id] = datetime.date(2024, 1, 1)
+    start = datetime.date(2020, 1, 1)
+    players = list(club.members.values())
+    for i in range(history):
+        a = players[i % members]
+        b = players[(i + 1) % members]
+        m = Match(
+            date=start + datetime.timedelta(days=i % 1500),
+            player_a=a,
+            player_b=b,
+            score_a=6,
+            score_b=i % 5,
+            club_id=club_id,
+        )
+        m.approved = True
+        club.matches.append(m)
+    return club
+
+
+def _round(club: Club, n: int) -> tuple[float, float]:
+    a, b = list(club.members.values())[:2]
+    m = Match(
+        date=datetime.date.today(),
+        player_a=a,
+        player_b=b,
+        score_a=6,
+        score_b=n % 5,
+        club_id=club.club_id,
+        initiator=a.user_id,
+    )
+    club.pending_matches.append(m)
+    t0 = time.perf_counter()
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+    submit = time.perf_counter() - t0
+
+    club.pending_matches.remove(m)
+    m.approved = True
+    club.matches.append(m)
+    t0 = time.perf_counter()
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+    approve = time.perf_counter() - t0
+    return submit, approve
+
+
+def run(sizes: list[int], rounds: int, members: int) -> None:
+    print(f"{'history':>8} {'initial':>10} {'submit':>10} {'approve':>10}")
+    for size in sizes:
+        _reset_tables()
+        club = _build_club(f"bench{size}", members, size)
+        t0 = time.perf_counter()
+        with storage.transaction() as conn:
+            storage.save_club(club, conn=conn)
+        initial = time.perf_counter() - t0
+        submit = approve = 0.0
+        for n in range(rounds):
+            s, a = _round(club, n)
+            submit += s
+            approve += a
+        print(
+            f"{size:>8} {initial * 1000:>8.1f}ms "
+            f"{submit / rounds * 1000:>8.2f}ms {approve / rounds * 1000:>8.2f}ms"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--database-url")
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _use_database(args.database_url, tmpdir)
+        run(args.sizes, args.rounds, args.members)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compare club and user searches with and without the n-gram index.
+
+A synthetic set of ``--entities`` ids with names is built in memory: half
+Chinese names of two or three characters, half latin club names. Each query
+is run as
+
+* ``scan``: the loop ``/clubs/search`` used before, lowercasing every id and
+  name and testing the query as a substring;
+* ``index``: :meth:`tennis.search.SearchIndex.page`.
+
+Both return every match in id order; the script checks they agree.
+
+Usage::
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --entities 100000 --repeat 50
+
+No database is needed; :func:`tennis.storage.search_entries` is replaced by
+the synthetic set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tennis import search, storage  # noqa: E402
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+GIVEN = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰"
+WORDS = ["tennis", "club", "ace", "smash", "court", "rally", "spin", "volley", "open", "city"]
+
+QUERIES = ["王", "王芳", "张伟", "t", "ace", "court", "smash c", "c1234", "nomatch"]
+
+
+def _build(entities: int) -> list[tuple[str, str]]:
+    rng = random.Random(0)
+    rows = []
+    for i in range(entities):
+        if i % 2:
+            name = rng.choice(SURNAMES) + "".join(rng.choice(GIVEN) for _ in range(rng.randrange(1, 3)))
+        else:
+            name = " ".join(rng.choice(WORDS) for _ in range(2)).title()
+        rows.append((f"c{i}", name))
+    return rows
+
+
+def _scan(rows: list[tuple[str, str]], query: str) -> list[str]:
+    q = query.lower()
+    return sorted(cid for cid, name in rows if q in cid.lower() or q in name.lower())
+
+
+def _timed(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def run(entities: int, repeat: int) -> None:
+    rows = _build(entities)
+    storage.search_entries = lambda kind, ids=None: rows if ids is None else [r for r in rows if r[0] in ids]
+    index = search.SearchIndex()
+    t0 = time.perf_counter()
+    index.page("clubs", "x")
+    build = time.perf_counter() - t0
+
+    print(f"{entities} clubs, index built in {build * 1000:.0f}ms")
+    print(f"{'query':<10} {'matches':>8} {'scan':>10} {'index':>10} {'speedup':>8}")
+    for query in QUERIES:
+        expected = _scan(rows, query)
+        assert index.page("clubs", query) == expected, query
+        scan = _timed(lambda: _scan(rows, query), max(1, repeat // 10))
+        indexed = _timed(lambda: index.page("clubs", query, limit=20), repeat)
+        print(
+            f"{query:<10} {len(expected):>8} {scan * 1000:>8.2f}ms {indexed * 1000:>8.3f}ms"
+            f" {scan / indexed:>7.0f}x"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+    run(args.entities, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
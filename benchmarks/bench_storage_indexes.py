@@ -0,0 +1,246 @@
+"""Measure the hot storage lookups with and without the secondary indexes.
+
+A synthetic database with ``--users`` players spread over clubs of
+``--club-size`` members and ``--matches`` approved matches is generated first.
+Each operation is then timed twice: once after dropping the indexes listed in
+:data:`tennis.migrations.SECONDARY_INDEXES` and once after recreating them.
+
+Usage::
+
+    python benchmarks/bench_storage_indexes.py
+    python benchmarks/bench_storage_indexes.py --users 10000 --matches 100000
+
+A throw-away SQLite database is used unless ``--database-url`` points at a
+scratch PostgreSQL database. Generating the default 100k users and 1M matches
+takes a minute or two.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tennis import migrations, storage  # noqa: E402
+from tennis.models import Club  # noqa: E402
+
+_CHUNK = 20000
+
+
+def _use_database(url: str | None, tmpdir: str) -> None:
+    if url is None:
+        url = f"sqlite:///{Path(tmpdir) / 'bench.db'}"
+    storage.DATABASE_URL = url
+    storage.IS_PG = url.lower().startswith("postgres")
+    storage._redis = None
+    storage.invalidate_cache()
+
+
+def _insert(cur, table: str, columns: tuple[str, ...], rows: list[tuple]) -> None:
+    sql = f"INSERT INTO {table}({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    if storage.IS_PG:
+        import psycopg2.extras
+
+        psycopg2.extras.execute_batch(cur._c, sql.replace("?", "%s"), rows, page_size=1000)
+    else:
+        cur.executemany(sql, rows)
+
+
+def _populate(users: int, club_size: int, matches: int, messages: int) -> int:
+    conn = storage._connect()
+    cur = conn.cursor()
+    for table in (
+        "users",
+        "players",
+        "clubs",
+        "club_meta",
+        "club_members",
+        "matches",
+        "pending_matches",
+        "appointments",
+        "messages",
+        "auth_tokens",
+        "refresh_tokens",
+    ):
+        cur.execute(f"DELETE FROM {table}")
+    clubs = max(1, users // club_size)
+    today = datetime.date.today().isoformat()
+    expires = (datetime.datetime.utcnow() + datetime.timedelta(days=30)).isoformat()
+    for start in range(0, users, _CHUNK):
+        ids = range(start, min(start + _CHUNK, users))
+        _insert(cur, "users", ("user_id", "name", "password_hash"), [(f"u{i}", f"U{i}", "") for i in ids])
+        _insert(
+            cur,
+            "players",
+            ("user_id", "name", "singles_rating", "doubles_rating", "experience", "pre_ratings", "joined"),
+            [(f"u{i}", f"U{i}", 1000.0, 1000.0, 0.0, "{}", today) for i in ids],
+        )
+        _insert(
+            cur,
+            "club_members",
+            ("club_id", "user_id", "joined"),
+            [(f"c{i % clubs}", f"u{i}", today) for i in ids],
+        )
+        _insert(
+            cur,
+            "messages",
+            ("id", "user_id", "date", "text", "read"),
+            [
+                (i * messages + k + 1, f"u{i}", today, f"message {k}", 0)
+                for i in ids
+                for k in range(messages)
+            ],
+        )
+        _insert(cur, "auth_tokens", ("token", "user_id", "ts"), [(f"t{i}", f"u{i}", expires) for i in ids])
+        _insert(
+            cur,
+            "refresh_tokens",
+            ("user_id", "token", "expires"),
+            [(f"u{i}", f"r{i}", expires) for i in ids],
+        )
+    _insert(cur, "clubs", ("club_id", "name"), [(f"c{c}", f"C{c}") for c in range(clubs)])
+    _insert(
+        cur,
+        "club_meta",
+        ("club_id", "banned_ids", "leader_id", "admin_ids", "pending_members", "rejected_members"),
+        [(f"c{c}", "[]", f"u{c}", "[]", "{}", "{}") for c in range(clubs)],
+    )
+    rng = random.Random(0)
+    start_date = datetime.date(2020, 1, 1)
+    columns = (
+        "id",
+        "club_id",
+        "type",
+        "date",
+        "player_a1",
+        "player_b1",
+        "score_a",
+        "score_b",
+        "weight",
+        "created_ts",
+        "approved_ts",
+    )
+    for start in range(0, matches, _CHUNK):
+        rows = []
+        for mid in range(start + 1, min(start + _CHUNK, matches) + 1):
+            c = rng.randrange(clubs)
+            per_club = (users - c + clubs - 1) // clubs
+            a, b = rng.sample(range(per_club), 2) if per_club > 1 else (0, 0)
+            date = start_date + datetime.timedelta(days=mid % 1500)
+            ts = datetime.datetime.combine(date, datetime.time(12)).isoformat()
+            rows.append(
+                (mid, f"c{c}", "singles", date.isoformat(), f"u{c + a * clubs}", f"u{c + b * clubs}", 6, mid % 5, 1.0, ts, ts)
+            )
+        _insert(cur, "matches", columns, rows)
+    if storage.IS_PG:
+        for table in ("matches", "messages"):
+            cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))")
+    conn.commit()
+    conn.close()
+    storage.invalidate_cache()
+    return clubs
+
+
+def _set_indexes(enabled: bool) -> None:
+    conn = storage._connect()
+    cur = conn.cursor()
+    for name, table, cols in migrations.SECONDARY_INDEXES:
+        if enabled:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({cols})")
+        else:
+            cur.execute(f"DROP INDEX IF EXISTS {name}")
+    cur.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+def _load_club(club_id: str) -> Club:
+    """Build one club with its members and matches without ``load_data``."""
+    conn = storage._connect()
+    cur = conn.cursor()
+    state = storage._read_club_state(cur, club_id)
+    club = Club(club_id=club_id, name=state["club"][0], leader_id=state["meta"][1])
+    for uid, joined in state["members"].items():
+        club.members[uid] = storage.get_player_record(uid)
+        club.member_joined[uid] = datetime.date.fromisoformat(joined)
+    for row in cur.execute(
+        "SELECT * FROM matches WHERE club_id = ? ORDER BY id",
+        (club_id,),
+    ).fetchall():
+        club.matches.append(storage._match_from_row(row, club.members, pending=False))
+    conn.close()
+    return club
+
+
+def _time(fn, calls: list[tuple]) -> float:
+    t0 = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - t0) / len(calls)
+
+
+def _save_without_member(club: Club, uid: str) -> None:
+    player = club.members.pop(uid)
+    # drop the remembered state so ``save_club`` reads the club's rows back
+    storage._club_states.pop(club.club_id, None)
+    storage.save_club(club)
+    club.members[uid] = player
+    storage.save_club(club)
+
+
+def _run_ops(users: int, clubs: int, rounds: int, rng: random.Random) -> dict[str, float]:
+    uids = [f"u{rng.randrange(users)}" for _ in range(rounds)]
+    club_ids = [f"c{rng.randrange(clubs)}" for _ in range(rounds)]
+    results = {
+        "list_user_messages": _time(storage.list_user_messages, [(u,) for u in uids]),
+        "mark_user_message_read": _time(storage.mark_user_message_read, [(u, 0) for u in uids]),
+        "get_club_member": _time(
+            storage.get_club_member,
+            [(c, u) for c, u in zip(club_ids, uids)],
+        ),
+        "get_refresh_token": _time(storage.get_refresh_token, [(f"r{u[1:]}",) for u in uids]),
+    }
+    saves = []
+    for cid in club_ids[: max(1, rounds // 10)]:
+        club = _load_club(cid)
+        saves.append((club, next(iter(club.members))))
+    results["save_club (remove member)"] = _time(_save_without_member, saves)
+    return results
+
+
+def run(users: int, club_size: int, matches: int, messages: int, rounds: int) -> None:
+    t0 = time.perf_counter()
+    clubs = _populate(users, club_size, matches, messages)
+    print(f"generated {users} users, {clubs} clubs, {matches} matches in {time.perf_counter() - t0:.1f}s")
+    _set_indexes(False)
+    without = _run_ops(users, clubs, rounds, random.Random(1))
+    _set_indexes(True)
+    with_idx = _run_ops(users, clubs, rounds, random.Random(2))
+    print(f"{'operation':<28} {'no index':>12} {'indexed':>12} {'speedup':>8}")
+    for name, slow in without.items():
+        fast = with_idx[name]
+        print(f"{name:<28} {slow * 1000:>10.3f}ms {fast * 1000:>10.3f}ms {slow / fast:>7.1f}x")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--club-size", type=int, default=100)
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--messages", type=int, default=3, help="messages per user")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--database-url")
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _use_database(args.database_url, tmpdir)
+        run(args.users, args.club_size, args.matches, args.messages, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
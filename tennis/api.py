@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, HTTPException, Depends, Header, UploadFile, File, Request
+from fastapi import FastAPI, HTTPException, Depends, Header, UploadFile, File, Request, Response
 from fastapi.staticfiles import StaticFiles
 import shutil
 from uuid import uuid4
 from .services.exceptions import ServiceError
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, StrictInt
+from contextlib import asynccontextmanager
 import datetime
 import json
 import urllib.request
@@ -27,7 +28,9 @@ ADMIN_ROOT.mkdir(parents=True, exist_ok=True)
 
 
 import tennis.storage as storage
-from .storage import load_data, load_users, invalidate_cache, get_cache_version
+from . import clubstats, cursors, history, leaderboard, notifications, search, wechat
+from .config import get_notify_dispatcher
+from .storage import invalidate_cache, get_cache_version
 
 # ensure cached data does not leak across reloads
 invalidate_cache()
@@ -84,16 +87,31 @@ from .services.stats import _pending_status_for_user, _club_stats
 from .services.friends import get_player_friends
 from .models import Player, Club, Match, DoublesMatch, Appointment, User
 
-# Runtime state loaded from persistent storage. ``load_data`` returns the
-# internal cache dictionaries, so these remain in sync with updates performed
-# through the storage layer.
-clubs, players = load_data()
-users = load_users()
+# Runtime state backed by the storage caches. Looking up a single club, player
+# or user only loads that entity; iterating loads everything on first use.
+clubs = storage.club_view
+players = storage.player_view
+users = storage.user_view
 import tennis.cli as cli_module
 cli_module.players = players
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Follow the cache changes of other workers over Redis pub/sub.
+
+    Unless ``NOTIFY_DISPATCHER=off`` each worker also sends the queued
+    WeChat notifications in the background.
+    """
+    storage.start_cache_subscriber()
+    if get_notify_dispatcher() == "api":
+        notifications.start_dispatcher()
+    yield
+    notifications.stop_dispatcher()
+    storage.stop_cache_subscriber()
+
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory=STATIC_ROOT), name="static")
 # Expose a very small web based admin dashboard stored under ``static/admin``.
 app.mount("/admin", StaticFiles(directory=ADMIN_ROOT, html=True), name="admin")
@@ -101,16 +119,14 @@ app.mount("/admin", StaticFiles(directory=ADMIN_ROOT, html=True), name="admin")
 
 @app.middleware("http")
 async def cache_sync_middleware(request: Request, call_next):
-    """Reload cached data when another worker has updated the version."""
-    global CACHE_VERSION, clubs, users, players
-    version = storage.get_cache_version()
-    if version != CACHE_VERSION:
-        invalidate_cache()
-        clubs, players = load_data()
-        users = load_users()
-        import tennis.cli as cli_module
-        cli_module.players = players
-        CACHE_VERSION = version
+    """Refresh cached entities another worker has changed.
+
+    Only the clubs, users and players named in the change records published
+    since :data:`CACHE_VERSION` are reloaded. While the pub/sub subscriber is
+    connected this does not touch Redis; otherwise the version is polled.
+    """
+    global CACHE_VERSION
+    CACHE_VERSION = storage.sync_cache_events(CACHE_VERSION)
     response = await call_next(request)
     return response
 
@@ -203,15 +219,6 @@ def absolute_url(request: Request, path: str | None) -> str | None:
 
 
 
-def _region_match(player_region: str | None, filter_region: str | None) -> bool:
-    """Return True if the player's region matches the filter."""
-    if not filter_region:
-        return True
-    if not player_region:
-        return False
-    return player_region.startswith(filter_region)
-
-
 class ClubCreate(BaseModel):
     club_id: str | None = None
     name: str
@@ -512,50 +519,34 @@ def list_players(
         raise HTTPException(404, "Club not found")
 
     gender = normalize_gender(gender)
-    today = datetime.date.today()
-    get_rating = weighted_doubles_rating if doubles else weighted_rating
-    
+    rows = leaderboard.page(
+        [club_id],
+        doubles,
+        sort=sort,
+        min_rating=min_rating,
+        max_rating=max_rating,
+        min_age=min_age,
+        max_age=max_age,
+        gender=gender,
+        region=region,
+    )
     players = []
-    for p in club.members.values():
-        rating = get_rating(p, today)
-        singles_count = weighted_singles_matches(p)
-        doubles_count = weighted_doubles_matches(p)
-        if min_rating is not None and (rating is None or rating < min_rating):
-            continue
-        if max_rating is not None and (rating is None or rating > max_rating):
-            continue
-        if min_age is not None and (p.age is None or p.age < min_age):
-            continue
-        if max_age is not None and (p.age is None or p.age > max_age):
-            continue
-        if gender is not None and p.gender != gender:
-            continue
-        if not _region_match(p.region, region):
-            continue
+    for row in rows:
+        p = row.player
         entry = {
             "user_id": p.user_id,
             "name": p.name,
             "avatar": p.avatar,
             "gender": p.gender,
             "joined": club.member_joined.get(p.user_id, p.joined).isoformat(),
-            "weighted_singles_matches": round(singles_count, 2),
-            "weighted_doubles_matches": round(doubles_count, 2),
+            "weighted_singles_matches": round(row.singles_matches, 2),
+            "weighted_doubles_matches": round(row.doubles_matches, 2),
         }
         if doubles:
-            entry["doubles_rating"] = rating
+            entry["doubles_rating"] = row.rating
         else:
-            entry["singles_rating"] = rating
+            entry["singles_rating"] = row.rating
         players.append(entry)
-
-    if sort == "matches":
-        key = "weighted_doubles_matches" if doubles else "weighted_singles_matches"
-        players.sort(key=lambda x: x.get(key, float('-inf')), reverse=True)
-    else:
-        key = "doubles_rating" if doubles else "singles_rating"
-        players.sort(
-            key=lambda x: x.get(key, float("-inf")) if x.get(key) is not None else float("-inf"),
-            reverse=True,
-        )
     return players
 
 
@@ -571,6 +562,8 @@ def get_global_player(user_id: str, request: Request, recent: int = 0):
     doubles = weighted_doubles_rating(player, today)
     singles_count = weighted_singles_matches(player)
     doubles_count = weighted_doubles_matches(player)
+    # the player's memberships, read without loading their clubs
+    joins = storage.player_club_joins(user_id)
 
     result = {
         "user_id": player.user_id,
@@ -583,14 +576,7 @@ def get_global_player(user_id: str, request: Request, recent: int = 0):
         "handedness": player.handedness,
         "backhand": player.backhand,
         "region": player.region,
-        "joined": min(
-            (
-                club.member_joined.get(player.user_id, player.joined)
-                for club in clubs.values()
-                if player.user_id in club.members
-            ),
-            default=player.joined,
-        ).isoformat(),
+        "joined": min((day or player.joined for day in joins.values()), default=player.joined).isoformat(),
         "singles_rating": singles,
         "doubles_rating": doubles,
         "weighted_singles_matches": round(singles_count, 2),
@@ -600,35 +586,113 @@ def get_global_player(user_id: str, request: Request, recent: int = 0):
     }
 
     if recent > 0:
-        from .cli import get_player_match_cards
-
-        cards = []
-        # iterate across all clubs to collect matches for this player
-        for club_id, club in clubs.items():
-            if user_id not in club.members:
-                continue
-            try:
-                match_cards = get_player_match_cards(clubs, club_id, user_id)
-            except ValueError:
-                continue
-            for c in match_cards:
-                c["date"] = c["date"].isoformat()
-                cards.append(c)
-        # sort by approval timestamp when available
-        cards.sort(
-            key=lambda x: (
-                x.get("approved_ts") or x["date"],
-                x.get("approved_ts") or x.get("created_ts", x["date"]),
-            ),
-            reverse=True,
-        )
-        result["recent_records"] = cards[:recent]
+        # the most recent matches in the clubs the player belongs to
+        rows = history.page(player, False, club_ids=list(joins), limit=recent)
+        result["recent_records"] = [_record_card(m, player, False) for _, m in rows]
 
     return result
 
 
+def _after_id(kind: str, cursor: str | None) -> str | None:
+    """Return the id stored in an id-ordered list ``cursor``."""
+    if not cursor:
+        return None
+    try:
+        key = cursors.decode(kind, cursor)
+        if len(key) != 1 or not isinstance(key[0], str):
+            raise ValueError("Invalid cursor")
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return key[0]
+
+
+def _after_match(kind: str, cursor: str | None) -> tuple | None:
+    """Return the match sort key stored in a match-ordered list ``cursor``."""
+    if not cursor:
+        return None
+    try:
+        key = cursors.decode(kind, cursor)
+        if len(key) != 4 or not isinstance(key[3], int) or not all(isinstance(k, str) for k in key[:3]):
+            raise ValueError("Invalid cursor")
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return tuple(key)
+
+
+def _next_page(kind: str, rows: list, limit: int | None, key, response: Response) -> list:
+    """Trim ``rows`` fetched with one extra row and set the next cursor."""
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        if rows:
+            response.headers[cursors.HEADER] = cursors.encode(kind, key(rows[-1]))
+    return rows
+
+
+def _players_page(
+    club: str | None,
+    doubles: bool,
+    sort: str,
+    limit: int | None,
+    offset: int,
+    cursor: str | None,
+    **filters,
+) -> tuple[list[dict[str, object]], str | None]:
+    """Return one page of ``/players`` and the cursor of the next page."""
+    filters["gender"] = normalize_gender(filters.get("gender"))
+    club_ids = club.split(",") if club else None
+    for cid in club_ids or ():
+        if cid not in clubs:
+            raise HTTPException(404, "Club not found")
+
+    kind = f"players:{'doubles' if doubles else 'singles'}:{'matches' if sort == 'matches' else 'rating'}"
+    after = None
+    if cursor:
+        try:
+            key = cursors.decode(kind, cursor)
+            if len(key) != 2 or not isinstance(key[0], (int, float)) or not isinstance(key[1], str):
+                raise ValueError("Invalid cursor")
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        after = tuple(key)
+
+    rows = leaderboard.page(
+        club_ids,
+        doubles,
+        sort=sort,
+        offset=offset,
+        limit=None if limit is None else limit + 1,
+        after=after,
+        **filters,
+    )
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = cursors.encode(kind, rows[-1].key) if rows else None
+    players = []
+    for row in rows:
+        p = row.player
+        joined = clubs[row.club_id].member_joined.get(p.user_id, p.joined) if row.club_id else p.joined
+        entry = {
+            "club_id": row.club_id,
+            "user_id": p.user_id,
+            "name": p.name,
+            "avatar": p.avatar,
+            "gender": p.gender,
+            "joined": joined.isoformat(),
+            "weighted_singles_matches": round(row.singles_matches, 2),
+            "weighted_doubles_matches": round(row.doubles_matches, 2),
+        }
+        if doubles:
+            entry["doubles_rating"] = row.rating
+        else:
+            entry["singles_rating"] = row.rating
+        players.append(entry)
+    return players, next_cursor
+
+
 @app.get("/players")
 def list_all_players(
+    response: Response,
     min_rating: float | None = None,
     max_rating: float | None = None,
     min_age: int | None = None,
@@ -640,118 +704,35 @@ def list_all_players(
     sort: str = "rating",
     limit: int | None = None,
     offset: int = 0,
+    cursor: str | None = None,
 ):
-    """Return players from one or more clubs optionally filtered and sorted."""
-
-    gender = normalize_gender(gender)
-    if not club:
-        clubs_to_iter = list(clubs.values())
-        _, all_players = storage.load_data()
-        extra_players = [
-            p
-            for p in all_players.values()
-            if all(p.user_id not in c.members for c in clubs_to_iter)
-        ]
-    else:
-        club_ids = club.split(",")
-        clubs_to_iter = []
-        for cid in club_ids:
-            c = clubs.get(cid)
-            if not c:
-                raise HTTPException(404, "Club not found")
-            clubs_to_iter.append(c)
-        extra_players = []
-    today = datetime.date.today()
-    get_rating = weighted_doubles_rating if doubles else weighted_rating
-    players_map: dict[str, dict[str, object]] = {}
-    for c in clubs_to_iter:
-        for p in c.members.values():
-            rating = get_rating(p, today)
-            singles_count = weighted_singles_matches(p)
-            doubles_count = weighted_doubles_matches(p)
-            if min_rating is not None and (rating is None or rating < min_rating):
-                continue
-            if max_rating is not None and (rating is None or rating > max_rating):
-                continue
-            if min_age is not None and (p.age is None or p.age < min_age):
-                continue
-            if max_age is not None and (p.age is None or p.age > max_age):
-                continue
-            if gender is not None and p.gender != gender:
-                continue
-            if not _region_match(p.region, region):
-                continue
-            if p.user_id in players_map:
-                continue
-            entry = {
-                "club_id": c.club_id,
-                "user_id": p.user_id,
-                "name": p.name,
-                "avatar": p.avatar,
-                "gender": p.gender,
-                "joined": c.member_joined.get(p.user_id, p.joined).isoformat(),
-                "weighted_singles_matches": round(singles_count, 2),
-                "weighted_doubles_matches": round(doubles_count, 2),
-            }
-            if doubles:
-                entry["doubles_rating"] = rating
-            else:
-                entry["singles_rating"] = rating
-            players_map[p.user_id] = entry
-
-    if not club:
-        for p in extra_players:
-            rating = get_rating(p, today)
-            singles_count = weighted_singles_matches(p)
-            doubles_count = weighted_doubles_matches(p)
-            if min_rating is not None and (rating is None or rating < min_rating):
-                continue
-            if max_rating is not None and (rating is None or rating > max_rating):
-                continue
-            if min_age is not None and (p.age is None or p.age < min_age):
-                continue
-            if max_age is not None and (p.age is None or p.age > max_age):
-                continue
-            if gender is not None and p.gender != gender:
-                continue
-            if not _region_match(p.region, region):
-                continue
-            if p.user_id in players_map:
-                continue
-            entry = {
-                "club_id": None,
-                "user_id": p.user_id,
-                "name": p.name,
-                "avatar": p.avatar,
-                "gender": p.gender,
-                "joined": p.joined.isoformat(),
-                "weighted_singles_matches": round(singles_count, 2),
-                "weighted_doubles_matches": round(doubles_count, 2),
-            }
-            if doubles:
-                entry["doubles_rating"] = rating
-            else:
-                entry["singles_rating"] = rating
-            players_map[p.user_id] = entry
-    players = list(players_map.values())
-    if sort == "matches":
-        key = "weighted_doubles_matches" if doubles else "weighted_singles_matches"
-        players.sort(key=lambda x: x.get(key, float("-inf")), reverse=True)
-    else:
-        key = "doubles_rating" if doubles else "singles_rating"
-        players.sort(
-            key=lambda x: x.get(key, float("-inf")) if x.get(key) is not None else float("-inf"),
-            reverse=True,
-        )
-    if offset:
-        players = players[offset:]
-    if limit is not None:
-        players = players[:limit]
+    """Return players from one or more clubs optionally filtered and sorted.
+
+    When more rows follow, ``X-Next-Cursor`` holds the ``cursor`` for them.
+    """
+
+    players, next_cursor = _players_page(
+        club,
+        doubles,
+        sort,
+        limit,
+        offset,
+        cursor,
+        min_rating=min_rating,
+        max_rating=max_rating,
+        min_age=min_age,
+        max_age=max_age,
+        gender=gender,
+        region=region,
+    )
+    if next_cursor:
+        response.headers[cursors.HEADER] = next_cursor
     return players
 
 
 @app.get("/leaderboard_full")
 def leaderboard_full(
+    response: Response,
     user_id: str | None = None,
     include_clubs: bool = True,
     include_joined: bool = True,
@@ -767,6 +748,7 @@ def leaderboard_full(
     sort: str = "rating",
     limit: int | None = None,
     offset: int = 0,
+    cursor: str | None = None,
 ):
     """Return club list, joined clubs and leaderboard data in one call."""
 
@@ -780,24 +762,27 @@ def leaderboard_full(
             user = users.get(user_id)
             if not user:
                 raise HTTPException(404, "User not found")
-            result["joined_clubs"] = [cid for cid, c in clubs.items() if user_id in c.members]
+            result["joined_clubs"] = list(storage.player_club_joins(user_id))
         else:
             result["joined_clubs"] = []
 
     if include_players:
-        result["players"] = list_all_players(
+        result["players"], next_cursor = _players_page(
+            club,
+            doubles,
+            sort,
+            limit,
+            offset,
+            cursor,
             min_rating=min_rating,
             max_rating=max_rating,
             min_age=min_age,
             max_age=max_age,
             gender=gender,
-            club=club,
-            doubles=doubles,
             region=region,
-            sort=sort,
-            limit=limit,
-            offset=offset,
         )
+        if next_cursor:
+            response.headers[cursors.HEADER] = next_cursor
 
     return result
 
@@ -938,102 +923,141 @@ def get_player(club_id: str, user_id: str, request: Request, recent: int = 0):
         from .cli import get_player_match_cards
 
         try:
-            cards = get_player_match_cards(clubs, club_id, user_id)
+            cards = get_player_match_cards(clubs, club_id, user_id, limit=recent)
         except ValueError as e:
             raise HTTPException(404, str(e))
         for c in cards:
             c["date"] = c["date"].isoformat()
-        result["recent_records"] = cards[:recent]
+        result["recent_records"] = cards
 
     return result
 
 
+def _record_card(match, player: Player, doubles: bool) -> dict[str, object]:
+    """Return the record card of ``match`` as seen by ``player``."""
+    from .cli import _doubles_match_to_card, _match_to_card
+
+    card = (_doubles_match_to_card if doubles else _match_to_card)(match, player)
+    card["date"] = card["date"].isoformat()
+    del card["created_ts"]
+    card.pop("approved_ts", None)
+    return card
+
+
+def _record_page(
+    player: Player,
+    doubles: bool,
+    club_ids: list[str] | None,
+    limit: int | None,
+    offset: int,
+    cursor: str | None,
+    response: Response,
+) -> list[dict[str, object]]:
+    """Return one page of a player's record cards, newest first.
+
+    The cards come from the sorted history index, so a page costs the rows
+    it returns wherever it starts.
+    """
+    kind = "doubles_records" if doubles else "records"
+    rows = history.page(
+        player,
+        doubles,
+        club_ids=club_ids,
+        after=_after_match(kind, cursor),
+        limit=None if limit is None else limit + 1,
+        offset=offset,
+    )
+    rows = _next_page(kind, rows, limit, lambda row: list(row[0]), response)
+    return [_record_card(m, player, doubles) for _, m in rows]
+
+
+def _club_member(club_id: str, user_id: str) -> Player:
+    club = clubs.get(club_id)
+    if not club:
+        raise HTTPException(404, "Club not found")
+    player = club.members.get(user_id)
+    if not player:
+        raise HTTPException(404, "Player not found")
+    return player
+
+
 @app.get("/clubs/{club_id}/players/{user_id}/records")
 def get_player_records(
-    club_id: str, user_id: str, limit: int | None = None, offset: int = 0
+    club_id: str,
+    user_id: str,
+    response: Response,
+    limit: int | None = None,
+    offset: int = 0,
+    cursor: str | None = None,
 ):
-    from .cli import get_player_match_cards
+    """Return singles match history cards for a player in one club.
 
-    try:
-        cards = get_player_match_cards(clubs, club_id, user_id)
-    except ValueError as e:
-        raise HTTPException(404, str(e))
-    # convert dates to iso strings
-    for c in cards:
-        c["date"] = c["date"].isoformat()
-    if offset:
-        cards = cards[offset:]
-    if limit is not None:
-        cards = cards[:limit]
-    return cards
+    When more rows follow, ``X-Next-Cursor`` holds the ``cursor`` for them.
+    """
+    player = _club_member(club_id, user_id)
+    return _record_page(player, False, [club_id], limit, offset, cursor, response)
 
 
 @app.get("/clubs/{club_id}/players/{user_id}/doubles_records")
 def get_player_doubles_records(
-    club_id: str, user_id: str, limit: int | None = None, offset: int = 0
+    club_id: str,
+    user_id: str,
+    response: Response,
+    limit: int | None = None,
+    offset: int = 0,
+    cursor: str | None = None,
 ):
-    """Return doubles match history cards for a player."""
-    from .cli import get_player_doubles_cards
+    """Return doubles match history cards for a player.
 
-    try:
-        cards = get_player_doubles_cards(clubs, club_id, user_id)
-    except ValueError as e:
-        raise HTTPException(404, str(e))
-    for c in cards:
-        c["date"] = c["date"].isoformat()
-    if offset:
-        cards = cards[offset:]
-    if limit is not None:
-        cards = cards[:limit]
-    return cards
+    When more rows follow, ``X-Next-Cursor`` holds the ``cursor`` for them.
+    """
+    player = _club_member(club_id, user_id)
+    return _record_page(player, True, [club_id], limit, offset, cursor, response)
 
 
 @app.get("/players/{user_id}/records")
 def get_global_player_records(
-    user_id: str, limit: int | None = None, offset: int = 0
+    user_id: str,
+    response: Response,
+    limit: int | None = None,
+    offset: int = 0,
+    cursor: str | None = None,
 ):
-    """Return singles match history across all clubs for a player."""
-    from .cli import get_player_global_match_cards
+    """Return singles match history across all clubs for a player.
 
+    When more rows follow, ``X-Next-Cursor`` holds the ``cursor`` for them.
+    """
     player = storage.get_player(user_id)
     if not player:
         raise HTTPException(404, "Player not found")
-
-    cards = get_player_global_match_cards(player)
-    for c in cards:
-        c["date"] = c["date"].isoformat()
-    if offset:
-        cards = cards[offset:]
-    if limit is not None:
-        cards = cards[:limit]
-    return cards
+    return _record_page(player, False, None, limit, offset, cursor, response)
 
 
 @app.get("/players/{user_id}/doubles_records")
 def get_global_player_doubles_records(
-    user_id: str, limit: int | None = None, offset: int = 0
+    user_id: str,
+    response: Response,
+    limit: int | None = None,
+    offset: int = 0,
+    cursor: str | None = None,
 ):
-    """Return doubles match history across all clubs for a player."""
-    from .cli import get_player_global_doubles_cards
+    """Return doubles match history across all clubs for a player.
 
+    When more rows follow, ``X-Next-Cursor`` holds the ``cursor`` for them.
+    """
     player = storage.get_player(user_id)
     if not player:
         raise HTTPException(404, "Player not found")
-
-    cards = get_player_global_doubles_cards(player)
-    for c in cards:
-        c["date"] = c["date"].isoformat()
-    if offset:
-        cards = cards[offset:]
-    if limit is not None:
-        cards = cards[:limit]
-    return cards
+    return _record_page(player, True, None, limit, offset, cursor, response)
 
 
 @app.get("/players/{user_id}/friends")
-def get_player_friends_api(user_id: str, request: Request):
-    """Return friend statistics aggregated from matches."""
-    friends = get_player_friends(user_id)
+def get_player_friends_api(user_id: str, request: Request, limit: int | None = None):
+    """Return friend statistics aggregated from matches.
+
+    ``limit`` keeps only the friends with the most games together.
+    """
+    friends = get_player_friends(user_id, limit)
     for f in friends:
         f["avatar_url"] = absolute_url(request, f.get("avatar"))
         for k in (
@@ -1344,23 +1368,21 @@ def _user_summary(user: User, request: Request) -> dict[str, object]:
 @app.get("/sys/users")
 def list_all_users(
     request: Request,
+    response: Response,
     query: str | None = None,
     limit: int | None = None,
     offset: int = 0,
+    cursor: str | None = None,
 ) -> list[dict[str, object]]:
     """Return users optionally filtered by a search query."""
-    q = query.lower() if query else None
-    result = []
-    for u in users.values():
-        if q and q not in u.user_id.lower() and q not in u.name.lower():
-            continue
-        result.append(_user_summary(u, request))
-    result.sort(key=lambda x: x["user_id"])
-    if offset:
-        result = result[offset:]
-    if limit is not None:
-        result = result[:limit]
-    return result
+    ids = storage.user_ids_page(
+        _after_id("users", cursor),
+        None if limit is None else limit + 1,
+        offset,
+        query,
+    )
+    ids = _next_page("users", ids, limit, lambda uid: [uid], response)
+    return [_user_summary(u, request) for u in (users.get(uid) for uid in ids) if u]
 
 
 @app.post("/sys/users/{user_id}/limits")
@@ -1386,15 +1408,24 @@ def update_user_limits(user_id: str, data: LimitsUpdateRequest, authorization: s
 
 @app.get("/sys/clubs")
 def list_all_clubs(
+    response: Response,
     query: str | None = None,
     limit: int | None = None,
     offset: int = 0,
+    cursor: str | None = None,
 ) -> list[dict[str, object]]:
     """Return clubs optionally filtered by a search query with stats."""
-    q = query.lower() if query else None
+    ids = storage.club_ids_page(
+        _after_id("clubs", cursor),
+        None if limit is None else limit + 1,
+        offset,
+        query,
+    )
+    ids = _next_page("clubs", ids, limit, lambda cid: [cid], response)
     result = []
-    for c in clubs.values():
-        if q and q not in c.club_id.lower() and q not in c.name.lower():
+    for cid in ids:
+        c = clubs.get(cid)
+        if not c:
             continue
         result.append(
             {
@@ -1405,11 +1436,6 @@ def list_all_clubs(
                 "total_matches": len(c.matches),
             }
         )
-    result.sort(key=lambda x: x["club_id"])
-    if offset:
-        result = result[offset:]
-    if limit is not None:
-        result = result[:limit]
     return result
 
 
@@ -1430,40 +1456,31 @@ def sys_set_club_leader(club_id: str, data: SysLeaderRequest, authorization: str
     return {"status": "ok"}
 
 
-def _iter_all_matches():
-    """Yield all unique match objects across the system."""
-    seen: set[int] = set()
-    for club in clubs.values():
-        for m in club.matches:
-            if m.id in seen:
-                continue
-            seen.add(m.id)
-            yield m
-    for p in players.values():
-        for m in p.singles_matches:
-            if m.id in seen:
-                continue
-            seen.add(m.id)
-            yield m
-        for m in p.doubles_matches:
-            if m.id in seen:
-                continue
-            seen.add(m.id)
-            yield m
-
-
 @app.get("/sys/stats")
 def system_stats() -> dict[str, int]:
     """Return aggregated statistics for system overview."""
-    total_users = len(users)
-    total_matches = sum(1 for _ in _iter_all_matches())
-    total_clubs = len(clubs)
-    pending_items = sum(len(c.pending_members) + len(c.pending_matches) for c in clubs.values())
+    totals = storage.system_totals()
     return {
-        "total_users": total_users,
-        "total_matches": total_matches,
-        "total_clubs": total_clubs,
-        "pending_items": pending_items,
+        "total_users": totals["users"],
+        "total_matches": storage.stat_total("matches"),
+        "total_clubs": totals["clubs"],
+        "pending_items": totals["pending_members"] + totals["pending_matches"],
+    }
+
+
+@app.get("/sys/metrics")
+def system_metrics() -> dict[str, object]:
+    """Return runtime metrics of the storage layer."""
+    return {
+        "db_pool": storage.pool_stats(),
+        "cache": storage.cache_stats(),
+        "tokens": storage.token_cache_stats(),
+        "notifications": {**notifications.dispatcher_stats(), "outbox": storage.notification_counts()},
+        "wechat": wechat.client_stats(),
+        "leaderboard": leaderboard.index_stats(),
+        "history": history.index_stats(),
+        "club_stats": clubstats.cache_stats(),
+        "search": search.index_stats(),
     }
 
 
@@ -1476,22 +1493,13 @@ def system_user_trend(days: int = 7) -> list[dict[str, object]]:
     end = datetime.date.today()
     start = end - datetime.timedelta(days=days - 1)
 
-    join_dates: dict[str, datetime.date] = {}
-    for club in clubs.values():
-        for uid, p in club.members.items():
-            d = club.member_joined.get(uid, p.joined)
-            if uid not in join_dates or d < join_dates[uid]:
-                join_dates[uid] = d
-
-    sorted_dates = sorted(join_dates.values())
+    # members who first joined from ``start`` on, including future join dates
+    joins = storage.daily_stats("members", start)
+    total = storage.stat_total("members") - sum(joins.values())
     result = []
-    total = 0
-    idx = 0
     current = start
     while current <= end:
-        while idx < len(sorted_dates) and sorted_dates[idx] <= current:
-            total += 1
-            idx += 1
+        total += joins.get(current, 0)
         result.append({"date": current.isoformat(), "count": total})
         current += datetime.timedelta(days=1)
 
@@ -1507,10 +1515,7 @@ def system_match_activity(days: int = 7) -> list[dict[str, object]]:
     end = datetime.date.today()
     start = end - datetime.timedelta(days=days - 1)
 
-    counts: dict[datetime.date, int] = {}
-    for m in _iter_all_matches():
-        if start <= m.date <= end:
-            counts[m.date] = counts.get(m.date, 0) + 1
+    counts = storage.daily_stats("matches", start, end)
 
     result = []
     current = start
@@ -1521,186 +1526,153 @@ def system_match_activity(days: int = 7) -> list[dict[str, object]]:
     return result
 
 
+def _match_feed(
+    doubles: bool,
+    limit: int | None,
+    offset: int,
+    cursor: str | None,
+    response: Response,
+) -> tuple[list[dict], dict[str, tuple[str, str | None]]]:
+    """Return one page of approved match rows and the names of their players.
+
+    The rows come from ``idx_matches_feed`` in the order the feeds have
+    always used, so a page costs the same wherever it starts.
+    """
+    kind = "doubles" if doubles else "matches"
+    rows = storage.match_page(doubles, _after_match(kind, cursor), None if limit is None else limit + 1, offset)
+    rows = _next_page(kind, rows, limit, lambda row: list(row["key"]), response)
+    names = storage.player_names(
+        row[slot] for row in rows for slot in ("player_a1", "player_a2", "player_b1", "player_b2")
+    )
+    return rows, names
+
+
+def _singles_record(row: dict, names: dict[str, tuple[str, str | None]]) -> dict[str, object]:
+    """Return the ``/sys/matches`` record of a singles ``match_page`` row."""
+    a_name, a_avatar = names.get(row["player_a1"], (row["player_a1"], None))
+    b_name, b_avatar = names.get(row["player_b1"], (row["player_b1"], None))
+    return {
+        "date": row["date"],
+        "club_id": row["club_id"],
+        "player_a": row["player_a1"],
+        "player_b": row["player_b1"],
+        "a_name": a_name,
+        "b_name": b_name,
+        "a_avatar": a_avatar,
+        "b_avatar": b_avatar,
+        "score_a": row["score_a"],
+        "score_b": row["score_b"],
+        "location": row["location"],
+        "format": row["format_name"],
+        "a_before": row["rating_a1_before"],
+        "a_after": row["rating_a1_after"],
+        "b_before": row["rating_b1_before"],
+        "b_after": row["rating_b1_after"],
+    }
+
+
+def _doubles_record(row: dict, names: dict[str, tuple[str, str | None]]) -> dict[str, object]:
+    """Return the ``/sys/doubles`` record of a doubles ``match_page`` row."""
+    a1_name, a1_avatar = names.get(row["player_a1"], (row["player_a1"], None))
+    a2_name, a2_avatar = names.get(row["player_a2"], (row["player_a2"], None))
+    b1_name, b1_avatar = names.get(row["player_b1"], (row["player_b1"], None))
+    b2_name, b2_avatar = names.get(row["player_b2"], (row["player_b2"], None))
+    return {
+        "date": row["date"],
+        "club_id": row["club_id"],
+        "a1": row["player_a1"],
+        "a2": row["player_a2"],
+        "b1": row["player_b1"],
+        "b2": row["player_b2"],
+        "a1_name": a1_name,
+        "a2_name": a2_name,
+        "b1_name": b1_name,
+        "b2_name": b2_name,
+        "a1_avatar": a1_avatar,
+        "a2_avatar": a2_avatar,
+        "b1_avatar": b1_avatar,
+        "b2_avatar": b2_avatar,
+        "score_a": row["score_a"],
+        "score_b": row["score_b"],
+        "location": row["location"],
+        "format": row["format_name"],
+        "rating_a1_before": row["rating_a1_before"],
+        "rating_a2_before": row["rating_a2_before"],
+        "rating_b1_before": row["rating_b1_before"],
+        "rating_b2_before": row["rating_b2_before"],
+        "rating_a1_after": row["rating_a1_after"],
+        "rating_a2_after": row["rating_a2_after"],
+        "rating_b1_after": row["rating_b1_after"],
+        "rating_b2_after": row["rating_b2_after"],
+    }
+
+
+# matches read per query by the streaming exports
+EXPORT_BATCH = 500
+
+
+def _export_feed(doubles: bool):
+    """Yield every approved match of one type as NDJSON, in feed order.
+
+    Matches are read ``EXPORT_BATCH`` at a time, each batch seeking past the
+    last one in ``idx_matches_feed``, so memory stays bounded however long
+    the history is and no connection is held between batches.
+    """
+    record = _doubles_record if doubles else _singles_record
+    after = None
+    while True:
+        rows = storage.match_page(doubles, after, EXPORT_BATCH)
+        if not rows:
+            return
+        names = storage.player_names(
+            row[slot] for row in rows for slot in ("player_a1", "player_a2", "player_b1", "player_b2")
+        )
+        yield "".join(json.dumps(record(row, names), ensure_ascii=False) + "\n" for row in rows)
+        if len(rows) < EXPORT_BATCH:
+            return
+        after = rows[-1]["key"]
+
+
 @app.get("/sys/matches")
 def list_all_matches(
-    limit: int | None = None, offset: int = 0
+    response: Response,
+    limit: int | None = None,
+    offset: int = 0,
+    cursor: str | None = None,
 ) -> list[dict[str, object]]:
-    """Return all singles match records across all clubs."""
-    result = []
-    seen: set[int] = set()
-    for cid, club in clubs.items():
-        for m in club.matches:
-            if isinstance(m, DoublesMatch):
-                continue
-            seen.add(m.id)
-            result.append(
-                {
-                    "date": m.date,
-                    "created_ts": m.created_ts,
-                    "approved_ts": m.approved_ts,
-                    "club_id": cid,
-                    "player_a": m.player_a.user_id,
-                    "player_b": m.player_b.user_id,
-                    "a_name": m.player_a.name,
-                    "b_name": m.player_b.name,
-                    "a_avatar": m.player_a.avatar,
-                    "b_avatar": m.player_b.avatar,
-                    "score_a": m.score_a,
-                    "score_b": m.score_b,
-                    "location": m.location,
-                    "format": m.format_name,
-                    "a_before": m.rating_a_before,
-                    "a_after": m.rating_a_after,
-                    "b_before": m.rating_b_before,
-                    "b_after": m.rating_b_after,
-                }
-            )
-    # include matches from players not linked to existing clubs
-    for p in players.values():
-        for m in p.singles_matches:
-            if m.id in seen or isinstance(m, DoublesMatch):
-                continue
-            seen.add(m.id)
-            result.append(
-                {
-                    "date": m.date,
-                    "created_ts": m.created_ts,
-                    "approved_ts": m.approved_ts,
-                    "club_id": m.club_id,
-                    "player_a": m.player_a.user_id,
-                    "player_b": m.player_b.user_id,
-                    "a_name": m.player_a.name,
-                    "b_name": m.player_b.name,
-                    "a_avatar": m.player_a.avatar,
-                    "b_avatar": m.player_b.avatar,
-                    "score_a": m.score_a,
-                    "score_b": m.score_b,
-                    "location": m.location,
-                    "format": m.format_name,
-                    "a_before": m.rating_a_before,
-                    "a_after": m.rating_a_after,
-                    "b_before": m.rating_b_before,
-                    "b_after": m.rating_b_after,
-                }
-            )
-    result.sort(
-        key=lambda x: (
-            x.get("approved_ts") or datetime.datetime.min,
-            datetime.datetime.combine(x["date"], datetime.time()),
-            x["created_ts"],
-        ),
-        reverse=True,
-    )
-    if offset:
-        result = result[offset:]
-    if limit is not None:
-        result = result[:limit]
-    for r in result:
-        r["date"] = r["date"].isoformat()
-        r.pop("created_ts", None)
-        r.pop("approved_ts", None)
-    return result
+    """Return all singles match records across all clubs.
+
+    When more rows follow, ``X-Next-Cursor`` holds the ``cursor`` for them.
+    """
+    rows, names = _match_feed(False, limit, offset, cursor, response)
+    return [_singles_record(row, names) for row in rows]
 
 
 @app.get("/sys/doubles")
 def list_all_doubles(
-    limit: int | None = None, offset: int = 0
+    response: Response,
+    limit: int | None = None,
+    offset: int = 0,
+    cursor: str | None = None,
 ) -> list[dict[str, object]]:
-    """Return all doubles match records across all clubs."""
-    result = []
-    seen: set[int] = set()
-    for cid, club in clubs.items():
-        for m in club.matches:
-            if not isinstance(m, DoublesMatch):
-                continue
-            seen.add(m.id)
-            result.append(
-                {
-                    "date": m.date,
-                    "created_ts": m.created_ts,
-                    "approved_ts": m.approved_ts,
-                    "club_id": cid,
-                    "a1": m.player_a1.user_id,
-                    "a2": m.player_a2.user_id,
-                    "b1": m.player_b1.user_id,
-                    "b2": m.player_b2.user_id,
-                    "a1_name": m.player_a1.name,
-                    "a2_name": m.player_a2.name,
-                    "b1_name": m.player_b1.name,
-                    "b2_name": m.player_b2.name,
-                    "a1_avatar": m.player_a1.avatar,
-                    "a2_avatar": m.player_a2.avatar,
-                    "b1_avatar": m.player_b1.avatar,
-                    "b2_avatar": m.player_b2.avatar,
-                    "score_a": m.score_a,
-                    "score_b": m.score_b,
-                    "location": m.location,
-                    "format": m.format_name,
-                    "rating_a1_before": m.rating_a1_before,
-                    "rating_a2_before": m.rating_a2_before,
-                    "rating_b1_before": m.rating_b1_before,
-                    "rating_b2_before": m.rating_b2_before,
-                    "rating_a1_after": m.rating_a1_after,
-                    "rating_a2_after": m.rating_a2_after,
-                    "rating_b1_after": m.rating_b1_after,
-                    "rating_b2_after": m.rating_b2_after,
-                }
-            )
-    # include matches from players not linked to existing clubs
-    for p in players.values():
-        for m in p.doubles_matches:
-            if m.id in seen or not isinstance(m, DoublesMatch):
-                continue
-            seen.add(m.id)
-            result.append(
-                {
-                    "date": m.date,
-                    "created_ts": m.created_ts,
-                    "approved_ts": m.approved_ts,
-                    "club_id": m.club_id,
-                    "a1": m.player_a1.user_id,
-                    "a2": m.player_a2.user_id,
-                    "b1": m.player_b1.user_id,
-                    "b2": m.player_b2.user_id,
-                    "a1_name": m.player_a1.name,
-                    "a2_name": m.player_a2.name,
-                    "b1_name": m.player_b1.name,
-                    "b2_name": m.player_b2.name,
-                    "a1_avatar": m.player_a1.avatar,
-                    "a2_avatar": m.player_a2.avatar,
-                    "b1_avatar": m.player_b1.avatar,
-                    "b2_avatar": m.player_b2.avatar,
-                    "score_a": m.score_a,
-                    "score_b": m.score_b,
-                    "location": m.location,
-                    "format": m.format_name,
-                    "rating_a1_before": m.rating_a1_before,
-                    "rating_a2_before": m.rating_a2_before,
-                    "rating_b1_before": m.rating_b1_before,
-                    "rating_b2_before": m.rating_b2_before,
-                    "rating_a1_after": m.rating_a1_after,
-                    "rating_a2_after": m.rating_a2_after,
-                    "rating_b1_after": m.rating_b1_after,
-                    "rating_b2_after": m.rating_b2_after,
-                }
-            )
-    result.sort(
-        key=lambda x: (
-            x.get("approved_ts") or datetime.datetime.min,
-            datetime.datetime.combine(x["date"], datetime.time()),
-            x["created_ts"],
-        ),
-        reverse=True,
-    )
-    if offset:
-        result = result[offset:]
-    if limit is not None:
-        result = result[:limit]
-    for r in result:
-        r["date"] = r["date"].isoformat()
-        r.pop("created_ts", None)
-        r.pop("approved_ts", None)
-    return result
+    """Return all doubles match records across all clubs.
+
+    When more rows follow, ``X-Next-Cursor`` holds the ``cursor`` for them.
+    """
+    rows, names = _match_feed(True, limit, offset, cursor, response)
+    return [_doubles_record(row, names) for row in rows]
+
+
+@app.get("/sys/matches/export")
+def export_all_matches():
+    """Stream every singles match record as newline-delimited JSON."""
+    return StreamingResponse(_export_feed(False), media_type="application/x-ndjson")
+
+
+@app.get("/sys/doubles/export")
+def export_all_doubles():
+    """Stream every doubles match record as newline-delimited JSON."""
+    return StreamingResponse(_export_feed(True), media_type="application/x-ndjson")
 
 
 @app.get("/sys/pending_matches")
@@ -1712,12 +1684,17 @@ def list_all_pending_matches(authorization: str | None = Header(None)) -> list[d
         raise HTTPException(401, "Not authorized")
 
     from .models import DoublesMatch
-    from .cli import cleanup_pending_matches
+    from .cli import pending_match_expired
 
+    today = datetime.date.today()
     combined: list[dict[str, object]] = []
-    for cid, club in clubs.items():
-        cleanup_pending_matches(club)
+    for cid in storage.pending_match_clubs(doubles=False):
+        club = clubs.get(cid)
+        if not club:
+            continue
         for idx, m in enumerate(club.pending_matches):
+            if pending_match_expired(m, today):
+                continue
             if isinstance(m, DoublesMatch):
                 continue
             if m.status in {"rejected", "vetoed"}:
@@ -1779,12 +1756,17 @@ def list_all_pending_doubles(authorization: str | None = Header(None)) -> list[d
         raise HTTPException(401, "Not authorized")
 
     from .models import DoublesMatch
-    from .cli import cleanup_pending_matches
+    from .cli import pending_match_expired
 
+    today = datetime.date.today()
     combined: list[dict[str, object]] = []
-    for cid, club in clubs.items():
-        cleanup_pending_matches(club)
+    for cid in storage.pending_match_clubs(doubles=True):
+        club = clubs.get(cid)
+        if not club:
+            continue
         for idx, m in enumerate(club.pending_matches):
+            if pending_match_expired(m, today):
+                continue
             if not isinstance(m, DoublesMatch):
                 continue
             if m.status in {"rejected", "vetoed"}:
@@ -0,0 +1,56 @@
+"""Binary framing for the entity records cached in Redis.
+
+A record is a plain list of column values built by :mod:`tennis.storage`.
+It is stored as compact JSON behind a six byte header: the format version, a
+flag telling whether the payload is zlib compressed and the Unix time the
+record expires at (``0`` for never). Records written with a different
+:data:`FORMAT_VERSION` or past their expiry decode to ``None`` and are
+treated as cache misses, so the layout can change without flushing Redis and
+every record lives at most its TTL even though a Redis hash only expires as
+a whole.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+
+# bump whenever the layout of any record changes
+FORMAT_VERSION = 2
+# payloads at least this long are compressed
+COMPRESS_MIN = 1024
+
+_RAW = 0
+_ZLIB = 1
+_HEADER = struct.Struct(">BBI")
+
+
+def encode(record, expires: float | None = None) -> bytes:
+    """Return the framed bytes for ``record``, valid until Unix time ``expires``."""
+    data = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode()
+    stamp = int(expires) if expires else 0
+    if len(data) >= COMPRESS_MIN:
+        return _HEADER.pack(FORMAT_VERSION, _ZLIB, stamp) + zlib.compress(data, 1)
+    return _HEADER.pack(FORMAT_VERSION, _RAW, stamp) + data
+
+
+def decode(data: bytes | None, now: float | None = None):
+    """Return the record stored in ``data`` or ``None`` if it is unusable.
+
+    With ``now`` a record that expired by then is unusable as well.
+    """
+    if not data or len(data) < _HEADER.size or data[0] != FORMAT_VERSION:
+        return None
+    _, flag, expires = _HEADER.unpack_from(data)
+    if expires and now is not None and now >= expires:
+        return None
+    payload = data[_HEADER.size :]
+    try:
+        if flag == _ZLIB:
+            payload = zlib.decompress(payload)
+        elif flag != _RAW:
+            return None
+        return json.loads(payload)
+    except (ValueError, zlib.error):
+        return None
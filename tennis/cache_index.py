@@ -0,0 +1,80 @@
+"""Base classes of the in-process indexes over :mod:`tennis.storage` data.
+
+An index registers with :func:`tennis.storage.register_index`. The storage
+layer then calls :meth:`CacheIndex.touch` with the ids of every club, user
+and player it writes or reloads, and :meth:`CacheIndex.reset` when its
+caches are dropped.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Iterable, NamedTuple
+
+
+class CacheIndex:
+    """An index kept in step with the storage caches.
+
+    ``counters`` name the update counters reported by :meth:`stats`, next to
+    the sizes returned by :meth:`_sizes`.
+    """
+
+    def __init__(self, *counters: str):
+        self._lock = threading.RLock()
+        self._stats = dict.fromkeys(counters, 0)
+
+    def touch(self, kind: str, ids: Iterable[str]) -> None:
+        """Note that the ``ids`` of ``kind`` (clubs, users or players) were written."""
+
+    def reset(self) -> None:
+        """Forget everything derived from the storage caches."""
+
+    def _sizes(self) -> dict:
+        return {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(self._sizes())
+            return stats
+
+
+class Memoized(NamedTuple):
+    # the cached object the value was computed from
+    source: object
+    # summary of ``source`` telling whether the value is still current
+    signature: object
+    value: object
+
+
+class MemoIndex(CacheIndex):
+    """Values computed from one cached object each.
+
+    A value is computed again when its object is replaced by a reload, when
+    the object's signature changes or after its key was dropped.
+    """
+
+    def __init__(self):
+        super().__init__("builds", "reads")
+        self._entries: dict[str, Memoized] = {}
+
+    def _drop(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def _built(self, key: str, entry: Memoized) -> None:
+        """Called with every newly computed entry."""
+
+    def _memo(self, key: str, source, signature, build: Callable) -> Memoized:
+        """Return the current entry of ``key``; the caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None or entry.source is not source or entry.signature != signature:
+            self._drop(key)
+            entry = self._entries[key] = Memoized(source, signature, build(source))
+            self._built(key, entry)
+            self._stats["builds"] += 1
+        return entry
+
+    def reset(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
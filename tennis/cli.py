@@ -2,6 +2,7 @@ import argparse
 import datetime
 import random
 import string
+import time
 from passlib.context import CryptContext
 from typing import Optional
 
@@ -26,6 +27,7 @@ from .rating import (
     FORMAT_WEIGHTS,
     expected_score,
 )
+from . import history, storage
 from .storage import load_data, save_data, load_users, save_users
 from .wechat import send_audit_message
 
@@ -68,23 +70,29 @@ def validate_scores(score_a, score_b):
         raise ValueError("Invalid score")
 
 
+def pending_match_expired(m, today: datetime.date | None = None) -> bool:
+    """Return ``True`` if a pending match is past its retention period.
+
+    Rejected and vetoed matches are kept for 3 days, all others for 7 days
+    after they were created or, once both sides confirmed, after that.
+    """
+    today = today or datetime.date.today()
+    if m.status in {"rejected", "vetoed"}:
+        return bool(m.status_date) and (today - m.status_date).days >= 3
+    if not (m.confirmed_a and m.confirmed_b):
+        return bool(m.created) and (today - m.created).days >= 7
+    base = m.confirmed_on or m.created
+    return bool(base) and (today - base).days >= 7
+
+
 def cleanup_pending_matches(club: Club) -> None:
-    """Remove expired pending matches from a club."""
+    """Remove expired pending matches from a club.
+
+    Only the in-memory list changes; :mod:`tennis.maintenance` deletes
+    expired rows from the database.
+    """
     today = datetime.date.today()
-    remaining = []
-    for m in club.pending_matches:
-        if m.status in {"rejected", "vetoed"}:
-            if m.status_date and (today - m.status_date).days >= 3:
-                continue
-        elif not (m.confirmed_a and m.confirmed_b):
-            if (today - m.created).days >= 7:
-                continue
-        else:
-            base = m.confirmed_on or m.created
-            if (today - base).days >= 7:
-                continue
-        remaining.append(m)
-    club.pending_matches = remaining
+    club.pending_matches = [m for m in club.pending_matches if not pending_match_expired(m, today)]
 
 
 def _next_user_id(users, *, use_uuid: bool = False) -> str:
@@ -629,8 +637,6 @@ def submit_match(
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
-    cleanup_pending_matches(club)
-    cleanup_pending_matches(club)
     p_init = club.members.get(initiator)
     p_opp = club.members.get(opponent)
     if not p_init or not p_opp:
@@ -673,8 +679,7 @@ def confirm_match(clubs, club_id: str, index: int, user_id: str, users=None):
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
-    cleanup_pending_matches(club)
-    if index >= len(club.pending_matches):
+    if index >= len(club.pending_matches) or pending_match_expired(club.pending_matches[index]):
         raise ValueError("Match not found")
     match = club.pending_matches[index]
     if match.player_a.user_id == user_id:
@@ -712,8 +717,7 @@ def reject_match(clubs, club_id: str, index: int, user_id: str, users=None):
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
-    cleanup_pending_matches(club)
-    if index >= len(club.pending_matches):
+    if index >= len(club.pending_matches) or pending_match_expired(club.pending_matches[index]):
         raise ValueError("Match not found")
     match = club.pending_matches[index]
     participants = {match.player_a.user_id, match.player_b.user_id}
@@ -746,8 +750,7 @@ def veto_match(clubs, club_id: str, index: int, approver: str, users=None):
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
-    cleanup_pending_matches(club)
-    if index >= len(club.pending_matches):
+    if index >= len(club.pending_matches) or pending_match_expired(club.pending_matches[index]):
         raise ValueError("Match not found")
     is_sys_admin = False
     if users is not None:
@@ -789,8 +792,7 @@ def veto_doubles(clubs, club_id: str, index: int, approver: str, users=None):
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
-    cleanup_pending_matches(club)
-    if index >= len(club.pending_matches):
+    if index >= len(club.pending_matches) or pending_match_expired(club.pending_matches[index]):
         raise ValueError("Match not found")
     is_sys_admin = False
     if users is not None:
@@ -900,8 +902,7 @@ def confirm_doubles(clubs, club_id: str, index: int, user_id: str, users=None):
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
-    cleanup_pending_matches(club)
-    if index >= len(club.pending_matches):
+    if index >= len(club.pending_matches) or pending_match_expired(club.pending_matches[index]):
         raise ValueError("Match not found")
     match = club.pending_matches[index]
     if not isinstance(match, DoublesMatch):
@@ -941,8 +942,7 @@ def reject_doubles(clubs, club_id: str, index: int, user_id: str, users=None):
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
-    cleanup_pending_matches(club)
-    if index >= len(club.pending_matches):
+    if index >= len(club.pending_matches) or pending_match_expired(club.pending_matches[index]):
         raise ValueError("Match not found")
     match = club.pending_matches[index]
     if not isinstance(match, DoublesMatch):
@@ -987,8 +987,7 @@ def approve_match(clubs, club_id: str, index: int, approver: str, users=None):
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
-    cleanup_pending_matches(club)
-    if index >= len(club.pending_matches):
+    if index >= len(club.pending_matches) or pending_match_expired(club.pending_matches[index]):
         raise ValueError("Match not found")
     is_sys_admin = False
     if users is not None:
@@ -1158,8 +1157,33 @@ def leaderboard(
         print(f"{avatar} {p.name}: {rating:.1f}")
 
 
-def get_player_match_cards(clubs, club_id: str, user_id: str):
-    """Return a list of match card info dictionaries for a player."""
+def _club_history(clubs, club, player: Player, doubles: bool, limit: int | None) -> list:
+    """Return the matches ``player`` played in ``club``, newest first.
+
+    Clubs served by :mod:`tennis.storage` read the sorted history index; the
+    matches of other clubs are collected from ``club.matches``.
+    """
+    if clubs is storage.club_view:
+        return [m for _, m in history.page(player, doubles, club_ids=[club.club_id], limit=limit)]
+    matches = []
+    for m in club.matches:
+        if isinstance(m, DoublesMatch) != doubles:
+            continue
+        if doubles:
+            played = player in (m.player_a1, m.player_a2, m.player_b1, m.player_b2)
+        else:
+            played = m.player_a == player or m.player_b == player
+        if played:
+            matches.append(m)
+    matches.sort(key=history.card_key, reverse=True)
+    return matches[:limit] if limit is not None else matches
+
+
+def get_player_match_cards(clubs, club_id: str, user_id: str, limit: int | None = None):
+    """Return a list of match card info dictionaries for a player.
+
+    ``limit`` keeps only that many of the most recent matches.
+    """
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
@@ -1168,11 +1192,7 @@ def get_player_match_cards(clubs, club_id: str, user_id: str):
         raise ValueError("Player not found")
 
     cards = []
-    for m in club.matches:
-        if isinstance(m, DoublesMatch):
-            continue
-        if m.player_a != player and m.player_b != player:
-            continue
+    for m in _club_history(clubs, club, player, False, limit):
         if m.player_a == player:
             opp = m.player_b
             self_score = m.score_a
@@ -1227,14 +1247,6 @@ def get_player_match_cards(clubs, club_id: str, user_id: str):
             }
         )
 
-    cards.sort(
-        key=lambda x: (
-            x.get("approved_ts") or datetime.datetime.min,
-            datetime.datetime.combine(x["date"], datetime.time()),
-            x["created_ts"],
-        ),
-        reverse=True,
-    )
     for c in cards:
         del c["created_ts"]
         c.pop("approved_ts", None)
@@ -1309,8 +1321,11 @@ def get_player_global_match_cards(player: Player) -> list[dict]:
     return cards
 
 
-def get_player_doubles_cards(clubs, club_id: str, user_id: str):
-    """Return a list of doubles match card info for a player."""
+def get_player_doubles_cards(clubs, club_id: str, user_id: str, limit: int | None = None):
+    """Return a list of doubles match card info for a player.
+
+    ``limit`` keeps only that many of the most recent matches.
+    """
     club = clubs.get(club_id)
     if not club:
         raise ValueError("Club not found")
@@ -1319,11 +1334,7 @@ def get_player_doubles_cards(clubs, club_id: str, user_id: str):
         raise ValueError("Player not found")
 
     cards = []
-    for m in club.matches:
-        if not isinstance(m, DoublesMatch):
-            continue
-        if player not in (m.player_a1, m.player_a2, m.player_b1, m.player_b2):
-            continue
+    for m in _club_history(clubs, club, player, True, limit):
         if player in (m.player_a1, m.player_a2):
             partner = m.player_a2 if m.player_a1 == player else m.player_a1
             opp1, opp2 = m.player_b1, m.player_b2
@@ -1430,14 +1441,6 @@ def get_player_doubles_cards(clubs, club_id: str, user_id: str):
             }
         )
 
-    cards.sort(
-        key=lambda x: (
-            x.get("approved_ts") or datetime.datetime.min,
-            datetime.datetime.combine(x["date"], datetime.time()),
-            x["created_ts"],
-        ),
-        reverse=True,
-    )
     for c in cards:
         del c["created_ts"]
         c.pop("approved_ts", None)
@@ -1594,6 +1597,81 @@ def player_history(clubs, club_id: str, user_id: str, doubles: bool):
             )
 
 
+def run_migrations(target: int | None = None, *, status_only: bool = False) -> None:
+    """Apply or list database schema migrations."""
+    done, todo = storage.schema_status()
+    if status_only:
+        from .migrations import MIGRATIONS
+
+        for m in MIGRATIONS:
+            state = 'applied' if m.version in done else 'pending'
+            print(f'{m.version:>4}  {state:<8} {m.name}')
+        return
+    applied = storage.migrate(target)
+    if not applied:
+        print(f'Schema is up to date (version {max(done, default=0)})')
+    for version in applied:
+        print(f'Applied migration {version}')
+
+
+def run_sweeper(once: bool = False, batch_size: int | None = None) -> None:
+    """Purge expired tokens and pending matches once or on a schedule."""
+    from . import maintenance
+
+    if once:
+        for name, count in maintenance.run_once(batch_size).items():
+            print(f'{name}: {count} purged')
+        return
+    sweeper = maintenance.Sweeper(batch_size=batch_size)
+    try:
+        sweeper.run_forever()
+    except KeyboardInterrupt:
+        pass
+    for name, count in maintenance.sweep_stats().items():
+        print(f'{name}: {count}')
+
+
+def run_notifier(once: bool = False) -> None:
+    """Send queued WeChat notifications once or until interrupted."""
+    from . import notifications
+
+    dispatcher = notifications.NotificationDispatcher()
+    if once:
+        print(f'{dispatcher.run_once()} notifications processed')
+        return
+    dispatcher.start()
+    try:
+        while dispatcher.is_running():
+            dispatcher.join(1.0)
+    except KeyboardInterrupt:
+        dispatcher.stop()
+    for name, count in notifications.dispatcher_stats().items():
+        print(f'{name}: {count}')
+
+
+def run_rebuild_friends() -> None:
+    """Recompute the head-to-head and partnership totals from every match."""
+    print(f'{storage.rebuild_friends()} friend rows rebuilt')
+
+
+def run_replay(write: bool = False, reweight: bool = False, tolerance: float = 1e-6, top: int = 20) -> None:
+    """Replay every approved match, report rating drift and optionally store the result."""
+    from . import replay
+
+    t0 = time.perf_counter()
+    log = replay.load(reweight)
+    result = replay.replay(log)
+    report = replay.diff(result, tolerance)
+    elapsed = time.perf_counter() - t0
+    print(f'Replayed {report.matches} matches of {len(log.players)} players in {elapsed:.2f}s')
+    print(f'{report.drifted_matches} matches and {len(report.players)} player values differ from the replay')
+    for d in report.players[:top]:
+        stored = 'none' if d.stored is None else f'{d.stored:.4f}'
+        print(f'  {d.user_id:<20} {d.kind:<10} {stored:>12} -> {d.replayed:.4f}')
+    if write:
+        print(f'Stored replayed ratings of {replay.write(result)} players')
+
+
 def main():
     parser = argparse.ArgumentParser(description='Tennis Rating CLI')
     sub = parser.add_subparsers(dest='cmd')
@@ -1707,7 +1785,42 @@ def main():
     hist.add_argument('user_id')
     hist.add_argument('--doubles', action='store_true')
 
+    mig = sub.add_parser('migrate', help='apply pending database schema migrations')
+    mig.add_argument('--to', type=int, dest='target', help='stop after this schema version')
+    mig.add_argument('--status', action='store_true', help='list migrations without applying them')
+
+    sweep = sub.add_parser('sweep', help='purge expired tokens and pending matches')
+    sweep.add_argument('--once', action='store_true', help='run every task once and exit')
+    sweep.add_argument('--batch', type=int, dest='batch_size', help='rows deleted per transaction')
+
+    notify = sub.add_parser('notify', help='send queued WeChat notifications')
+    notify.add_argument('--once', action='store_true', help='send what is due and exit')
+
+    sub.add_parser('rebuild_friends', help='recompute head-to-head and partner totals')
+
+    rep = sub.add_parser('replay_ratings', help='recompute ratings from the match history')
+    rep.add_argument('--write', action='store_true', help='store the replayed ratings')
+    rep.add_argument('--reweight', action='store_true', help='take match weights from the current format weights')
+    rep.add_argument('--tolerance', type=float, default=1e-6, help='smallest difference reported')
+    rep.add_argument('--top', type=int, default=20, help='player differences listed')
+
     args = parser.parse_args()
+    if args.cmd == 'rebuild_friends':
+        run_rebuild_friends()
+        return
+    if args.cmd == 'replay_ratings':
+        run_replay(args.write, args.reweight, args.tolerance, args.top)
+        return
+    if args.cmd == 'migrate':
+        run_migrations(args.target, status_only=args.status)
+        return
+    if args.cmd == 'notify':
+        run_notifier(args.once)
+        return
+    if args.cmd == 'sweep':
+        run_sweeper(args.once, args.batch_size)
+        return
+
     global players
     clubs, players = load_data()
     users = load_users()
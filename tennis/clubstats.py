@@ -0,0 +1,99 @@
+"""Memoized club statistics over the clubs cached by :mod:`tennis.storage`.
+
+Club listings show each club's member count, rating range and average and
+match totals. Computing them scans every member, so the result is kept per
+club and reused until :mod:`tennis.storage` reports that the club or one of
+its members was written, or until the club object is replaced by a reload.
+Listing clubs then costs one lookup per club.
+"""
+
+from __future__ import annotations
+
+import statistics
+from typing import Iterable
+
+from . import storage
+from .cache_index import Memoized, MemoIndex
+from .models import Club
+
+
+def compute(club: Club) -> dict[str, object]:
+    """Aggregate statistics for ``club`` from its members."""
+    singles = [p.singles_rating for p in club.members.values() if p.singles_rating is not None]
+    doubles = [p.doubles_rating for p in club.members.values() if p.doubles_rating is not None]
+    total_singles = sum(len(p.singles_matches) for p in club.members.values()) / 2
+    total_doubles = sum(len(p.doubles_matches) for p in club.members.values()) / 4
+    singles_avg = statistics.mean(singles) if singles else 0
+    doubles_avg = statistics.mean(doubles) if doubles else 0
+    return {
+        "member_count": len(club.members),
+        "singles_rating_range": [min(singles) if singles else 0, max(singles) if singles else 0],
+        "doubles_rating_range": [min(doubles) if doubles else 0, max(doubles) if doubles else 0],
+        "singles_avg_rating": singles_avg,
+        "doubles_avg_rating": doubles_avg,
+        "total_singles_matches": total_singles,
+        "total_doubles_matches": total_doubles,
+    }
+
+
+class ClubStatsCache(MemoIndex):
+    """Statistics of every club, recomputed when the club or a member changes.
+
+    Entries are keyed by club id; their signature is the set of member ids.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # member id -> clubs whose cached statistics include the member
+        self._player_clubs: dict[str, set[str]] = {}
+
+    def _drop(self, cid: str) -> None:
+        entry = self._entries.pop(cid, None)
+        if entry is None:
+            return
+        for uid in entry.signature:
+            cids = self._player_clubs.get(uid)
+            if cids is not None:
+                cids.discard(cid)
+                if not cids:
+                    del self._player_clubs[uid]
+
+    def _built(self, cid: str, entry: Memoized) -> None:
+        for uid in entry.signature:
+            self._player_clubs.setdefault(uid, set()).add(cid)
+
+    def touch(self, kind: str, ids: Iterable[str]) -> None:
+        """Recompute the clubs ``ids``, or the clubs of players ``ids``, on the next read."""
+        with self._lock:
+            if kind == "clubs":
+                for cid in ids:
+                    self._drop(cid)
+            elif kind == "players":
+                for uid in ids:
+                    for cid in list(self._player_clubs.get(uid, ())):
+                        self._drop(cid)
+
+    def get(self, club: Club) -> dict[str, object]:
+        """Return the statistics of ``club``; the caller may modify the copy."""
+        with self._lock:
+            self._stats["reads"] += 1
+            stats = dict(self._memo(club.club_id, club, frozenset(club.members), compute).value)
+        stats["singles_rating_range"] = list(stats["singles_rating_range"])
+        stats["doubles_rating_range"] = list(stats["doubles_rating_range"])
+        return stats
+
+    def _sizes(self) -> dict:
+        return {"clubs": len(self._entries)}
+
+
+_cache = storage.register_index(ClubStatsCache())
+
+
+def get(club: Club) -> dict[str, object]:
+    """Return the statistics of ``club`` from the process-wide cache."""
+    return _cache.get(club)
+
+
+def cache_stats() -> dict:
+    """Return the size and update counters of the club statistics cache."""
+    return _cache.stats()
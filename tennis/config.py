@@ -66,6 +66,46 @@ def get_cache_ttl() -> int:
     return int(os.getenv("CACHE_TTL", "300"))
 
 
+def get_db_pool_size() -> int:
+    """Return the maximum number of pooled PostgreSQL connections."""
+    return int(os.getenv("DB_POOL_SIZE", "10"))
+
+
+def get_db_pool_timeout() -> float:
+    """Return how many seconds to wait for a free pooled connection."""
+    return float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def get_token_cache_size() -> int:
+    """Return how many access tokens each worker keeps in memory."""
+    return int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+def get_token_cache_ttl() -> float:
+    """Return how many seconds a cached access token is trusted."""
+    return float(os.getenv("TOKEN_CACHE_TTL", "60"))
+
+
+def get_token_secret() -> str:
+    """Return the key signing access tokens; empty keeps random DB tokens."""
+    return os.getenv("TOKEN_SECRET", "")
+
+
+def get_token_sweep_interval() -> float:
+    """Return seconds between purges of expired access and refresh tokens."""
+    return float(os.getenv("TOKEN_SWEEP_INTERVAL", "3600"))
+
+
+def get_pending_sweep_interval() -> float:
+    """Return seconds between purges of expired pending matches."""
+    return float(os.getenv("PENDING_SWEEP_INTERVAL", "3600"))
+
+
+def get_sweep_batch_size() -> int:
+    """Return how many rows the sweeper deletes per transaction."""
+    return int(os.getenv("SWEEP_BATCH_SIZE", "500"))
+
+
 def get_wechat_appid() -> str:
     """Return the WeChat mini program AppID."""
     return os.getenv("WECHAT_APPID", "")
@@ -75,11 +115,49 @@ def get_wechat_secret() -> str:
     """Return the WeChat mini program secret."""
     return os.getenv("WECHAT_SECRET", "")
 
+
+def get_wechat_api_base() -> str:
+    """Return the WeChat API origin, overridable to point at a stub server."""
+    return os.getenv("WECHAT_API_BASE", "https://api.weixin.qq.com").rstrip("/")
+
+
+def get_notify_dispatcher() -> str:
+    """Return where notifications are sent: ``api`` (in each API worker) or ``off``."""
+    return os.getenv("NOTIFY_DISPATCHER", "api")
+
+
+def get_notify_concurrency() -> int:
+    """Return how many notifications are sent at the same time."""
+    return int(os.getenv("NOTIFY_CONCURRENCY", "8"))
+
+
+def get_notify_max_attempts() -> int:
+    """Return how often a notification is tried before it is given up."""
+    return int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+
+
+def get_search_backend() -> str:
+    """Return what serves club and user searches: ``memory`` or ``database``."""
+    return os.getenv("SEARCH_BACKEND", "memory")
+
 __all__ = [
     "DB_FILE",
     "get_database_url",
     "get_redis_url",
     "get_cache_ttl",
+    "get_db_pool_size",
+    "get_db_pool_timeout",
+    "get_token_cache_size",
+    "get_token_cache_ttl",
+    "get_token_secret",
+    "get_token_sweep_interval",
+    "get_pending_sweep_interval",
+    "get_sweep_batch_size",
     "get_wechat_appid",
     "get_wechat_secret",
+    "get_wechat_api_base",
+    "get_notify_dispatcher",
+    "get_notify_concurrency",
+    "get_notify_max_attempts",
+    "get_search_backend",
 ]
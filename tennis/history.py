@@ -0,0 +1,139 @@
+"""Sorted match history index over the players cached by :mod:`tennis.storage`.
+
+Record cards list a player's matches newest first by approval time, date and
+creation time. For every player the index keeps that order once for all of
+their singles and doubles matches and once per club, so "the N most recent
+matches" or the page after a cursor costs a binary search plus the rows it
+returns instead of a scan and sort of the club's matches. A player is
+re-sorted on the next read after :mod:`tennis.storage` reports a write, or
+when their history lists change length.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+from typing import Iterable
+
+from . import storage
+from .cache_index import MemoIndex
+from .models import DoublesMatch, Match, Player
+
+
+def card_key(match: Match | DoublesMatch) -> tuple:
+    """Return the sort key of ``match``; larger keys are more recent.
+
+    The key matches the ``key`` of :func:`tennis.storage.match_page` rows:
+    ISO approval time (empty while unknown), date, ISO creation time, id.
+    """
+    return (
+        match.approved_ts.isoformat() if match.approved_ts else "",
+        match.date.isoformat(),
+        match.created_ts.isoformat() if match.created_ts else "",
+        match.id or 0,
+    )
+
+
+def _histories(player: Player) -> dict:
+    """Map ``(mode, club id or None for every club)`` to ascending keys and matches."""
+    histories: dict = {}
+    for mode, matches in (("singles", player.singles_matches), ("doubles", player.doubles_matches)):
+        ranked = sorted(((card_key(m), i, m) for i, m in enumerate(matches)), key=lambda row: row[:2])
+        histories[(mode, None)] = ([key for key, _, _ in ranked], [m for _, _, m in ranked])
+        for key, _, m in ranked:
+            if m.club_id is None:
+                continue
+            keys, rows = histories.setdefault((mode, m.club_id), ([], []))
+            keys.append(key)
+            rows.append(m)
+    return histories
+
+
+def _walk(keys: list, rows: list, end: int, stream: int):
+    """Yield ``(_Newest(key), stream, match)`` from position ``end`` backwards."""
+    for i in range(end - 1, -1, -1):
+        yield _Newest(keys[i]), stream, rows[i]
+
+
+class _Newest:
+    """Order keys newest first for :func:`heapq.merge`."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: tuple):
+        self.key = key
+
+    def __lt__(self, other: "_Newest") -> bool:
+        return self.key > other.key
+
+
+class HistoryIndex(MemoIndex):
+    """Per-player match histories sorted in record card order.
+
+    Entries are keyed by user id; their signature is the length of the
+    player's two history lists.
+    """
+
+    def touch(self, kind: str, ids: Iterable[str]) -> None:
+        """Re-sort the histories of players ``ids`` on the next read."""
+        if kind == "players":
+            with self._lock:
+                for uid in ids:
+                    self._drop(uid)
+
+    def page(
+        self,
+        player: Player,
+        doubles: bool,
+        club_ids: Iterable[str] | None = None,
+        after: tuple | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[tuple[tuple, Match | DoublesMatch]]:
+        """Return ``(key, match)`` rows of ``player``, newest first.
+
+        ``club_ids`` keeps matches of those clubs only. ``after`` is the key
+        of the last row of the previous page.
+        """
+        mode = "doubles" if doubles else "singles"
+        with self._lock:
+            self._stats["reads"] += 1
+            signature = (len(player.singles_matches), len(player.doubles_matches))
+            histories = self._memo(player.user_id, player, signature, _histories).value
+            scopes = [None] if club_ids is None else list(dict.fromkeys(club_ids))
+            if not scopes:
+                return []
+            streams = []
+            for i, scope in enumerate(scopes):
+                keys, rows = histories.get((mode, scope), ([], []))
+                end = len(keys) if after is None else bisect.bisect_left(keys, after)
+                streams.append(_walk(keys, rows, end, i))
+            merged = heapq.merge(*streams) if len(streams) > 1 else streams[0]
+            result = []
+            for newest, _, match in merged:
+                if offset:
+                    offset -= 1
+                    continue
+                if limit is not None and len(result) >= limit:
+                    break
+                result.append((newest.key, match))
+            return result
+
+    def _sizes(self) -> dict:
+        return {"players": len(self._entries)}
+
+
+_index = storage.register_index(HistoryIndex())
+
+
+def page(player: Player, doubles: bool, **kwargs) -> list[tuple[tuple, Match | DoublesMatch]]:
+    """Return a page of ``player``'s match history from the process-wide index.
+
+    See :meth:`HistoryIndex.page` for the keyword arguments.
+    """
+    return _index.page(player, doubles, **kwargs)
+
+
+def index_stats() -> dict:
+    """Return the size and update counters of the history index."""
+    return _index.stats()
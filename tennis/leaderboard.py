@@ -0,0 +1,440 @@
+"""Sorted leaderboard index over the players and clubs in :mod:`tennis.storage`.
+
+For every mode (singles, doubles) and sort order (rating, weighted match
+count) the index keeps one sorted list of all players and one per club, next
+to each player's weighted match counts. It is built from the ``players``,
+``club_members`` and ``matches`` rows, sharing the player objects of the
+storage identity map without loading any match history.
+:mod:`tennis.storage` reports every club and player it writes or reloads;
+those ids are re-ranked on the next read, so a page of the leaderboard costs
+a binary search plus the rows it returns instead of a scan over every club.
+Dropping the storage caches rebuilds the index.
+
+Filters on gender, region prefix and age use secondary indexes: a set of
+user ids per gender and per region and a sorted ``(age, user_id)`` list.
+Combined filters intersect those sets; a small result is sorted directly
+while a large one is checked while walking the ranking.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+from typing import Iterable, NamedTuple
+
+from . import storage
+from .cache_index import CacheIndex
+from .models import Player
+
+MODES = ("singles", "doubles")
+SORTS = ("rating", "matches")
+# filtered ids are sorted directly when the boards are this many times larger
+SORT_RATIO = 4
+
+
+class Ranked(NamedTuple):
+    """One leaderboard row."""
+
+    player: Player
+    club_id: str | None
+    rating: float | None
+    singles_matches: float
+    doubles_matches: float
+    # position in the ranking, for :mod:`tennis.cursors`
+    key: tuple
+
+
+class _Entry(NamedTuple):
+    player: Player
+    # ratings, match counts and filter attributes the entry was built from
+    signature: tuple
+    # (mode, sort) -> sort key; keys end with the user id so they are unique
+    keys: dict
+    counts: tuple[float, float]
+
+
+def _signature(player: Player, counts: tuple[float, float]) -> tuple:
+    return (
+        player.singles_rating,
+        player.doubles_rating,
+        *counts,
+        player.gender,
+        player.age,
+        player.region,
+    )
+
+
+def _rating_key(rating: float | None, user_id: str) -> tuple:
+    # highest rating first, players without a rating last
+    return (math.inf if rating is None else -rating, user_id)
+
+
+def _entry(player: Player, counts: tuple[float, float] = (0.0, 0.0)) -> _Entry:
+    uid = player.user_id
+    singles, doubles = counts
+    keys = {
+        ("singles", "rating"): _rating_key(player.singles_rating, uid),
+        ("doubles", "rating"): _rating_key(player.doubles_rating, uid),
+        ("singles", "matches"): (-singles, uid),
+        ("doubles", "matches"): (-doubles, uid),
+    }
+    return _Entry(player, _signature(player, counts), keys, (singles, doubles))
+
+
+def _walk(board: list[tuple], start: int, stream: int):
+    for j in range(start, len(board)):
+        yield board[j], stream
+
+
+class LeaderboardIndex(CacheIndex):
+    """Rankings of all players and of every club's members.
+
+    The index is built on the first read and again after :meth:`reset`.
+    Players not loaded by :mod:`tennis.storage` yet are read without their
+    history; weighted match counts come from the database.
+    """
+
+    def __init__(self):
+        super().__init__("rebuilds", "player_updates", "club_updates")
+        self._built = False
+        self._entries: dict[str, _Entry] = {}
+        # (club id or None for all players, mode, sort) -> sorted keys
+        self._boards: dict[tuple[str | None, str, str], list[tuple]] = {}
+        self._players: set[str] = set()
+        self._members: dict[str, set[str]] = {}
+        self._player_clubs: dict[str, set[str]] = {}
+        # position of each club in storage order; the first club a player
+        # belongs to is reported in the global leaderboard
+        self._club_order: dict[str, int] = {}
+        self._next_order = 0
+        self._dirty_clubs: set[str] = set()
+        self._dirty_players: set[str] = set()
+        # secondary indexes over every entry
+        self._by_gender: dict[str | None, set[str]] = {}
+        self._by_region: dict[str, set[str]] = {}
+        self._regions: list[str] = []
+        self._ages: list[tuple] = []
+
+    def touch(self, kind: str, ids: Iterable[str]) -> None:
+        """Re-rank the clubs or players ``ids`` on the next read."""
+        with self._lock:
+            if kind == "clubs":
+                self._dirty_clubs.update(ids)
+            elif kind == "players":
+                self._dirty_players.update(ids)
+
+    def reset(self) -> None:
+        """Rebuild the index on the next read."""
+        with self._lock:
+            self._built = False
+
+    def _insert(self, scope: str | None, keys: dict) -> None:
+        for (mode, sort), key in keys.items():
+            bisect.insort(self._boards.setdefault((scope, mode, sort), []), key)
+
+    def _remove(self, scope: str | None, keys: dict) -> None:
+        for (mode, sort), key in keys.items():
+            board = self._boards.get((scope, mode, sort))
+            if not board:
+                continue
+            i = bisect.bisect_left(board, key)
+            if i < len(board) and board[i] == key:
+                del board[i]
+
+    def _index_attrs(self, uid: str, entry: _Entry) -> None:
+        gender, age, region = entry.signature[4:]
+        self._by_gender.setdefault(gender, set()).add(uid)
+        if region:
+            if region not in self._by_region:
+                bisect.insort(self._regions, region)
+                self._by_region[region] = set()
+            self._by_region[region].add(uid)
+        if age is not None:
+            bisect.insort(self._ages, (age, uid))
+
+    def _unindex_attrs(self, uid: str, entry: _Entry) -> None:
+        gender, age, region = entry.signature[4:]
+        self._by_gender.get(gender, set()).discard(uid)
+        if region in self._by_region:
+            ids = self._by_region[region]
+            ids.discard(uid)
+            if not ids:
+                del self._by_region[region]
+                del self._regions[bisect.bisect_left(self._regions, region)]
+        if age is not None:
+            i = bisect.bisect_left(self._ages, (age, uid))
+            if i < len(self._ages) and self._ages[i] == (age, uid):
+                del self._ages[i]
+
+    def _scopes(self, uid: str) -> list[str | None]:
+        scopes: list[str | None] = [None] if uid in self._players else []
+        scopes.extend(self._player_clubs.get(uid, ()))
+        return scopes
+
+    def _refresh(self, player: Player, counts: tuple[float, float] | None = None, force: bool = False) -> None:
+        """Move ``player`` to its current position on all its boards.
+
+        Without ``counts`` the weighted match counts of the player are kept.
+        """
+        uid = player.user_id
+        old = self._entries.get(uid)
+        if counts is None:
+            counts = old.counts if old else (0.0, 0.0)
+        if old and not force and old.player is player and old.signature == _signature(player, counts):
+            return
+        new = _entry(player, counts)
+        for scope in self._scopes(uid):
+            if old:
+                self._remove(scope, old.keys)
+            self._insert(scope, new.keys)
+        if old:
+            self._unindex_attrs(uid, old)
+        self._index_attrs(uid, new)
+        self._entries[uid] = new
+        self._stats["player_updates"] += 1
+
+    def _rebuild(
+        self,
+        clubs: dict[str, list[str]],
+        players: dict[str, Player],
+        counts: dict[str, tuple[float, float]],
+    ) -> None:
+        self._built = True
+        self._entries = {uid: _entry(p, counts.get(uid, (0.0, 0.0))) for uid, p in players.items()}
+        self._players = set(players)
+        self._members = {}
+        self._player_clubs = {}
+        self._club_order = {}
+        for order, (cid, member_ids) in enumerate(clubs.items()):
+            self._club_order[cid] = order
+            self._members[cid] = {uid for uid in member_ids if uid in self._entries}
+            for uid in self._members[cid]:
+                self._player_clubs.setdefault(uid, set()).add(cid)
+        self._next_order = len(clubs)
+        self._by_gender = {}
+        self._by_region = {}
+        self._ages = []
+        for uid, entry in self._entries.items():
+            gender, age, region = entry.signature[4:]
+            self._by_gender.setdefault(gender, set()).add(uid)
+            if region:
+                self._by_region.setdefault(region, set()).add(uid)
+            if age is not None:
+                self._ages.append((age, uid))
+        self._regions = sorted(self._by_region)
+        self._ages.sort()
+        self._boards = {}
+        scopes: dict[str | None, set[str]] = {None: self._players, **self._members}
+        for scope, uids in scopes.items():
+            for mode in MODES:
+                for sort in SORTS:
+                    self._boards[(scope, mode, sort)] = sorted(
+                        self._entries[uid].keys[(mode, sort)] for uid in uids
+                    )
+        self._stats["rebuilds"] += 1
+
+    def _update_club(
+        self,
+        cid: str,
+        member_ids: list[str] | None,
+        players: dict[str, Player],
+        counts: dict[str, tuple[float, float]],
+    ) -> None:
+        old = self._members.get(cid, set())
+        members = {uid for uid in member_ids or () if uid in players}
+        for uid in old - members:
+            entry = self._entries.get(uid)
+            if entry:
+                self._remove(cid, entry.keys)
+            self._player_clubs.get(uid, set()).discard(cid)
+        # a save may have replaced the member objects in the identity map
+        for uid in members:
+            self._refresh(players[uid], counts.get(uid))
+        for uid in members - old:
+            self._insert(cid, self._entries[uid].keys)
+            self._player_clubs.setdefault(uid, set()).add(cid)
+        if member_ids is None:
+            self._members.pop(cid, None)
+            self._club_order.pop(cid, None)
+            for mode in MODES:
+                for sort in SORTS:
+                    self._boards.pop((cid, mode, sort), None)
+        else:
+            self._members[cid] = members
+            if cid not in self._club_order:
+                self._club_order[cid] = self._next_order
+                self._next_order += 1
+        self._stats["club_updates"] += 1
+
+    def _update_player(self, uid: str, player: Player | None, counts: tuple[float, float]) -> None:
+        if player is None:
+            entry = self._entries.get(uid)
+            if uid in self._players and entry:
+                self._remove(None, entry.keys)
+            self._players.discard(uid)
+            if entry and not self._player_clubs.get(uid):
+                self._unindex_attrs(uid, entry)
+                del self._entries[uid]
+            return
+        if uid not in self._players:
+            self._refresh(player, counts)
+            self._players.add(uid)
+            self._insert(None, self._entries[uid].keys)
+            return
+        self._refresh(player, counts, force=True)
+
+    def _sync(self) -> None:
+        dirty_clubs, self._dirty_clubs = self._dirty_clubs, set()
+        dirty_players, self._dirty_players = self._dirty_players, set()
+        if not self._built:
+            self._rebuild(storage.club_member_ids(), storage.ranking_players(), storage.weighted_match_counts())
+            return
+        if not dirty_clubs and not dirty_players:
+            return
+        memberships = storage.club_member_ids(dirty_clubs) if dirty_clubs else {}
+        member_ids = {uid for ids in memberships.values() for uid in ids}
+        players = storage.ranking_players(dirty_players | member_ids)
+        # counts of the other members are unchanged unless they are dirty too
+        counts = storage.weighted_match_counts(dirty_players | (member_ids - self._entries.keys()))
+        for cid in sorted(dirty_clubs):
+            self._update_club(cid, memberships.get(cid), players, counts)
+        for uid in sorted(dirty_players):
+            self._update_player(uid, players.get(uid), counts.get(uid, (0.0, 0.0)))
+
+    def _primary_club(self, uid: str) -> str | None:
+        cids = self._player_clubs.get(uid)
+        if not cids:
+            return None
+        return min(cids, key=lambda cid: self._club_order.get(cid, math.inf))
+
+    def _candidates(
+        self,
+        gender: str | None,
+        region: str | None,
+        min_age: int | None,
+        max_age: int | None,
+    ) -> set[str] | None:
+        """Return the ids passing the attribute filters, ``None`` if unfiltered."""
+        sets: list[set[str]] = []
+        if gender is not None:
+            sets.append(self._by_gender.get(gender, set()))
+        if region:
+            ids: set[str] = set()
+            for i in range(bisect.bisect_left(self._regions, region), len(self._regions)):
+                if not self._regions[i].startswith(region):
+                    break
+                ids |= self._by_region[self._regions[i]]
+            sets.append(ids)
+        if min_age is not None or max_age is not None:
+            lo = 0 if min_age is None else bisect.bisect_left(self._ages, (min_age,))
+            hi = len(self._ages)
+            if max_age is not None:
+                hi = bisect.bisect_left(self._ages, (math.nextafter(max_age, math.inf),))
+            sets.append({uid for _, uid in self._ages[lo:hi]})
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for ids in sets[1:]:
+            result &= ids
+        return result
+
+    def page(
+        self,
+        club_ids: list[str] | None,
+        doubles: bool,
+        sort: str = "rating",
+        offset: int = 0,
+        limit: int | None = None,
+        min_rating: float | None = None,
+        max_rating: float | None = None,
+        min_age: int | None = None,
+        max_age: int | None = None,
+        gender: str | None = None,
+        region: str | None = None,
+        after: tuple | None = None,
+    ) -> list[Ranked]:
+        """Return ranked players of ``club_ids`` or of everyone.
+
+        Players belonging to several of ``club_ids`` are listed once, under
+        the first of those clubs. ``region`` matches as a prefix; players
+        without an age never pass an age bound. ``after`` is the ``key`` of
+        the last row of the previous page.
+        """
+        mode = "doubles" if doubles else "singles"
+        sort = "matches" if sort == "matches" else "rating"
+        with self._lock:
+            self._sync()
+            scopes: list[str | None] = list(club_ids) if club_ids else [None]
+            boards = [self._boards.get((scope, mode, sort), []) for scope in scopes]
+            candidates = self._candidates(gender, region, min_age, max_age)
+            if candidates is not None and len(candidates) * SORT_RATIO < sum(map(len, boards)):
+                # few matches: rank them directly instead of walking the boards
+                members = [self._players if scope is None else self._members.get(scope, set()) for scope in scopes]
+                ranked = []
+                for uid in candidates:
+                    key = self._entries[uid].keys[(mode, sort)]
+                    if after is not None and key <= after:
+                        continue
+                    for i, ids in enumerate(members):
+                        if uid in ids:
+                            ranked.append((key, i))
+                            break
+                ranked.sort()
+                merged = iter(ranked)
+            else:
+                streams = []
+                for i, board in enumerate(boards):
+                    start = 0
+                    if sort == "rating" and max_rating is not None:
+                        start = bisect.bisect_left(board, (-max_rating,))
+                    if after is not None:
+                        start = max(start, bisect.bisect_right(board, after))
+                    streams.append(_walk(board, start, i))
+                merged = heapq.merge(*streams) if len(streams) > 1 else streams[0]
+            rows: list[Ranked] = []
+            seen: set[str] = set()
+            skipped = 0
+            for key, i in merged:
+                uid = key[-1]
+                if uid in seen:
+                    continue
+                seen.add(uid)
+                if candidates is not None and uid not in candidates:
+                    continue
+                entry = self._entries[uid]
+                rating = entry.signature[1 if doubles else 0]
+                if min_rating is not None and (rating is None or rating < min_rating):
+                    if sort == "rating":
+                        break
+                    continue
+                if max_rating is not None and (rating is None or rating > max_rating):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                club_id = scopes[i] if club_ids else self._primary_club(uid)
+                rows.append(Ranked(entry.player, club_id, rating, *entry.counts, key))
+                if limit is not None and len(rows) >= limit:
+                    break
+            return rows
+
+    def _sizes(self) -> dict:
+        return {"players": len(self._players), "clubs": len(self._members)}
+
+
+_index = storage.register_index(LeaderboardIndex())
+
+
+def page(club_ids: list[str] | None, doubles: bool, **kwargs) -> list[Ranked]:
+    """Return a page of the process-wide leaderboard index.
+
+    See :meth:`LeaderboardIndex.page` for the keyword arguments.
+    """
+    return _index.page(club_ids, doubles, **kwargs)
+
+
+def index_stats() -> dict:
+    """Return the size and update counters of the leaderboard index."""
+    return _index.stats()
@@ -0,0 +1,142 @@
+"""Scheduled removal of expired rows.
+
+Access tokens older than :data:`tennis.services.state.TOKEN_TTL`, expired
+refresh tokens, revoked signed tokens past their expiry and pending matches
+past their retention period (see :func:`tennis.cli.pending_match_expired`)
+are deleted in batches. Request handlers only skip expired rows, so the
+sweeper is what keeps the tables small. Run it with
+``python -m tennis.cli sweep``.
+"""
+
+from __future__ import annotations
+
+import datetime
+import threading
+import time
+from types import SimpleNamespace
+
+from . import storage
+from .config import get_pending_sweep_interval, get_sweep_batch_size, get_token_sweep_interval
+
+# rows purged since the process started, reported by :func:`sweep_stats`
+_stats = {
+    "runs": 0,
+    "errors": 0,
+    "auth_tokens": 0,
+    "refresh_tokens": 0,
+    "revoked_tokens": 0,
+    "pending_matches": 0,
+}
+
+
+def sweep_tokens(batch_size: int | None = None, now: datetime.datetime | None = None) -> dict[str, int]:
+    """Delete expired access, refresh and revoked tokens."""
+    from .services.state import TOKEN_TTL
+
+    batch_size = batch_size or get_sweep_batch_size()
+    now = now or datetime.datetime.utcnow()
+    purged = {
+        "auth_tokens": storage.purge_auth_tokens(now - TOKEN_TTL, batch_size),
+        "refresh_tokens": storage.purge_refresh_tokens(now, batch_size),
+        "revoked_tokens": storage.purge_revoked_tokens(now, batch_size),
+    }
+    for name, count in purged.items():
+        _stats[name] += count
+    return purged
+
+
+def sweep_pending_matches(batch_size: int | None = None, today: datetime.date | None = None) -> dict[str, int]:
+    """Delete pending matches past their retention period."""
+    from .cli import pending_match_expired
+
+    batch_size = batch_size or get_sweep_batch_size()
+    today = today or datetime.date.today()
+    purged = 0
+    last_id = 0
+    while True:
+        states = storage.pending_match_states(last_id, batch_size)
+        if not states:
+            break
+        last_id = states[-1]["id"]
+        expired = {
+            s["id"]: s["club_id"]
+            for s in states
+            if pending_match_expired(SimpleNamespace(**s), today)
+        }
+        purged += storage.delete_pending_matches(expired)
+        if len(states) < batch_size:
+            break
+    _stats["pending_matches"] += purged
+    return {"pending_matches": purged}
+
+
+# task name -> (function, interval getter)
+TASKS = {
+    "tokens": (sweep_tokens, get_token_sweep_interval),
+    "pending_matches": (sweep_pending_matches, get_pending_sweep_interval),
+}
+
+
+def run_once(batch_size: int | None = None) -> dict[str, int]:
+    """Run every task once and return the rows each purged."""
+    purged: dict[str, int] = {}
+    for func, _ in TASKS.values():
+        purged.update(func(batch_size))
+    _stats["runs"] += 1
+    return purged
+
+
+class Sweeper:
+    """Run the sweep tasks in a background thread at their intervals.
+
+    ``intervals`` maps task names to seconds and defaults to the configured
+    ``TOKEN_SWEEP_INTERVAL`` and ``PENDING_SWEEP_INTERVAL``. A failing task
+    is counted in ``errors`` and retried at its next interval.
+    """
+
+    def __init__(self, intervals: dict[str, float] | None = None, batch_size: int | None = None):
+        self.intervals = intervals or {name: getter() for name, (_, getter) in TASKS.items()}
+        self.batch_size = batch_size
+        self._due = {name: 0.0 for name in self.intervals}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def run_due(self, now: float | None = None) -> dict[str, int]:
+        """Run the tasks whose interval has elapsed."""
+        now = time.monotonic() if now is None else now
+        purged: dict[str, int] = {}
+        ran = False
+        for name, interval in self.intervals.items():
+            if now < self._due[name]:
+                continue
+            self._due[name] = now + interval
+            ran = True
+            try:
+                purged.update(TASKS[name][0](self.batch_size))
+            except Exception:
+                _stats["errors"] += 1
+        if ran:
+            _stats["runs"] += 1
+        return purged
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="tennis-sweeper", daemon=True)
+        self._thread.start()
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            self.run_due()
+            self._stop.wait(max(0.0, min(self._due.values()) - time.monotonic()))
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+def sweep_stats() -> dict:
+    """Return run and purged row counters of this process."""
+    return dict(_stats)
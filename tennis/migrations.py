@@ -0,0 +1,626 @@
+"""Versioned schema migrations for the SQLite and PostgreSQL backends.
+
+Every migration has a version number and a list of steps per backend. A step
+is either an SQL statement or a callable taking a cursor. Applied versions are
+recorded in the ``schema_version`` table, so each step runs exactly once per
+database. New schema changes are added by appending a :class:`Migration` to
+:data:`MIGRATIONS`; existing entries must never be edited.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Sequence, Union
+
+Step = Union[str, Callable[[object], None]]
+
+# arbitrary key for ``pg_advisory_xact_lock`` so concurrent workers starting
+# up do not apply the same migration twice
+_PG_LOCK_ID = 73_117_001
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    postgres: Sequence[Step] = field(default_factory=tuple)
+    sqlite: Sequence[Step] = field(default_factory=tuple)
+
+    def steps(self, is_pg: bool) -> Sequence[Step]:
+        return self.postgres if is_pg else self.sqlite
+
+
+def _initial_schema(json_type: str) -> list[str]:
+    return [
+        "CREATE TABLE IF NOT EXISTS clubs (club_id TEXT PRIMARY KEY, name TEXT, logo TEXT, region TEXT, slogan TEXT)",
+        """CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            name TEXT,
+            password_hash TEXT,
+            wechat_openid TEXT,
+            can_create_club INTEGER DEFAULT 1,
+            is_sys_admin INTEGER DEFAULT 0,
+            created_clubs INTEGER DEFAULT 0,
+            joined_clubs INTEGER DEFAULT 0,
+            max_creatable_clubs INTEGER DEFAULT 0,
+            max_joinable_clubs INTEGER DEFAULT 5
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS players (
+            user_id TEXT PRIMARY KEY,
+            name TEXT,
+            singles_rating REAL,
+            doubles_rating REAL,
+            experience REAL,
+            pre_ratings {json_type},
+            age INTEGER,
+            gender TEXT,
+            avatar TEXT,
+            birth TEXT,
+            handedness TEXT,
+            backhand TEXT,
+            region TEXT,
+            joined TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS club_members (
+            club_id TEXT,
+            user_id TEXT,
+            joined TEXT,
+            PRIMARY KEY (club_id, user_id)
+        )""",
+        f"CREATE TABLE IF NOT EXISTS matches (id SERIAL PRIMARY KEY, club_id TEXT, type TEXT, date TEXT, data {json_type})",
+        f"CREATE TABLE IF NOT EXISTS pending_matches (id SERIAL PRIMARY KEY, club_id TEXT, type TEXT, date TEXT, data {json_type})",
+        f"""CREATE TABLE IF NOT EXISTS appointments (
+            id SERIAL PRIMARY KEY,
+            club_id TEXT,
+            date TEXT,
+            creator TEXT,
+            location TEXT,
+            info TEXT,
+            signups {json_type}
+        )""",
+        f"""CREATE TABLE IF NOT EXISTS club_meta (
+            club_id TEXT PRIMARY KEY,
+            banned_ids {json_type},
+            leader_id TEXT,
+            admin_ids {json_type},
+            pending_members {json_type},
+            rejected_members {json_type}
+        )""",
+        """CREATE TABLE IF NOT EXISTS messages (
+            id SERIAL PRIMARY KEY,
+            user_id TEXT,
+            date TEXT,
+            text TEXT,
+            read INTEGER
+        )""",
+        """CREATE TABLE IF NOT EXISTS auth_tokens (
+            token TEXT PRIMARY KEY,
+            user_id TEXT,
+            ts TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS refresh_tokens (
+            user_id TEXT PRIMARY KEY,
+            token TEXT,
+            expires TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS user_subscribe (
+            user_id TEXT,
+            scene TEXT,
+            quota INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, scene)
+        )""",
+        """CREATE TABLE IF NOT EXISTS subscribe_log (
+            id SERIAL PRIMARY KEY,
+            user_id TEXT,
+            scene TEXT,
+            errcode INTEGER,
+            errmsg TEXT,
+            retries INTEGER DEFAULT 0,
+            ts TEXT
+        )""",
+    ]
+
+
+def _table_columns(cur, table: str, is_pg: bool) -> set[str]:
+    if is_pg:
+        rows = cur.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = ?",
+            (table,),
+        ).fetchall()
+        return {row["column_name"] for row in rows}
+    return {row[1] for row in cur.execute(f"PRAGMA table_info('{table}')").fetchall()}
+
+
+# columns added after the first releases; databases created by those
+# releases may still be missing them. ``JSON`` maps to JSONB on PostgreSQL.
+_LEGACY_COLUMNS = [
+    ("clubs", "slogan", "TEXT"),
+    ("users", "is_sys_admin", "INTEGER DEFAULT 0"),
+    ("users", "max_creatable_clubs", "INTEGER DEFAULT 0"),
+    ("users", "max_joinable_clubs", "INTEGER DEFAULT 5"),
+    ("club_meta", "leader_id", "TEXT"),
+    ("club_meta", "admin_ids", "JSON"),
+    ("club_meta", "pending_members", "JSON"),
+    ("club_meta", "rejected_members", "JSON"),
+    ("players", "birth", "TEXT"),
+    ("players", "handedness", "TEXT"),
+    ("players", "backhand", "TEXT"),
+    ("players", "region", "TEXT"),
+    ("players", "joined", "TEXT"),
+    ("club_members", "joined", "TEXT"),
+]
+
+
+def _add_legacy_columns(is_pg: bool) -> Callable[[object], None]:
+    def step(cur) -> None:
+        existing: dict[str, set[str]] = {}
+        for table, column, decl in _LEGACY_COLUMNS:
+            if table not in existing:
+                existing[table] = _table_columns(cur, table, is_pg)
+            if column not in existing[table]:
+                if decl == "JSON":
+                    decl = "JSONB" if is_pg else "TEXT"
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+                existing[table].add(column)
+
+    return step
+
+
+def _backfill_member_joined(cur) -> None:
+    """Give memberships without a join date the player's join date."""
+    rows = cur.execute(
+        "SELECT club_id, user_id FROM club_members WHERE joined IS NULL OR joined = ''"
+    ).fetchall()
+    for row in rows:
+        uid = row["user_id"]
+        joined_row = cur.execute(
+            "SELECT joined FROM players WHERE user_id = ?",
+            (uid,),
+        ).fetchone()
+        joined = joined_row["joined"] if joined_row and joined_row["joined"] else None
+        if not joined:
+            joined = datetime.date.today().isoformat()
+        cur.execute(
+            "UPDATE club_members SET joined = ? WHERE club_id = ? AND user_id = ?",
+            (joined, row["club_id"], uid),
+        )
+
+
+# typed columns replacing the JSON ``data`` blob of ``matches`` and
+# ``pending_matches``. Singles matches use the ``a1``/``b1`` player and rating
+# columns and leave the ``a2``/``b2`` ones empty. ``REAL`` maps to
+# DOUBLE PRECISION on PostgreSQL.
+_MATCH_COLUMNS = [
+    ("player_a1", "TEXT"),
+    ("player_a2", "TEXT"),
+    ("player_b1", "TEXT"),
+    ("player_b2", "TEXT"),
+    ("score_a", "INTEGER"),
+    ("score_b", "INTEGER"),
+    ("weight", "REAL"),
+    ("location", "TEXT"),
+    ("format_name", "TEXT"),
+    ("initiator", "TEXT"),
+    ("confirmed_a", "INTEGER DEFAULT 0"),
+    ("confirmed_b", "INTEGER DEFAULT 0"),
+    ("created", "TEXT"),
+    ("created_ts", "TEXT"),
+    ("confirmed_on", "TEXT"),
+    ("status", "TEXT"),
+    ("status_date", "TEXT"),
+    ("approved_ts", "TEXT"),
+    ("rating_a1_before", "REAL"),
+    ("rating_a2_before", "REAL"),
+    ("rating_b1_before", "REAL"),
+    ("rating_b2_before", "REAL"),
+    ("rating_a1_after", "REAL"),
+    ("rating_a2_after", "REAL"),
+    ("rating_b1_after", "REAL"),
+    ("rating_b2_after", "REAL"),
+]
+
+# JSON keys of the old ``data`` blob that were renamed for the typed columns
+_MATCH_JSON_KEYS = {
+    "player_a": "player_a1",
+    "player_b": "player_b1",
+    "a1": "player_a1",
+    "a2": "player_a2",
+    "b1": "player_b1",
+    "b2": "player_b2",
+    "rating_a_before": "rating_a1_before",
+    "rating_b_before": "rating_b1_before",
+    "rating_a_after": "rating_a1_after",
+    "rating_b_after": "rating_b1_after",
+}
+
+
+def _add_match_columns(is_pg: bool) -> list[str]:
+    steps = []
+    for table in ("matches", "pending_matches"):
+        for column, decl in _MATCH_COLUMNS:
+            if is_pg:
+                decl = decl.replace("REAL", "DOUBLE PRECISION")
+            steps.append(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return steps
+
+
+def _backfill_match_columns(cur) -> None:
+    """Copy every match's JSON ``data`` into the typed columns."""
+    names = [column for column, _ in _MATCH_COLUMNS]
+    assignments = ", ".join(f"{name} = ?" for name in names)
+    for table in ("matches", "pending_matches"):
+        rows = cur.execute(f"SELECT id, data FROM {table}").fetchall()
+        updates = []
+        for row in rows:
+            data = row["data"]
+            if isinstance(data, str):
+                data = json.loads(data) if data else {}
+            data = {_MATCH_JSON_KEYS.get(k, k): v for k, v in (data or {}).items()}
+            for flag in ("confirmed_a", "confirmed_b"):
+                data[flag] = int(bool(data.get(flag)))
+            if data.get("weight") is None:
+                data["weight"] = 1.0
+            updates.append((*(data.get(name) for name in names), row["id"]))
+        if updates:
+            cur.executemany(
+                f"UPDATE {table} SET {assignments} WHERE id = ?",
+                updates,
+            )
+
+
+def _typed_match_columns(is_pg: bool) -> list[Step]:
+    return [
+        *_add_match_columns(is_pg),
+        _backfill_match_columns,
+        "ALTER TABLE matches DROP COLUMN data",
+        "ALTER TABLE pending_matches DROP COLUMN data",
+        # per-player history
+        "CREATE INDEX IF NOT EXISTS idx_matches_player_a1 ON matches(player_a1)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_player_a2 ON matches(player_a2)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_player_b1 ON matches(player_b1)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_player_b2 ON matches(player_b2)",
+        # date-range activity and pagination in approval order
+        "CREATE INDEX IF NOT EXISTS idx_matches_date ON matches(date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_matches_approved_ts ON matches(approved_ts, id)",
+    ]
+
+
+# indexes for the lookups the storage layer runs on every request.
+# ``club_members`` is already keyed by ``(club_id, user_id)`` so lookups by
+# club use its primary key; ``refresh_tokens`` is keyed by user.
+SECONDARY_INDEXES = [
+    ("idx_messages_user", "messages", "user_id, id"),
+    ("idx_club_members_user", "club_members", "user_id"),
+    ("idx_matches_club", "matches", "club_id, id"),
+    ("idx_pending_matches_club", "pending_matches", "club_id, id"),
+    ("idx_appointments_club", "appointments", "club_id"),
+    ("idx_auth_tokens_user", "auth_tokens", "user_id"),
+    ("idx_refresh_tokens_token", "refresh_tokens", "token"),
+]
+
+
+def _create_indexes(indexes) -> list[str]:
+    return [
+        f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})"
+        for name, table, columns in indexes
+    ]
+
+
+# ids of signed access tokens revoked before their expiry; rows past
+# ``expires`` can be deleted since the token is rejected anyway
+_REVOKED_TOKENS = """CREATE TABLE IF NOT EXISTS revoked_tokens (
+    token_id TEXT PRIMARY KEY,
+    expires TEXT NOT NULL
+)"""
+
+
+# ``quota_consumed`` is set in the transaction taking the recipient's
+# subscription quota, so a retried or re-claimed row never takes it twice
+def _notification_outbox(id_decl: str) -> list[str]:
+    return [
+        f"""CREATE TABLE IF NOT EXISTS notification_outbox (
+            id {id_decl},
+            user_id TEXT,
+            openid TEXT,
+            scene TEXT,
+            audit_type TEXT,
+            audit_status TEXT,
+            page TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            quota_consumed INTEGER NOT NULL DEFAULT 0,
+            next_attempt TEXT NOT NULL,
+            last_error TEXT,
+            created TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox(status, next_attempt)",
+    ]
+
+
+# keyset pagination of /sys/matches and /sys/doubles, newest approval first;
+# the COALESCE expressions must match those in ``storage.match_page``
+_MATCH_FEED_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_matches_feed ON matches"
+    "(type, (COALESCE(approved_ts, '')), date, (COALESCE(created_ts, '')), id)"
+)
+
+
+# totals and per-day histograms behind /sys/stats, /sys/user_trend and
+# /sys/match_activity, kept in step by the storage layer on every write. The
+# row with ``day = ''`` holds the total of a counter. ``member_first_join``
+# remembers the day each club member first joined a club so the ``members``
+# histogram can be corrected when memberships change.
+_STATS_TABLES = [
+    "CREATE TABLE IF NOT EXISTS stats_daily (name TEXT NOT NULL, day TEXT NOT NULL, n INTEGER NOT NULL, PRIMARY KEY (name, day))",
+    "CREATE TABLE IF NOT EXISTS member_first_join (user_id TEXT PRIMARY KEY, day TEXT NOT NULL)",
+]
+
+# the day a membership started; memberships without one count from the day
+# the player joined, as everywhere else. Must match
+# ``storage._refresh_first_join``.
+MEMBER_JOINED = "COALESCE(NULLIF(cm.joined, ''), p.joined)"
+
+# fills the empty statistics tables from the current data; also run by
+# ``storage.save_data`` after it rewrites every table
+STATS_BACKFILL = [
+    f"INSERT INTO member_first_join(user_id, day) SELECT cm.user_id, MIN({MEMBER_JOINED}) "
+    "FROM club_members cm LEFT JOIN players p ON p.user_id = cm.user_id "
+    f"WHERE {MEMBER_JOINED} IS NOT NULL GROUP BY cm.user_id",
+    "INSERT INTO stats_daily(name, day, n) SELECT 'matches', date, COUNT(*) FROM matches WHERE date IS NOT NULL GROUP BY date",
+    "INSERT INTO stats_daily(name, day, n) SELECT 'members', day, COUNT(*) FROM member_first_join GROUP BY day",
+    "INSERT INTO stats_daily(name, day, n) SELECT name, '', SUM(n) FROM stats_daily GROUP BY name",
+]
+
+# head-to-head and partnership totals behind /players/{user_id}/friends, one
+# row per player and friend in either direction. The storage layer adds a
+# match's contribution when it is approved and takes it away when the match
+# is deleted or rewritten.
+_PLAYER_FRIENDS = [
+    """CREATE TABLE IF NOT EXISTS player_friends (
+        user_id TEXT NOT NULL,
+        friend_id TEXT NOT NULL,
+        weight REAL NOT NULL DEFAULT 0,
+        wins REAL NOT NULL DEFAULT 0,
+        singles_weight REAL NOT NULL DEFAULT 0,
+        singles_wins REAL NOT NULL DEFAULT 0,
+        doubles_weight REAL NOT NULL DEFAULT 0,
+        doubles_wins REAL NOT NULL DEFAULT 0,
+        partner_games REAL NOT NULL DEFAULT 0,
+        partner_wins REAL NOT NULL DEFAULT 0,
+        singles_score_diff REAL NOT NULL DEFAULT 0,
+        doubles_score_diff REAL NOT NULL DEFAULT 0,
+        partner_score_diff REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, friend_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_player_friends_weight ON player_friends(user_id, weight)",
+]
+
+FRIEND_COLUMNS = (
+    "weight",
+    "wins",
+    "singles_weight",
+    "singles_wins",
+    "doubles_weight",
+    "doubles_wins",
+    "partner_games",
+    "partner_wins",
+    "singles_score_diff",
+    "doubles_score_diff",
+    "partner_score_diff",
+)
+
+# per-role columns counting the weight of the games and of the wins
+_FRIEND_ROLE_COLUMNS = {
+    "singles": ("singles_weight", "singles_wins"),
+    "doubles": ("doubles_weight", "doubles_wins"),
+    "partner": ("partner_games", "partner_wins"),
+}
+
+
+def _friend_pairs() -> list[tuple[str, str, str, str]]:
+    """Return ``(self, friend, role, side)`` slots of every pair in a match."""
+    pairs = [("a1", "b1", "singles", "a"), ("b1", "a1", "singles", "b")]
+    teams = {"a": ("a1", "a2"), "b": ("b1", "b2")}
+    for side, other in (("a", "b"), ("b", "a")):
+        for me in teams[side]:
+            partner = teams[side][1] if me == teams[side][0] else teams[side][0]
+            pairs.append((me, partner, "partner", side))
+            pairs.extend((me, opp, "doubles", side) for opp in teams[other])
+    return pairs
+
+
+def friends_upsert(source: str) -> str:
+    """Return SQL adding the friend totals of the matches in ``source``.
+
+    ``source`` selects match rows plus a ``sign`` column, ``1`` to add a
+    match and ``-1`` to take it away.
+    """
+    selects = []
+    for me, friend, role, side in _friend_pairs():
+        other = "b" if side == "a" else "a"
+        weight = "COALESCE(weight, 1) * sign"
+        win = f"CASE WHEN score_{side} > score_{other} THEN {weight} ELSE 0 END"
+        diff = f"COALESCE(rating_{me}_after - rating_{me}_before, 0) * sign"
+        games, wins = _FRIEND_ROLE_COLUMNS[role]
+        values = {
+            "weight": weight,
+            "wins": win,
+            games: weight,
+            wins: win,
+            f"{role}_score_diff": diff,
+        }
+        columns = ", ".join(f"{values.get(c, '0')} AS {c}" for c in FRIEND_COLUMNS)
+        mtype = "singles" if role == "singles" else "doubles"
+        selects.append(
+            f"SELECT player_{me} AS user_id, player_{friend} AS friend_id, {columns} "
+            f"FROM m WHERE type = '{mtype}'"
+        )
+    sums = ", ".join(f"SUM({c})" for c in FRIEND_COLUMNS)
+    updates = ", ".join(f"{c} = player_friends.{c} + EXCLUDED.{c}" for c in FRIEND_COLUMNS)
+    return (
+        f"WITH m AS ({source}) "
+        f"INSERT INTO player_friends(user_id, friend_id, {', '.join(FRIEND_COLUMNS)}) "
+        f"SELECT user_id, friend_id, {sums} FROM ({' UNION ALL '.join(selects)}) pairs "
+        "WHERE user_id IS NOT NULL AND friend_id IS NOT NULL AND user_id <> friend_id "
+        "GROUP BY user_id, friend_id "
+        f"ON CONFLICT (user_id, friend_id) DO UPDATE SET {updates}"
+    )
+
+# trigram indexes serving ``LOWER(id/name) LIKE '%...%'`` when searches go to
+# the database (``SEARCH_BACKEND=database``)
+_TRIGRAM_INDEXES = {
+    "idx_clubs_search": "clubs USING gin (LOWER(club_id) gin_trgm_ops, LOWER(name) gin_trgm_ops)",
+    "idx_users_search": "users USING gin (LOWER(user_id) gin_trgm_ops, LOWER(name) gin_trgm_ops)",
+}
+
+
+def _trigram_indexes(cur) -> None:
+    """Add the search indexes where the ``pg_trgm`` extension is available.
+
+    Servers without the extension, or roles not allowed to install it, keep
+    plain scans; the migration still counts as applied.
+    """
+    row = cur.execute("SELECT 1 AS ok FROM pg_available_extensions WHERE name = 'pg_trgm'").fetchone()
+    if not row:
+        return
+    cur.execute("SAVEPOINT trigram")
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except Exception:
+        cur.execute("ROLLBACK TO SAVEPOINT trigram")
+        return
+    cur.execute("RELEASE SAVEPOINT trigram")
+    for name, target in _TRIGRAM_INDEXES.items():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(
+        1,
+        "initial schema",
+        postgres=_initial_schema("JSONB"),
+        sqlite=_initial_schema("TEXT"),
+    ),
+    Migration(
+        2,
+        "add columns missing from early databases",
+        postgres=[_add_legacy_columns(True)],
+        sqlite=[_add_legacy_columns(False)],
+    ),
+    Migration(
+        3,
+        "backfill club_members.joined",
+        postgres=[_backfill_member_joined],
+        sqlite=[_backfill_member_joined],
+    ),
+    Migration(
+        4,
+        "store match fields in typed columns",
+        postgres=_typed_match_columns(True),
+        sqlite=_typed_match_columns(False),
+    ),
+    Migration(
+        5,
+        "add secondary indexes for hot lookups",
+        postgres=_create_indexes(SECONDARY_INDEXES),
+        sqlite=_create_indexes(SECONDARY_INDEXES),
+    ),
+    Migration(
+        6,
+        "revocation list for signed access tokens",
+        postgres=[_REVOKED_TOKENS],
+        sqlite=[_REVOKED_TOKENS],
+    ),
+    Migration(
+        7,
+        "outbox for WeChat notifications",
+        postgres=_notification_outbox("SERIAL PRIMARY KEY"),
+        sqlite=_notification_outbox("INTEGER PRIMARY KEY AUTOINCREMENT"),
+    ),
+    Migration(
+        8,
+        "index matches in feed order",
+        postgres=[_MATCH_FEED_INDEX],
+        sqlite=[_MATCH_FEED_INDEX],
+    ),
+    Migration(
+        9,
+        "maintained system statistics",
+        postgres=[*_STATS_TABLES, *STATS_BACKFILL],
+        sqlite=[*_STATS_TABLES, *STATS_BACKFILL],
+    ),
+    Migration(
+        10,
+        "player friends aggregate",
+        postgres=[*_PLAYER_FRIENDS, friends_upsert("SELECT *, 1 AS sign FROM matches")],
+        sqlite=[*_PLAYER_FRIENDS, friends_upsert("SELECT *, 1 AS sign FROM matches")],
+    ),
+    Migration(
+        11,
+        "trigram indexes for club and user search",
+        postgres=[_trigram_indexes],
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _ensure_version_table(cur) -> None:
+    cur.execute(
+        """CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            applied TEXT
+        )"""
+    )
+
+
+def applied_versions(cur) -> set[int]:
+    """Return the migration versions recorded in ``schema_version``."""
+    _ensure_version_table(cur)
+    return {row["version"] for row in cur.execute("SELECT version FROM schema_version").fetchall()}
+
+
+def pending_migrations(cur, target: int | None = None) -> list[Migration]:
+    """Return migrations not yet applied, up to ``target`` if given."""
+    done = applied_versions(cur)
+    return [
+        m
+        for m in MIGRATIONS
+        if m.version not in done and (target is None or m.version <= target)
+    ]
+
+
+def apply_migrations(conn, cur, is_pg: bool, target: int | None = None) -> list[int]:
+    """Apply pending migrations in order and return the versions applied.
+
+    Each migration commits on its own. On PostgreSQL an advisory lock
+    serialises workers that start at the same time.
+    """
+    todo = pending_migrations(cur, target)
+    conn.commit()
+    applied: list[int] = []
+    for migration in todo:
+        if is_pg:
+            cur.execute("SELECT pg_advisory_xact_lock(?)", (_PG_LOCK_ID,))
+            row = cur.execute(
+                "SELECT 1 AS done FROM schema_version WHERE version = ?",
+                (migration.version,),
+            ).fetchone()
+            if row:
+                conn.commit()
+                continue
+        for step in migration.steps(is_pg):
+            if callable(step):
+                step(cur)
+            else:
+                cur.execute(step)
+        cur.execute(
+            "INSERT INTO schema_version(version, name, applied) VALUES (?,?,?)",
+            (migration.version, migration.name, datetime.datetime.utcnow().isoformat()),
+        )
+        conn.commit()
+        applied.append(migration.version)
+    return applied
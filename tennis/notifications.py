@@ -0,0 +1,212 @@
+"""Background delivery of queued WeChat subscribe messages.
+
+:func:`tennis.wechat.send_audit_message` only inserts a row into the
+``notification_outbox`` table. A :class:`NotificationDispatcher` claims due
+rows in batches, consumes the recipient's subscription quota and sends the
+messages concurrently over the pooled client of :mod:`tennis.wechat`. Temporary
+failures (network errors, an expired access token, rate limits) are retried
+with exponential backoff; other WeChat errors are logged to
+``subscribe_log`` like before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import threading
+
+from . import storage, wechat
+from .config import get_notify_concurrency, get_notify_max_attempts
+
+# errcodes worth another attempt: network failure or no token, invalid or
+# expired access token, API rate limit
+RETRY_ERRCODES = {-1, 40001, 42001, 45009}
+# errcodes meaning the cached access token must be fetched again
+TOKEN_ERRCODES = {40001, 42001}
+# seconds before the first retry; doubled for each further attempt
+BACKOFF_BASE = 5.0
+BACKOFF_MAX = 600.0
+# seconds a claimed row stays hidden from other dispatchers
+CLAIM_LEASE = 60.0
+
+# counters reported by :func:`dispatcher_stats`
+_stats = {
+    "batches": 0,
+    "sent": 0,
+    "retried": 0,
+    "failed": 0,
+    "skipped": 0,
+    "errors": 0,
+}
+
+
+def backoff(attempts: int) -> float:
+    """Return the delay in seconds before attempt ``attempts + 1``."""
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+class NotificationDispatcher:
+    """Send queued notifications from a background thread.
+
+    ``client`` replaces :func:`tennis.wechat.get_client`; it is not closed
+    by the dispatcher.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        concurrency: int | None = None,
+        max_attempts: int | None = None,
+        interval: float = 1.0,
+        client=None,
+    ):
+        self.batch_size = batch_size
+        self.concurrency = concurrency or get_notify_concurrency()
+        self.max_attempts = max_attempts or get_notify_max_attempts()
+        self.interval = interval
+        self.client = client
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    async def _deliver(self, client, row: dict, limit: asyncio.Semaphore) -> None:
+        attempts = row["attempts"] + 1
+        user_id, scene = row["user_id"], row["scene"]
+        # the quota is consumed once, before the first attempt; the row
+        # remembers it across retries and expired claims
+        if not row["quota_consumed"] and not await asyncio.to_thread(
+            storage.consume_notification_quota, row["id"], user_id, scene
+        ):
+            await asyncio.to_thread(storage.finish_notification, row["id"], "skipped", attempts, "no quota")
+            _stats["skipped"] += 1
+            return
+        async with limit:
+            data = await wechat._send(
+                row["openid"], row["audit_type"], row["audit_status"], row["page"], client=client
+            )
+        errcode = data.get("errcode", 0)
+        errmsg = data.get("errmsg", "")
+        if errcode == 0:
+            await asyncio.to_thread(storage.finish_notification, row["id"], "sent", attempts)
+            _stats["sent"] += 1
+            return
+        if errcode in TOKEN_ERRCODES:
+            wechat.drop_access_token()
+        if errcode in RETRY_ERRCODES and attempts < self.max_attempts:
+            when = datetime.datetime.utcnow() + datetime.timedelta(seconds=backoff(attempts))
+            await asyncio.to_thread(storage.retry_notification, row["id"], attempts, when, f"{errcode}: {errmsg}")
+            _stats["retried"] += 1
+            return
+        await asyncio.to_thread(storage.log_subscribe_error, user_id, scene, errcode, errmsg)
+        await asyncio.to_thread(storage.finish_notification, row["id"], "failed", attempts, f"{errcode}: {errmsg}")
+        _stats["failed"] += 1
+
+    async def dispatch(self, client) -> int:
+        """Send one batch of due notifications and return its size."""
+        rows = await asyncio.to_thread(storage.claim_notifications, self.batch_size, CLAIM_LEASE)
+        if not rows:
+            return 0
+        limit = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(
+            *(self._deliver(client, row, limit) for row in rows), return_exceptions=True
+        )
+        _stats["errors"] += sum(isinstance(r, Exception) for r in results)
+        _stats["batches"] += 1
+        return len(rows)
+
+    async def _drain(self, client) -> int:
+        sent = 0
+        while n := await self.dispatch(client):
+            sent += n
+        return sent
+
+    def run_once(self) -> int:
+        """Send every notification that is due now and return how many."""
+
+        async def main() -> int:
+            if self.client is not None:
+                return await self._drain(self.client)
+            try:
+                return await self._drain(wechat.get_client())
+            finally:
+                await wechat.close_client()
+
+        return asyncio.run(main())
+
+    async def _loop(self, client) -> None:
+        while not self._stop.is_set():
+            try:
+                await self._drain(client)
+            except Exception:
+                _stats["errors"] += 1
+            await asyncio.to_thread(self._wake.wait, self.interval)
+            self._wake.clear()
+
+    def _run(self) -> None:
+        async def main() -> None:
+            if self.client is not None:
+                await self._loop(self.client)
+                return
+            try:
+                await self._loop(wechat.get_client())
+            finally:
+                await wechat.close_client()
+
+        asyncio.run(main())
+
+    def wake(self) -> None:
+        """Check the outbox now instead of after the polling interval."""
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tennis-notifications", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout: float | None = None) -> None:
+        """Wait for the dispatcher thread to end, or for ``timeout`` seconds."""
+        if self._thread:
+            self._thread.join(timeout)
+
+
+_dispatcher: NotificationDispatcher | None = None
+
+
+def start_dispatcher(**kwargs) -> NotificationDispatcher:
+    """Start the process-wide dispatcher."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = NotificationDispatcher(**kwargs)
+    _dispatcher.start()
+    return _dispatcher
+
+
+def stop_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.stop()
+        _dispatcher = None
+
+
+def wake() -> None:
+    """Wake the process-wide dispatcher if one is running."""
+    if _dispatcher is not None:
+        _dispatcher.wake()
+
+
+def dispatcher_stats() -> dict:
+    """Return delivery counters of this process."""
+    stats = dict(_stats)
+    stats["dispatcher"] = "running" if _dispatcher is not None else "off"
+    return stats
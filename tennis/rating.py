@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import datetime
-from typing import List, Tuple
+import math
+from typing import Iterable, List, Sequence, Tuple
 
 from .models import Player, Match, DoublesMatch, Club
 
@@ -42,14 +43,137 @@ def expected_score(rating_a: float, rating_b: float) -> float:
     :math:`e` and a fixed slope of ``4``.
     """
 
-    import math
-
     return 1 / (1 + math.exp(-4 * (rating_a - rating_b)))
 
 
 DEFAULT_RATING = 1000.0
 
 
+def experience_gain(rating: float, weight: float, games_played: int) -> float:
+    """Return the experience a player rated ``rating`` gains from a match."""
+    if rating <= 0:
+        return 0.0
+    denom = (125 / (7 / rating - 1)) * ((6 + 12) / 2)
+    if weight not in (FORMAT_6_GAME, FORMAT_4_GAME):
+        denom *= ((4 + 7) / 2)
+    if denom == 0:
+        return 0.0
+    return 0.5 / denom * games_played
+
+
+def singles_change(
+    rating_a: float, rating_b: float, score_a: int, score_b: int, weight: float
+) -> Tuple[float, float, float, float]:
+    """Return ``(delta_a, delta_b, gain_a, gain_b)`` of a singles result.
+
+    Each player's new rating is ``rating + delta + gain``. At least one game
+    must have been played.
+    """
+    games_played = score_a + score_b
+    exp_a = expected_score(rating_a, rating_b)
+    actual_a = score_a / games_played
+
+    # competitive skill adjustment
+    delta_a = weight * 0.25 * (actual_a - exp_a)
+    return (
+        delta_a,
+        -delta_a,
+        experience_gain(rating_a, weight, games_played),
+        experience_gain(rating_b, weight, games_played),
+    )
+
+
+def doubles_change(
+    a1: float, a2: float, b1: float, b2: float, score_a: int, score_b: int, weight: float
+) -> Tuple[float, float, float, float, float, float, float, float]:
+    """Return the deltas and then the gains of the four players of a doubles result.
+
+    The adjustment is computed on the team averages and shared between
+    partners in proportion to their ratings. At least one game must have
+    been played.
+    """
+    games_played = score_a + score_b
+    exp_a = expected_score((a1 + a2) / 2, (b1 + b2) / 2)
+    actual_a = score_a / games_played
+
+    # competitive skill adjustment computed on the team averages
+    delta_team = weight * 0.25 * (actual_a - exp_a)
+
+    total_a = a1 + a2
+    total_b = b1 + b2
+
+    if total_a == 0:
+        delta_a1 = delta_team / 2
+        delta_a2 = delta_team / 2
+    else:
+        delta_a1 = delta_team * (a1 / total_a)
+        delta_a2 = delta_team * (a2 / total_a)
+
+    if total_b == 0:
+        delta_b1 = -delta_team / 2
+        delta_b2 = -delta_team / 2
+    else:
+        delta_b1 = -delta_team * (b1 / total_b)
+        delta_b2 = -delta_team * (b2 / total_b)
+
+    return (
+        delta_a1,
+        delta_a2,
+        delta_b1,
+        delta_b2,
+        experience_gain(a1, weight, games_played),
+        experience_gain(a2, weight, games_played),
+        experience_gain(b1, weight, games_played),
+        experience_gain(b2, weight, games_played),
+    )
+
+
+def simulate_singles(
+    rating_a: float | None,
+    rating_b: float | None,
+    scores: Iterable[Tuple[int, int]],
+    weight: float = FORMAT_6_GAME,
+) -> List[Tuple[float, float]]:
+    """Return both ratings after each of the hypothetical ``scores``.
+
+    The result of every score matches what :func:`update_ratings` would
+    store, but no player or match is touched: missing ratings start at
+    :data:`DEFAULT_RATING` and a score without games changes nothing.
+    """
+    a = DEFAULT_RATING if rating_a is None else rating_a
+    b = DEFAULT_RATING if rating_b is None else rating_b
+    result = []
+    for score_a, score_b in scores:
+        if score_a + score_b == 0:
+            result.append((a, b))
+            continue
+        delta_a, delta_b, gain_a, gain_b = singles_change(a, b, score_a, score_b, weight)
+        result.append((a + (delta_a + gain_a), b + (delta_b + gain_b)))
+    return result
+
+
+def simulate_doubles(
+    ratings: Sequence[float | None],
+    scores: Iterable[Tuple[int, int]],
+    weight: float = FORMAT_6_GAME,
+) -> List[Tuple[float, float, float, float]]:
+    """Return the four ratings after each of the hypothetical ``scores``.
+
+    ``ratings`` are those of players a1, a2, b1 and b2. Like
+    :func:`simulate_singles` this mirrors :func:`update_doubles_ratings`
+    without touching any player.
+    """
+    before = tuple(DEFAULT_RATING if r is None else r for r in ratings)
+    result = []
+    for score_a, score_b in scores:
+        if score_a + score_b == 0:
+            result.append(before)
+            continue
+        change = doubles_change(*before, score_a, score_b, weight)
+        result.append(tuple(before[k] + (change[k] + change[k + 4]) for k in range(4)))
+    return result
+
+
 def update_ratings(match: Match) -> Tuple[float, float]:
     """Update player ratings based on a match result.
 
@@ -67,25 +191,9 @@ def update_ratings(match: Match) -> Tuple[float, float]:
     if games_played == 0:
         return a_rating, b_rating
 
-    exp_a = expected_score(a_rating, b_rating)
-    actual_a = match.score_a / games_played
-
-    # competitive skill adjustment
-    delta_a = match.format_weight * 0.25 * (actual_a - exp_a)
-    delta_b = -delta_a
-
-    def _exp_gain(rating: float) -> float:
-        if rating <= 0:
-            return 0.0
-        denom = (125 / (7 / rating - 1)) * ((6 + 12) / 2)
-        if match.format_weight not in (FORMAT_6_GAME, FORMAT_4_GAME):
-            denom *= ((4 + 7) / 2)
-        if denom == 0:
-            return 0.0
-        return 0.5 / denom * games_played
-
-    gain_a = _exp_gain(a_rating)
-    gain_b = _exp_gain(b_rating)
+    delta_a, delta_b, gain_a, gain_b = singles_change(
+        a_rating, b_rating, match.score_a, match.score_b, match.format_weight
+    )
 
     a_rating += delta_a + gain_a
     b_rating += delta_b + gain_b
@@ -147,46 +255,22 @@ def update_doubles_ratings(match: DoublesMatch) -> Tuple[float, float, float, fl
     pre_b1 = b1_rating
     pre_b2 = b2_rating
 
-    exp_a = expected_score(team_a_rating, team_b_rating)
-
     games_played = match.score_a + match.score_b
     if games_played == 0:
         return team_a_rating, team_a_rating, team_b_rating, team_b_rating
 
-    actual_a = match.score_a / games_played
-
-    # competitive skill adjustment computed on the team averages
-    delta_team = match.format_weight * 0.25 * (actual_a - exp_a)
-
-    total_a = a1_rating + a2_rating
-    total_b = b1_rating + b2_rating
-
-    if total_a == 0:
-        delta_a1 = delta_team / 2
-        delta_a2 = delta_team / 2
-    else:
-        delta_a1 = delta_team * (a1_rating / total_a)
-        delta_a2 = delta_team * (a2_rating / total_a)
-
-    if total_b == 0:
-        delta_b1 = -delta_team / 2
-        delta_b2 = -delta_team / 2
-    else:
-        delta_b1 = -delta_team * (b1_rating / total_b)
-        delta_b2 = -delta_team * (b2_rating / total_b)
-
-    def _exp_gain(rating: float) -> float:
-        if rating <= 0:
-            return 0.0
-        denom = (125 / (7 / rating - 1)) * ((6 + 12) / 2)
-        if match.format_weight not in (FORMAT_6_GAME, FORMAT_4_GAME):
-            denom *= ((4 + 7) / 2)
-        return 0.5 / denom * games_played
-
-    gain_a1 = _exp_gain(pre_a1)
-    gain_a2 = _exp_gain(pre_a2)
-    gain_b1 = _exp_gain(pre_b1)
-    gain_b2 = _exp_gain(pre_b2)
+    (
+        delta_a1,
+        delta_a2,
+        delta_b1,
+        delta_b2,
+        gain_a1,
+        gain_a2,
+        gain_b1,
+        gain_b2,
+    ) = doubles_change(
+        pre_a1, pre_a2, pre_b1, pre_b2, match.score_a, match.score_b, match.format_weight
+    )
 
     match.player_a1.doubles_rating += delta_a1 + gain_a1
     match.player_a2.doubles_rating += delta_a2 + gain_a2
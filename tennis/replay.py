@@ -0,0 +1,247 @@
+"""Recompute every rating by replaying the approved matches in order.
+
+:func:`load` reads the matches, in the order their ratings were applied,
+into a :class:`MatchLog`: flat arrays with one entry per match holding
+player numbers, scores and format weights next to the stored ratings. A
+:func:`replay` walks the log once, keeping the current singles and doubles
+rating of every player in plain lists, and applies
+:func:`tennis.rating.singles_change` and :func:`tennis.rating.doubles_change`,
+the arithmetic of :func:`~tennis.rating.update_ratings` and
+:func:`~tennis.rating.update_doubles_ratings`. A player starts from the
+rating stored before their first match, so pre-ratings carry over.
+
+:func:`diff` compares a replay with the stored ratings to audit drift, and
+:func:`write` stores the replayed ratings, for instance after a change to
+the format weights or the experience formula.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterable, NamedTuple
+
+from . import storage
+from .rating import DEFAULT_RATING, FORMAT_WEIGHTS, doubles_change, singles_change
+
+_NAN = math.nan
+
+
+def _value(number: float) -> float | None:
+    return None if math.isnan(number) else number
+
+
+@dataclass
+class MatchLog:
+    """Approved matches in replay order, stored column by column.
+
+    ``slots`` holds four player numbers per match in the order a1, a2, b1,
+    b2 (singles use a1 and b1; ``-1`` marks an empty slot),
+    ``scores`` two scores and ``stored`` eight ratings: before and then
+    after the match, in slot order, ``nan`` when unset.
+    """
+
+    players: list[str] = field(default_factory=list)
+    ids: array = field(default_factory=lambda: array("q"))
+    clubs: list[str | None] = field(default_factory=list)
+    doubles: bytearray = field(default_factory=bytearray)
+    slots: array = field(default_factory=lambda: array("l"))
+    scores: array = field(default_factory=lambda: array("l"))
+    weights: array = field(default_factory=lambda: array("d"))
+    stored: array = field(default_factory=lambda: array("d"))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple], reweight: bool = False) -> "MatchLog":
+        """Build a log from :func:`tennis.storage.replay_rows` rows.
+
+        With ``reweight`` the weight of a match with a known format name is
+        taken from :data:`tennis.rating.FORMAT_WEIGHTS` instead of the row.
+        """
+        log = cls()
+        numbers: dict[str, int] = {}
+        players = log.players
+        slots, stored = log.slots, log.stored
+        for row in rows:
+            log.ids.append(row[0])
+            log.clubs.append(row[2])
+            log.doubles.append(row[1] == "doubles")
+            for uid in row[3:7]:
+                if uid is None:
+                    slots.append(-1)
+                    continue
+                number = numbers.get(uid)
+                if number is None:
+                    number = numbers[uid] = len(players)
+                    players.append(uid)
+                slots.append(number)
+            score_a, score_b, weight, format_name = row[7:11]
+            log.scores.extend((score_a or 0, score_b or 0))
+            if reweight and format_name and format_name.lower() in FORMAT_WEIGHTS:
+                weight = FORMAT_WEIGHTS[format_name.lower()]
+            log.weights.append(1.0 if weight is None else weight)
+            stored.extend([_NAN if v is None else v for v in row[11:19]])
+        return log
+
+
+@dataclass
+class Replay:
+    """Ratings after replaying a :class:`MatchLog`.
+
+    ``singles`` and ``doubles`` are indexed by player number, ``None`` for
+    players without a match of that kind; ``experience`` holds the gains of
+    the replay. ``ratings`` has the same layout as :attr:`MatchLog.stored`.
+    """
+
+    log: MatchLog
+    singles: list[float | None]
+    doubles: list[float | None]
+    experience: list[float]
+    ratings: array
+
+
+def load(reweight: bool = False) -> MatchLog:
+    """Read every approved match from the database into a :class:`MatchLog`."""
+    return MatchLog.from_rows(storage.replay_rows(), reweight)
+
+
+def replay(log: MatchLog) -> Replay:
+    """Apply every match of ``log`` in order and return the resulting ratings."""
+    n = len(log.players)
+    singles: list[float | None] = [None] * n
+    doubles: list[float | None] = [None] * n
+    experience = [0.0] * n
+    ratings = array("d", [_NAN]) * (8 * len(log))
+    slots, scores, weights, stored = log.slots, log.scores, log.weights, log.stored
+    for m, is_doubles in enumerate(log.doubles):
+        s = 4 * m
+        r = 8 * m
+        score_a = scores[2 * m]
+        score_b = scores[2 * m + 1]
+        if is_doubles:
+            p = slots[s : s + 4]
+            if -1 in p:
+                continue
+            # players without a doubles rating yet start from the stored one
+            for k in range(4):
+                if doubles[p[k]] is None:
+                    first = stored[r + k]
+                    doubles[p[k]] = DEFAULT_RATING if first != first else first
+            before = [doubles[p[k]] for k in range(4)]
+            ratings[r : r + 4] = array("d", before)
+            if score_a + score_b == 0:
+                continue
+            change = doubles_change(*before, score_a, score_b, weights[m])
+            for k in range(4):
+                doubles[p[k]] += change[k] + change[k + 4]
+                experience[p[k]] += change[k + 4]
+            for k in range(4):
+                ratings[r + 4 + k] = doubles[p[k]]
+        else:
+            pa = slots[s]
+            pb = slots[s + 2]
+            if pa < 0 or pb < 0:
+                continue
+            a = singles[pa]
+            if a is None:
+                first = stored[r]
+                a = DEFAULT_RATING if first != first else first
+            b = singles[pb]
+            if b is None:
+                first = stored[r + 2]
+                b = DEFAULT_RATING if first != first else first
+            ratings[r] = a
+            ratings[r + 2] = b
+            if score_a + score_b == 0:
+                continue
+            delta_a, delta_b, gain_a, gain_b = singles_change(a, b, score_a, score_b, weights[m])
+            a += delta_a + gain_a
+            b += delta_b + gain_b
+            singles[pa] = a
+            singles[pb] = b
+            experience[pa] += gain_a
+            experience[pb] += gain_b
+            ratings[r + 4] = a
+            ratings[r + 6] = b
+    return Replay(log, singles, doubles, experience, ratings)
+
+
+class Drift(NamedTuple):
+    """A stored value that differs from the replay."""
+
+    user_id: str
+    # ``singles``, ``doubles`` or ``experience``
+    kind: str
+    stored: float | None
+    replayed: float
+
+
+class DriftReport(NamedTuple):
+    matches: int
+    # matches whose stored ratings before or after differ from the replay
+    drifted_matches: int
+    # largest difference first
+    players: list[Drift]
+
+
+def _differs(stored: float | None, replayed: float | None, tolerance: float) -> bool:
+    if stored is None or replayed is None:
+        return (stored is None) != (replayed is None)
+    return abs(stored - replayed) > tolerance
+
+
+def diff(result: Replay, tolerance: float = 1e-6) -> DriftReport:
+    """Compare ``result`` with the ratings and experience in the database."""
+    log = result.log
+    stored, ratings = log.stored, result.ratings
+    drifted = 0
+    for m in range(len(log)):
+        r = 8 * m
+        for i in range(r, r + 8):
+            if _differs(_value(stored[i]), _value(ratings[i]), tolerance):
+                drifted += 1
+                break
+    current = storage.player_ratings()
+    players = []
+    for number, uid in enumerate(log.players):
+        saved = current.get(uid)
+        if saved is None:
+            continue
+        replayed = (result.singles[number], result.doubles[number], result.experience[number])
+        for name, old, new in zip(("singles", "doubles", "experience"), saved, replayed):
+            if new is not None and _differs(old, new, tolerance):
+                players.append(Drift(uid, name, old, new))
+    players.sort(key=lambda d: (-abs(d.replayed - (d.stored or 0.0)), d.user_id, d.kind))
+    return DriftReport(len(log), drifted, players)
+
+
+def write(result: Replay) -> int:
+    """Store the ratings of ``result`` and return the number of players updated.
+
+    Ratings of a kind a player never played are left as they are.
+    """
+    log = result.log
+    current = storage.player_ratings()
+    players = {}
+    for number, uid in enumerate(log.players):
+        saved = current.get(uid)
+        if saved is None:
+            continue
+        singles = result.singles[number]
+        doubles = result.doubles[number]
+        players[uid] = (
+            saved[0] if singles is None else singles,
+            saved[1] if doubles is None else doubles,
+            result.experience[number],
+        )
+    ratings = result.ratings
+    matches = (
+        (log.weights[m], *(_value(v) for v in ratings[8 * m : 8 * m + 8]), log.ids[m])
+        for m in range(len(log))
+    )
+    storage.write_ratings(players, matches)
+    storage.bump_cache_version()
+    return len(players)
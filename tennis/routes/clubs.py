@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Header, Request
+from fastapi import APIRouter, HTTPException, Header, Request, Response
 from ..services.exceptions import ServiceError
 from pydantic import BaseModel
 from ..services.auth import require_auth, assert_token_matches
@@ -8,7 +8,7 @@ from ..services.clubs import (
     get_clubs_batch as svc_get_clubs_batch,
     generate_club_id,
 )
-from ..storage import get_club, get_player, get_user, list_clubs
+from ..storage import club_ids_page, get_club, get_player, get_user
 from ..rating import (
     weighted_rating,
     weighted_doubles_rating,
@@ -222,14 +222,28 @@ def get_clubs_batch(club_ids: str, request: Request):
 
 
 @router.get("/clubs/search")
-def search_clubs(query: str | None = None, limit: int | None = None, offset: int = 0):
-    """Return detailed club information filtered by an optional query."""
-    q = query.lower() if query else None
-    clubs = list_clubs()
-    today = datetime.date.today()
+def search_clubs(
+    response: Response,
+    query: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    cursor: str | None = None,
+):
+    """Return detailed club information filtered by an optional query.
+
+    When more rows follow, ``X-Next-Cursor`` holds the ``cursor`` for them.
+    """
+    ids = club_ids_page(
+        api._after_id("clubs", cursor),
+        None if limit is None else limit + 1,
+        offset,
+        query,
+    )
+    ids = api._next_page("clubs", ids, limit, lambda cid: [cid], response)
     result = []
-    for club in clubs:
-        if q and q not in club.club_id.lower() and q not in club.name.lower():
+    for cid in ids:
+        club = get_club(cid)
+        if not club:
             continue
         entry = {
             "club_id": club.club_id,
@@ -243,10 +257,4 @@ def search_clubs(query: str | None = None, limit: int | None = None, offset: int
             "stats": _club_stats(club),
         }
         result.append(entry)
-
-    result.sort(key=lambda x: x["club_id"])
-    if offset:
-        result = result[offset:]
-    if limit is not None:
-        result = result[:limit]
     return result
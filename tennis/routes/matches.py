@@ -5,6 +5,7 @@ from ..services.matches import (
     list_pending_doubles_service,
     list_pending_matches_service,
 )
+from ..services.simulator import simulate_match_service
 
 router = APIRouter()
 
@@ -27,3 +28,17 @@ def list_pending_doubles(club_id: str, authorization: str | None = Header(None))
 @router.get("/clubs/{club_id}/pending_matches")
 def list_pending_matches(club_id: str, authorization: str | None = Header(None)):
     return list_pending_matches_service(club_id, authorization)
+
+
+@router.get("/players/{user_id}/simulate")
+def simulate_match(
+    user_id: str,
+    opponent: str,
+    scores: str | None = None,
+    partner: str | None = None,
+    opponent_partner: str | None = None,
+    format: str | None = None,
+    weight: float | None = None,
+):
+    """Preview rating changes for hypothetical scores; nothing is stored."""
+    return simulate_match_service(user_id, opponent, scores, partner, opponent_partner, format, weight)
@@ -0,0 +1,164 @@
+"""In-memory substring search over club and user ids and names.
+
+Every id and name is lowercased and split into its 1-, 2- and 3-character
+n-grams; each n-gram maps to the ids containing it. A query looks up the
+n-grams of its own length; a query of up to three characters is a single
+n-gram, and a longer one intersects its two rarest trigrams and checks the
+remaining candidates. A search costs about the size of its result instead
+of a scan over every club or user. Short n-grams keep one and two character queries, and Chinese names
+that are often only two characters long, on the index as well. Prefixes are
+substrings, so prefix queries need nothing extra.
+
+The index is filled from the database on the first query. :mod:`tennis.storage`
+reports created, renamed and deleted clubs and users; their rows are read
+again before the next query. Results are ordered by id,
+like the database listings, so cursors work the same on both.
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Iterable
+
+from . import storage
+from .cache_index import CacheIndex
+
+KINDS = ("clubs", "users")
+# longest n-gram kept; longer queries are matched through their trigrams
+GRAM = 3
+_SEP = "\x00"
+
+
+def _grams(text: str, n: int) -> set[str]:
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+def _all_grams(texts: Iterable[str]) -> set[str]:
+    grams: set[str] = set()
+    for text in texts:
+        for n in range(1, GRAM + 1):
+            grams |= _grams(text, n)
+    return grams
+
+
+class _Kind:
+    """Index of one kind of entity."""
+
+    def __init__(self):
+        # id -> lowercased id and name, separated by a character no query has
+        self.texts: dict[str, str] = {}
+        self.postings: dict[str, set[str]] = {}
+
+    def add(self, uid: str, name: str | None) -> None:
+        texts = (uid.lower(),) if name is None else (uid.lower(), name.lower())
+        self.texts[uid] = _SEP.join(texts)
+        for gram in _all_grams(texts):
+            self.postings.setdefault(gram, set()).add(uid)
+
+    def remove(self, uid: str) -> None:
+        text = self.texts.pop(uid, None)
+        if text is None:
+            return
+        for gram in _all_grams(text.split(_SEP)):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(uid)
+                if not ids:
+                    del self.postings[gram]
+
+    def search(self, query: str) -> set[str]:
+        """Return the ids whose id or name contains the lowercased ``query``."""
+        if _SEP in query:
+            return set()
+        grams = _grams(query, min(len(query), GRAM))
+        sets = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+        if len(query) <= GRAM:
+            return sets[0]
+        # the rarest trigrams narrow the candidates; the text check settles them
+        candidates = sets[0] & sets[1] if len(sets) > 1 else sets[0]
+        texts = self.texts
+        return {uid for uid in candidates if query in texts[uid]}
+
+
+class SearchIndex(CacheIndex):
+    """Substring index of club and user ids and names."""
+
+    def __init__(self):
+        super().__init__("builds", "updates", "queries")
+        self._kinds: dict[str, _Kind] = {}
+        self._dirty: dict[str, set[str]] = {kind: set() for kind in KINDS}
+
+    def touch(self, kind: str, ids: Iterable[str]) -> None:
+        """Read the rows of ``ids`` again before the next query."""
+        if kind in self._dirty:
+            with self._lock:
+                if kind in self._kinds:
+                    self._dirty[kind].update(ids)
+
+    def reset(self) -> None:
+        """Drop the index; it is rebuilt from the database on the next query."""
+        with self._lock:
+            self._kinds.clear()
+            for ids in self._dirty.values():
+                ids.clear()
+
+    def _get(self, kind: str) -> _Kind:
+        index = self._kinds.get(kind)
+        if index is None:
+            index = _Kind()
+            for uid, name in storage.search_entries(kind):
+                index.add(uid, name)
+            self._kinds[kind] = index
+            self._dirty[kind].clear()
+            self._stats["builds"] += 1
+        elif self._dirty[kind]:
+            ids, self._dirty[kind] = self._dirty[kind], set()
+            for uid in ids:
+                index.remove(uid)
+            for uid, name in storage.search_entries(kind, ids):
+                index.add(uid, name)
+            self._stats["updates"] += len(ids)
+        return index
+
+    def page(
+        self,
+        kind: str,
+        query: str,
+        after: str | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[str]:
+        """Return the ids of ``kind`` whose id or name contains ``query``.
+
+        Matching ignores case. Ids are in order, starting after ``after``.
+        """
+        query = query.lower()
+        with self._lock:
+            self._stats["queries"] += 1
+            found = self._get(kind).search(query)
+            if after is not None:
+                found = [uid for uid in found if uid > after]
+            if limit is None:
+                ids = sorted(found)
+            else:
+                ids = heapq.nsmallest(offset + limit, found)
+        return ids[offset:] if limit is None else ids[offset : offset + limit]
+
+    def _sizes(self) -> dict:
+        return {kind: len(index.texts) for kind, index in self._kinds.items()}
+
+
+_index = storage.register_index(SearchIndex())
+
+
+def page(kind: str, query: str, **kwargs) -> list[str]:
+    """Return matching ids from the process-wide index.
+
+    See :meth:`SearchIndex.page` for the keyword arguments.
+    """
+    return _index.page(kind, query, **kwargs)
+
+
+def index_stats() -> dict:
+    """Return the size and update counters of the search index."""
+    return _index.stats()
@@ -1,9 +1,97 @@
 from __future__ import annotations
+import base64
 import datetime
+import hashlib
+import hmac
+import json
+import secrets
+import time
 from fastapi import Request
 from .exceptions import ServiceError
 from . import state
 from .. import storage
+from ..config import get_token_secret
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(secret: str, payload: str) -> str:
+    return _b64encode(hmac.new(secret.encode(), payload.encode(), hashlib.sha256).digest())
+
+
+def is_signed_token(token: str) -> bool:
+    """Return ``True`` for tokens issued in signed mode.
+
+    Random database tokens are plain hex and never contain a dot.
+    """
+    return "." in token
+
+
+def _decode_signed(token: str) -> tuple[str, int, int, str] | None:
+    """Return ``(user_id, issued, expires, token_id)`` if the signature is valid."""
+    secret = get_token_secret()
+    payload, _, signature = token.partition(".")
+    # compare bytes: compare_digest rejects str with non-ASCII characters
+    if not secret or not hmac.compare_digest(signature.encode(), _signature(secret, payload).encode()):
+        return None
+    try:
+        user_id, issued, expires, token_id = json.loads(_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    return user_id, issued, expires, token_id
+
+
+def issue_access_token(user_id: str) -> str:
+    """Return a new access token for ``user_id``.
+
+    With ``TOKEN_SECRET`` set the token carries the user id and its expiry
+    signed with HMAC-SHA256, so validating it needs no database lookup.
+    Otherwise a random token is stored in ``auth_tokens``.
+    """
+    secret = get_token_secret()
+    if not secret:
+        token = secrets.token_hex(16)
+        storage.insert_token(token, user_id)
+        return token
+    issued = int(time.time())
+    expires = issued + int(state.TOKEN_TTL.total_seconds())
+    claims = [user_id, issued, expires, secrets.token_hex(8)]
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_signature(secret, payload)}"
+
+
+def verify_signed_token(token: str) -> str:
+    """Return the user id of a signed token or raise ``ServiceError``."""
+    claims = _decode_signed(token)
+    if claims is None:
+        raise ServiceError("Invalid token", 401)
+    user_id, _, expires, token_id = claims
+    if time.time() > expires:
+        raise ServiceError("Token expired", 401)
+    if storage.is_token_revoked(token_id):
+        raise ServiceError("Invalid token", 401)
+    return user_id
+
+
+def revoke_access_token(token: str) -> str | None:
+    """Invalidate ``token`` and return the user it belonged to, if any."""
+    if is_signed_token(token):
+        claims = _decode_signed(token)
+        if claims is None:
+            return None
+        user_id, _, expires, token_id = claims
+        if time.time() <= expires:
+            storage.revoke_token_id(token_id, datetime.datetime.utcfromtimestamp(expires))
+        return user_id
+    info = storage.get_token(token)
+    storage.delete_token(token)
+    return info[0] if info else None
 
 
 def require_auth(authorization: str | None = None, request: Request | None = None) -> str:
@@ -17,6 +105,8 @@ def require_auth(authorization: str | None = None, request: Request | None = Non
         raise ServiceError("Invalid token", 401)
 
     token = header[7:]
+    if is_signed_token(token):
+        return verify_signed_token(token)
 
     info = storage.get_token(token)
     if not info:
@@ -32,8 +32,6 @@ from ..cli import (
     normalize_gender,
 )
 from ..storage import (
-    load_users,
-    load_data,
     get_club,
     get_user,
     get_player,
@@ -61,23 +59,16 @@ def _find_pending_match(club, match_id: int) -> int:
     raise ServiceError("Match not found", 404)
 
 
-def _prepare_players(
-    club: "Club" | None = None, extra: list[str] | None = None
-) -> None:
-    """Ensure players referenced by a club or ``extra`` ids are cached."""
-    _, players = load_data()
+def _prepare_players(extra: list[str] | None = None) -> None:
+    """Let the CLI helpers look players up through the storage caches.
+
+    Players are loaded one at a time as the helpers ask for them; ``extra``
+    ids are fetched up front.
+    """
     import tennis.cli as cli_module
-    cli_module.players = players
-    if club:
-        for p in club.members.values():
-            if p.user_id not in players:
-                set_player(p)
-    if extra:
-        for uid in extra:
-            if uid not in players:
-                p = get_player(uid)
-                if p:
-                    set_player(p)
+    cli_module.players = storage.player_view
+    for uid in extra or []:
+        get_player(uid)
 
 
 import uuid
@@ -105,10 +96,10 @@ def create_club(
     slogan=None,
 ):
     """Create a new club and persist it to the database."""
-    users = load_users()
+    users = storage.user_view
     club = get_club(club_id)
     clubs = {club_id: club} if club else {}
-    _prepare_players(club, extra=[user_id])
+    _prepare_players(extra=[user_id])
     try:
         cli_create_club(users, clubs, user_id, club_id, name, logo, region, slogan)
     except ValueError as e:
@@ -132,7 +123,7 @@ def add_player(club_id: str, user_id: str, name: str, **kwargs):
     """Add a player to a club and persist the change."""
     club = get_club_or_404(club_id)
     clubs = {club_id: club}
-    _prepare_players(club, extra=[user_id])
+    _prepare_players(extra=[user_id])
     try:
         cli_add_player(clubs, club_id, user_id, name, **kwargs)
     except ValueError as e:
@@ -153,9 +144,9 @@ def add_player(club_id: str, user_id: str, name: str, **kwargs):
 def request_join_club(club_id: str, user_id: str, **kwargs) -> None:
     """Handle a join request and persist affected records."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club, extra=[user_id])
+    _prepare_players(extra=[user_id])
     try:
         cli_request_join(clubs, users, club_id, user_id, **kwargs)
     except ValueError as e:
@@ -173,9 +164,9 @@ def request_join_club(club_id: str, user_id: str, **kwargs) -> None:
 def approve_member_request(club_id: str, approver_id: str, user_id: str, rating: float, make_admin: bool = False) -> None:
     """Approve membership and persist changes."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     try:
         cli_approve_member(clubs, users, club_id, approver_id, user_id, rating, make_admin=make_admin)
     except ValueError as e:
@@ -195,9 +186,9 @@ def approve_member_request(club_id: str, approver_id: str, user_id: str, rating:
 def dissolve_existing_club(club_id: str, user_id: str) -> None:
     """Dissolve a club and update affected users."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     members = list(club.members)
     try:
         cli_dissolve_club(clubs, users, club_id, user_id)
@@ -215,9 +206,9 @@ def dissolve_existing_club(club_id: str, user_id: str) -> None:
 def approve_pending_match(club_id: str, match_id: int, approver: str) -> None:
     """Approve a pending singles match and persist the club and users."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     index = _find_pending_match(club, match_id)
     match = club.pending_matches[index]
     try:
@@ -247,9 +238,9 @@ def approve_pending_match(club_id: str, match_id: int, approver: str) -> None:
 def reject_join_request(club_id: str, approver_id: str, user_id: str, reason: str) -> None:
     """Reject a join request and persist club and user records."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     try:
         cli_reject_application(clubs, users, club_id, approver_id, user_id, reason)
     except ValueError as e:
@@ -267,7 +258,7 @@ def clear_member_rejection(club_id: str, user_id: str) -> None:
     """Clear a stored rejection reason."""
     club = get_club_or_404(club_id)
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     try:
         cli_clear_rejection(clubs, club_id, user_id)
     except ValueError as e:
@@ -295,20 +286,15 @@ def update_club_info(club_id: str, **fields) -> None:
 
 def update_global_player(user_id: str, **fields) -> None:
     """Update player information without club context."""
-    users = load_users()
+    users = storage.user_view
     player = get_player(user_id)
     if not player:
         raise ServiceError("Player not found", 404)
-    _prepare_players(None, extra=[user_id])
+    _prepare_players(extra=[user_id])
     if fields.get("name") is not None:
         new_name = fields["name"]
-        for u in users.values():
-            if u.user_id != user_id and u.name == new_name:
-                raise ServiceError("用户名已存在", 400)
-        _, players = load_data()
-        for p in players.values():
-            if p.user_id != user_id and p.name == new_name:
-                raise ServiceError("用户名已存在", 400)
+        if storage.name_in_use(new_name, exclude=user_id):
+            raise ServiceError("用户名已存在", 400)
         player.name = new_name
         if user_id in users:
             users[user_id].name = new_name
@@ -336,17 +322,12 @@ def update_global_player(user_id: str, **fields) -> None:
 def update_player_profile(club_id: str, user_id: str, **fields) -> None:
     """Update a club member's profile."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     if fields.get("name") is not None:
-        new_name = fields["name"]
-        for u in users.values():
-            if u.user_id != user_id and u.name == new_name:
-                raise ServiceError("用户名已存在", 400)
-        for p in players.values():
-            if p.user_id != user_id and p.name == new_name:
-                raise ServiceError("用户名已存在", 400)
+        if storage.name_in_use(fields["name"], exclude=user_id):
+            raise ServiceError("用户名已存在", 400)
     try:
         cli_update_player(clubs, club_id, user_id, **fields)
     except ValueError as e:
@@ -363,9 +344,9 @@ def update_player_profile(club_id: str, user_id: str, **fields) -> None:
 def remove_club_member(club_id: str, remover_id: str, user_id: str, ban: bool = False) -> None:
     """Remove a member from a club and update records."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     try:
         cli_remove_member(clubs, users, club_id, remover_id, user_id, ban=ban)
     except ValueError as e:
@@ -381,9 +362,9 @@ def remove_club_member(club_id: str, remover_id: str, user_id: str, ban: bool =
 def update_member_role(club_id: str, action: str, actor_id: str, target_id: str) -> None:
     """Perform a role-related action and persist changes."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     try:
         if action == "toggle_admin":
             cli_toggle_admin(clubs, club_id, actor_id, target_id)
@@ -421,9 +402,9 @@ def submit_pending_match(
 ) -> None:
     """Create a pending singles match."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club, extra=[initiator, opponent])
+    _prepare_players(extra=[initiator, opponent])
     try:
         cli_submit_match(
             clubs,
@@ -453,9 +434,9 @@ def submit_pending_match(
 def confirm_pending_match(club_id: str, match_id: int, user_id: str) -> None:
     """Confirm a pending singles match."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     index = _find_pending_match(club, match_id)
     try:
         cli_confirm_match(clubs, club_id, index, user_id, users)
@@ -473,9 +454,9 @@ def confirm_pending_match(club_id: str, match_id: int, user_id: str) -> None:
 def reject_pending_match(club_id: str, match_id: int, user_id: str) -> None:
     """Reject a pending singles match."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     index = _find_pending_match(club, match_id)
     try:
         cli_reject_match(clubs, club_id, index, user_id, users)
@@ -495,9 +476,9 @@ def reject_pending_match(club_id: str, match_id: int, user_id: str) -> None:
 def veto_pending_match(club_id: str, match_id: int, approver: str) -> None:
     """Veto a pending singles match."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     index = _find_pending_match(club, match_id)
     try:
         cli_veto_match(clubs, club_id, index, approver, users)
@@ -529,9 +510,9 @@ def submit_pending_doubles(
 ) -> None:
     """Create a pending doubles match."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club, extra=[initiator, partner, opponent1, opponent2])
+    _prepare_players(extra=[initiator, partner, opponent1, opponent2])
     try:
         cli_submit_doubles(
             clubs,
@@ -562,9 +543,9 @@ def submit_pending_doubles(
 def confirm_pending_doubles(club_id: str, match_id: int, user_id: str) -> None:
     """Confirm a pending doubles match."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     index = _find_pending_match(club, match_id)
     try:
         cli_confirm_doubles(clubs, club_id, index, user_id, users)
@@ -582,9 +563,9 @@ def confirm_pending_doubles(club_id: str, match_id: int, user_id: str) -> None:
 def reject_pending_doubles(club_id: str, match_id: int, user_id: str) -> None:
     """Reject a pending doubles match."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     index = _find_pending_match(club, match_id)
     try:
         cli_reject_doubles(clubs, club_id, index, user_id, users)
@@ -603,9 +584,9 @@ def reject_pending_doubles(club_id: str, match_id: int, user_id: str) -> None:
 def veto_pending_doubles(club_id: str, match_id: int, approver: str) -> None:
     """Veto a pending doubles match."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     index = _find_pending_match(club, match_id)
     try:
         cli_veto_doubles(clubs, club_id, index, approver, users)
@@ -663,7 +644,7 @@ def pre_rate_member(club_id: str, rater_id: str, target_id: str, rating: float)
     """Record a pre-rating and persist the player."""
     club = get_club_or_404(club_id)
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     try:
         cli_pre_rate(clubs, club_id, rater_id, target_id, rating)
     except ValueError as e:
@@ -689,7 +670,7 @@ def record_match_result(
     """Record a finished singles match and persist affected players."""
     club = get_club_or_404(club_id)
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     try:
         cli_record_match(
             clubs,
@@ -718,9 +699,9 @@ def record_match_result(
 def sys_set_leader(club_id: str, user_id: str) -> None:
     """System admin sets club leader and persist changes."""
     club = get_club_or_404(club_id)
-    users = load_users()
+    users = storage.user_view
     clubs = {club_id: club}
-    _prepare_players(club)
+    _prepare_players()
     try:
         cli_sys_set_leader(clubs, club_id, user_id)
     except ValueError as e:
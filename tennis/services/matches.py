@@ -12,9 +12,7 @@ def list_pending_doubles_service(club_id: str, authorization: str | None = None)
     club = get_club(club_id)
     if not club:
         raise ServiceError("Club not found", 404)
-    from ..cli import cleanup_pending_matches
-
-    cleanup_pending_matches(club)
+    from ..cli import pending_match_expired
 
     admins = {club.leader_id, *club.admin_ids}
     result = []
@@ -26,6 +24,8 @@ def list_pending_doubles_service(club_id: str, authorization: str | None = None)
     ):
         if not isinstance(m, DoublesMatch):
             continue
+        if pending_match_expired(m, today):
+            continue
         team_a = {m.player_a1.user_id, m.player_a2.user_id}
         team_b = {m.player_b1.user_id, m.player_b2.user_id}
         participants = team_a | team_b
@@ -181,9 +181,8 @@ def list_pending_matches_service(club_id: str, authorization: str | None = None)
     club = get_club(club_id)
     if not club:
         raise ServiceError("Club not found", 404)
-    from ..cli import cleanup_pending_matches
+    from ..cli import pending_match_expired
 
-    cleanup_pending_matches(club)
     result = []
     admins = {club.leader_id, *club.admin_ids}
     today = datetime.date.today()
@@ -194,6 +193,8 @@ def list_pending_matches_service(club_id: str, authorization: str | None = None)
     ):
         if isinstance(m, DoublesMatch):
             continue
+        if pending_match_expired(m, today):
+            continue
         participants = {m.player_a.user_id, m.player_b.user_id}
         if m.status == "rejected":
             if uid != m.initiator:
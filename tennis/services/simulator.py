@@ -0,0 +1,102 @@
+import math
+
+from .exceptions import ServiceError
+from .. import storage
+from ..rating import (
+    DEFAULT_RATING,
+    expected_score,
+    format_weight_from_name,
+    simulate_doubles,
+    simulate_singles,
+)
+
+# every result of a set up to 7 games, enough for a full score grid
+DEFAULT_SCORES = [(a, b) for a in range(8) for b in range(8)]
+MAX_SCORES = 100
+
+
+def parse_scores(text: str | None) -> list[tuple[int, int]]:
+    """Parse scores written as ``"6-3,7-5"``; no value means the full grid."""
+    if not text:
+        return list(DEFAULT_SCORES)
+    scores = []
+    for part in text.split(","):
+        try:
+            score_a, score_b = (int(s) for s in part.split("-"))
+        except ValueError:
+            raise ServiceError("Invalid score", 400)
+        if score_a < 0 or score_b < 0:
+            raise ServiceError("Invalid score", 400)
+        scores.append((score_a, score_b))
+    if len(scores) > MAX_SCORES:
+        raise ServiceError("Too many scores", 400)
+    return scores
+
+
+def simulate_match_service(
+    user_id: str,
+    opponent: str,
+    scores: str | None = None,
+    partner: str | None = None,
+    opponent_partner: str | None = None,
+    format: str | None = None,
+    weight: float | None = None,
+) -> dict[str, object]:
+    """Return the ratings each hypothetical score would leave the players with.
+
+    Singles pit ``user_id`` against ``opponent``; passing ``partner`` and
+    ``opponent_partner`` simulates a doubles match instead. Nothing is stored
+    and no player is modified, so any number of outcomes can be previewed.
+    """
+    if (partner is None) != (opponent_partner is None):
+        raise ServiceError("Doubles need both partners", 400)
+    ids = [user_id, opponent] if partner is None else [user_id, partner, opponent, opponent_partner]
+    if len(set(ids)) != len(ids):
+        raise ServiceError("Players must be different", 400)
+    players = []
+    for uid in ids:
+        # only the ratings are needed, not the match history
+        player = storage.get_player_record(uid)
+        if not player:
+            raise ServiceError("Player not found", 404)
+        players.append(player)
+    if weight is None:
+        try:
+            weight = format_weight_from_name(format or "6_game")
+        except ValueError as e:
+            raise ServiceError(str(e), 400)
+    elif not math.isfinite(weight) or weight <= 0:
+        raise ServiceError("Invalid weight", 400)
+    grid = parse_scores(scores)
+
+    if partner is None:
+        before = [p.singles_rating for p in players]
+        after = simulate_singles(before[0], before[1], grid, weight)
+    else:
+        before = [p.doubles_rating for p in players]
+        after = simulate_doubles(before, grid, weight)
+    before = [DEFAULT_RATING if r is None else r for r in before]
+    half = len(before) // 2
+    team_a = sum(before[:half]) / half
+    team_b = sum(before[half:]) / half
+
+    results = []
+    for (score_a, score_b), ratings in zip(grid, after):
+        results.append(
+            {
+                "score_a": score_a,
+                "score_b": score_b,
+                "ratings": {uid: r for uid, r in zip(ids, ratings)},
+                "changes": {uid: r - old for uid, r, old in zip(ids, ratings, before)},
+            }
+        )
+    return {
+        "type": "singles" if partner is None else "doubles",
+        "weight": weight,
+        "expected_score": expected_score(team_a, team_b),
+        "ratings": dict(zip(ids, before)),
+        "results": results,
+    }
+
+
+__all__ = ["simulate_match_service", "parse_scores"]
@@ -1,5 +1,6 @@
 import datetime
-import statistics
+import math
+from .. import clubstats, leaderboard, storage
 from ..rating import (
     weighted_rating,
     weighted_doubles_rating,
@@ -100,22 +101,8 @@ def _pending_status_for_user(user_id: str, match: Match | DoublesMatch, club: Cl
 
 
 def _club_stats(club: Club) -> dict[str, object]:
-    """Aggregate statistics for a club."""
-    singles = [p.singles_rating for p in club.members.values() if p.singles_rating is not None]
-    doubles = [p.doubles_rating for p in club.members.values() if p.doubles_rating is not None]
-    total_singles = sum(len(p.singles_matches) for p in club.members.values()) / 2
-    total_doubles = sum(len(p.doubles_matches) for p in club.members.values()) / 4
-    singles_avg = statistics.mean(singles) if singles else 0
-    doubles_avg = statistics.mean(doubles) if doubles else 0
-    return {
-        "member_count": len(club.members),
-        "singles_rating_range": [min(singles) if singles else 0, max(singles) if singles else 0],
-        "doubles_rating_range": [min(doubles) if doubles else 0, max(doubles) if doubles else 0],
-        "singles_avg_rating": singles_avg,
-        "doubles_avg_rating": doubles_avg,
-        "total_singles_matches": total_singles,
-        "total_doubles_matches": total_doubles,
-    }
+    """Aggregate statistics for a club, memoized until it or a member changes."""
+    return clubstats.get(club)
 
 
 def get_leaderboard(
@@ -128,58 +115,55 @@ def get_leaderboard(
     max_age: int | None = None,
     gender: str | None = None,
 ) -> list[tuple[Player, float]]:
-    """Collect leaderboard data with optional filters."""
+    """Collect leaderboard data with optional filters.
+
+    The storage-backed club mapping is served from
+    :mod:`tennis.leaderboard`; other mappings are scanned.
+    """
+
+    if club_id is not None and club_id not in clubs:
+        raise ValueError("Club not found")
+    if clubs is storage.club_view:
+        rows = leaderboard.page(
+            [club_id] if club_id is not None else None,
+            doubles,
+            min_rating=-math.inf if min_rating is None else min_rating,
+            max_rating=max_rating,
+            min_age=min_age,
+            max_age=max_age,
+            gender=gender,
+        )
+        return [(row.player, row.rating) for row in rows]
 
     today = datetime.date.today()
     if club_id is not None:
-        club = clubs.get(club_id)
-        if not club:
-            raise ValueError("Club not found")
-        clubs_to_iter = [club]
+        candidates = list(clubs[club_id].members.values())
     else:
-        clubs_to_iter = list(clubs.values())
+        members: dict[str, Player] = {}
+        for club in clubs.values():
+            for uid, p in club.members.items():
+                members.setdefault(uid, p)
         # fetch all players so we can include those without club membership
         _, all_players = load_data()
-        extra_players = [
-            p
-            for p in all_players.values()
-            if all(p.user_id not in c.members for c in clubs_to_iter)
-        ]
+        candidates = list(members.values())
+        candidates.extend(p for uid, p in all_players.items() if uid not in members)
 
     players: list[tuple[Player, float]] = []
-    for club in clubs_to_iter:
-        for p in club.members.values():
-            rating = weighted_doubles_rating(p, today) if doubles else weighted_rating(p, today)
-            if rating is None:
-                continue
-            if min_rating is not None and rating < min_rating:
-                continue
-            if max_rating is not None and rating > max_rating:
-                continue
-            if min_age is not None and (p.age is None or p.age < min_age):
-                continue
-            if max_age is not None and (p.age is None or p.age > max_age):
-                continue
-            if gender is not None and p.gender != gender:
-                continue
-            players.append((p, rating))
-
-    if club_id is None:
-        for p in extra_players:
-            rating = weighted_doubles_rating(p, today) if doubles else weighted_rating(p, today)
-            if rating is None:
-                continue
-            if min_rating is not None and rating < min_rating:
-                continue
-            if max_rating is not None and rating > max_rating:
-                continue
-            if min_age is not None and (p.age is None or p.age < min_age):
-                continue
-            if max_age is not None and (p.age is None or p.age > max_age):
-                continue
-            if gender is not None and p.gender != gender:
-                continue
-            players.append((p, rating))
+    for p in candidates:
+        rating = weighted_doubles_rating(p, today) if doubles else weighted_rating(p, today)
+        if rating is None:
+            continue
+        if min_rating is not None and rating < min_rating:
+            continue
+        if max_rating is not None and rating > max_rating:
+            continue
+        if min_age is not None and (p.age is None or p.age < min_age):
+            continue
+        if max_age is not None and (p.age is None or p.age > max_age):
+            continue
+        if gender is not None and p.gender != gender:
+            continue
+        players.append((p, rating))
 
     players.sort(key=lambda x: x[1], reverse=True)
     return players
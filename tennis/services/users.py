@@ -11,7 +11,6 @@ from ..storage import (
     get_club,
     list_clubs,
     insert_token,
-    delete_token,
     get_token,
     insert_refresh_token,
     get_refresh_token,
@@ -28,6 +27,7 @@ from ..storage import (
 )
 from .. import storage
 from . import state
+from .auth import issue_access_token, is_signed_token, revoke_access_token, verify_signed_token
 from ..models import User, Player
 
 
@@ -105,9 +105,8 @@ def login(user_id: str, password: str):
         if not check_password(user, password):
             return False, None, None
 
-    access_token = secrets.token_hex(16)
+    access_token = issue_access_token(user.user_id)
     refresh_token = secrets.token_hex(16)
-    insert_token(access_token, user.user_id)
     insert_refresh_token(user.user_id, refresh_token, datetime.datetime.utcnow() + state.REFRESH_TOKEN_TTL)
     return True, access_token, refresh_token, user.user_id
 
@@ -197,22 +196,23 @@ def wechat_login(code: str, exchange_func) -> tuple[str, str, str, bool]:
         storage.bump_cache_version()
         created = True
 
-    access_token = secrets.token_hex(16)
+    access_token = issue_access_token(user.user_id)
     refresh_token = secrets.token_hex(16)
-    insert_token(access_token, user.user_id)
     insert_refresh_token(user.user_id, refresh_token, datetime.datetime.utcnow() + state.REFRESH_TOKEN_TTL)
     return access_token, refresh_token, user.user_id, created
 
 
 def logout(token: str):
-    info = get_token(token)
-    if info:
-        uid, _ = info
+    uid = revoke_access_token(token)
+    if uid:
         delete_refresh_token(uid)
-    delete_token(token)
 
 
 def refresh_token(token: str):
+    if is_signed_token(token):
+        # signed tokens cannot be extended; clients renew them with the
+        # refresh token instead
+        return verify_signed_token(token)
     info = get_token(token)
     if not info:
         raise ServiceError("Invalid token", 401)
@@ -229,8 +229,7 @@ def refresh_access_token(refresh_token: str) -> tuple[str, str]:
     if datetime.datetime.utcnow() > expires:
         delete_refresh_token(uid)
         raise ServiceError("Token expired", 401)
-    access_token = secrets.token_hex(16)
-    insert_token(access_token, uid)
+    access_token = issue_access_token(uid)
     return access_token, uid
 
 
@@ -1,21 +1,32 @@
 import json
 import datetime
-import pickle
+import hashlib
 import sqlite3
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Dict, Generator
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Generator, Iterable
 from contextlib import contextmanager
 from urllib.parse import urlparse
 
 import psycopg2
 import psycopg2.extras
 
+from . import cache_codec, migrations
 
 from .config import (
     DB_FILE,
     get_database_url,
     get_redis_url,
     get_cache_ttl,
+    get_db_pool_size,
+    get_db_pool_timeout,
+    get_token_cache_size,
+    get_token_cache_ttl,
+    get_search_backend,
 )
 
 
@@ -28,6 +39,8 @@ IS_PG = DATABASE_URL.lower().startswith("postgres")
 # Optional Redis cache
 REDIS_URL = get_redis_url()
 CACHE_TTL = get_cache_ttl()
+# ``memory`` serves id and name searches from :mod:`tennis.search`
+SEARCH_BACKEND = get_search_backend()
 _redis = None
 if REDIS_URL:
     try:
@@ -38,6 +51,12 @@ if REDIS_URL:
 
 # Redis key storing the current cache version
 CACHE_VERSION_KEY = "tennis:cache_version"
+# Redis key holding the ids of the entities changed by each version
+CACHE_CHANGES_KEY = "tennis:cache_changes:{}"
+# workers further behind than this drop their whole cache instead
+CACHE_SYNC_LIMIT = 100
+# Redis pub/sub channel announcing each version and its change record
+CACHE_CHANNEL = "tennis:cache_events"
 
 
 def get_cache_version() -> int:
@@ -54,13 +73,42 @@ def get_cache_version() -> int:
 
 
 def increment_cache_version() -> int:
-    """Increment and return the cache version stored in Redis."""
+    """Increment and return the cache version stored in Redis.
+
+    The ids of the clubs, users and players written since the previous bump
+    are published under the new version so other workers can refresh just
+    those entities (see :func:`sync_cache`), along with the ids of the
+    approved matches edited or deleted and the digests of the access tokens
+    that were revoked or renewed.
+    """
+    with _changed_lock:
+        changes = {kind: sorted(ids) for kind, ids in _changed.items()}
+        # written entities whose cached objects were not replaced afterwards
+        stale = {kind: _changed[kind] - ids for kind, ids in _fresh.items()}
+        for ids in (*_changed.values(), *_fresh.values()):
+            ids.clear()
+    if any(stale.values()):
+        _apply_changes(stale["clubs"], stale["users"], stale["players"])
+    _refresh_matches(changes["matches"])
     if not _redis:
         return 0
+    # their Redis records are outdated too, so readers go to the database
+    for kind, ids in stale.items():
+        _drop_cache(kind, *ids)
+    # histories are only cached from the database, never from written objects
+    _drop_cache("histories", *changes["players"])
+    _drop_cache("matches", *changes["matches"])
     try:
-        return int(_redis.incr(CACHE_VERSION_KEY))
+        version = int(_redis.incr(CACHE_VERSION_KEY))
     except Exception:
         return 0
+    _own_versions.add(version)
+    try:
+        _redis.setex(CACHE_CHANGES_KEY.format(version), CACHE_TTL, json.dumps(changes))
+        _redis.publish(CACHE_CHANNEL, json.dumps({"version": version, "changes": changes}))
+    except Exception:
+        pass
+    return version
 
 
 def bump_cache_version() -> int:
@@ -102,13 +150,86 @@ class _PgCursor:
         return getattr(self._c, name)
 
 
+def _reclaim(wrapper, conn, pool):
+    """Hand ``conn`` back to ``pool`` if ``wrapper`` is dropped without ``close()``.
+
+    A statement that raises skips the ``close()`` of most callers; the slot
+    is freed once the wrapper is garbage collected. The connection may hold
+    a failed transaction, possibly of another thread, so it is discarded.
+    """
+    if pool is None:
+        return None
+    return weakref.finalize(wrapper, pool.release, conn, True)
+
+
 class _PgConnection:
-    def __init__(self, conn):
+    def __init__(self, conn, pool=None):
         self._conn = conn
+        self._pool = pool
+        self._closed = False
+        self._finalizer = _reclaim(self, conn, pool)
 
     def cursor(self, *a, **kw):
         return _PgCursor(self._conn.cursor(*a, **kw))
 
+    def execute(self, query, params=None):
+        return self.cursor().execute(query, params)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._finalizer is not None:
+            self._finalizer.detach()
+        if self._pool is None:
+            self._conn.close()
+            return
+        broken = bool(self._conn.closed)
+        if not broken:
+            try:
+                self._conn.rollback()
+            except Exception:
+                broken = True
+        self._pool.release(self._conn, discard=broken)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _SqliteConnection:
+    """A pooled SQLite connection whose ``close`` returns it for reuse."""
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+        self._closed = False
+        self._finalizer = _reclaim(self, conn, pool)
+
+    def cursor(self, *a, **kw):
+        return self._conn.cursor(*a, **kw)
+
+    def execute(self, query, params=()):
+        return self._conn.execute(query, params)
+
+    def executemany(self, query, seq):
+        return self._conn.executemany(query, seq)
+
     def commit(self):
         self._conn.commit()
 
@@ -116,11 +237,143 @@ class _PgConnection:
         self._conn.rollback()
 
     def close(self):
-        self._conn.close()
+        if self._closed:
+            return
+        self._closed = True
+        self._finalizer.detach()
+        broken = False
+        try:
+            if self._conn.in_transaction:
+                self._conn.rollback()
+        except sqlite3.Error:
+            broken = True
+        self._pool.release(self._conn, discard=broken)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
 
     def __getattr__(self, name):
         return getattr(self._conn, name)
 
+
+class _ConnectionPool:
+    """Pool of reusable DB connections with checkout and wait metrics.
+
+    PostgreSQL uses one bounded pool shared by all threads; callers wait up to
+    ``timeout`` seconds for a free connection. SQLite connections cannot move
+    between threads, so each thread keeps its own idle list and the pool is
+    unbounded.
+    """
+
+    def __init__(self, connect, max_size: int | None, timeout: float, per_thread: bool = False):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self._per_thread = per_thread
+        self._local = threading.local()
+        self._idle: list = []
+        self._cond = threading.Condition()
+        self.size = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def _idle_list(self) -> list:
+        if not self._per_thread:
+            return self._idle
+        idle = getattr(self._local, "idle", None)
+        if idle is None:
+            idle = self._local.idle = []
+        return idle
+
+    def acquire(self):
+        """Check out an idle connection, opening or waiting for one if needed."""
+        started = None
+        conn = None
+        with self._cond:
+            while True:
+                idle = self._idle_list()
+                if idle:
+                    conn = idle.pop()
+                    if getattr(conn, "closed", False):
+                        self.size -= 1
+                        conn = None
+                        continue
+                    break
+                if self.max_size is None or self.size < self.max_size:
+                    self.size += 1
+                    break
+                if started is None:
+                    started = time.monotonic()
+                    self.waits += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise TimeoutError("database connection pool exhausted")
+                self._cond.wait(remaining)
+            if started is not None:
+                waited = time.monotonic() - started
+                self.wait_time += waited
+                self.max_wait = max(self.max_wait, waited)
+            self.in_use += 1
+            self.checkouts += 1
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self.size -= 1
+                    self.in_use -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Return a checked out connection, dropping it when ``discard``."""
+        with self._cond:
+            self.in_use -= 1
+            if discard:
+                self.size -= 1
+            else:
+                self._idle_list().append(conn)
+            self._cond.notify()
+        if discard:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "idle": self.size - self.in_use,
+                "max_size": self.max_size,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "wait_time_total": round(self.wait_time, 6),
+                "wait_time_max": round(self.max_wait, 6),
+            }
+
+
+# one pool per database, and the databases whose schema is already set up
+_pools: Dict[str, _ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_schema_ready: set[str] = set()
+_schema_lock = threading.Lock()
+
 # track which database file the caches were loaded from
 _db_file: Path | None = None
 
@@ -134,119 +387,619 @@ from .models import (
     Message,
     JoinApplication,
 )
+from .rating import weighted_doubles_matches, weighted_singles_matches
 
-# in-memory store used when loading player data
+# in-memory store used when loading player data. It doubles as an identity
+# map: every club and match loaded by this process shares these objects.
 _players_cache: Dict[str, Player] = {}
+# players whose ``singles_matches``/``doubles_matches`` hold their full history
+_hydrated_players: set[str] = set()
+# approved matches loaded so far, shared by clubs and players
+_matches_cache: Dict[int, Match | DoublesMatch] = {}
 # caches for loaded clubs and users
 _clubs_cache: Dict[str, Club] | None = None
 _users_cache: Dict[str, User] | None = None
+# whether the caches above hold every club/user or just those loaded on demand
+_clubs_complete = False
+_users_complete = False
 
 # pending objects to refresh after a transactional commit
 _pending_clubs: Dict[str, Club | None] = {}
 _pending_users: Dict[str, User | None] = {}
 _pending_players: Dict[str, Player | None] = {}
 
-
-def _load_cache(key: str):
+# last persisted row state of each club so ``save_club`` only writes changes
+_club_states: Dict[str, dict] = {}
+_pending_club_states: Dict[str, dict | None] = {}
+
+# ids written by this process since the cache version was last bumped;
+# "matches" holds the ids of approved matches edited or deleted, "tokens"
+# digests of the access tokens deleted or renewed and "revoked_tokens" the
+# ids of revoked signed tokens
+_changed: Dict[str, set] = {
+    "clubs": set(),
+    "users": set(),
+    "players": set(),
+    "matches": set(),
+    "tokens": set(),
+    "revoked_tokens": set(),
+}
+# ids whose cached objects were stored after the write that changed them
+_fresh: Dict[str, set[str]] = {"clubs": set(), "users": set(), "players": set()}
+_changed_lock = threading.Lock()
+# versions bumped by this process; their changes are already in its caches
+_own_versions: set[int] = set()
+# ids changed elsewhere that a complete cache has to load again
+_stale_clubs: set[str] = set()
+_stale_users: set[str] = set()
+
+# counters reported by :func:`cache_stats`
+_cache_stats = {
+    "syncs": 0,
+    "full_invalidations": 0,
+    "club_refreshes": 0,
+    "user_refreshes": 0,
+    "player_refreshes": 0,
+    "match_refreshes": 0,
+    "full_loads": 0,
+    "club_loads": 0,
+    "player_loads": 0,
+    "user_loads": 0,
+    "events": 0,
+    "polls": 0,
+    "subscriber_errors": 0,
+}
+
+
+# Redis hashes holding one encoded record per entity, keyed by its id
+CACHE_HASHES = {
+    "clubs": "tennis:club_records",
+    "players": "tennis:player_records",
+    "histories": "tennis:player_histories",
+    "matches": "tennis:match_records",
+    "users": "tennis:user_records",
+}
+# approved match ids this process has stored in or read from Redis
+_cached_match_ids: set[int] = set()
+
+
+def _load_cache(kind: str, ids) -> list | None:
+    """Return the decoded records of ``ids`` or ``None`` if any is missing."""
+    ids = list(ids)
+    if not ids:
+        return []
     if not _redis:
         return None
     try:
-        data = _redis.get(key)
-        if data is not None:
-            return pickle.loads(data)
+        raw = _redis.hmget(CACHE_HASHES[kind], [str(i) for i in ids])
     except Exception:
         return None
-    return None
+    now = time.time()
+    records = [cache_codec.decode(data, now) for data in raw]
+    if any(record is None for record in records):
+        return None
+    return records
 
 
-def _save_cache(key: str, value: object) -> None:
-    if not _redis:
+def _save_cache(kind: str, records: dict) -> None:
+    """Store ``records`` (id -> record) in the Redis hash of ``kind``.
+
+    Each record expires ``CACHE_TTL`` seconds after it is written. The hash
+    itself expires ``CACHE_TTL`` seconds after it was created, which also
+    clears records nobody reads again.
+    """
+    if not _redis or not records:
+        return
+    key = CACHE_HASHES[kind]
+    expires = time.time() + CACHE_TTL
+    try:
+        _redis.hset(key, mapping={str(i): cache_codec.encode(r, expires) for i, r in records.items()})
+        if _redis.ttl(key) < 0:
+            _redis.expire(key, CACHE_TTL)
+    except Exception:
+        pass
+
+
+def _drop_cache(kind: str, *ids) -> None:
+    if not _redis or not ids:
         return
     try:
-        _redis.setex(key, CACHE_TTL, pickle.dumps(value))
+        for chunk in _chunks([str(i) for i in ids], 1000):
+            _redis.hdel(CACHE_HASHES[kind], *chunk)
+            if kind == "players":
+                _redis.hdel(CACHE_HASHES["histories"], *chunk)
     except Exception:
         pass
 
 
+# in-process indexes told about writes and cache drops, see register_index;
+# the indexes register once, so the list outlives a reload of this module
+_indexes: list = globals().get("_indexes", [])
+
+
+def register_index(index):
+    """Keep ``index`` in step with the caches of this process and return it.
+
+    ``index.touch(kind, ids)`` is called with the ids of every club, user and
+    player written here or reported by another worker, and ``index.reset()``
+    whenever the caches are dropped. See :class:`tennis.cache_index.CacheIndex`.
+    """
+    if index not in _indexes:
+        _indexes.append(index)
+    return index
+
+
+def _touch_indexes(kind: str, ids: Iterable[str]) -> None:
+    if ids:
+        for index in _indexes:
+            index.touch(kind, ids)
+
+
+def _reset_indexes() -> None:
+    for index in _indexes:
+        index.reset()
+
+
+def _mark_changed(kind: str, *ids: str | None) -> None:
+    """Remember that ``ids`` of ``kind`` were written by this process."""
+    with _changed_lock:
+        ids = {i for i in ids if i}
+        _changed[kind].update(ids)
+        if kind in _fresh:
+            _fresh[kind].difference_update(ids)
+    _touch_indexes(kind, ids)
+
+
+def _mark_fresh(kind: str, *ids: str | None) -> None:
+    """Remember that the cached ``ids`` of ``kind`` match the database."""
+    ids = {i for i in ids if i}
+    with _changed_lock:
+        _fresh[kind].update(ids)
+    # the write is committed now; re-read what an index may have read before
+    _touch_indexes(kind, ids)
+
+
 def _refresh_after_write() -> None:
     """Flush pending objects to the in-memory and Redis caches."""
+    _mark_changed("clubs", *_pending_clubs)
+    _mark_changed("users", *_pending_users)
+    _mark_changed("players", *_pending_players)
     for club_id, club in list(_pending_clubs.items()):
         if club is None:
-            _clubs_cache.pop(club_id, None)
-            if _redis:
-                try:
-                    _redis.delete(f"tennis:club:{club_id}")
-                except Exception:
-                    pass
+            _mark_fresh("clubs", club_id)
+            if _clubs_cache is not None:
+                _clubs_cache.pop(club_id, None)
+            _drop_cache("clubs", club_id)
         else:
             set_club(club)
     for user_id, user in list(_pending_users.items()):
         if user is None:
+            _mark_fresh("users", user_id)
             if _users_cache is not None:
                 _users_cache.pop(user_id, None)
-            if _redis:
-                try:
-                    _redis.delete(f"tennis:user:{user_id}")
-                except Exception:
-                    pass
+            _drop_cache("users", user_id)
         else:
             set_user(user)
     for pid, player in list(_pending_players.items()):
         if player is None:
+            _mark_fresh("players", pid)
             _players_cache.pop(pid, None)
-            if _redis:
-                try:
-                    _redis.delete(f"tennis:player:{pid}")
-                except Exception:
-                    pass
+            _hydrated_players.discard(pid)
+            _drop_cache("players", pid)
         else:
             set_player(player)
+    for club_id, state in list(_pending_club_states.items()):
+        if state is None:
+            _club_states.pop(club_id, None)
+        else:
+            _club_states[club_id] = state
 
-    if _clubs_cache is not None:
-        _save_cache("tennis:data", (_clubs_cache, _players_cache))
-    if _users_cache is not None:
-        _save_cache("tennis:users", _users_cache)
     global _db_file
     _db_file = DATABASE_URL
 
     _pending_clubs.clear()
     _pending_users.clear()
     _pending_players.clear()
+    _pending_club_states.clear()
 
-    # bump cache version so other workers reload on next request
+    # bump cache version so other workers refresh the changed entities
     increment_cache_version()
 
 
 def invalidate_cache() -> None:
     """Clear cached club, user and player data."""
-    global _clubs_cache, _users_cache, _db_file
+    global _clubs_cache, _users_cache, _db_file, _clubs_complete, _users_complete
+    global _revoked_tokens
     _clubs_cache = None
     _users_cache = None
+    _clubs_complete = False
+    _users_complete = False
     _players_cache.clear()
+    _hydrated_players.clear()
+    _matches_cache.clear()
+    _cached_match_ids.clear()
+    _club_states.clear()
+    _stale_clubs.clear()
+    _stale_users.clear()
+    _token_cache.clear()
+    _revoked_tokens = None
     _db_file = None
+    _reset_indexes()
 
 
-def _connect():
-    """Return a DB connection based on ``DATABASE_URL``."""
-    if IS_PG:
-        conn = psycopg2.connect(DATABASE_URL, cursor_factory=psycopg2.extras.RealDictCursor)
-        _init_schema(conn)
-        return _PgConnection(conn)
+def _fetch_changes(old: int, new: int) -> dict[str, set[str]] | None:
+    """Collect the ids changed by versions ``old + 1`` to ``new``.
+
+    ``None`` is returned when a change record is missing or Redis fails, in
+    which case the caller cannot know what changed.
+    """
+    versions = range(old + 1, new + 1)
+    changes: dict[str, set[str]] = {kind: set() for kind in _changed}
+    if not _redis or not 0 < len(versions) <= CACHE_SYNC_LIMIT:
+        return None
+    for version in versions:
+        if version in _own_versions:
+            continue
+        try:
+            raw = _redis.get(CACHE_CHANGES_KEY.format(version))
+        except Exception:
+            return None
+        if raw is None:
+            return None
+        for kind, ids in json.loads(raw).items():
+            changes.setdefault(kind, set()).update(ids)
+    return changes
+
+
+def _refresh_players(ids) -> None:
+    """Reload cached players in place so clubs and matches see the changes."""
+    global _db_file
+    ids = sorted(set(ids))
+    known = [uid for uid in ids if uid in _players_cache]
+    # a complete cache also has to pick up players created elsewhere
+    wanted = ids if _clubs_complete else known
+    if not wanted:
+        return
+    hydrated = [uid for uid in wanted if uid in _hydrated_players or uid not in _players_cache]
+    conn = _connect()
+    cur = conn.cursor()
+    found = set()
+    for chunk in _chunks(wanted):
+        marks = ", ".join("?" for _ in chunk)
+        for row in cur.execute(
+            f"SELECT * FROM players WHERE user_id IN ({marks})",
+            chunk,
+        ).fetchall():
+            fresh = _player_from_row(row)
+            player = _players_cache.setdefault(fresh.user_id, fresh)
+            if player is not fresh:
+                for name, value in vars(fresh).items():
+                    if name not in ("singles_matches", "doubles_matches"):
+                        setattr(player, name, value)
+            found.add(fresh.user_id)
+    for uid in known:
+        if uid not in found:
+            _players_cache.pop(uid, None)
+            _hydrated_players.discard(uid)
+    _hydrated_players.difference_update(hydrated)
+    _hydrate_players(cur, [uid for uid in hydrated if uid in found])
+    conn.close()
+    _cache_stats["player_refreshes"] += len(found)
+    _db_file = DATABASE_URL
+
+
+def _refresh_matches(ids) -> None:
+    """Reload cached approved matches in place and forget deleted ones.
+
+    Their Redis records are stored again the next time they are cached.
+    """
+    ids = sorted({int(mid) for mid in ids})
+    _cached_match_ids.difference_update(ids)
+    known = [mid for mid in ids if mid in _matches_cache]
+    if not known:
+        return
+    conn = _connect()
+    cur = conn.cursor()
+    rows = []
+    for chunk in _chunks(known):
+        marks = ", ".join("?" for _ in chunk)
+        rows.extend(cur.execute(f"SELECT * FROM matches WHERE id IN ({marks})", chunk).fetchall())
+    _load_players(
+        cur,
+        [row[col] for row in rows for col in ("player_a1", "player_a2", "player_b1", "player_b2")],
+    )
+    conn.close()
+    found = {_cached_match(row).id for row in rows}
+    for mid in known:
+        if mid not in found:
+            _matches_cache.pop(mid, None)
+    _cache_stats["match_refreshes"] += len(found)
+
+
+def _apply_changes(clubs=(), users=(), players=(), tokens=(), revoked_tokens=(), matches=()) -> None:
+    """Drop or reload cached entities whose rows were written."""
+    for digest in tokens:
+        _token_cache.discard(digest)
+    if _revoked_tokens is not None and revoked_tokens:
+        _reload_revoked_tokens(revoked_tokens)
+    _touch_indexes("clubs", clubs)
+    _touch_indexes("users", users)
+    _touch_indexes("players", players)
+    if matches:
+        _refresh_matches(matches)
+    if players:
+        _refresh_players(players)
+    for cid in clubs:
+        if _clubs_cache is not None and _clubs_cache.pop(cid, None) is not None:
+            _cache_stats["club_refreshes"] += 1
+        _club_states.pop(cid, None)
+        if _clubs_complete:
+            _stale_clubs.add(cid)
+    for uid in users:
+        if _users_cache is not None and _users_cache.pop(uid, None) is not None:
+            _cache_stats["user_refreshes"] += 1
+        if _users_complete:
+            _stale_users.add(uid)
+
+
+def sync_cache(version: int) -> int:
+    """Bring the caches of this process up to date and return the version.
+
+    ``version`` is the cache version this process last synced to. When other
+    workers bumped it since, only the clubs, users and players named in their
+    change records are refreshed. If a record is missing, expired or too many
+    versions were skipped the whole cache is dropped instead.
+    """
+    current = get_cache_version()
+    if current == version:
+        return current
+    _cache_stats["syncs"] += 1
+    changes = _fetch_changes(version, current)
+    _own_versions.difference_update([v for v in _own_versions if v <= current])
+    if changes is None:
+        invalidate_cache()
+        _cache_stats["full_invalidations"] += 1
     else:
-        path = DB_FILE
-        if DATABASE_URL.startswith("sqlite://"):
-            path = Path(urlparse(DATABASE_URL).path)
-        conn = sqlite3.connect(path)
-        conn.row_factory = sqlite3.Row
-        _init_schema(conn)
-        return conn
+        _apply_changes(
+            changes["clubs"],
+            changes["users"],
+            changes["players"],
+            changes["tokens"],
+            changes["revoked_tokens"],
+            changes["matches"],
+        )
+    return current
+
+
+class CacheSubscriber:
+    """Collect cache change events from Redis pub/sub in a background thread.
+
+    Events are only queued here; :func:`sync_cache_events` applies them from
+    the request path so the caches are never mutated by this thread.
+    """
+
+    def __init__(self, client, channel: str = CACHE_CHANNEL, retry_delay: float = 1.0):
+        self.client = client
+        self.channel = channel
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._events: list[tuple[int, dict]] = []
+        self._connected = False
+        self._resync = True
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="tennis-cache-subscriber", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._connected = False
+
+    @property
+    def healthy(self) -> bool:
+        """``True`` while the subscription is live and no event can be missed."""
+        return self._connected and self._thread is not None and self._thread.is_alive()
+
+    def take(self) -> tuple[list[tuple[int, dict]], bool]:
+        """Return and clear the queued events and whether a resync is due."""
+        with self._lock:
+            events, self._events = self._events, []
+            resync, self._resync = self._resync, False
+        return events, resync
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                with self._lock:
+                    # events published before the subscription was live are lost
+                    self._resync = True
+                    self._connected = True
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        event = json.loads(message["data"])
+                        with self._lock:
+                            self._events.append((int(event["version"]), event["changes"]))
+            except Exception:
+                self._connected = False
+                _cache_stats["subscriber_errors"] += 1
+                self._stop.wait(self.retry_delay)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+        self._connected = False
+
+
+_subscriber: CacheSubscriber | None = None
+
+
+def start_cache_subscriber() -> CacheSubscriber | None:
+    """Start following cache change events if Redis is configured."""
+    global _subscriber
+    if not _redis:
+        return None
+    if _subscriber is None:
+        _subscriber = CacheSubscriber(_redis)
+    _subscriber.start()
+    return _subscriber
+
+
+def stop_cache_subscriber() -> None:
+    global _subscriber
+    if _subscriber is not None:
+        _subscriber.stop()
+        _subscriber = None
+
+
+def sync_cache_events(version: int) -> int:
+    """Apply the change events queued by the subscriber and return the version.
+
+    Nothing is read from Redis while the subscription is healthy. Without a
+    subscriber, after a reconnect or when an event was missed this falls back
+    to polling with :func:`sync_cache`.
+    """
+    sub = _subscriber
+    if sub is None or not sub.healthy:
+        _cache_stats["polls"] += 1
+        return sync_cache(version)
+    events, resync = sub.take()
+    if resync:
+        _cache_stats["polls"] += 1
+        version = sync_cache(version)
+    changes: dict[str, set[str]] = {kind: set() for kind in _changed}
+    start = version
+    gap = False
+    for event_version, event_changes in sorted(events, key=lambda e: e[0]):
+        if event_version <= version:
+            continue
+        if event_version != version + 1:
+            gap = True
+            break
+        if event_version not in _own_versions:
+            for kind, ids in event_changes.items():
+                changes.setdefault(kind, set()).update(ids)
+        _own_versions.discard(event_version)
+        version = event_version
+    _cache_stats["events"] += len(events)
+    if version != start:
+        _cache_stats["syncs"] += 1
+        _apply_changes(
+            changes["clubs"],
+            changes["users"],
+            changes["players"],
+            changes["tokens"],
+            changes["revoked_tokens"],
+            changes["matches"],
+        )
+    if gap:
+        _cache_stats["polls"] += 1
+        version = sync_cache(version)
+    return version
+
+
+def cache_stats() -> dict:
+    """Return reload and refresh counters of this process's caches."""
+    stats = dict(_cache_stats)
+    if _subscriber is None:
+        stats["subscriber"] = "off"
+    else:
+        stats["subscriber"] = "connected" if _subscriber.healthy else "disconnected"
+    stats["cached_clubs"] = len(_clubs_cache or {})
+    stats["cached_players"] = len(_players_cache)
+    stats["cached_users"] = len(_users_cache or {})
+    return stats
+
+
+def _sqlite_path() -> Path:
+    if DATABASE_URL.startswith("sqlite://"):
+        return Path(urlparse(DATABASE_URL).path)
+    return Path(DB_FILE)
+
+
+def _get_pool() -> tuple[str, _ConnectionPool]:
+    key = DATABASE_URL if IS_PG else str(_sqlite_path())
+    pool = _pools.get(key)
+    if pool is not None:
+        return key, pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            if IS_PG:
+                dsn = DATABASE_URL
+                pool = _ConnectionPool(
+                    lambda: psycopg2.connect(dsn, cursor_factory=psycopg2.extras.RealDictCursor),
+                    get_db_pool_size(),
+                    get_db_pool_timeout(),
+                )
+            else:
+                path = key
+
+                def _open():
+                    conn = sqlite3.connect(path)
+                    conn.row_factory = sqlite3.Row
+                    return conn
+
+                pool = _ConnectionPool(_open, None, get_db_pool_timeout(), per_thread=True)
+            _pools[key] = pool
+    return key, pool
+
+
+def _connect():
+    """Check out a pooled DB connection based on ``DATABASE_URL``.
+
+    Calling ``close()`` on the returned connection rolls back anything left
+    uncommitted and hands it back to the pool; a connection dropped without
+    ``close()``, e.g. after a failed statement, is discarded when it is
+    garbage collected. The schema is set up by the first connection made to
+    each database in this process.
+    """
+    key, pool = _get_pool()
+    raw = pool.acquire()
+    conn = _PgConnection(raw, pool) if IS_PG else _SqliteConnection(raw, pool)
+    if key not in _schema_ready:
+        try:
+            with _schema_lock:
+                if key not in _schema_ready:
+                    _init_schema(raw)
+                    _schema_ready.add(key)
+        except Exception:
+            conn.close()
+            raise
+    return conn
+
+
+def pool_stats() -> dict:
+    """Return size and wait-time metrics for the current connection pool."""
+    _, pool = _get_pool()
+    stats = pool.stats()
+    stats["backend"] = "postgresql" if IS_PG else "sqlite"
+    return stats
 
 
 @contextmanager
 def transaction() -> Generator[object, None, None]:
-    """Context manager yielding a connection with an active transaction."""
-    conn = _connect()
+    """Context manager yielding a connection with an active transaction.
+
+    The connection is checked out for the whole block and returned to the
+    pool after the commit or rollback.
+    """
     assert not (_pending_clubs or _pending_users or _pending_players)
+    conn = _connect()
     try:
         yield conn
         conn.commit()
@@ -256,546 +1009,582 @@ def transaction() -> Generator[object, None, None]:
         _pending_clubs.clear()
         _pending_users.clear()
         _pending_players.clear()
+        _pending_club_states.clear()
         raise
     finally:
         conn.close()
 
 
-def _init_schema(conn) -> None:
+def _schema_cursor(conn):
     cur = conn.cursor(
         cursor_factory=psycopg2.extras.RealDictCursor
     ) if IS_PG else conn.cursor()
-    if IS_PG:
-        cur = _PgCursor(cur)
-        
-        cur.execute(
-            "CREATE TABLE IF NOT EXISTS clubs (club_id TEXT PRIMARY KEY, name TEXT, logo TEXT, region TEXT, slogan TEXT)"
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            name TEXT,
-            password_hash TEXT,
-            wechat_openid TEXT,
-            can_create_club INTEGER DEFAULT 1,
-            is_sys_admin INTEGER DEFAULT 0,
-            created_clubs INTEGER DEFAULT 0,
-            joined_clubs INTEGER DEFAULT 0,
-            max_creatable_clubs INTEGER DEFAULT 0,
-            max_joinable_clubs INTEGER DEFAULT 5
-        )"""
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS players (
-            user_id TEXT PRIMARY KEY,
-            name TEXT,
-            singles_rating REAL,
-            doubles_rating REAL,
-            experience REAL,
-            pre_ratings JSONB,
-            age INTEGER,
-            gender TEXT,
-            avatar TEXT,
-            birth TEXT,
-            handedness TEXT,
-            backhand TEXT,
-            region TEXT,
-            joined TEXT
-        )"""
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS club_members (
-            club_id TEXT,
-            user_id TEXT,
-            joined TEXT,
-            PRIMARY KEY (club_id, user_id)
-        )"""
-        )
-        cur.execute(
-            "SELECT column_name FROM information_schema.columns WHERE table_name='club_members'"
-        )
-        cols = {row["column_name"] for row in cur.fetchall()}
-        if 'joined' not in cols:
-            cur.execute("ALTER TABLE club_members ADD COLUMN joined TEXT")
-        cur.execute(
-            "CREATE TABLE IF NOT EXISTS matches (id SERIAL PRIMARY KEY, club_id TEXT, type TEXT, date TEXT, data JSONB)"
-        )
-        cur.execute(
-            "CREATE TABLE IF NOT EXISTS pending_matches (id SERIAL PRIMARY KEY, club_id TEXT, type TEXT, date TEXT, data JSONB)"
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS appointments (
-            id SERIAL PRIMARY KEY,
-            club_id TEXT,
-            date TEXT,
-            creator TEXT,
-            location TEXT,
-            info TEXT,
-            signups JSONB
-        )"""
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS club_meta (
-            club_id TEXT PRIMARY KEY,
-            banned_ids JSONB,
-            leader_id TEXT,
-            admin_ids JSONB,
-            pending_members JSONB,
-            rejected_members JSONB
-        )"""
-        )
-    else:
-        cur.execute(
-            "CREATE TABLE IF NOT EXISTS clubs (club_id TEXT PRIMARY KEY, name TEXT, logo TEXT, region TEXT, slogan TEXT)"
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            name TEXT,
-            password_hash TEXT,
-            wechat_openid TEXT,
-            can_create_club INTEGER DEFAULT 1,
-            is_sys_admin INTEGER DEFAULT 0,
-            created_clubs INTEGER DEFAULT 0,
-            joined_clubs INTEGER DEFAULT 0,
-            max_creatable_clubs INTEGER DEFAULT 0,
-            max_joinable_clubs INTEGER DEFAULT 5
-        )"""
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS players (
-            user_id TEXT PRIMARY KEY,
-            name TEXT,
-            singles_rating REAL,
-            doubles_rating REAL,
-            experience REAL,
-            pre_ratings TEXT,
-            age INTEGER,
-            gender TEXT,
-            avatar TEXT,
-            birth TEXT,
-            handedness TEXT,
-            backhand TEXT,
-            region TEXT,
-            joined TEXT
-        )"""
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS club_members (
-            club_id TEXT,
-            user_id TEXT,
-            joined TEXT,
-            PRIMARY KEY (club_id, user_id)
-        )"""
-        )
-        cur.execute(
-            "CREATE TABLE IF NOT EXISTS matches (id SERIAL PRIMARY KEY, club_id TEXT, type TEXT, date TEXT, data TEXT)"
-        )
-        cur.execute(
-            "CREATE TABLE IF NOT EXISTS pending_matches (id SERIAL PRIMARY KEY, club_id TEXT, type TEXT, date TEXT, data TEXT)"
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS appointments (
-            id SERIAL PRIMARY KEY,
-            club_id TEXT,
-            date TEXT,
-            creator TEXT,
-            location TEXT,
-            info TEXT,
-            signups TEXT
-        )"""
-        )
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS club_meta (
-            club_id TEXT PRIMARY KEY,
-            banned_ids TEXT,
-            leader_id TEXT,
-            admin_ids TEXT,
-            pending_members TEXT,
-            rejected_members TEXT
-        )"""
-        )
-    # add new columns if an older database is missing them
-    if not IS_PG:
-        cols = {row[1] for row in cur.execute("PRAGMA table_info('clubs')")}
-        if 'slogan' not in cols:
-            cur.execute("ALTER TABLE clubs ADD COLUMN slogan TEXT")
-        cols = {row[1] for row in cur.execute("PRAGMA table_info('users')")}
-        if 'is_sys_admin' not in cols:
-            cur.execute("ALTER TABLE users ADD COLUMN is_sys_admin INTEGER DEFAULT 0")
-        if 'max_creatable_clubs' not in cols:
-            cur.execute("ALTER TABLE users ADD COLUMN max_creatable_clubs INTEGER DEFAULT 0")
-        if 'max_joinable_clubs' not in cols:
-            cur.execute("ALTER TABLE users ADD COLUMN max_joinable_clubs INTEGER DEFAULT 5")
-        cols = {row[1] for row in cur.execute("PRAGMA table_info('club_meta')")}
-        if 'leader_id' not in cols:
-            cur.execute("ALTER TABLE club_meta ADD COLUMN leader_id TEXT")
-        if 'admin_ids' not in cols:
-            cur.execute("ALTER TABLE club_meta ADD COLUMN admin_ids TEXT")
-        if 'pending_members' not in cols:
-            cur.execute("ALTER TABLE club_meta ADD COLUMN pending_members TEXT")
-        if 'rejected_members' not in cols:
-            cur.execute("ALTER TABLE club_meta ADD COLUMN rejected_members TEXT")
-        cols = {row[1] for row in cur.execute("PRAGMA table_info('players')")}
-        if 'birth' not in cols:
-            cur.execute("ALTER TABLE players ADD COLUMN birth TEXT")
-        if 'handedness' not in cols:
-            cur.execute("ALTER TABLE players ADD COLUMN handedness TEXT")
-        if 'backhand' not in cols:
-            cur.execute("ALTER TABLE players ADD COLUMN backhand TEXT")
-        if 'region' not in cols:
-            cur.execute("ALTER TABLE players ADD COLUMN region TEXT")
-        if 'joined' not in cols:
-            cur.execute("ALTER TABLE players ADD COLUMN joined TEXT")
-        cols = {row[1] for row in cur.execute("PRAGMA table_info('club_members')")}
-        if 'joined' not in cols:
-            cur.execute("ALTER TABLE club_members ADD COLUMN joined TEXT")
-    if IS_PG:
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS messages (
-            id SERIAL PRIMARY KEY,
-            user_id TEXT,
-            date TEXT,
-            text TEXT,
-            read INTEGER
-        )"""
-        )
-    else:
-        cur.execute(
-            """CREATE TABLE IF NOT EXISTS messages (
-            id SERIAL PRIMARY KEY,
-            user_id TEXT,
-            date TEXT,
-            text TEXT,
-            read INTEGER
-        )"""
-        )
-    cur.execute(
-        """CREATE TABLE IF NOT EXISTS auth_tokens (
-        token TEXT PRIMARY KEY,
-        user_id TEXT,
-        ts TEXT
-    )"""
-    )
-    cur.execute(
-        """CREATE TABLE IF NOT EXISTS refresh_tokens (
-        user_id TEXT PRIMARY KEY,
-        token TEXT,
-        expires TEXT
-    )"""
-    )
-    cur.execute(
-        """CREATE TABLE IF NOT EXISTS user_subscribe (
-        user_id TEXT,
-        scene TEXT,
-        quota INTEGER DEFAULT 0,
-        PRIMARY KEY (user_id, scene)
-    )"""
+    return _PgCursor(cur) if IS_PG else cur
+
+
+def _init_schema(conn) -> None:
+    """Bring the database schema up to date with :mod:`tennis.migrations`."""
+    migrations.apply_migrations(conn, _schema_cursor(conn), IS_PG)
+
+
+def migrate(target: int | None = None) -> list[int]:
+    """Apply pending schema migrations up to ``target`` and return them."""
+    key, pool = _get_pool()
+    raw = pool.acquire()
+    conn = _PgConnection(raw, pool) if IS_PG else _SqliteConnection(raw, pool)
+    try:
+        applied = migrations.apply_migrations(raw, _schema_cursor(raw), IS_PG, target)
+        if target is None:
+            _schema_ready.add(key)
+    finally:
+        conn.close()
+    return applied
+
+
+def schema_status() -> tuple[set[int], list[migrations.Migration]]:
+    """Return the applied migration versions and the pending migrations."""
+    _, pool = _get_pool()
+    raw = pool.acquire()
+    conn = _PgConnection(raw, pool) if IS_PG else _SqliteConnection(raw, pool)
+    try:
+        cur = _schema_cursor(raw)
+        done = migrations.applied_versions(cur)
+        todo = migrations.pending_migrations(cur)
+        conn.commit()
+    finally:
+        conn.close()
+    return done, todo
+
+
+def _club_from_row(row) -> Club:
+    return Club(
+        club_id=row["club_id"],
+        name=row["name"],
+        logo=row["logo"],
+        region=row["region"],
+        slogan=row["slogan"],
     )
-    cur.execute(
-        """CREATE TABLE IF NOT EXISTS subscribe_log (
-        id SERIAL PRIMARY KEY,
-        user_id TEXT,
-        scene TEXT,
-        errcode INTEGER,
-        errmsg TEXT,
-        retries INTEGER DEFAULT 0,
-        ts TEXT
-    )"""
+
+
+def _apply_club_meta(club: Club, row) -> None:
+    """Copy a ``club_meta`` row onto ``club``."""
+    club.banned_ids.update(_parse_json(row["banned_ids"], []))
+    club.leader_id = row["leader_id"]
+    club.admin_ids.update(_parse_json(row["admin_ids"], []))
+    for uid, info in _parse_json(row["pending_members"], {}).items():
+        club.pending_members[uid] = JoinApplication(
+            reason=info.get("reason"),
+            singles_rating=info.get("singles_rating"),
+            doubles_rating=info.get("doubles_rating"),
+        )
+    club.rejected_members.update(_parse_json(row["rejected_members"], {}))
+
+
+def _player_from_row(row) -> Player:
+    from .cli import normalize_gender
+
+    p = Player(
+        user_id=row["user_id"],
+        name=row["name"],
+        singles_rating=row["singles_rating"],
+        doubles_rating=row["doubles_rating"],
+        experience=row["experience"],
+        age=row["age"],
+        gender=normalize_gender(row["gender"]),
+        avatar=row["avatar"],
+        birth=row["birth"],
+        handedness=row["handedness"],
+        backhand=row["backhand"],
+        region=row["region"],
+        joined=datetime.date.fromisoformat(row["joined"]) if row["joined"] else datetime.date.today(),
     )
-    # patch old records lacking per-club join dates
-    cur.execute(
-        "SELECT club_id, user_id FROM club_members WHERE joined IS NULL OR joined = ''"
+    p.pre_ratings.update(_parse_json(row["pre_ratings"], {}))
+    return p
+
+
+def _add_member(club: Club, player: Player, joined: str | None) -> None:
+    club.members[player.user_id] = player
+    if joined:
+        club.member_joined[player.user_id] = datetime.date.fromisoformat(joined)
+
+
+def _appointment_from_row(row) -> Appointment:
+    appt = Appointment(
+        date=datetime.date.fromisoformat(row["date"]),
+        creator=row["creator"],
+        location=row["location"],
+        info=row["info"],
     )
-    missing = cur.fetchall()
-    for row in missing:
-        uid = row["user_id"]
-        joined_row = cur.execute(
-            "SELECT joined FROM players WHERE user_id = ?",
-            (uid,),
-        ).fetchone()
-        joined = joined_row["joined"] if joined_row and joined_row["joined"] else None
-        if not joined:
-            joined = datetime.date.today().isoformat()
-        cur.execute(
-            "UPDATE club_members SET joined = ? WHERE club_id = ? AND user_id = ?",
-            (joined, row["club_id"], uid),
-        )
-    conn.commit()
+    appt.signups.update(_parse_json(row["signups"], []))
+    return appt
+
+
+def _match_players(match: Match | DoublesMatch) -> list[Player]:
+    if isinstance(match, DoublesMatch):
+        return [match.player_a1, match.player_a2, match.player_b1, match.player_b2]
+    return [match.player_a, match.player_b]
+
+
+def _player_matches(player: Player, match: Match | DoublesMatch) -> list:
+    if isinstance(match, DoublesMatch):
+        return player.doubles_matches
+    return player.singles_matches
 
 
 def load_data() -> tuple[Dict[str, Club], Dict[str, Player]]:
-    """Load all clubs and players, using cached data when available."""
-    global _clubs_cache, _players_cache, _db_file
-    if _clubs_cache is not None and _db_file == DATABASE_URL:
+    """Load all clubs and players, using cached data when available.
+
+    Request handlers should prefer :func:`get_club` and :func:`get_player`,
+    which only load the rows they need.
+    """
+    global _clubs_cache, _db_file, _clubs_complete
+    if _clubs_complete and _db_file == DATABASE_URL:
+        for cid in sorted(_stale_clubs):
+            get_club(cid)
         return _clubs_cache, _players_cache
-    if _redis:
-        cached = _load_cache("tennis:data")
-        if cached:
-            _clubs_cache, _players_cache = cached
-            _db_file = DATABASE_URL
-            return _clubs_cache, _players_cache
     _db_file = DATABASE_URL
+    _cache_stats["full_loads"] += 1
 
     conn = _connect()
     cur = conn.cursor()
-    from .cli import normalize_gender
     clubs: Dict[str, Club] = {}
     players = _players_cache
     players.clear()
+    _matches_cache.clear()
+    # the indexes hold the player objects replaced here
+    _reset_indexes()
     for row in cur.execute("SELECT * FROM clubs"):
-        clubs[row["club_id"]] = Club(
-            club_id=row["club_id"],
-            name=row["name"],
-            logo=row["logo"],
-            region=row["region"],
-            slogan=row["slogan"],
-        )
+        clubs[row["club_id"]] = _club_from_row(row)
 
     for row in cur.execute("SELECT * FROM club_meta"):
         club = clubs.get(row["club_id"])
-        if not club:
-            continue
-        value = row["banned_ids"]
-        if isinstance(value, str):
-            parsed = json.loads(value or "[]")
-        else:
-            parsed = value or []
-        club.banned_ids.update(parsed)
-        club.leader_id = row["leader_id"]
-        value = row["admin_ids"]
-        if isinstance(value, str):
-            parsed = json.loads(value or "[]")
-        else:
-            parsed = value or []
-        club.admin_ids.update(parsed)
-        value = row["pending_members"]
-        if isinstance(value, str):
-            pending = json.loads(value or "{}")
-        else:
-            pending = value or {}
-        for uid, info in pending.items():
-            club.pending_members[uid] = JoinApplication(
-                reason=info.get("reason"),
-                singles_rating=info.get("singles_rating"),
-                doubles_rating=info.get("doubles_rating"),
-            )
-        value = row["rejected_members"]
-        if isinstance(value, str):
-            rejected = json.loads(value or "{}")
-        else:
-            rejected = value or {}
-        club.rejected_members.update(rejected)
+        if club:
+            _apply_club_meta(club, row)
 
     for row in cur.execute("SELECT * FROM players"):
-        p = Player(
-            user_id=row["user_id"],
-            name=row["name"],
-            singles_rating=row["singles_rating"],
-            doubles_rating=row["doubles_rating"],
-            experience=row["experience"],
-            age=row["age"],
-            gender=normalize_gender(row["gender"]),
-            avatar=row["avatar"],
-            birth=row["birth"],
-            handedness=row["handedness"],
-            backhand=row["backhand"],
-            region=row["region"],
-            joined=datetime.date.fromisoformat(row["joined"]) if row["joined"] else datetime.date.today(),
-        )
-        value = row["pre_ratings"]
-        if isinstance(value, str):
-            parsed = json.loads(value or "{}")
-        else:
-            parsed = value or {}
-        p.pre_ratings.update(parsed)
+        p = _player_from_row(row)
         players[p.user_id] = p
 
     for row in cur.execute("SELECT * FROM club_members"):
         club = clubs.get(row["club_id"])
         p = players.get(row["user_id"])
         if club and p:
-            club.members[p.user_id] = p
-            joined_str = row["joined"] if "joined" in row.keys() else None
-            if joined_str:
-                club.member_joined[p.user_id] = datetime.date.fromisoformat(joined_str)
+            _add_member(club, p, row["joined"])
 
     for row in cur.execute("SELECT * FROM matches ORDER BY id"):
         club = clubs.get(row["club_id"])
-        value = row["data"]
-        if isinstance(value, str):
-            data = json.loads(value or "{}")
-        else:
-            data = value or {}
-        date = datetime.date.fromisoformat(row["date"])
-        created_ts_str = data.get("created_ts")
-        created_ts = (
-            datetime.datetime.fromisoformat(created_ts_str)
-            if created_ts_str
-            else datetime.datetime.combine(date, datetime.time())
-        )
-        approved_ts_str = data.get("approved_ts")
-        approved_ts = (
-            datetime.datetime.fromisoformat(approved_ts_str)
-            if approved_ts_str
-            else None
-        )
-        if row["type"] == "doubles":
-            pa1 = players[data["a1"]]
-            pa2 = players[data["a2"]]
-            pb1 = players[data["b1"]]
-            pb2 = players[data["b2"]]
-            match = DoublesMatch(
-                id=row["id"],
-                date=date,
-                club_id=row["club_id"],
-                player_a1=pa1,
-                player_a2=pa2,
-                player_b1=pb1,
-                player_b2=pb2,
-                score_a=data["score_a"],
-                score_b=data["score_b"],
-                format_weight=data.get("weight", 1.0),
-                location=data.get("location"),
-                format_name=data.get("format_name"),
-            )
-            match.created_ts = created_ts
-            match.approved_ts = approved_ts
-            match.rating_a1_before = data.get("rating_a1_before")
-            match.rating_a2_before = data.get("rating_a2_before")
-            match.rating_b1_before = data.get("rating_b1_before")
-            match.rating_b2_before = data.get("rating_b2_before")
-            match.rating_a1_after = data.get("rating_a1_after")
-            match.rating_a2_after = data.get("rating_a2_after")
-            match.rating_b1_after = data.get("rating_b1_after")
-            match.rating_b2_after = data.get("rating_b2_after")
-            if club:
-                club.matches.append(match)
-            pa1.doubles_matches.append(match)
-            pa2.doubles_matches.append(match)
-            pb1.doubles_matches.append(match)
-            pb2.doubles_matches.append(match)
-        else:
-            pa = players[data["player_a"]]
-            pb = players[data["player_b"]]
-            match = Match(
-                id=row["id"],
-                date=date,
-                club_id=row["club_id"],
-                player_a=pa,
-                player_b=pb,
-                score_a=data["score_a"],
-                score_b=data["score_b"],
-                format_weight=data.get("weight", 1.0),
-                location=data.get("location"),
-                format_name=data.get("format_name"),
-            )
-            match.created_ts = created_ts
-            match.approved_ts = approved_ts
-            match.rating_a_before = data.get("rating_a_before")
-            match.rating_b_before = data.get("rating_b_before")
-            match.rating_a_after = data.get("rating_a_after")
-            match.rating_b_after = data.get("rating_b_after")
-            if club:
-                club.matches.append(match)
-            pa.singles_matches.append(match)
-            pb.singles_matches.append(match)
+        match = _match_from_row(row, players, pending=False)
+        _matches_cache[match.id] = match
+        if club:
+            club.matches.append(match)
+        for p in _match_players(match):
+            _player_matches(p, match).append(match)
     for row in cur.execute("SELECT * FROM pending_matches ORDER BY id"):
         club = clubs.get(row["club_id"])
         if not club:
             continue
-        value = row["data"]
-        if isinstance(value, str):
-            data = json.loads(value or "{}")
-        else:
-            data = value or {}
-        date = datetime.date.fromisoformat(row["date"])
-        approved_ts = None
-        if row["type"] == "doubles":
-            pa1 = players[data["a1"]]
-            pa2 = players[data["a2"]]
-            pb1 = players[data["b1"]]
-            pb2 = players[data["b2"]]
-            match = DoublesMatch(
-                id=row["id"],
-                date=date,
-                player_a1=pa1,
-                player_a2=pa2,
-                player_b1=pb1,
-                player_b2=pb2,
-                score_a=data["score_a"],
-                score_b=data["score_b"],
-                format_weight=data.get("weight", 1.0),
-                location=data.get("location"),
-                format_name=data.get("format_name"),
-                initiator=data.get("initiator"),
-            )
-            match.confirmed_a = data.get("confirmed_a", False)
-            match.confirmed_b = data.get("confirmed_b", False)
-            if "created" in data:
-                match.created = datetime.date.fromisoformat(data["created"])
-            if "created_ts" in data:
-                match.created_ts = datetime.datetime.fromisoformat(data["created_ts"])
-            if data.get("approved_ts"):
-                match.approved_ts = datetime.datetime.fromisoformat(data["approved_ts"])
-            if data.get("confirmed_on"):
-                match.confirmed_on = datetime.date.fromisoformat(data["confirmed_on"])
-            match.status = data.get("status")
-            if data.get("status_date"):
-                match.status_date = datetime.date.fromisoformat(data["status_date"])
-            club.pending_matches.append(match)
-        else:
-            pa = players[data["player_a"]]
-            pb = players[data["player_b"]]
-            match = Match(
-                id=row["id"],
-                date=date,
-                player_a=pa,
-                player_b=pb,
-                score_a=data["score_a"],
-                score_b=data["score_b"],
-                format_weight=data.get("weight", 1.0),
-                location=data.get("location"),
-                format_name=data.get("format_name"),
-                initiator=data.get("initiator"),
-            )
-            match.confirmed_a = data.get("confirmed_a", False)
-            match.confirmed_b = data.get("confirmed_b", False)
-            if "created" in data:
-                match.created = datetime.date.fromisoformat(data["created"])
-            if "created_ts" in data:
-                match.created_ts = datetime.datetime.fromisoformat(data["created_ts"])
-            if data.get("approved_ts"):
-                match.approved_ts = datetime.datetime.fromisoformat(data["approved_ts"])
-            if data.get("confirmed_on"):
-                match.confirmed_on = datetime.date.fromisoformat(data["confirmed_on"])
-            match.status = data.get("status")
-            if data.get("status_date"):
-                match.status_date = datetime.date.fromisoformat(data["status_date"])
-            club.pending_matches.append(match)
+        club.pending_matches.append(_match_from_row(row, players, pending=True))
     for row in cur.execute("SELECT * FROM appointments ORDER BY id"):
         club = clubs.get(row["club_id"])
-        if not club:
-            continue
-        appt = Appointment(
-            date=datetime.date.fromisoformat(row["date"]),
-            creator=row["creator"],
-            location=row["location"],
-            info=row["info"],
-        )
-        value = row["signups"]
-        if isinstance(value, str):
-            parsed = json.loads(value or "[]")
-        else:
-            parsed = value or []
-        appt.signups.update(parsed)
-        club.appointments.append(appt)
+        if club:
+            club.appointments.append(_appointment_from_row(row))
     conn.close()
+    _club_states.clear()
+    for cid, club in clubs.items():
+        _club_states[cid] = _club_state(club)
     _clubs_cache = clubs
-    _save_cache("tennis:data", (clubs, players))
+    _clubs_complete = True
+    _stale_clubs.clear()
+    _hydrated_players.clear()
+    _hydrated_players.update(players)
     return clubs, players
 
 
+def _chunks(ids: list[str], size: int = 200):
+    for i in range(0, len(ids), size):
+        yield ids[i : i + size]
+
+
+def _load_players(cur, ids) -> None:
+    """Put the ``players`` rows for ``ids`` into the identity map.
+
+    Players loaded this way have no match history yet; see
+    :func:`_hydrate_players`.
+    """
+    missing = sorted({uid for uid in ids if uid and uid not in _players_cache})
+    for chunk in _chunks(missing):
+        marks = ", ".join("?" for _ in chunk)
+        for row in cur.execute(
+            f"SELECT * FROM players WHERE user_id IN ({marks})",
+            chunk,
+        ).fetchall():
+            _players_cache[row["user_id"]] = _player_from_row(row)
+
+
+def _cached_match(row) -> Match | DoublesMatch:
+    """Return the shared object for an approved match row.
+
+    A match already in the identity map is updated in place from ``row``, so
+    clubs and players holding it see edits made by other workers.
+    """
+    fresh = _match_from_row(row, _players_cache, pending=False)
+    match = _matches_cache.setdefault(fresh.id, fresh)
+    if match is not fresh:
+        for name, value in vars(fresh).items():
+            setattr(match, name, value)
+    return match
+
+
+def _hydrate_players(cur, ids) -> None:
+    """Load players and their complete singles and doubles history."""
+    todo = sorted({uid for uid in ids if uid and uid not in _hydrated_players})
+    if not todo:
+        return
+    _load_players(cur, todo)
+    todo = [uid for uid in todo if uid in _players_cache]
+    _cache_stats["player_loads"] += len(todo)
+    rows: dict = {}
+    for chunk in _chunks(todo):
+        marks = ", ".join("?" for _ in chunk)
+        query = (
+            f"SELECT * FROM matches WHERE player_a1 IN ({marks}) OR player_a2 IN ({marks})"
+            f" OR player_b1 IN ({marks}) OR player_b2 IN ({marks})"
+        )
+        for row in cur.execute(query, chunk * 4).fetchall():
+            rows[row["id"]] = row
+    _load_players(
+        cur,
+        [row[col] for row in rows.values() for col in ("player_a1", "player_a2", "player_b1", "player_b2")],
+    )
+    hydrating = set(todo)
+    for uid in todo:
+        player = _players_cache[uid]
+        player.singles_matches.clear()
+        player.doubles_matches.clear()
+    for mid in sorted(rows):
+        match = _cached_match(rows[mid])
+        for p in _match_players(match):
+            if p.user_id in hydrating:
+                _player_matches(p, match).append(match)
+    _hydrated_players.update(todo)
+
+
+def _hydrate_club(club_id: str) -> Club | None:
+    """Load one club with its members, their history and its matches."""
+    _cache_stats["club_loads"] += 1
+    conn = _connect()
+    cur = conn.cursor()
+    row = cur.execute("SELECT * FROM clubs WHERE club_id = ?", (club_id,)).fetchone()
+    if not row:
+        conn.close()
+        return None
+    club = _club_from_row(row)
+    row = cur.execute("SELECT * FROM club_meta WHERE club_id = ?", (club_id,)).fetchone()
+    if row:
+        _apply_club_meta(club, row)
+    members = cur.execute(
+        "SELECT user_id, joined FROM club_members WHERE club_id = ?",
+        (club_id,),
+    ).fetchall()
+    match_rows = cur.execute(
+        "SELECT * FROM matches WHERE club_id = ? ORDER BY id",
+        (club_id,),
+    ).fetchall()
+    pending_rows = cur.execute(
+        "SELECT * FROM pending_matches WHERE club_id = ? ORDER BY id",
+        (club_id,),
+    ).fetchall()
+    _load_players(
+        cur,
+        [
+            r[col]
+            for r in (*match_rows, *pending_rows)
+            for col in ("player_a1", "player_a2", "player_b1", "player_b2")
+        ],
+    )
+    _hydrate_players(cur, [r["user_id"] for r in members])
+    for r in members:
+        p = _players_cache.get(r["user_id"])
+        if p:
+            _add_member(club, p, r["joined"])
+    club.matches.extend(_cached_match(r) for r in match_rows)
+    club.pending_matches.extend(
+        _match_from_row(r, _players_cache, pending=True) for r in pending_rows
+    )
+    for r in cur.execute(
+        "SELECT * FROM appointments WHERE club_id = ? ORDER BY id",
+        (club_id,),
+    ).fetchall():
+        club.appointments.append(_appointment_from_row(r))
+    conn.close()
+    _club_states[club_id] = _club_state(club)
+    return club
+
+
+# Records cached in Redis are lists of the same column values the database
+# stores. Objects point at each other by id, so a club record lists its
+# members and match ids and a player record lists their match ids, and each
+# entity is encoded once no matter how many clubs or players reference it.
+
+
+def _club_record(club: Club) -> list | None:
+    if any(m.id is None for m in (*club.matches, *club.pending_matches)):
+        return None
+    return [
+        (club.name, club.logo, club.region, club.slogan),
+        _meta_values(club),
+        {
+            uid: club.member_joined.get(uid, p.joined).isoformat()
+            for uid, p in club.members.items()
+        },
+        [m.id for m in club.matches],
+        [[m.id, *_match_values(m)] for m in club.pending_matches],
+        [_appointment_values(a) for a in club.appointments],
+    ]
+
+
+def _history_record(player: Player) -> list | None:
+    if any(m.id is None for m in (*player.singles_matches, *player.doubles_matches)):
+        return None
+    return [
+        [m.id for m in player.singles_matches],
+        [m.id for m in player.doubles_matches],
+    ]
+
+
+# columns kept in the records of approved matches, by match type; the
+# confirmation columns only matter while a match is pending
+_MATCH_RECORD_COLUMNS = {
+    "singles": (
+        "date",
+        "player_a1",
+        "player_b1",
+        "score_a",
+        "score_b",
+        "weight",
+        "location",
+        "format_name",
+        "created_ts",
+        "approved_ts",
+        "rating_a1_before",
+        "rating_b1_before",
+        "rating_a1_after",
+        "rating_b1_after",
+    ),
+    "doubles": (
+        "date",
+        "player_a1",
+        "player_a2",
+        "player_b1",
+        "player_b2",
+        "score_a",
+        "score_b",
+        "weight",
+        "location",
+        "format_name",
+        "created_ts",
+        "approved_ts",
+        "rating_a1_before",
+        "rating_a2_before",
+        "rating_b1_before",
+        "rating_b2_before",
+        "rating_a1_after",
+        "rating_a2_after",
+        "rating_b1_after",
+        "rating_b2_after",
+    ),
+}
+
+
+def _match_record(match: Match | DoublesMatch, club_id: str | None = None) -> list:
+    row = dict(zip(_MATCH_COLUMNS, _match_values(match)))
+    columns = _MATCH_RECORD_COLUMNS[row["type"]]
+    return [club_id or match.club_id, row["type"], *(row[c] for c in columns)]
+
+
+def _match_row_from_record(match_id: int, record: list) -> dict:
+    club_id, mtype, *values = record
+    row = dict.fromkeys(_MATCH_COLUMNS)
+    row.update(zip(_MATCH_RECORD_COLUMNS[mtype], values), id=match_id, club_id=club_id, type=mtype)
+    return row
+
+
+def _user_record(user: User) -> list:
+    return [
+        user.name,
+        user.password_hash,
+        user.wechat_openid,
+        int(getattr(user, "is_sys_admin", False)),
+        user.created_clubs,
+        user.joined_clubs,
+        getattr(user, "max_creatable_clubs", 0),
+        getattr(user, "max_joinable_clubs", 5),
+        [[m.date.isoformat(), m.text, int(m.read)] for m in user.messages],
+    ]
+
+
+def _user_from_record(user_id: str, record: list) -> User:
+    *values, messages = record
+    name, password_hash, openid, is_admin, created, joined, max_create, max_join = values
+    user = User(
+        user_id=user_id,
+        name=name,
+        password_hash=password_hash,
+        wechat_openid=openid,
+        can_create_club=True,
+        is_sys_admin=bool(is_admin),
+        created_clubs=created,
+        joined_clubs=joined,
+        max_creatable_clubs=max_create,
+        max_joinable_clubs=max_join,
+    )
+    for date, text, read in messages:
+        user.messages.append(
+            Message(date=datetime.date.fromisoformat(date), text=text, read=bool(read))
+        )
+    return user
+
+
+def _cache_matches(matches, club_id: str | None = None) -> None:
+    """Store approved matches in Redis unless this process already did."""
+    records = {
+        m.id: _match_record(m, club_id)
+        for m in matches
+        if m.id is not None and m.id not in _cached_match_ids
+    }
+    _save_cache("matches", records)
+    _cached_match_ids.update(records)
+
+
+def _cache_players(players, histories: bool = False) -> None:
+    """Store player records in Redis.
+
+    With ``histories`` the match history of hydrated players is stored too.
+    Only pass it for players just read from the database: a write drops the
+    history records of the players it touched (see
+    :func:`increment_cache_version`).
+    """
+    records = {}
+    history_records = {}
+    for p in players:
+        records[p.user_id] = list(_player_values(p))
+        if histories and p.user_id in _hydrated_players:
+            history = _history_record(p)
+            if history is None:
+                _drop_cache("histories", p.user_id)
+            else:
+                history_records[p.user_id] = history
+                _cache_matches((*p.singles_matches, *p.doubles_matches))
+    _save_cache("players", records)
+    _save_cache("histories", history_records)
+
+
+def _cache_opponents(players) -> None:
+    """Store the records of everyone ``players`` have played with."""
+    _cache_players(
+        {
+            p.user_id: p
+            for player in players
+            for m in (*player.singles_matches, *player.doubles_matches)
+            for p in _match_players(m)
+        }.values()
+    )
+
+
+def _players_from_cache(ids, hydrate: bool) -> bool:
+    """Load players from Redis into the identity map.
+
+    With ``hydrate`` their match history is loaded as well. ``False`` is
+    returned when a record is missing so the caller can use the database.
+    """
+    ids = {uid for uid in ids if uid}
+    fetch = sorted(uid for uid in ids if uid not in _players_cache)
+    records = _load_cache("players", fetch)
+    if records is None:
+        return False
+    for uid, record in zip(fetch, records):
+        row = dict(zip(_PLAYER_COLUMNS, record), user_id=uid)
+        _players_cache[uid] = _player_from_row(row)
+    todo = sorted(uid for uid in ids if hydrate and uid not in _hydrated_players)
+    if not todo:
+        return True
+    histories = _load_cache("histories", todo)
+    if histories is None:
+        return False
+    matches = _matches_from_cache([mid for singles, doubles in histories for mid in (*singles, *doubles)])
+    if matches is None:
+        return False
+    for uid, (singles, doubles) in zip(todo, histories):
+        player = _players_cache[uid]
+        player.singles_matches[:] = [matches[mid] for mid in singles]
+        player.doubles_matches[:] = [matches[mid] for mid in doubles]
+    _hydrated_players.update(todo)
+    return True
+
+
+def _matches_from_cache(ids) -> Dict[int, Match | DoublesMatch] | None:
+    """Return the shared objects of approved matches, reading Redis if needed."""
+    fetch = sorted({mid for mid in ids if mid not in _matches_cache})
+    records = _load_cache("matches", fetch)
+    if records is None:
+        _cached_match_ids.difference_update(fetch)
+        return None
+    rows = [_match_row_from_record(mid, record) for mid, record in zip(fetch, records)]
+    players = [row[col] for row in rows for col in ("player_a1", "player_a2", "player_b1", "player_b2")]
+    if not _players_from_cache(players, hydrate=False):
+        return None
+    for row in rows:
+        _cached_match(row)
+    _cached_match_ids.update(fetch)
+    return {mid: _matches_cache[mid] for mid in ids}
+
+
+def _club_from_cache(club_id: str) -> Club | None:
+    """Rebuild a club from its Redis record or return ``None`` on a miss."""
+    records = _load_cache("clubs", [club_id])
+    if not records:
+        return None
+    info, meta, members, match_ids, pending, appointments = records[0]
+    pending_rows = [dict(zip(_MATCH_COLUMNS, values), id=mid) for mid, *values in pending]
+    if not _players_from_cache(members, hydrate=True):
+        return None
+    if not _players_from_cache(
+        [row[col] for row in pending_rows for col in ("player_a1", "player_a2", "player_b1", "player_b2")],
+        hydrate=False,
+    ):
+        return None
+    matches = _matches_from_cache(match_ids)
+    if matches is None:
+        return None
+    name, logo, region, slogan = info
+    club = Club(club_id=club_id, name=name, logo=logo, region=region, slogan=slogan)
+    banned, leader_id, admins, pending_members, rejected = meta
+    _apply_club_meta(
+        club,
+        {
+            "banned_ids": banned,
+            "leader_id": leader_id,
+            "admin_ids": admins,
+            "pending_members": pending_members,
+            "rejected_members": rejected,
+        },
+    )
+    for uid, joined in members.items():
+        _add_member(club, _players_cache[uid], joined)
+    club.matches.extend(matches[mid] for mid in match_ids)
+    club.pending_matches.extend(
+        _match_from_row(row, _players_cache, pending=True) for row in pending_rows
+    )
+    for date, creator, location, info, signups in appointments:
+        club.appointments.append(
+            _appointment_from_row(
+                {"date": date, "creator": creator, "location": location, "info": info, "signups": signups}
+            )
+        )
+    _club_states[club_id] = _club_state(club)
+    return club
+
+
 def save_data(clubs: Dict[str, Club]) -> None:
     conn = _connect()
     cur = conn.cursor()
@@ -806,6 +1595,9 @@ def save_data(clubs: Dict[str, Club]) -> None:
     cur.execute("DELETE FROM pending_matches")
     cur.execute("DELETE FROM appointments")
     cur.execute("DELETE FROM club_meta")
+    cur.execute("DELETE FROM stats_daily")
+    cur.execute("DELETE FROM member_first_join")
+    cur.execute("DELETE FROM player_friends")
     for p in _players_cache.values():
         cur.execute(
             """INSERT INTO players
@@ -874,8 +1666,14 @@ def save_data(clubs: Dict[str, Club]) -> None:
                     json.dumps(list(a.signups)),
                 ),
             )
+    # recount from scratch rather than per row
+    cur.execute("DELETE FROM stats_daily")
+    for statement in migrations.STATS_BACKFILL:
+        cur.execute(statement)
     conn.commit()
     conn.close()
+    _club_states.clear()
+    _reset_indexes()
     for cid, club in clubs.items():
         _pending_clubs[cid] = club
         for p in club.members.values():
@@ -885,16 +1683,13 @@ def save_data(clubs: Dict[str, Club]) -> None:
 
 def load_users() -> Dict[str, User]:
     """Load user accounts from the database using a cache."""
-    global _users_cache, _db_file
-    if _users_cache is not None and _db_file == DATABASE_URL:
+    global _users_cache, _db_file, _users_complete
+    if _users_complete and _db_file == DATABASE_URL:
+        for uid in sorted(_stale_users):
+            get_user(uid)
         return _users_cache
-    if _redis:
-        cached = _load_cache("tennis:users")
-        if cached:
-            _users_cache = cached
-            _db_file = DATABASE_URL
-            return _users_cache
     _db_file = DATABASE_URL
+    _cache_stats["full_loads"] += 1
 
     conn = _connect()
     cur = conn.cursor()
@@ -927,12 +1722,14 @@ def load_users() -> Dict[str, User]:
             user.messages.append(msg)
     conn.close()
     _users_cache = users
-    _save_cache("tennis:users", users)
+    _users_complete = True
+    _stale_users.clear()
     return users
 
 
 def save_users(users: Dict[str, User]) -> None:
     """Persist user accounts to the database."""
+    _mark_changed("users", *users)
     conn = _connect()
     cur = conn.cursor()
     cur.execute("DELETE FROM users")
@@ -965,12 +1762,14 @@ def save_users(users: Dict[str, User]) -> None:
             )
     conn.commit()
     conn.close()
+    _reset_indexes()
 
 
 # --- New transactional helper APIs ---
 
 def create_club(club: Club, conn: sqlite3.Connection | None = None) -> None:
     """Insert a new club record into the database."""
+    _mark_changed("clubs", club.club_id)
     close = conn is None
     if conn is None:
         conn = _connect()
@@ -990,17 +1789,23 @@ def create_club(club: Club, conn: sqlite3.Connection | None = None) -> None:
             "{}",
         ),
     )
+    state = _empty_club_state()
+    state["club"] = (club.name, club.logo, club.region, club.slogan)
+    state["meta"] = ([], club.leader_id, [], {}, {})
     if close:
         conn.commit()
         conn.close()
         set_club(club)
         _pending_clubs.pop(club.club_id, None)
+        _club_states[club.club_id] = state
     else:
         _pending_clubs[club.club_id] = club
+        _pending_club_states[club.club_id] = state
 
 
 def create_user(user: User, conn: sqlite3.Connection | None = None) -> None:
     """Insert a new user account."""
+    _mark_changed("users", user.user_id)
     close = conn is None
     if conn is None:
         conn = _connect()
@@ -1043,6 +1848,8 @@ def create_player(
     conn: sqlite3.Connection | None = None,
 ) -> None:
     """Add a player to a club."""
+    _mark_changed("clubs", club_id)
+    _mark_changed("players", player.user_id)
     close = conn is None
     if conn is None:
         conn = _connect()
@@ -1108,6 +1915,7 @@ def create_player(
             "INSERT OR IGNORE INTO club_members(club_id, user_id, joined) VALUES (?, ?, ?)",
             (club_id, player.user_id, joined.isoformat()),
         )
+    _refresh_first_join(cur, [player.user_id])
     if close:
         conn.commit()
         conn.close()
@@ -1116,6 +1924,167 @@ def create_player(
     else:
         _pending_players[player.user_id] = player
 
+# columns of ``matches`` and ``pending_matches`` besides ``id`` and ``club_id``
+_MATCH_COLUMNS = (
+    "type",
+    "date",
+    "player_a1",
+    "player_a2",
+    "player_b1",
+    "player_b2",
+    "score_a",
+    "score_b",
+    "weight",
+    "location",
+    "format_name",
+    "initiator",
+    "confirmed_a",
+    "confirmed_b",
+    "created",
+    "created_ts",
+    "confirmed_on",
+    "status",
+    "status_date",
+    "approved_ts",
+    "rating_a1_before",
+    "rating_a2_before",
+    "rating_b1_before",
+    "rating_b2_before",
+    "rating_a1_after",
+    "rating_a2_after",
+    "rating_b1_after",
+    "rating_b2_after",
+)
+_MATCH_ASSIGNMENTS = ", ".join(f"{name} = ?" for name in _MATCH_COLUMNS)
+
+
+def _iso(value: datetime.date | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _match_values(match: Match | DoublesMatch) -> tuple:
+    """Return the values of :data:`_MATCH_COLUMNS` stored for a match."""
+    if isinstance(match, DoublesMatch):
+        mtype = "doubles"
+        players = (
+            match.player_a1.user_id,
+            match.player_a2.user_id,
+            match.player_b1.user_id,
+            match.player_b2.user_id,
+        )
+        ratings = (
+            match.rating_a1_before,
+            match.rating_a2_before,
+            match.rating_b1_before,
+            match.rating_b2_before,
+            match.rating_a1_after,
+            match.rating_a2_after,
+            match.rating_b1_after,
+            match.rating_b2_after,
+        )
+    else:
+        mtype = "singles"
+        players = (match.player_a.user_id, None, match.player_b.user_id, None)
+        ratings = (
+            match.rating_a_before,
+            None,
+            match.rating_b_before,
+            None,
+            match.rating_a_after,
+            None,
+            match.rating_b_after,
+            None,
+        )
+    return (
+        mtype,
+        match.date.isoformat(),
+        *players,
+        match.score_a,
+        match.score_b,
+        match.format_weight,
+        match.location,
+        match.format_name,
+        match.initiator,
+        int(bool(match.confirmed_a)),
+        int(bool(match.confirmed_b)),
+        _iso(match.created),
+        _iso(match.created_ts),
+        _iso(match.confirmed_on),
+        match.status,
+        _iso(match.status_date),
+        _iso(match.approved_ts),
+        *ratings,
+    )
+
+
+def _row_match_values(row) -> tuple:
+    """Return the :data:`_MATCH_COLUMNS` values of a match row."""
+    return tuple(row[name] for name in _MATCH_COLUMNS)
+
+
+def _match_from_row(row, players: Dict[str, Player], pending: bool) -> Match | DoublesMatch:
+    """Build a match object from a ``matches`` or ``pending_matches`` row."""
+    date = datetime.date.fromisoformat(row["date"])
+    common = dict(
+        id=row["id"],
+        date=date,
+        score_a=row["score_a"],
+        score_b=row["score_b"],
+        format_weight=row["weight"] if row["weight"] is not None else 1.0,
+        location=row["location"],
+        format_name=row["format_name"],
+    )
+    if pending:
+        common["initiator"] = row["initiator"]
+    else:
+        common["club_id"] = row["club_id"]
+    if row["type"] == "doubles":
+        match = DoublesMatch(
+            player_a1=players[row["player_a1"]],
+            player_a2=players[row["player_a2"]],
+            player_b1=players[row["player_b1"]],
+            player_b2=players[row["player_b2"]],
+            **common,
+        )
+        if not pending:
+            match.rating_a1_before = row["rating_a1_before"]
+            match.rating_a2_before = row["rating_a2_before"]
+            match.rating_b1_before = row["rating_b1_before"]
+            match.rating_b2_before = row["rating_b2_before"]
+            match.rating_a1_after = row["rating_a1_after"]
+            match.rating_a2_after = row["rating_a2_after"]
+            match.rating_b1_after = row["rating_b1_after"]
+            match.rating_b2_after = row["rating_b2_after"]
+    else:
+        match = Match(
+            player_a=players[row["player_a1"]],
+            player_b=players[row["player_b1"]],
+            **common,
+        )
+        if not pending:
+            match.rating_a_before = row["rating_a1_before"]
+            match.rating_b_before = row["rating_b1_before"]
+            match.rating_a_after = row["rating_a1_after"]
+            match.rating_b_after = row["rating_b1_after"]
+    if row["created_ts"]:
+        match.created_ts = datetime.datetime.fromisoformat(row["created_ts"])
+    elif not pending:
+        match.created_ts = datetime.datetime.combine(date, datetime.time())
+    if row["approved_ts"]:
+        match.approved_ts = datetime.datetime.fromisoformat(row["approved_ts"])
+    if pending:
+        match.confirmed_a = bool(row["confirmed_a"])
+        match.confirmed_b = bool(row["confirmed_b"])
+        if row["created"]:
+            match.created = datetime.date.fromisoformat(row["created"])
+        if row["confirmed_on"]:
+            match.confirmed_on = datetime.date.fromisoformat(row["confirmed_on"])
+        match.status = row["status"]
+        if row["status_date"]:
+            match.status_date = datetime.date.fromisoformat(row["status_date"])
+    return match
+
+
 def create_match(
     club_id: str,
     match: Match | DoublesMatch,
@@ -1123,88 +2092,37 @@ def create_match(
     conn: sqlite3.Connection | None = None,
 ) -> int:
     """Insert a match record and return its row id."""
+    _mark_changed("clubs", club_id)
+    if not pending:
+        _mark_changed("players", *(p.user_id for p in _match_players(match) if p))
     close = conn is None
     if conn is None:
         conn = _connect()
     cur = conn.cursor()
     table = "pending_matches" if pending else "matches"
-    cols = ["club_id", "type", "date", "data"]
-    values = [club_id]
-    if isinstance(match, DoublesMatch):
-        values.extend([
-            "doubles",
-            match.date.isoformat(),
-        ])
-        data = {
-            "a1": match.player_a1.user_id,
-            "a2": match.player_a2.user_id,
-            "b1": match.player_b1.user_id,
-            "b2": match.player_b2.user_id,
-            "score_a": match.score_a,
-            "score_b": match.score_b,
-            "weight": match.format_weight,
-            "location": match.location,
-            "format_name": match.format_name,
-            "initiator": match.initiator,
-            "confirmed_a": match.confirmed_a,
-            "confirmed_b": match.confirmed_b,
-            "created": match.created.isoformat(),
-            "created_ts": match.created_ts.isoformat(),
-            "confirmed_on": match.confirmed_on.isoformat() if match.confirmed_on else None,
-            "status": match.status,
-            "status_date": match.status_date.isoformat() if match.status_date else None,
-            "approved_ts": match.approved_ts.isoformat() if match.approved_ts else None,
-            "rating_a1_before": match.rating_a1_before,
-            "rating_a2_before": match.rating_a2_before,
-            "rating_b1_before": match.rating_b1_before,
-            "rating_b2_before": match.rating_b2_before,
-            "rating_a1_after": match.rating_a1_after,
-            "rating_a2_after": match.rating_a2_after,
-            "rating_b1_after": match.rating_b1_after,
-            "rating_b2_after": match.rating_b2_after,
-        }
-        values.append(json.dumps(data))
-    else:
-        values.extend([
-            "singles",
-            match.date.isoformat(),
-        ])
-        data = {
-            "player_a": match.player_a.user_id,
-            "player_b": match.player_b.user_id,
-            "score_a": match.score_a,
-            "score_b": match.score_b,
-            "weight": match.format_weight,
-            "location": match.location,
-            "format_name": match.format_name,
-            "initiator": match.initiator,
-            "confirmed_a": match.confirmed_a,
-            "confirmed_b": match.confirmed_b,
-            "created": match.created.isoformat(),
-            "created_ts": match.created_ts.isoformat(),
-            "confirmed_on": match.confirmed_on.isoformat() if match.confirmed_on else None,
-            "status": match.status,
-            "status_date": match.status_date.isoformat() if match.status_date else None,
-            "approved_ts": match.approved_ts.isoformat() if match.approved_ts else None,
-            "rating_a_before": match.rating_a_before,
-            "rating_b_before": match.rating_b_before,
-            "rating_a_after": match.rating_a_after,
-            "rating_b_after": match.rating_b_after,
-        }
-        values.append(json.dumps(data))
+    cols = ["club_id", *_MATCH_COLUMNS]
+    values = [club_id, *_match_values(match)]
 
-    placeholders = "?, ?, ?, ?"
+    if match.id is None and not IS_PG:
+        # ``id SERIAL`` is not a rowid alias in SQLite, so allocate it here
+        row = cur.execute(
+            f"SELECT COALESCE(MAX(id), 0) + 1 AS next_id FROM {table}"
+        ).fetchone()
+        match.id = row["next_id"]
     if match.id is not None:
         cols.insert(0, "id")
         values.insert(0, match.id)
-        placeholders = "?, ?, ?, ?, ?"
+    placeholders = ", ".join("?" for _ in cols)
     query = f"INSERT INTO {table}({', '.join(cols)}) VALUES ({placeholders})" + (
         " RETURNING id" if IS_PG else ""
     )
     cur.execute(query, values)
     row = cur.fetchone()
-    row_id = row["id"] if IS_PG else cur.lastrowid
+    row_id = row["id"] if IS_PG else match.id
     match.id = row_id
+    if not pending:
+        _bump_stat(cur, "matches", match.date.isoformat(), 1)
+        _count_friends(cur, row_id, 1)
     if close:
         conn.commit()
         conn.close()
@@ -1212,19 +2130,30 @@ def create_match(
 
 
 def update_match_record(
-    table: str, match_id: int, data: dict, conn: sqlite3.Connection | None = None
+    table: str, match: Match | DoublesMatch, conn: sqlite3.Connection | None = None
 ) -> None:
-    """Update a match JSON data by id."""
+    """Rewrite the stored columns of a match by its id."""
+    _mark_changed("clubs", match.club_id)
+    _mark_changed("players", *(p.user_id for p in _match_players(match) if p))
+    if table == "matches":
+        _mark_changed("matches", match.id)
     close = conn is None
     if conn is None:
         conn = _connect()
     cur = conn.cursor()
-    if "approved_ts" not in data:
-        data["approved_ts"] = None
+    old = None
+    if table == "matches":
+        old = cur.execute("SELECT date FROM matches WHERE id = ?", (match.id,)).fetchone()
+        _count_friends(cur, match.id, -1)
     cur.execute(
-        f"UPDATE {table} SET data = ? WHERE id = ?",
-        (json.dumps(data), match_id),
+        f"UPDATE {table} SET {_MATCH_ASSIGNMENTS} WHERE id = ?",
+        (*_match_values(match), match.id),
     )
+    if table == "matches":
+        _count_friends(cur, match.id, 1)
+    if old and old["date"] != match.date.isoformat():
+        _bump_stat(cur, "matches", old["date"], -1)
+        _bump_stat(cur, "matches", match.date.isoformat(), 1)
     if close:
         conn.commit()
         conn.close()
@@ -1238,6 +2167,7 @@ def add_club_member(
     conn: sqlite3.Connection | None = None,
 ) -> None:
     """Insert a user into ``club_members``."""
+    _mark_changed("clubs", club_id)
     close = conn is None
     if conn is None:
         conn = _connect()
@@ -1254,6 +2184,7 @@ def add_club_member(
             "INSERT OR IGNORE INTO club_members(club_id, user_id, joined) VALUES (?, ?, ?)",
             (club_id, user_id, joined.isoformat()),
         )
+    _refresh_first_join(cur, [user_id])
     if close:
         conn.commit()
         conn.close()
@@ -1274,6 +2205,7 @@ def get_club_member(club_id: str, user_id: str) -> bool:
 
 def remove_club_member(club_id: str, user_id: str, conn: sqlite3.Connection | None = None) -> None:
     """Delete a membership record."""
+    _mark_changed("clubs", club_id)
     close = conn is None
     if conn is None:
         conn = _connect()
@@ -1282,6 +2214,7 @@ def remove_club_member(club_id: str, user_id: str, conn: sqlite3.Connection | No
         "DELETE FROM club_members WHERE club_id = ? AND user_id = ?",
         (club_id, user_id),
     )
+    _refresh_first_join(cur, [user_id])
     if close:
         conn.commit()
         conn.close()
@@ -1295,59 +2228,78 @@ def get_player_record(user_id: str) -> Player | None:
         "SELECT * FROM players WHERE user_id = ?",
         (user_id,),
     ).fetchone()
+    conn.close()
     if not row:
-        conn.close()
         return None
-    from .cli import normalize_gender
-
-    p = Player(
-        user_id=row["user_id"],
-        name=row["name"],
-        singles_rating=row["singles_rating"],
-        doubles_rating=row["doubles_rating"],
-        experience=row["experience"],
-        age=row["age"],
-        gender=normalize_gender(row["gender"]),
-        avatar=row["avatar"],
-        birth=row["birth"],
-        handedness=row["handedness"],
-        backhand=row["backhand"],
-        region=row["region"],
-        joined=datetime.date.fromisoformat(row["joined"])
-        if row["joined"]
-        else datetime.date.today(),
-    )
-    value = row["pre_ratings"]
-    if isinstance(value, str):
-        parsed = json.loads(value or "{}")
-    else:
-        parsed = value or {}
-    p.pre_ratings.update(parsed)
-    conn.close()
-    return p
+    return _player_from_row(row)
 
 
 def get_player(user_id: str) -> Player | None:
-    """Return a single :class:`Player` by id using caches when possible."""
-    global _players_cache, _db_file
-    if _players_cache and _db_file == DATABASE_URL:
+    """Return a single :class:`Player` by id using caches when possible.
+
+    On a cache miss only this player and their match history are read.
+    """
+    global _db_file
+    if _db_file == DATABASE_URL and user_id in _hydrated_players:
         player = _players_cache.get(user_id)
         if player:
             return player
-    if _redis:
-        cached = _load_cache(f"tennis:player:{user_id}")
-        if cached:
-            _players_cache[user_id] = cached
-            _db_file = DATABASE_URL
-            return cached
-    player = get_player_record(user_id)
+    if _redis and _players_from_cache([user_id], hydrate=True):
+        _db_file = DATABASE_URL
+        return _players_cache[user_id]
+    conn = _connect()
+    try:
+        _hydrate_players(conn.cursor(), [user_id])
+    finally:
+        conn.close()
+    player = _players_cache.get(user_id)
     if player:
         set_player(player)
+        _cache_players([player], histories=True)
+        _cache_opponents([player])
     return player
 
 
+# ``players`` columns in the order returned by :func:`_player_values`
+_PLAYER_COLUMNS = (
+    "name",
+    "singles_rating",
+    "doubles_rating",
+    "experience",
+    "pre_ratings",
+    "age",
+    "gender",
+    "avatar",
+    "birth",
+    "handedness",
+    "backhand",
+    "region",
+    "joined",
+)
+
+
+def _player_values(player: Player) -> tuple:
+    """Return the ``players`` columns written by :func:`update_player_record`."""
+    return (
+        player.name,
+        player.singles_rating,
+        player.doubles_rating,
+        player.experience,
+        json.dumps(player.pre_ratings),
+        player.age,
+        player.gender,
+        player.avatar,
+        player.birth,
+        player.handedness,
+        player.backhand,
+        player.region,
+        player.joined.isoformat(),
+    )
+
+
 def update_player_record(player: Player, conn: sqlite3.Connection | None = None) -> None:
     """Update a player's information."""
+    _mark_changed("players", player.user_id)
     close = conn is None
     if conn is None:
         conn = _connect()
@@ -1370,22 +2322,7 @@ def update_player_record(player: Player, conn: sqlite3.Connection | None = None)
                 joined = ?
             WHERE user_id = ?
             """,
-            (
-                player.name,
-                player.singles_rating,
-                player.doubles_rating,
-                player.experience,
-                json.dumps(player.pre_ratings),
-                player.age,
-                player.gender,
-                player.avatar,
-                player.birth,
-                player.handedness,
-                player.backhand,
-                player.region,
-            player.joined.isoformat(),
-            player.user_id,
-        ),
+            (*_player_values(player), player.user_id),
     )
     if close:
         conn.commit()
@@ -1399,8 +2336,10 @@ def set_player(player: Player) -> None:
     """Cache a single :class:`Player` object."""
     global _db_file
     _players_cache[player.user_id] = player
+    _hydrated_players.add(player.user_id)
+    _mark_fresh("players", player.user_id)
     _db_file = DATABASE_URL
-    _save_cache(f"tennis:player:{player.user_id}", player)
+    _cache_players([player])
 
 
 def set_user(user: User) -> None:
@@ -1409,8 +2348,9 @@ def set_user(user: User) -> None:
     if _users_cache is None:
         _users_cache = {}
     _users_cache[user.user_id] = user
+    _mark_fresh("users", user.user_id)
     _db_file = DATABASE_URL
-    _save_cache(f"tennis:user:{user.user_id}", user)
+    _save_cache("users", {user.user_id: _user_record(user)})
 
 
 def set_club(club: Club) -> None:
@@ -1419,11 +2359,21 @@ def set_club(club: Club) -> None:
     if _clubs_cache is None:
         _clubs_cache = {}
     _clubs_cache[club.club_id] = club
+    _mark_fresh("clubs", club.club_id)
+    for m in club.matches:
+        if m.id is not None:
+            _matches_cache.setdefault(m.id, m)
     _db_file = DATABASE_URL
-    _save_cache(f"tennis:club:{club.club_id}", club)
+    record = _club_record(club)
+    if record is None:
+        _drop_cache("clubs", club.club_id)
+        return
+    _cache_matches(club.matches, club.club_id)
+    _save_cache("clubs", {club.club_id: record})
 
 def update_user_record(user: User, conn: sqlite3.Connection | None = None) -> None:
     """Update fields of a :class:`User` record."""
+    _mark_changed("users", user.user_id)
     close = conn is None
     if conn is None:
         conn = _connect()
@@ -1470,17 +2420,27 @@ def delete_player(user_id: str, conn: sqlite3.Connection | None = None) -> None:
     if conn is None:
         conn = _connect()
     cur = conn.cursor()
+    _mark_changed("players", user_id)
+    _mark_changed(
+        "clubs",
+        *(
+            r["club_id"]
+            for r in cur.execute(
+                "SELECT club_id FROM club_members WHERE user_id = ?",
+                (user_id,),
+            ).fetchall()
+        ),
+    )
     cur.execute("DELETE FROM players WHERE user_id = ?", (user_id,))
     cur.execute("DELETE FROM club_members WHERE user_id = ?", (user_id,))
+    _refresh_first_join(cur, [user_id])
     if close:
         conn.commit()
         conn.close()
         _players_cache.pop(user_id, None)
-        if _redis:
-            try:
-                _redis.delete(f"tennis:player:{user_id}")
-            except Exception:
-                pass
+        _hydrated_players.discard(user_id)
+        _mark_fresh("players", user_id)
+        _drop_cache("players", user_id)
     else:
         _pending_players[user_id] = None
 
@@ -1503,7 +2463,13 @@ def delete_match_record(table: str, match_id: int, conn: sqlite3.Connection | No
     if conn is None:
         conn = _connect()
     cur = conn.cursor()
-    cur.execute(f"DELETE FROM {table} WHERE id = ?", (match_id,))
+    row = cur.execute(f"SELECT club_id FROM {table} WHERE id = ?", (match_id,)).fetchone()
+    if row:
+        _mark_changed("clubs", row["club_id"])
+    if table == "matches":
+        _delete_matches(cur, [match_id])
+    else:
+        cur.execute(f"DELETE FROM {table} WHERE id = ?", (match_id,))
     if close:
         conn.commit()
         conn.close()
@@ -1511,6 +2477,7 @@ def delete_match_record(table: str, match_id: int, conn: sqlite3.Connection | No
 
 def create_appointment_record(club_id: str, appt: Appointment, conn: sqlite3.Connection | None = None) -> int:
     """Insert an appointment and return the new row id."""
+    _mark_changed("clubs", club_id)
     close = conn is None
     if conn is None:
         conn = _connect()
@@ -1556,6 +2523,12 @@ def get_appointment_record(app_id: int) -> sqlite3.Row | None:
     return row
 
 
+def _mark_appointment_club(cur, app_id: int) -> None:
+    row = cur.execute("SELECT club_id FROM appointments WHERE id = ?", (app_id,)).fetchone()
+    if row:
+        _mark_changed("clubs", row["club_id"])
+
+
 def update_appointment_record(app_id: int, conn: sqlite3.Connection | None = None, **fields) -> None:
     """Update fields of an appointment."""
     if not fields:
@@ -1574,6 +2547,7 @@ def update_appointment_record(app_id: int, conn: sqlite3.Connection | None = Non
         cols.append(f"{k} = ?")
         values.append(v)
     values.append(app_id)
+    _mark_appointment_club(cur, app_id)
     cur.execute(
         f"UPDATE appointments SET {', '.join(cols)} WHERE id = ?",
         values,
@@ -1592,6 +2566,7 @@ def delete_appointment_record(app_id: int, conn: sqlite3.Connection | None = Non
     if conn is None:
         conn = _connect()
     cur = conn.cursor()
+    _mark_appointment_club(cur, app_id)
     cur.execute("DELETE FROM appointments WHERE id = ?", (app_id,))
     if close:
         conn.commit()
@@ -1609,6 +2584,7 @@ def create_message_record(
     read: bool = False,
 ) -> int:
     """Insert a message for a user and return its row id."""
+    _mark_changed("users", user_id)
     conn = _connect()
     cur = conn.cursor()
     if date is None:
@@ -1637,6 +2613,12 @@ def get_message_record(msg_id: int) -> sqlite3.Row | None:
     return row
 
 
+def _mark_message_user(cur, msg_id: int) -> None:
+    row = cur.execute("SELECT user_id FROM messages WHERE id = ?", (msg_id,)).fetchone()
+    if row:
+        _mark_changed("users", row["user_id"])
+
+
 def update_message_record(msg_id: int, *, text: str | None = None, read: bool | None = None) -> None:
     """Update the text or read state of a message."""
     if text is None and read is None:
@@ -1652,6 +2634,7 @@ def update_message_record(msg_id: int, *, text: str | None = None, read: bool |
         cols.append("read = ?")
         values.append(int(read))
     values.append(msg_id)
+    _mark_message_user(cur, msg_id)
     cur.execute(
         f"UPDATE messages SET {', '.join(cols)} WHERE id = ?",
         values,
@@ -1661,162 +2644,1052 @@ def update_message_record(msg_id: int, *, text: str | None = None, read: bool |
     _refresh_after_write()
 
 
-def delete_message_record(msg_id: int) -> None:
-    """Remove a message from the database."""
+def delete_message_record(msg_id: int) -> None:
+    """Remove a message from the database."""
+    conn = _connect()
+    cur = conn.cursor()
+    _mark_message_user(cur, msg_id)
+    cur.execute("DELETE FROM messages WHERE id = ?", (msg_id,))
+    conn.commit()
+    conn.close()
+    _refresh_after_write()
+
+
+class TokenCache:
+    """Bounded LRU map of access tokens to their ``(user_id, timestamp)``.
+
+    Entries are trusted for ``ttl`` seconds; afterwards the next lookup goes
+    back to the database. Keys are token digests so the same value can be
+    used in the change records other workers read.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, tuple[str, datetime.datetime]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, digest: str) -> tuple[str, datetime.datetime] | None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[digest]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, digest: str, value: tuple[str, datetime.datetime]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, digest: str) -> None:
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_token_cache = TokenCache(get_token_cache_size(), get_token_cache_ttl())
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _forget_token(token: str) -> None:
+    """Drop ``token`` here and announce it so other workers drop it too."""
+    digest = _token_digest(token)
+    _token_cache.discard(digest)
+    _mark_changed("tokens", digest)
+
+
+def token_cache_stats() -> dict:
+    """Return size and hit/miss counters of the access token cache."""
+    return _token_cache.stats()
+
+
+def insert_token(token: str, user_id: str) -> None:
+    """Persist or update an authentication token."""
+    conn = _connect()
+    cur = conn.cursor()
+    if IS_PG:
+        cur.execute(
+            """
+            INSERT INTO auth_tokens(token, user_id, ts) VALUES (?,?,?)
+            ON CONFLICT (token) DO UPDATE SET user_id = EXCLUDED.user_id, ts = EXCLUDED.ts
+            """,
+            (token, user_id, datetime.datetime.utcnow().isoformat()),
+        )
+    else:
+        cur.execute(
+            "INSERT OR REPLACE INTO auth_tokens(token, user_id, ts) VALUES (?,?,?)",
+            (token, user_id, datetime.datetime.utcnow().isoformat()),
+        )
+    conn.commit()
+    conn.close()
+    # a renewed token must not keep its old timestamp in any worker
+    _forget_token(token)
+    _refresh_after_write()
+
+
+def delete_token(token: str) -> None:
+    """Remove an authentication token."""
+    conn = _connect()
+    conn.execute("DELETE FROM auth_tokens WHERE token = ?", (token,))
+    conn.commit()
+    conn.close()
+    _forget_token(token)
+    _refresh_after_write()
+
+
+def get_token(token: str) -> tuple[str, datetime.datetime] | None:
+    """Retrieve a ``(user_id, timestamp)`` tuple for the token.
+
+    Valid tokens are served from :class:`TokenCache`; unknown tokens always
+    go to the database.
+    """
+    digest = _token_digest(token)
+    cached = _token_cache.get(digest)
+    if cached is not None:
+        return cached
+    conn = _connect()
+    cur = conn.cursor()
+    row = cur.execute(
+        "SELECT user_id, ts FROM auth_tokens WHERE token = ?",
+        (token,),
+    ).fetchone()
+    conn.close()
+    if not row:
+        return None
+    info = row["user_id"], datetime.datetime.fromisoformat(row["ts"])
+    _token_cache.put(digest, info)
+    return info
+
+
+# expiry of every revoked signed token that has not expired yet, loaded on
+# first use and kept in sync through the cache change records
+_revoked_tokens: Dict[str, datetime.datetime] | None = None
+
+
+def revoke_token_id(token_id: str, expires: datetime.datetime) -> None:
+    """Reject the signed token ``token_id`` until it expires."""
+    conn = _connect()
+    cur = conn.cursor()
+    if IS_PG:
+        cur.execute(
+            "INSERT INTO revoked_tokens(token_id, expires) VALUES (?,?) ON CONFLICT (token_id) DO NOTHING",
+            (token_id, expires.isoformat()),
+        )
+    else:
+        cur.execute(
+            "INSERT OR IGNORE INTO revoked_tokens(token_id, expires) VALUES (?,?)",
+            (token_id, expires.isoformat()),
+        )
+    conn.commit()
+    conn.close()
+    if _revoked_tokens is not None:
+        _revoked_tokens[token_id] = expires
+    _mark_changed("revoked_tokens", token_id)
+    _refresh_after_write()
+
+
+def is_token_revoked(token_id: str) -> bool:
+    """Return ``True`` if the signed token ``token_id`` was revoked.
+
+    Only the first call of a process (or the first after a full cache
+    invalidation) reads the ``revoked_tokens`` table.
+    """
+    global _revoked_tokens
+    now = datetime.datetime.utcnow()
+    if _revoked_tokens is None:
+        conn = _connect()
+        rows = conn.execute(
+            "SELECT token_id, expires FROM revoked_tokens WHERE expires > ?",
+            (now.isoformat(),),
+        ).fetchall()
+        conn.close()
+        _revoked_tokens = {row["token_id"]: datetime.datetime.fromisoformat(row["expires"]) for row in rows}
+    expires = _revoked_tokens.get(token_id)
+    if expires is None:
+        return False
+    if expires <= now:
+        del _revoked_tokens[token_id]
+        return False
+    return True
+
+
+def _reload_revoked_tokens(token_ids: Iterable[str]) -> None:
+    """Re-read the revocations ``token_ids`` written by another worker."""
+    token_ids = sorted(set(token_ids))
+    now = datetime.datetime.utcnow()
+    conn = _connect()
+    for chunk in _chunks(token_ids):
+        marks = ", ".join("?" for _ in chunk)
+        rows = conn.execute(f"SELECT token_id, expires FROM revoked_tokens WHERE token_id IN ({marks})", chunk)
+        for row in rows.fetchall():
+            _revoked_tokens[row["token_id"]] = datetime.datetime.fromisoformat(row["expires"])
+    conn.close()
+    for token_id in token_ids:
+        expires = _revoked_tokens.get(token_id)
+        if expires is not None and expires <= now:
+            del _revoked_tokens[token_id]
+    _prune_revoked_tokens(now)
+
+
+def _prune_revoked_tokens(now: datetime.datetime) -> None:
+    """Forget cached revocations that expired before ``now``."""
+    if _revoked_tokens is None:
+        return
+    for token_id in [t for t, expires in _revoked_tokens.items() if expires <= now]:
+        del _revoked_tokens[token_id]
+
+
+def insert_refresh_token(user_id: str, token: str, expires: datetime.datetime) -> None:
+    """Persist or update a refresh token."""
+    conn = _connect()
+    cur = conn.cursor()
+    if IS_PG:
+        cur.execute(
+            """
+            INSERT INTO refresh_tokens(user_id, token, expires) VALUES (?,?,?)
+            ON CONFLICT (user_id) DO UPDATE SET token = EXCLUDED.token, expires = EXCLUDED.expires
+            """,
+            (user_id, token, expires.isoformat()),
+        )
+    else:
+        cur.execute(
+            "INSERT OR REPLACE INTO refresh_tokens(user_id, token, expires) VALUES (?,?,?)",
+            (user_id, token, expires.isoformat()),
+        )
+    conn.commit()
+    conn.close()
+    _refresh_after_write()
+
+
+def get_refresh_token(token: str) -> tuple[str, datetime.datetime] | None:
+    """Return ``(user_id, expires)`` for the refresh token."""
+    conn = _connect()
+    cur = conn.cursor()
+    row = cur.execute(
+        "SELECT user_id, expires FROM refresh_tokens WHERE token = ?",
+        (token,),
+    ).fetchone()
+    conn.close()
+    if not row:
+        return None
+    return row["user_id"], datetime.datetime.fromisoformat(row["expires"])
+
+
+def delete_refresh_token(user_id: str) -> None:
+    """Remove refresh token for a user."""
+    conn = _connect()
+    conn.execute("DELETE FROM refresh_tokens WHERE user_id = ?", (user_id,))
+    conn.commit()
+    conn.close()
+    _refresh_after_write()
+
+
+def _purge_before(table: str, key: str, column: str, cutoff: datetime.datetime, batch_size: int) -> list:
+    """Delete rows whose ``column`` is before ``cutoff`` and return their keys.
+
+    Each batch of ``batch_size`` rows is committed on its own so a large
+    backlog never holds locks for long.
+    """
+    purged: list = []
+    while True:
+        conn = _connect()
+        cur = conn.cursor()
+        rows = cur.execute(
+            f"SELECT {key} FROM {table} WHERE {column} < ? LIMIT ?",
+            (cutoff.isoformat(), batch_size),
+        ).fetchall()
+        keys = [row[key] for row in rows]
+        if keys:
+            marks = ", ".join("?" for _ in keys)
+            cur.execute(f"DELETE FROM {table} WHERE {key} IN ({marks})", keys)
+            conn.commit()
+        conn.close()
+        purged.extend(keys)
+        if len(keys) < batch_size:
+            return purged
+
+
+def purge_auth_tokens(issued_before: datetime.datetime, batch_size: int = 500) -> int:
+    """Delete access tokens issued before ``issued_before``; return the count."""
+    tokens = _purge_before("auth_tokens", "token", "ts", issued_before, batch_size)
+    for token in tokens:
+        _token_cache.discard(_token_digest(token))
+    return len(tokens)
+
+
+def purge_refresh_tokens(now: datetime.datetime | None = None, batch_size: int = 500) -> int:
+    """Delete expired refresh tokens and return how many were removed."""
+    now = now or datetime.datetime.utcnow()
+    return len(_purge_before("refresh_tokens", "user_id", "expires", now, batch_size))
+
+
+def purge_revoked_tokens(now: datetime.datetime | None = None, batch_size: int = 500) -> int:
+    """Forget revoked signed tokens that have expired anyway.
+
+    Other workers drop the purged ids from their cached revocations too.
+    """
+    now = now or datetime.datetime.utcnow()
+    token_ids = _purge_before("revoked_tokens", "token_id", "expires", now, batch_size)
+    _prune_revoked_tokens(now)
+    if token_ids:
+        _mark_changed("revoked_tokens", *token_ids)
+        _refresh_after_write()
+    return len(token_ids)
+
+
+def pending_match_states(after_id: int = 0, limit: int = 500) -> list[dict]:
+    """Return the fields deciding the expiry of pending matches.
+
+    Rows with an id greater than ``after_id`` are returned in id order, at
+    most ``limit`` of them. Dates are parsed and the confirmation flags are
+    booleans.
+    """
+    conn = _connect()
+    rows = conn.execute(
+        """
+        SELECT id, club_id, status, status_date, confirmed_a, confirmed_b, created, confirmed_on
+        FROM pending_matches WHERE id > ? ORDER BY id LIMIT ?
+        """,
+        (after_id, limit),
+    ).fetchall()
+    conn.close()
+    states = []
+    for row in rows:
+        state = {k: row[k] for k in ("id", "club_id", "status")}
+        state["confirmed_a"] = bool(row["confirmed_a"])
+        state["confirmed_b"] = bool(row["confirmed_b"])
+        for name in ("status_date", "created", "confirmed_on"):
+            state[name] = datetime.date.fromisoformat(row[name]) if row[name] else None
+        states.append(state)
+    return states
+
+
+def delete_pending_matches(matches: Mapping[int, str]) -> int:
+    """Delete pending matches given as ``{match_id: club_id}``.
+
+    Cached clubs holding them are dropped in every worker.
+    """
+    if not matches:
+        return 0
+    ids = list(matches)
+    conn = _connect()
+    cur = conn.cursor()
+    for chunk in _chunks(ids):
+        marks = ", ".join("?" for _ in chunk)
+        cur.execute(f"DELETE FROM pending_matches WHERE id IN ({marks})", chunk)
+    conn.commit()
+    conn.close()
+    _mark_changed("clubs", *matches.values())
+    _refresh_after_write()
+    return len(ids)
+
+
+def add_subscribe_quota(user_id: str, scene: str, quota: int = 1) -> None:
+    """Increment or set subscription quota for a user/scene."""
+    conn = _connect()
+    cur = conn.cursor()
+    if IS_PG:
+        cur.execute(
+            """
+            INSERT INTO user_subscribe(user_id, scene, quota) VALUES (?, ?, 0)
+            ON CONFLICT (user_id, scene) DO NOTHING
+            """,
+            (user_id, scene),
+        )
+    else:
+        cur.execute(
+            "INSERT OR IGNORE INTO user_subscribe(user_id, scene, quota) VALUES (?, ?,0)",
+            (user_id, scene),
+        )
+    cur.execute(
+        "UPDATE user_subscribe SET quota = quota + ? WHERE user_id = ? AND scene = ?",
+        (quota, user_id, scene),
+    )
+    conn.commit()
+    conn.close()
+
+
+def consume_subscribe_quota(user_id: str, scene: str) -> bool:
+    """Decrement quota if available and return True on success."""
+    conn = _connect()
+    cur = conn.cursor()
+    row = cur.execute(
+        "SELECT quota FROM user_subscribe WHERE user_id = ? AND scene = ?",
+        (user_id, scene),
+    ).fetchone()
+    q = row["quota"] if row else 0
+    if q <= 0:
+        conn.close()
+        return False
+    cur.execute(
+        "UPDATE user_subscribe SET quota = quota - 1 WHERE user_id = ? AND scene = ?",
+        (user_id, scene),
+    )
+    conn.commit()
+    conn.close()
+    return True
+
+
+def consume_notification_quota(notification_id: int, user_id: str, scene: str) -> bool:
+    """Take the subscription quota for a queued notification.
+
+    The outbox row is marked in the same transaction, so a notification
+    claimed again after a crash or an expired lease keeps the quota it
+    already took. Return ``False`` if no quota is left.
+    """
+    conn = _connect()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE notification_outbox SET quota_consumed = 1 WHERE id = ? AND quota_consumed = 0",
+        (notification_id,),
+    )
+    if cur.rowcount == 0:
+        conn.close()
+        return True
+    cur.execute(
+        "UPDATE user_subscribe SET quota = quota - 1 WHERE user_id = ? AND scene = ? AND quota > 0",
+        (user_id, scene),
+    )
+    if cur.rowcount == 0:
+        conn.rollback()
+        conn.close()
+        return False
+    conn.commit()
+    conn.close()
+    return True
+
+
+def log_subscribe_error(user_id: str, scene: str, errcode: int, errmsg: str) -> None:
+    """Record a failed subscribe push."""
+    conn = _connect()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO subscribe_log(user_id, scene, errcode, errmsg, ts) VALUES (?,?,?,?,?)",
+        (user_id, scene, errcode, errmsg, datetime.datetime.utcnow().isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def enqueue_notification(
+    user_id: str,
+    openid: str,
+    scene: str,
+    audit_type: str,
+    audit_status: str,
+    page: str,
+) -> int:
+    """Queue a WeChat subscribe message and return its outbox id."""
+    now = datetime.datetime.utcnow().isoformat()
+    conn = _connect()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO notification_outbox(
+            user_id, openid, scene, audit_type, audit_status, page, status, attempts, next_attempt, created
+        ) VALUES (?,?,?,?,?,?,'pending',0,?,?)
+        """
+        + (" RETURNING id" if IS_PG else ""),
+        (user_id, openid, scene, audit_type, audit_status, page, now, now),
+    )
+    row = cur.fetchone() if IS_PG else None
+    row_id = row["id"] if IS_PG else cur.lastrowid
+    conn.commit()
+    conn.close()
+    return row_id
+
+
+def claim_notifications(limit: int, lease: float, now: datetime.datetime | None = None) -> list[dict]:
+    """Return up to ``limit`` due notifications and hide them for ``lease`` seconds.
+
+    A row is only returned to the caller whose update moved its
+    ``next_attempt`` forward, so several dispatchers never send the same
+    message twice. A dispatcher that dies leaves its rows to be retried once
+    the lease runs out.
+    """
+    now = now or datetime.datetime.utcnow()
+    until = (now + datetime.timedelta(seconds=lease)).isoformat()
+    conn = _connect()
+    cur = conn.cursor()
+    rows = cur.execute(
+        """
+        SELECT * FROM notification_outbox
+        WHERE status = 'pending' AND next_attempt <= ?
+        ORDER BY next_attempt, id LIMIT ?
+        """,
+        (now.isoformat(), limit),
+    ).fetchall()
+    claimed = []
+    for row in rows:
+        cur.execute(
+            "UPDATE notification_outbox SET next_attempt = ? WHERE id = ? AND next_attempt = ?",
+            (until, row["id"], row["next_attempt"]),
+        )
+        if cur.rowcount == 1:
+            claimed.append({k: row[k] for k in row.keys()})
+    conn.commit()
+    conn.close()
+    return claimed
+
+
+def finish_notification(notification_id: int, status: str, attempts: int, error: str | None = None) -> None:
+    """Record the final ``status`` (sent, failed or skipped) of a notification."""
+    conn = _connect()
+    conn.execute(
+        "UPDATE notification_outbox SET status = ?, attempts = ?, last_error = ? WHERE id = ?",
+        (status, attempts, error, notification_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def retry_notification(notification_id: int, attempts: int, next_attempt: datetime.datetime, error: str) -> None:
+    """Schedule another attempt of a notification at ``next_attempt``."""
+    conn = _connect()
+    conn.execute(
+        "UPDATE notification_outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+        (attempts, next_attempt.isoformat(), error, notification_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def notification_counts() -> dict[str, int]:
+    """Return the number of outbox rows per status."""
+    conn = _connect()
+    rows = conn.execute(
+        "SELECT status, COUNT(*) AS n FROM notification_outbox GROUP BY status"
+    ).fetchall()
+    conn.close()
+    return {row["status"]: row["n"] for row in rows}
+
+
+def _like(query: str) -> str:
+    """Return a ``LIKE`` pattern matching ``query`` anywhere, wildcards escaped."""
+    escaped = query.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _limit_clause(limit: int | None, offset: int) -> tuple[str, list]:
+    if limit is None and not offset:
+        return "", []
+    # -1 means no limit on SQLite; PostgreSQL takes NULL
+    return " LIMIT ? OFFSET ?", [limit if limit is not None else (None if IS_PG else -1), offset]
+
+
+def _id_page(table: str, key: str, after: str | None, limit: int | None, offset: int, query: str | None) -> list[str]:
+    if query and SEARCH_BACKEND == "memory":
+        from . import search
+
+        return search.page(table, query, after=after, limit=limit, offset=offset)
+    # ids sort by code point, as Python sorts them, whatever the database collation
+    column = f'{key} COLLATE "C"' if IS_PG else key
+    where, params = [], []
+    if after is not None:
+        where.append(f"{column} > ?")
+        params.append(after)
+    if query:
+        pattern = _like(query)
+        where.append(f"(LOWER({key}) LIKE ? ESCAPE '\\' OR LOWER(name) LIKE ? ESCAPE '\\')")
+        params.extend([pattern, pattern])
+    sql = f"SELECT {key} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    tail, tail_params = _limit_clause(limit, offset)
+    conn = _connect()
+    rows = conn.execute(f"{sql} ORDER BY {column}{tail}", (*params, *tail_params)).fetchall()
+    conn.close()
+    return [row[key] for row in rows]
+
+
+def search_entries(kind: str, ids: Iterable[str] | None = None) -> list[tuple[str, str | None]]:
+    """Return ``(id, name)`` of every club or user, or of ``ids`` only.
+
+    ``kind`` is ``clubs`` or ``users``; ids without a row are left out.
+    """
+    key = {"clubs": "club_id", "users": "user_id"}[kind]
+    sql = f"SELECT {key}, name FROM {kind}"
+    params: list = []
+    if ids is not None:
+        params = list(ids)
+        if not params:
+            return []
+        sql += f" WHERE {key} IN ({', '.join('?' for _ in params)})"
+    conn = _connect()
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return [(row[key], row["name"]) for row in rows]
+
+
+def user_ids_page(
+    after: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    query: str | None = None,
+) -> list[str]:
+    """Return user ids in order, starting after ``after``.
+
+    ``query`` keeps users whose id or name contains it, ignoring case.
+    """
+    return _id_page("users", "user_id", after, limit, offset, query)
+
+
+def club_ids_page(
+    after: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    query: str | None = None,
+) -> list[str]:
+    """Return club ids in order, starting after ``after``.
+
+    ``query`` keeps clubs whose id or name contains it, ignoring case.
+    """
+    return _id_page("clubs", "club_id", after, limit, offset, query)
+
+
+# sort key of the match feeds, newest approval first; matches idx_matches_feed
+_FEED_KEY = ("COALESCE(approved_ts, '')", "date", "COALESCE(created_ts, '')", "id")
+
+
+def match_page(
+    doubles: bool,
+    after: tuple | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> list[dict]:
+    """Return approved match rows in feed order, starting after ``after``.
+
+    Rows are ordered by approval time, date, creation time and id, newest
+    first. Each row carries its position as ``key`` for the next page.
+    """
+    sql = "SELECT *, COALESCE(approved_ts, '') AS feed_approved, COALESCE(created_ts, '') AS feed_created FROM matches WHERE type = ?"
+    params: list = ["doubles" if doubles else "singles"]
+    if after is not None:
+        sql += f" AND ({', '.join(_FEED_KEY)}) < (?, ?, ?, ?)"
+        params.extend(after)
+    order = ", ".join(f"{column} DESC" for column in _FEED_KEY)
+    tail, tail_params = _limit_clause(limit, offset)
+    conn = _connect()
+    rows = conn.execute(f"{sql} ORDER BY {order}{tail}", (*params, *tail_params)).fetchall()
+    conn.close()
+    result = []
+    for row in rows:
+        record = {name: row[name] for name in _MATCH_COLUMNS}
+        record["id"] = row["id"]
+        record["club_id"] = row["club_id"]
+        record["key"] = (row["feed_approved"], row["date"], row["feed_created"], row["id"])
+        result.append(record)
+    return result
+
+
+def player_names(ids) -> Dict[str, tuple[str, str | None]]:
+    """Return ``(name, avatar)`` of each player in ``ids``."""
+    ids = sorted({i for i in ids if i})
+    names: Dict[str, tuple[str, str | None]] = {}
+    if not ids:
+        return names
     conn = _connect()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM messages WHERE id = ?", (msg_id,))
-    conn.commit()
+    for chunk in _chunks(ids):
+        marks = ", ".join("?" for _ in chunk)
+        for row in conn.execute(
+            f"SELECT user_id, name, avatar FROM players WHERE user_id IN ({marks})",
+            chunk,
+        ).fetchall():
+            names[row["user_id"]] = (row["name"], row["avatar"])
     conn.close()
-    _refresh_after_write()
+    return names
 
 
-def insert_token(token: str, user_id: str) -> None:
-    """Persist or update an authentication token."""
+def ranking_players(ids: Iterable[str] | None = None) -> Dict[str, Player]:
+    """Return the players ``ids``, or every player, from the identity map.
+
+    Players not cached yet are read without their match history, so nothing
+    loaded so far is dropped or replaced.
+    """
     conn = _connect()
     cur = conn.cursor()
-    if IS_PG:
-        cur.execute(
-            """
-            INSERT INTO auth_tokens(token, user_id, ts) VALUES (?,?,?)
-            ON CONFLICT (token) DO UPDATE SET user_id = EXCLUDED.user_id, ts = EXCLUDED.ts
-            """,
-            (token, user_id, datetime.datetime.utcnow().isoformat()),
-        )
+    if ids is None:
+        wanted = []
+        for row in cur.execute("SELECT * FROM players").fetchall():
+            uid = row["user_id"]
+            if uid not in _players_cache:
+                _players_cache[uid] = _player_from_row(row)
+            wanted.append(uid)
     else:
-        cur.execute(
-            "INSERT OR REPLACE INTO auth_tokens(token, user_id, ts) VALUES (?,?,?)",
-            (token, user_id, datetime.datetime.utcnow().isoformat()),
+        wanted = sorted({uid for uid in ids if uid})
+        _load_players(cur, wanted)
+    conn.close()
+    return {uid: _players_cache[uid] for uid in wanted if uid in _players_cache}
+
+
+def weighted_match_counts(ids: Iterable[str] | None = None) -> Dict[str, tuple[float, float]]:
+    """Return the weighted singles and doubles match counts of players.
+
+    Players whose history is loaded are counted from it with
+    :func:`tennis.rating.weighted_singles_matches`; for the others the format
+    weights of their approved matches are summed in the database. ``ids``
+    limits the result to those players; unloaded players without matches are
+    left out.
+    """
+    loaded = _hydrated_players if ids is None else {uid for uid in ids if uid in _hydrated_players}
+    result = {
+        uid: (weighted_singles_matches(_players_cache[uid]), weighted_doubles_matches(_players_cache[uid]))
+        for uid in loaded
+        if uid in _players_cache
+    }
+    slots = ("player_a1", "player_a2", "player_b1", "player_b2")
+    chunks = [None] if ids is None else list(_chunks(sorted({uid for uid in ids if uid} - result.keys())))
+    counts: Dict[str, list[float]] = {}
+    conn = _connect()
+    for chunk in chunks:
+        branches = []
+        params: list = []
+        for slot in slots:
+            sql = f"SELECT {slot} AS player, type, weight FROM matches WHERE {slot} IS NOT NULL"
+            if chunk is not None:
+                sql += f" AND {slot} IN ({', '.join('?' for _ in chunk)})"
+                params.extend(chunk)
+            branches.append(sql)
+        query = (
+            "SELECT player, type, SUM(CAST(COALESCE(weight, 1.0) AS DOUBLE PRECISION)) AS n FROM ("
+            + " UNION ALL ".join(branches)
+            + ") slots GROUP BY player, type"
         )
-    conn.commit()
+        for row in conn.execute(query, params).fetchall():
+            entry = counts.setdefault(row["player"], [0.0, 0.0])
+            entry[row["type"] == "doubles"] = row["n"]
     conn.close()
-    _refresh_after_write()
+    for uid, (singles, doubles) in counts.items():
+        result.setdefault(uid, (singles, doubles))
+    return result
 
 
-def delete_token(token: str) -> None:
-    """Remove an authentication token."""
+def club_member_ids(club_ids: Iterable[str] | None = None) -> Dict[str, list[str]]:
+    """Return the member ids of every club, or of ``club_ids``.
+
+    Clubs are in table order and clubs without members map to an empty
+    list; clubs that do not exist are left out.
+    """
     conn = _connect()
-    conn.execute("DELETE FROM auth_tokens WHERE token = ?", (token,))
-    conn.commit()
+    if club_ids is None:
+        clubs = [row["club_id"] for row in conn.execute("SELECT club_id FROM clubs").fetchall()]
+        rows = conn.execute(
+            "SELECT m.club_id, m.user_id FROM club_members m JOIN players p ON p.user_id = m.user_id"
+        ).fetchall()
+    else:
+        clubs, rows = [], []
+        for chunk in _chunks(sorted(set(club_ids))):
+            marks = ", ".join("?" for _ in chunk)
+            clubs.extend(
+                row["club_id"]
+                for row in conn.execute(f"SELECT club_id FROM clubs WHERE club_id IN ({marks})", chunk).fetchall()
+            )
+            rows.extend(
+                conn.execute(
+                    "SELECT m.club_id, m.user_id FROM club_members m JOIN players p ON p.user_id = m.user_id "
+                    f"WHERE m.club_id IN ({marks})",
+                    chunk,
+                ).fetchall()
+            )
     conn.close()
-    _refresh_after_write()
+    members: Dict[str, list[str]] = {cid: [] for cid in clubs}
+    for row in rows:
+        if row["club_id"] in members:
+            members[row["club_id"]].append(row["user_id"])
+    return members
 
 
-def get_token(token: str) -> tuple[str, datetime.datetime] | None:
-    """Retrieve a ``(user_id, timestamp)`` tuple for the token."""
+def player_club_joins(user_id: str) -> Dict[str, datetime.date | None]:
+    """Return the clubs ``user_id`` belongs to and the day they joined each.
+
+    Memberships without a join date fall back to the player's join date.
+    Only the player's ``club_members`` rows are read.
+    """
     conn = _connect()
-    cur = conn.cursor()
-    row = cur.execute(
-        "SELECT user_id, ts FROM auth_tokens WHERE token = ?",
-        (token,),
-    ).fetchone()
+    rows = conn.execute(
+        f"SELECT cm.club_id, {migrations.MEMBER_JOINED} AS joined FROM club_members cm "
+        "JOIN clubs c ON c.club_id = cm.club_id LEFT JOIN players p ON p.user_id = cm.user_id "
+        "WHERE cm.user_id = ? ORDER BY cm.club_id",
+        (user_id,),
+    ).fetchall()
     conn.close()
-    if not row:
-        return None
-    return row["user_id"], datetime.datetime.fromisoformat(row["ts"])
+    return {
+        row["club_id"]: datetime.date.fromisoformat(row["joined"]) if row["joined"] else None for row in rows
+    }
 
 
-def insert_refresh_token(user_id: str, token: str, expires: datetime.datetime) -> None:
-    """Persist or update a refresh token."""
+def pending_match_clubs(doubles: bool) -> list[str]:
+    """Return the ids of clubs holding pending singles or ``doubles`` matches."""
     conn = _connect()
-    cur = conn.cursor()
-    if IS_PG:
-        cur.execute(
-            """
-            INSERT INTO refresh_tokens(user_id, token, expires) VALUES (?,?,?)
-            ON CONFLICT (user_id) DO UPDATE SET token = EXCLUDED.token, expires = EXCLUDED.expires
-            """,
-            (user_id, token, expires.isoformat()),
-        )
-    else:
+    rows = conn.execute(
+        "SELECT DISTINCT p.club_id FROM pending_matches p JOIN clubs c ON c.club_id = p.club_id WHERE p.type = ?",
+        ("doubles" if doubles else "singles",),
+    ).fetchall()
+    conn.close()
+    return sorted(row["club_id"] for row in rows)
+
+
+def _bump_stat(cur, name: str, day: str, delta: int) -> None:
+    """Add ``delta`` to counter ``name`` on ``day`` and to its total."""
+    for key in (day, ""):
         cur.execute(
-            "INSERT OR REPLACE INTO refresh_tokens(user_id, token, expires) VALUES (?,?,?)",
-            (user_id, token, expires.isoformat()),
+            "INSERT INTO stats_daily(name, day, n) VALUES (?, ?, ?) "
+            "ON CONFLICT (name, day) DO UPDATE SET n = stats_daily.n + EXCLUDED.n",
+            (name, key, delta),
         )
-    conn.commit()
-    conn.close()
-    _refresh_after_write()
 
 
-def get_refresh_token(token: str) -> tuple[str, datetime.datetime] | None:
-    """Return ``(user_id, expires)`` for the refresh token."""
+def _delete_matches(cur, ids) -> None:
+    """Delete approved matches by id and take them off the daily counts."""
+    for mid in ids:
+        row = cur.execute(
+            "SELECT date, player_a1, player_a2, player_b1, player_b2 FROM matches WHERE id = ?",
+            (mid,),
+        ).fetchone()
+        if row is None:
+            continue
+        _mark_changed("matches", mid)
+        _mark_changed("players", row["player_a1"], row["player_a2"], row["player_b1"], row["player_b2"])
+        _count_friends(cur, mid, -1)
+        cur.execute("DELETE FROM matches WHERE id = ?", (mid,))
+        _bump_stat(cur, "matches", row["date"], -1)
+
+
+def _refresh_first_join(cur, user_ids) -> None:
+    """Recompute the day ``user_ids`` first joined a club after a membership change."""
+    for uid in set(user_ids):
+        row = cur.execute(
+            f"SELECT MIN({migrations.MEMBER_JOINED}) AS day FROM club_members cm "
+            "LEFT JOIN players p ON p.user_id = cm.user_id WHERE cm.user_id = ?",
+            (uid,),
+        ).fetchone()
+        new = row["day"] if row else None
+        row = cur.execute("SELECT day FROM member_first_join WHERE user_id = ?", (uid,)).fetchone()
+        old = row["day"] if row else None
+        if old == new:
+            continue
+        if old is not None:
+            _bump_stat(cur, "members", old, -1)
+            cur.execute("DELETE FROM member_first_join WHERE user_id = ?", (uid,))
+        if new is not None:
+            _bump_stat(cur, "members", new, 1)
+            cur.execute("INSERT INTO member_first_join(user_id, day) VALUES (?, ?)", (uid, new))
+
+
+# a friend whose totals fall below this after matches are taken away is gone
+_FRIEND_EPSILON = 1e-9
+
+
+def _count_friends(cur, match_id: int | None, sign: int) -> None:
+    """Add (``sign=1``) or take away (``-1``) an approved match's friend totals."""
+    if match_id is None:
+        return
+    cur.execute(
+        migrations.friends_upsert("SELECT *, ? AS sign FROM matches WHERE id = ?"),
+        (sign, match_id),
+    )
+    if sign < 0:
+        row = cur.execute(
+            "SELECT player_a1, player_a2, player_b1, player_b2 FROM matches WHERE id = ?",
+            (match_id,),
+        ).fetchone()
+        slots = ("player_a1", "player_a2", "player_b1", "player_b2")
+        ids = [row[slot] for slot in slots if row[slot]] if row else []
+        if ids:
+            marks = ", ".join("?" for _ in ids)
+            cur.execute(
+                f"DELETE FROM player_friends WHERE user_id IN ({marks}) AND weight < ?",
+                (*ids, _FRIEND_EPSILON),
+            )
+
+
+def friend_stats(user_id: str, limit: int | None = None) -> list[dict]:
+    """Return the friend totals of ``user_id``, most games together first.
+
+    Each row holds the :data:`tennis.migrations.FRIEND_COLUMNS` plus the
+    friend's ``user_id``, ``name`` and ``avatar``.
+    """
+    columns = ", ".join(f"f.{c}" for c in migrations.FRIEND_COLUMNS)
+    sql = (
+        f"SELECT f.friend_id, p.name, p.avatar, {columns} FROM player_friends f "
+        "LEFT JOIN players p ON p.user_id = f.friend_id "
+        "WHERE f.user_id = ? ORDER BY f.weight DESC, f.friend_id"
+    )
+    params: list = [user_id]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
     conn = _connect()
-    cur = conn.cursor()
-    row = cur.execute(
-        "SELECT user_id, expires FROM refresh_tokens WHERE token = ?",
-        (token,),
-    ).fetchone()
+    rows = conn.execute(sql, params).fetchall()
     conn.close()
-    if not row:
-        return None
-    return row["user_id"], datetime.datetime.fromisoformat(row["expires"])
+    result = []
+    for row in rows:
+        entry = {
+            "user_id": row["friend_id"],
+            "name": row["name"] if row["name"] is not None else row["friend_id"],
+            "avatar": row["avatar"],
+        }
+        entry.update((c, row[c]) for c in migrations.FRIEND_COLUMNS)
+        result.append(entry)
+    return result
 
 
-def delete_refresh_token(user_id: str) -> None:
-    """Remove refresh token for a user."""
+def rebuild_friends() -> int:
+    """Recompute every friend total from the approved matches.
+
+    Returns the number of player and friend pairs written.
+    """
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM player_friends")
+        cur.execute(migrations.friends_upsert("SELECT *, 1 AS sign FROM matches"))
+        return cur.execute("SELECT COUNT(*) AS n FROM player_friends").fetchone()["n"]
+
+
+# order in which approved matches changed the ratings
+_REPLAY_ORDER = "COALESCE(approved_ts, created_ts, date), id"
+_RATING_COLUMNS = tuple(f"rating_{slot}_{when}" for when in ("before", "after") for slot in ("a1", "a2", "b1", "b2"))
+_REPLAY_COLUMNS = (
+    "id",
+    "type",
+    "club_id",
+    "player_a1",
+    "player_a2",
+    "player_b1",
+    "player_b2",
+    "score_a",
+    "score_b",
+    "weight",
+    "format_name",
+    *_RATING_COLUMNS,
+)
+
+
+def replay_rows() -> list[tuple]:
+    """Return every approved match in the order its ratings were applied.
+
+    Each row is ``(id, type, club_id, player_a1, player_a2, player_b1,
+    player_b2, score_a, score_b, weight, format_name)`` followed by the
+    stored ratings before and then after the match, in slot order.
+    """
     conn = _connect()
-    conn.execute("DELETE FROM refresh_tokens WHERE user_id = ?", (user_id,))
-    conn.commit()
+    rows = conn.execute(f"SELECT {', '.join(_REPLAY_COLUMNS)} FROM matches ORDER BY {_REPLAY_ORDER}").fetchall()
     conn.close()
-    _refresh_after_write()
+    return [tuple(row[c] for c in _REPLAY_COLUMNS) for row in rows]
 
 
-def add_subscribe_quota(user_id: str, scene: str, quota: int = 1) -> None:
-    """Increment or set subscription quota for a user/scene."""
+def player_ratings() -> Dict[str, tuple]:
+    """Return ``(singles_rating, doubles_rating, experience)`` of every player."""
     conn = _connect()
-    cur = conn.cursor()
-    if IS_PG:
-        cur.execute(
-            """
-            INSERT INTO user_subscribe(user_id, scene, quota) VALUES (?, ?, 0)
-            ON CONFLICT (user_id, scene) DO NOTHING
-            """,
-            (user_id, scene),
-        )
-    else:
-        cur.execute(
-            "INSERT OR IGNORE INTO user_subscribe(user_id, scene, quota) VALUES (?, ?,0)",
-            (user_id, scene),
+    rows = conn.execute("SELECT user_id, singles_rating, doubles_rating, experience FROM players").fetchall()
+    conn.close()
+    return {r["user_id"]: (r["singles_rating"], r["doubles_rating"], r["experience"]) for r in rows}
+
+
+def write_ratings(players: Dict[str, tuple], matches: Iterable[tuple]) -> None:
+    """Store recomputed ratings in one transaction.
+
+    ``players`` maps user ids to ``(singles_rating, doubles_rating,
+    experience)``. ``matches`` yields ``(weight, *ratings, id)`` with the
+    ratings before and then after the match, in slot order. The friend
+    totals, which include rating changes, are recomputed as well and the
+    caches of this process are dropped. The rewritten matches are recorded
+    as changed so other workers reload them on the next version bump.
+    """
+    assignments = ", ".join(f"{c} = ?" for c in ("weight", *_RATING_COLUMNS))
+    matches = list(matches)
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "UPDATE players SET singles_rating = ?, doubles_rating = ?, experience = ? WHERE user_id = ?",
+            [(*values, uid) for uid, values in players.items()],
         )
-    cur.execute(
-        "UPDATE user_subscribe SET quota = quota + ? WHERE user_id = ? AND scene = ?",
-        (quota, user_id, scene),
-    )
-    conn.commit()
+        cur.executemany(f"UPDATE matches SET {assignments} WHERE id = ?", matches)
+        clubs = [r["club_id"] for r in cur.execute("SELECT club_id FROM clubs").fetchall()]
+        cur.execute("DELETE FROM player_friends")
+        cur.execute(migrations.friends_upsert("SELECT *, 1 AS sign FROM matches"))
+    invalidate_cache()
+    _mark_changed("players", *players)
+    _mark_changed("clubs", *clubs)
+    _mark_changed("matches", *(values[-1] for values in matches))
+
+
+def stat_total(name: str) -> int:
+    """Return the total of counter ``name``: ``matches`` or ``members``."""
+    conn = _connect()
+    row = conn.execute("SELECT n FROM stats_daily WHERE name = ? AND day = ''", (name,)).fetchone()
     conn.close()
+    return row["n"] if row else 0
 
 
-def consume_subscribe_quota(user_id: str, scene: str) -> bool:
-    """Decrement quota if available and return True on success."""
+def system_totals() -> Dict[str, int]:
+    """Return the number of users, clubs and pending items of all clubs.
+
+    Pending items are join applications plus pending matches. Each total is
+    counted in the database, so no club or user is loaded.
+    """
+    if IS_PG:
+        applications = (
+            "CASE WHEN jsonb_typeof(m.pending_members) = 'object' "
+            "THEN (SELECT COUNT(*) FROM jsonb_object_keys(m.pending_members)) ELSE 0 END"
+        )
+    else:
+        applications = "(SELECT COUNT(*) FROM json_each(m.pending_members))"
+    queries = {
+        "users": "SELECT COUNT(*) AS n FROM users",
+        "clubs": "SELECT COUNT(*) AS n FROM clubs",
+        "pending_members": f"SELECT SUM({applications}) AS n FROM club_meta m JOIN clubs c ON c.club_id = m.club_id",
+        "pending_matches": "SELECT COUNT(*) AS n FROM pending_matches p JOIN clubs c ON c.club_id = p.club_id",
+    }
     conn = _connect()
-    cur = conn.cursor()
-    row = cur.execute(
-        "SELECT quota FROM user_subscribe WHERE user_id = ? AND scene = ?",
-        (user_id, scene),
-    ).fetchone()
-    q = row["quota"] if row else 0
-    if q <= 0:
-        conn.close()
-        return False
-    cur.execute(
-        "UPDATE user_subscribe SET quota = quota - 1 WHERE user_id = ? AND scene = ?",
-        (user_id, scene),
-    )
-    conn.commit()
+    totals = {name: conn.execute(sql).fetchone()["n"] or 0 for name, sql in queries.items()}
     conn.close()
-    return True
+    return {name: int(n) for name, n in totals.items()}
 
 
-def log_subscribe_error(user_id: str, scene: str, errcode: int, errmsg: str) -> None:
-    """Record a failed subscribe push."""
+def daily_stats(name: str, start: datetime.date, end: datetime.date | None = None) -> Dict[datetime.date, int]:
+    """Return the per-day values of counter ``name`` from ``start`` to ``end``.
+
+    Days without a value are left out; ``end`` defaults to no bound.
+    """
+    sql = "SELECT day, n FROM stats_daily WHERE name = ? AND day >= ?"
+    params: list = [name, start.isoformat()]
+    if end is not None:
+        sql += " AND day <= ?"
+        params.append(end.isoformat())
     conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO subscribe_log(user_id, scene, errcode, errmsg, ts) VALUES (?,?,?,?,?)",
-        (user_id, scene, errcode, errmsg, datetime.datetime.utcnow().isoformat()),
-    )
-    conn.commit()
+    rows = conn.execute(sql, params).fetchall()
     conn.close()
+    return {datetime.date.fromisoformat(row["day"]): row["n"] for row in rows if row["n"]}
 
 
 def get_user(user_id: str) -> User | None:
@@ -1826,15 +3699,16 @@ def get_user(user_id: str) -> User | None:
         user = _users_cache.get(user_id)
         if user:
             return user
-    if _redis:
-        cached = _load_cache(f"tennis:user:{user_id}")
-        if cached:
-            if _users_cache is None:
-                _users_cache = {}
-            _users_cache[user_id] = cached
-            _db_file = DATABASE_URL
-            return cached
-
+    _stale_users.discard(user_id)
+    cached = _load_cache("users", [user_id])
+    if cached:
+        if _users_cache is None:
+            _users_cache = {}
+        user = _users_cache[user_id] = _user_from_record(user_id, cached[0])
+        _db_file = DATABASE_URL
+        return user
+
+    _cache_stats["user_loads"] += 1
     conn = _connect()
     cur = conn.cursor()
     row = cur.execute(
@@ -1874,25 +3748,33 @@ def get_user(user_id: str) -> User | None:
 
 
 def get_club(club_id: str) -> Club | None:
-    """Return a single :class:`Club` by id or ``None`` if not found."""
+    """Return a single :class:`Club` by id or ``None`` if not found.
+
+    On a cache miss only this club, its members and their matches are read.
+    """
     global _clubs_cache, _db_file
     if _clubs_cache is not None and _db_file == DATABASE_URL:
         club = _clubs_cache.get(club_id)
         if club:
             return club
-    if _redis:
-        cached = _load_cache(f"tennis:club:{club_id}")
-        if cached:
-            if _clubs_cache is None:
-                _clubs_cache = {}
-            _clubs_cache[club_id] = cached
-            _db_file = DATABASE_URL
-            return cached
-
-    clubs, _ = load_data()
-    club = clubs.get(club_id)
+        if _clubs_complete and club_id not in _stale_clubs:
+            return None
+    _stale_clubs.discard(club_id)
+    cached = _club_from_cache(club_id)
+    if cached:
+        if _clubs_cache is None:
+            _clubs_cache = {}
+        _clubs_cache[club_id] = cached
+        _db_file = DATABASE_URL
+        return cached
+
+    club = _hydrate_club(club_id)
     if club:
         set_club(club)
+        members = list(club.members.values())
+        _cache_players(members, histories=True)
+        _cache_opponents(members)
+        _cache_players(p for m in club.pending_matches for p in _match_players(m))
     return club
 
 
@@ -1902,6 +3784,73 @@ def list_clubs() -> list[Club]:
     return list(clubs.values())
 
 
+class CacheView(Mapping):
+    """Dict-like access to clubs, players or users through the caches.
+
+    Looking up a key loads only that entity, while iterating or taking the
+    length falls back to loading every row. Code written against the old
+    whole-world dictionaries keeps working without paying for a full load on
+    every request.
+    """
+
+    def __init__(self, get, load_all, put):
+        self._get = get
+        self._load_all = load_all
+        self._put = put
+
+    def __getitem__(self, key):
+        value = self._get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self._get(key)
+        return default if value is None else value
+
+    def __contains__(self, key) -> bool:
+        return self._get(key) is not None
+
+    def __setitem__(self, key, value) -> None:
+        self._put(value)
+
+    def __iter__(self):
+        return iter(list(self._load_all()))
+
+    def __len__(self) -> int:
+        return len(self._load_all())
+
+    def keys(self):
+        return self._load_all().keys()
+
+    def values(self):
+        return self._load_all().values()
+
+    def items(self):
+        return self._load_all().items()
+
+
+club_view = CacheView(get_club, lambda: load_data()[0], set_club)
+player_view = CacheView(get_player, lambda: load_data()[1], set_player)
+user_view = CacheView(get_user, lambda: load_users(), set_user)
+
+
+def name_in_use(name: str, exclude: str | None = None) -> bool:
+    """Return ``True`` if a user or player other than ``exclude`` has ``name``."""
+    conn = _connect()
+    cur = conn.cursor()
+    row = cur.execute(
+        """
+        SELECT 1 AS taken FROM users WHERE name = ? AND user_id <> ?
+        UNION ALL
+        SELECT 1 AS taken FROM players WHERE name = ? AND user_id <> ?
+        """,
+        (name, exclude or "", name, exclude or ""),
+    ).fetchone()
+    conn.close()
+    return row is not None
+
+
 def list_user_messages(user_id: str) -> list[tuple[int, Message]]:
     """Return all messages for a user as ``(id, Message)`` tuples."""
     conn = _connect()
@@ -1927,6 +3876,7 @@ def list_user_messages(user_id: str) -> list[tuple[int, Message]]:
 
 def mark_user_message_read(user_id: str, index: int) -> None:
     """Mark a user's message by list index as read."""
+    _mark_changed("users", user_id)
     conn = _connect()
     cur = conn.cursor()
     ids = cur.execute(
@@ -1948,6 +3898,7 @@ def mark_user_message_read(user_id: str, index: int) -> None:
 
 def save_user(user: User, conn: sqlite3.Connection | None = None) -> None:
     """Persist a single user's data and messages."""
+    _mark_changed("users", user.user_id)
     close = conn is None
     if conn is None:
         conn = _connect()
@@ -1987,63 +3938,281 @@ def save_user(user: User, conn: sqlite3.Connection | None = None) -> None:
     else:
         _pending_users[user.user_id] = user
 
+def _parse_json(value, default):
+    """Decode a JSON column that may already be parsed by the driver."""
+    if isinstance(value, str):
+        return json.loads(value) if value else default
+    return value if value is not None else default
+
+
+def _meta_values(club: Club) -> tuple:
+    return (
+        sorted(club.banned_ids),
+        club.leader_id,
+        sorted(club.admin_ids),
+        {uid: dict(vars(pm)) for uid, pm in club.pending_members.items()},
+        dict(club.rejected_members),
+    )
+
+
+def _appointment_values(appt: Appointment) -> tuple:
+    return (
+        appt.date.isoformat(),
+        appt.creator,
+        appt.location,
+        appt.info,
+        sorted(appt.signups),
+    )
+
+
+def _empty_club_state() -> dict:
+    return {
+        "club": None,
+        "meta": None,
+        "members": {},
+        "players": {},
+        "matches": set(),
+        "pending": {},
+        "appointments": [],
+    }
+
+
+def _club_state(club: Club) -> dict:
+    """Return the row state ``save_club`` would persist for ``club``."""
+    return {
+        "club": (club.name, club.logo, club.region, club.slogan),
+        "meta": _meta_values(club),
+        "members": {
+            uid: club.member_joined.get(uid, p.joined).isoformat()
+            for uid, p in club.members.items()
+        },
+        "players": {uid: _player_values(p) for uid, p in club.members.items()},
+        # approved matches are append-only so only their ids are tracked
+        "matches": {m.id for m in club.matches},
+        "pending": {m.id: _match_values(m) for m in club.pending_matches},
+        "appointments": [_appointment_values(a) for a in club.appointments],
+    }
+
+
+def _read_club_state(cur, club_id: str) -> dict:
+    """Rebuild a club's persisted row state from the database."""
+    state = _empty_club_state()
+    row = cur.execute(
+        "SELECT name, logo, region, slogan FROM clubs WHERE club_id = ?",
+        (club_id,),
+    ).fetchone()
+    if row:
+        state["club"] = (row["name"], row["logo"], row["region"], row["slogan"])
+    row = cur.execute(
+        "SELECT * FROM club_meta WHERE club_id = ?",
+        (club_id,),
+    ).fetchone()
+    if row:
+        state["meta"] = (
+            sorted(_parse_json(row["banned_ids"], [])),
+            row["leader_id"],
+            sorted(_parse_json(row["admin_ids"], [])),
+            _parse_json(row["pending_members"], {}),
+            _parse_json(row["rejected_members"], {}),
+        )
+    for row in cur.execute(
+        "SELECT user_id, joined FROM club_members WHERE club_id = ?",
+        (club_id,),
+    ).fetchall():
+        state["members"][row["user_id"]] = row["joined"]
+    for row in cur.execute(
+        """
+        SELECT p.* FROM players p
+        JOIN club_members m ON m.user_id = p.user_id
+        WHERE m.club_id = ?
+        """,
+        (club_id,),
+    ).fetchall():
+        state["players"][row["user_id"]] = (
+            row["name"],
+            row["singles_rating"],
+            row["doubles_rating"],
+            row["experience"],
+            json.dumps(_parse_json(row["pre_ratings"], {})),
+            row["age"],
+            row["gender"],
+            row["avatar"],
+            row["birth"],
+            row["handedness"],
+            row["backhand"],
+            row["region"],
+            row["joined"],
+        )
+    for row in cur.execute(
+        "SELECT id FROM matches WHERE club_id = ?",
+        (club_id,),
+    ).fetchall():
+        state["matches"].add(row["id"])
+    for row in cur.execute(
+        "SELECT * FROM pending_matches WHERE club_id = ?",
+        (club_id,),
+    ).fetchall():
+        state["pending"][row["id"]] = _row_match_values(row)
+    for row in cur.execute(
+        "SELECT date, creator, location, info, signups FROM appointments WHERE club_id = ? ORDER BY id",
+        (club_id,),
+    ).fetchall():
+        state["appointments"].append(
+            (
+                row["date"],
+                row["creator"],
+                row["location"],
+                row["info"],
+                sorted(_parse_json(row["signups"], [])),
+            )
+        )
+    return state
+
+
 def save_club(club: Club, conn: sqlite3.Connection | None = None) -> None:
-    """Persist a single club's records."""
+    """Persist the rows of a club that changed since it was last saved.
+
+    The state written by the previous save (or read by :func:`load_data`) is
+    compared with ``club`` so only new matches, changed pending matches and
+    changed member, player or meta rows are written. Existing match ids are
+    never reassigned.
+    """
+    _mark_changed("clubs", club.club_id)
     close = conn is None
     if conn is None:
         conn = _connect()
     cur = conn.cursor()
-    cur.execute("DELETE FROM clubs WHERE club_id = ?", (club.club_id,))
-    cur.execute("DELETE FROM club_meta WHERE club_id = ?", (club.club_id,))
-    cur.execute("DELETE FROM club_members WHERE club_id = ?", (club.club_id,))
-    cur.execute("DELETE FROM matches WHERE club_id = ?", (club.club_id,))
-    cur.execute("DELETE FROM pending_matches WHERE club_id = ?", (club.club_id,))
-    cur.execute("DELETE FROM appointments WHERE club_id = ?", (club.club_id,))
-    cur.execute(
-        "INSERT INTO clubs(club_id, name, logo, region, slogan) VALUES (?,?,?,?,?)",
-        (club.club_id, club.name, club.logo, club.region, club.slogan),
-    )
-    cur.execute(
-        "INSERT INTO club_meta(club_id, banned_ids, leader_id, admin_ids, pending_members, rejected_members) VALUES (?,?,?,?,?,?)",
-        (
-            club.club_id,
-            json.dumps(list(club.banned_ids)),
-            club.leader_id,
-            json.dumps(list(club.admin_ids)),
-            json.dumps({uid: vars(pm) for uid, pm in club.pending_members.items()}),
-            json.dumps(club.rejected_members),
-        ),
-    )
-    for player in club.members.values():
-        joined = club.member_joined.get(player.user_id, player.joined)
-        create_player(club.club_id, player, joined=joined, conn=conn)
-        update_player_record(player, conn=conn)
-    for m in club.matches:
-        m.id = create_match(club.club_id, m, pending=False, conn=conn)
+    cid = club.club_id
+    if cid in _pending_club_states:
+        old = _pending_club_states[cid]
+    else:
+        old = _club_states.get(cid)
+    if old is None:
+        old = _read_club_state(cur, cid)
+    new = _club_state(club)
+    # members whose join date changed or who left, for the join histogram
+    rejoined: list[str] = []
+
+    if old["club"] is None:
+        cur.execute(
+            "INSERT INTO clubs(club_id, name, logo, region, slogan) VALUES (?,?,?,?,?)",
+            (cid, *new["club"]),
+        )
+    elif old["club"] != new["club"]:
+        cur.execute(
+            "UPDATE clubs SET name = ?, logo = ?, region = ?, slogan = ? WHERE club_id = ?",
+            (*new["club"], cid),
+        )
+    if old["meta"] != new["meta"]:
+        banned, leader_id, admins, pending, rejected = new["meta"]
+        values = (
+            json.dumps(banned),
+            leader_id,
+            json.dumps(admins),
+            json.dumps(pending),
+            json.dumps(rejected),
+        )
+        if old["meta"] is None:
+            cur.execute(
+                "INSERT INTO club_meta(banned_ids, leader_id, admin_ids, pending_members, rejected_members, club_id) VALUES (?,?,?,?,?,?)",
+                (*values, cid),
+            )
+        else:
+            cur.execute(
+                "UPDATE club_meta SET banned_ids = ?, leader_id = ?, admin_ids = ?, pending_members = ?, rejected_members = ? WHERE club_id = ?",
+                (*values, cid),
+            )
+
+    for uid, player in club.members.items():
+        joined = new["members"][uid]
+        if uid not in old["members"]:
+            create_player(
+                cid,
+                player,
+                joined=datetime.date.fromisoformat(joined),
+                conn=conn,
+            )
+        elif old["members"][uid] != joined:
+            cur.execute(
+                "UPDATE club_members SET joined = ? WHERE club_id = ? AND user_id = ?",
+                (joined, cid, uid),
+            )
+            rejoined.append(uid)
+        if old["players"].get(uid) != new["players"][uid]:
+            update_player_record(player, conn=conn)
+    for uid in old["members"].keys() - new["members"].keys():
+        cur.execute(
+            "DELETE FROM club_members WHERE club_id = ? AND user_id = ?",
+            (cid, uid),
+        )
+        rejoined.append(uid)
+    _refresh_first_join(cur, rejoined)
+
+    # pending rows first: an approved match moves to ``matches`` under a new id
+    pending_state: dict = {}
     for m in club.pending_matches:
-        m.id = create_match(club.club_id, m, pending=True, conn=conn)
-    for a in club.appointments:
-        create_appointment_record(club.club_id, a, conn=conn)
+        values = _match_values(m)
+        if m.id in old["pending"] and m.id not in pending_state:
+            if old["pending"][m.id] != values:
+                cur.execute(
+                    f"UPDATE pending_matches SET {_MATCH_ASSIGNMENTS} WHERE id = ?",
+                    (*values, m.id),
+                )
+        else:
+            m.id = None
+            create_match(cid, m, pending=True, conn=conn)
+        pending_state[m.id] = values
+    for mid in old["pending"].keys() - pending_state.keys():
+        cur.execute("DELETE FROM pending_matches WHERE id = ?", (mid,))
+    match_ids: set = set()
+    for m in club.matches:
+        # a second match carrying a known id was just moved from pending
+        if m.id not in old["matches"] or m.id in match_ids:
+            m.id = None
+            create_match(cid, m, pending=False, conn=conn)
+        match_ids.add(m.id)
+    _delete_matches(cur, old["matches"] - match_ids)
+    new["pending"] = pending_state
+    new["matches"] = match_ids
+
+    if old["appointments"] != new["appointments"]:
+        cur.execute("DELETE FROM appointments WHERE club_id = ?", (cid,))
+        cur.executemany(
+            "INSERT INTO appointments(club_id, date, creator, location, info, signups) VALUES (?,?,?,?,?,?)",
+            [
+                (cid, date, creator, location, info, json.dumps(signups))
+                for date, creator, location, info, signups in new["appointments"]
+            ],
+        )
+
     if close:
         conn.commit()
         conn.close()
         set_club(club)
-        _pending_clubs.pop(club.club_id, None)
+        _pending_clubs.pop(cid, None)
+        _club_states[cid] = new
         for player in club.members.values():
             set_player(player)
             _pending_players.pop(player.user_id, None)
     else:
-        _pending_clubs[club.club_id] = club
+        _pending_clubs[cid] = club
+        _pending_club_states[cid] = new
 
 def delete_club(club_id: str, conn: sqlite3.Connection | None = None) -> None:
     """Remove a club while preserving its match history."""
+    _mark_changed("clubs", club_id)
     close = conn is None
     if conn is None:
         conn = _connect()
     cur = conn.cursor()
     cur.execute("DELETE FROM clubs WHERE club_id = ?", (club_id,))
     cur.execute("DELETE FROM club_meta WHERE club_id = ?", (club_id,))
+    members = [
+        r["user_id"]
+        for r in cur.execute("SELECT user_id FROM club_members WHERE club_id = ?", (club_id,)).fetchall()
+    ]
     cur.execute("DELETE FROM club_members WHERE club_id = ?", (club_id,))
+    _refresh_first_join(cur, members)
     cur.execute("DELETE FROM pending_matches WHERE club_id = ?", (club_id,))
     cur.execute("DELETE FROM appointments WHERE club_id = ?", (club_id,))
     if close:
@@ -2051,11 +4220,10 @@ def delete_club(club_id: str, conn: sqlite3.Connection | None = None) -> None:
         conn.close()
         if _clubs_cache is not None:
             _clubs_cache.pop(club_id, None)
-        if _redis:
-            try:
-                _redis.delete(f"tennis:club:{club_id}")
-            except Exception:
-                pass
+        _club_states.pop(club_id, None)
+        _mark_fresh("clubs", club_id)
+        _drop_cache("clubs", club_id)
     else:
         _pending_clubs[club_id] = None
+        _pending_club_states[club_id] = None
 
@@ -1,11 +1,25 @@
-import os
-import json
+"""WeChat subscribe messages.
+
+All requests to the WeChat API go through one connection-pooled
+``httpx.AsyncClient`` per event loop (:func:`get_client`). The access token
+is kept in process memory and in Redis so other workers can reuse it; it is
+refreshed :data:`TOKEN_REFRESH_MARGIN` seconds before it expires, and only
+one refresh per event loop is in flight at a time. Concurrent senders keep
+using the old token while it is still valid.
+"""
+
+from __future__ import annotations
+
 import asyncio
+import threading
+import time
+import weakref
+
 import httpx
 import redis
 
-from .config import get_wechat_appid, get_wechat_secret, get_redis_url
-from .storage import consume_subscribe_quota, log_subscribe_error
+from .config import get_wechat_api_base, get_wechat_appid, get_wechat_secret, get_redis_url
+from .storage import enqueue_notification
 
 TEMPLATE_ID = "uqaaIKXK918Yz4FGODyiuB4uJgMFkXC_63vTGq-0G2c"
 
@@ -18,52 +32,193 @@ if REDIS_URL:
         _redis = None
 
 TOKEN_KEY = "tennis:wx_token"
+# seconds before expiry at which the cached access token is refreshed
+TOKEN_REFRESH_MARGIN = 300
+# seconds cut from ``expires_in`` to allow for clock skew and latency
+TOKEN_EXPIRY_SLACK = 60
 
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+# in-process copy of the access token; ``_token_expires`` is time.monotonic()
+_token: str | None = None
+_token_expires = 0.0
+_token_guard = threading.Lock()
+# event loop -> asyncio.Lock serialising refreshes on that loop
+_refresh_locks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+# counters reported by :func:`client_stats`
+_stats = {
+    "token_hits": 0,
+    "token_redis_hits": 0,
+    "token_fetches": 0,
+    "token_fetch_errors": 0,
+    "sends": 0,
+    "send_errors": 0,
+    "send_seconds": 0.0,
+    "send_max_seconds": 0.0,
+}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the pooled client bound to the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        # a client of a finished loop cannot be closed from here; drop it
+        _client = httpx.AsyncClient(timeout=5)
+        _client_loop = loop
+    return _client
+
+
+async def close_client() -> None:
+    """Close the pooled client if it belongs to the running event loop."""
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        client, _client, _client_loop = _client, None, None
+        await client.aclose()
+
+
+def _refresh_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _refresh_locks.get(loop)
+    if lock is None:
+        lock = _refresh_locks[loop] = asyncio.Lock()
+    return lock
+
+
+def _cached_token() -> tuple[str | None, float]:
+    """Return the in-memory token and its remaining lifetime in seconds."""
+    with _token_guard:
+        if _token is None:
+            return None, 0.0
+        return _token, _token_expires - time.monotonic()
+
+
+def _store_token(token: str, lifetime: float) -> None:
+    global _token, _token_expires
+    with _token_guard:
+        _token = token
+        _token_expires = time.monotonic() + lifetime
+
+
+async def _get_access_token(client: httpx.AsyncClient | None = None) -> str | None:
+    """Return a cached WeChat access token or fetch a new one.
+
+    ``client`` is used for the request instead of :func:`get_client`.
+    """
+    token, remaining = _cached_token()
+    if token and remaining > TOKEN_REFRESH_MARGIN:
+        _stats["token_hits"] += 1
+        return token
+    lock = _refresh_lock()
+    if token and remaining > 0 and lock.locked():
+        # early refresh already running; the old token still works
+        _stats["token_hits"] += 1
+        return token
+    async with lock:
+        token, remaining = _cached_token()
+        if token and remaining > TOKEN_REFRESH_MARGIN:
+            _stats["token_hits"] += 1
+            return token
+        fresh = await _refresh_access_token(client)
+    if fresh:
+        return fresh
+    return token if remaining > 0 else None
+
+
+def _redis_token() -> tuple[str | None, float]:
+    if not _redis:
+        return None, 0.0
+    try:
+        pipe = _redis.pipeline()
+        pipe.get(TOKEN_KEY)
+        pipe.ttl(TOKEN_KEY)
+        token, ttl = pipe.execute()
+    except Exception:
+        return None, 0.0
+    if not token:
+        return None, 0.0
+    return (token.decode() if isinstance(token, bytes) else token), float(ttl or 0)
 
-async def _get_access_token() -> str | None:
-    """Return a cached WeChat access token or fetch a new one."""
-    if _redis:
-        try:
-            token = _redis.get(TOKEN_KEY)
-            if token:
-                return token.decode() if isinstance(token, bytes) else token
-        except Exception:
-            pass
+
+async def _refresh_access_token(client: httpx.AsyncClient | None) -> str | None:
+    # another worker may already have refreshed the shared token
+    token, ttl = _redis_token()
+    if token and ttl > TOKEN_REFRESH_MARGIN:
+        _stats["token_redis_hits"] += 1
+        _store_token(token, ttl)
+        return token
 
     appid = get_wechat_appid()
     secret = get_wechat_secret()
     if not appid or not secret:
         return None
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(
-                "https://api.weixin.qq.com/cgi-bin/token",
-                params={
-                    "grant_type": "client_credential",
-                    "appid": appid,
-                    "secret": secret,
-                },
-                timeout=5,
-            )
-            data = resp.json()
-        except Exception:
-            return None
+    _stats["token_fetches"] += 1
+    try:
+        resp = await _fetch_token(client or get_client(), appid, secret)
+        data = resp.json()
+    except Exception:
+        _stats["token_fetch_errors"] += 1
+        return None
 
     token = data.get("access_token")
     if not token:
+        _stats["token_fetch_errors"] += 1
         return None
-    expires = int(data.get("expires_in", 0))
+    lifetime = max(int(data.get("expires_in", 0)) - TOKEN_EXPIRY_SLACK, 1)
+    _store_token(token, lifetime)
     if _redis:
         try:
-            _redis.setex(TOKEN_KEY, expires - 60, token)
+            _redis.setex(TOKEN_KEY, lifetime, token)
         except Exception:
             pass
     return token
 
 
-async def _send(openid: str, audit_type: str, audit_status: str, page: str) -> dict:
-    token = await _get_access_token()
+def drop_access_token() -> None:
+    """Forget the cached access token after WeChat rejected it."""
+    global _token, _token_expires
+    with _token_guard:
+        _token = None
+        _token_expires = 0.0
+    if _redis:
+        try:
+            _redis.delete(TOKEN_KEY)
+        except Exception:
+            pass
+
+
+def client_stats() -> dict:
+    """Return token and send counters of this process."""
+    stats = dict(_stats)
+    token, remaining = _cached_token()
+    stats["token_ttl"] = max(int(remaining), 0) if token else None
+    stats["send_avg_seconds"] = stats["send_seconds"] / stats["sends"] if stats["sends"] else 0.0
+    return stats
+
+
+async def _fetch_token(client: httpx.AsyncClient, appid: str, secret: str):
+    return await client.get(
+        get_wechat_api_base() + "/cgi-bin/token",
+        params={
+            "grant_type": "client_credential",
+            "appid": appid,
+            "secret": secret,
+        },
+        timeout=5,
+    )
+
+
+async def _send(
+    openid: str,
+    audit_type: str,
+    audit_status: str,
+    page: str,
+    client: httpx.AsyncClient | None = None,
+) -> dict:
+    token = await _get_access_token(client)
     if not token or not openid:
         return {"errcode": -1, "errmsg": "no token"}
 
@@ -76,30 +231,29 @@ async def _send(openid: str, audit_type: str, audit_status: str, page: str) -> d
             "thing17": {"value": audit_status[:20]},
         },
     }
-    url = "https://api.weixin.qq.com/cgi-bin/message/subscribe/send?access_token=" + token
+    url = get_wechat_api_base() + "/cgi-bin/message/subscribe/send?access_token=" + token
+    started = time.perf_counter()
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, json=payload, timeout=5)
-            result = resp.json()
+        resp = await (client or get_client()).post(url, json=payload, timeout=5)
+        result = resp.json()
     except Exception as exc:
+        _stats["send_errors"] += 1
         return {"errcode": -1, "errmsg": str(exc)}
+    finally:
+        elapsed = time.perf_counter() - started
+        _stats["sends"] += 1
+        _stats["send_seconds"] += elapsed
+        _stats["send_max_seconds"] = max(_stats["send_max_seconds"], elapsed)
     return result
 
 
 def send_audit_message(user_id: str, openid: str, scene: str, audit_type: str, audit_status: str, page: str) -> None:
-    """Send an audit result message and manage quota."""
-    if not consume_subscribe_quota(user_id, scene):
-        return
-    data = asyncio.run(_send(openid, audit_type, audit_status, page))
-    errcode = data.get("errcode", 0)
-    if errcode == 0:
-        return
-    if errcode == 43101:
-        log_subscribe_error(user_id, scene, errcode, data.get("errmsg", ""))
-    elif errcode == 40001 and _redis:
-        try:
-            _redis.delete(TOKEN_KEY)
-        except Exception:
-            pass
-    else:
-        log_subscribe_error(user_id, scene, errcode, data.get("errmsg", ""))
+    """Queue an audit result message for :mod:`tennis.notifications`.
+
+    Nothing is sent from the calling request; the dispatcher checks the
+    subscription quota and delivers the message in the background.
+    """
+    enqueue_notification(user_id, openid, scene, audit_type, audit_status, page)
+    from . import notifications
+
+    notifications.wake()
@@ -1,6 +1,6 @@
 import importlib
+import importlib.util
 import pytest
-import importlib
 import testing.postgresql
 import fakeredis
 import tennis.storage as storage
@@ -25,6 +25,26 @@ def use_postgres(monkeypatch):
         storage.invalidate_cache()
 
 
+@pytest.fixture
+def worker(monkeypatch):
+    """Return a second storage module sharing a fake Redis server with this one."""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(storage, "_redis", fakeredis.FakeRedis(server=server))
+    spec = importlib.util.find_spec("tennis.storage")
+    other = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(other)
+    other._redis = fakeredis.FakeRedis(server=server)
+    yield other
+    other.stop_cache_subscriber()
+
+
+@pytest.fixture
+def api():
+    """Return a freshly loaded :mod:`tennis.api`."""
+    importlib.reload(importlib.import_module("tennis.services.state"))
+    return importlib.reload(importlib.import_module("tennis.api"))
+
+
 def fetch(conn, query, *args):
     """Return the first row for ``query`` using the given SQLite connection."""
     cur = conn.cursor()
@@ -39,7 +59,8 @@ def inject_auth_header(monkeypatch):
     orig_request = TestClient.request
 
     def wrapped(self, method, url, *args, **kwargs):
-        headers = kwargs.setdefault("headers", {})
+        headers = kwargs.get("headers") or {}
+        kwargs["headers"] = headers
 
         if "json" in kwargs and isinstance(kwargs["json"], dict):
             token = kwargs["json"].pop("token", None)
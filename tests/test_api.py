@@ -869,9 +869,9 @@ def test_veto_pending_match(tmp_path, monkeypatch):
     assert resp.json()["status"] == "vetoed"
 
     with storage._connect() as conn:
-        row = conn.execute("SELECT data FROM pending_matches").fetchone()
+        row = conn.execute("SELECT status FROM pending_matches").fetchone()
         assert row is not None
-        assert json.loads(row[0])["status"] == "vetoed"
+        assert row["status"] == "vetoed"
         msgs = conn.execute(
             "SELECT text FROM messages WHERE user_id = 'p1'"
         ).fetchall()
@@ -926,8 +926,8 @@ def test_veto_pending_doubles(tmp_path, monkeypatch):
     assert resp.json()["status"] == "vetoed"
 
     with storage._connect() as conn:
-        row = conn.execute("SELECT data FROM pending_matches").fetchone()
-        assert json.loads(row[0])["status"] == "vetoed"
+        row = conn.execute("SELECT status FROM pending_matches").fetchone()
+        assert row["status"] == "vetoed"
         msgs = conn.execute(
             "SELECT text FROM messages WHERE user_id = 'p1'"
         ).fetchall()
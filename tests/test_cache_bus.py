@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+import tennis.storage as storage
+from tennis.models import Club, Player, User
+
+
+@pytest.fixture
+def workers(worker):
+    """Return two copies of the storage module sharing a fake Redis server."""
+    club = Club(club_id="c1", name="C1", leader_id="p1")
+    club.members["p1"] = Player("p1", "P1", singles_rating=1000.0)
+    storage.save_club(club)
+    storage.create_user(User("u1", "U1", password_hash="pw"))
+    storage.increment_cache_version()
+    storage.invalidate_cache()
+    return storage, worker
+
+
+def _wait(cond, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _rename_club(worker, name):
+    club = worker.get_club("c1")
+    club.name = name
+    with worker.transaction() as conn:
+        worker.save_club(club, conn=conn)
+
+
+def test_events_are_applied_without_redis_reads(workers):
+    a, b = workers
+    sub = b.start_cache_subscriber()
+    assert _wait(lambda: sub.healthy)
+    version = b.sync_cache_events(b.get_cache_version())
+    user = b.get_user("u1")
+    b.get_club("c1")
+
+    _rename_club(a, "Renamed")
+    assert _wait(lambda: sub._events)
+
+    def no_redis(*args, **kwargs):
+        raise AssertionError("Redis was read on the request path")
+
+    b._redis.get = no_redis
+    version = b.sync_cache_events(version)
+    del b._redis.get
+    assert version == a.get_cache_version()
+    assert "c1" not in b._clubs_cache
+    assert b.get_user("u1") is user
+    assert b.get_club("c1").name == "Renamed"
+    assert b.cache_stats()["events"] == 1
+
+
+def test_polls_when_subscription_is_down(workers):
+    a, b = workers
+    version = b.get_cache_version()
+    b.get_club("c1")
+
+    _rename_club(a, "Polled")
+
+    assert b.cache_stats()["subscriber"] == "off"
+    version = b.sync_cache_events(version)
+    assert version == a.get_cache_version()
+    assert b.get_club("c1").name == "Polled"
+    assert b.cache_stats()["polls"] == 1
+
+
+def test_missed_event_falls_back_to_change_records(workers):
+    a, b = workers
+    sub = b.start_cache_subscriber()
+    assert _wait(lambda: sub.healthy)
+    version = b.sync_cache_events(b.get_cache_version())
+    b.get_club("c1")
+
+    _rename_club(a, "First")
+    _rename_club(a, "Second")
+    assert _wait(lambda: len(sub._events) == 2)
+    # drop the first event as if the message had been lost
+    del sub._events[0]
+
+    version = b.sync_cache_events(version)
+    assert version == a.get_cache_version()
+    assert b.get_club("c1").name == "Second"
+    assert b.cache_stats()["full_invalidations"] == 0
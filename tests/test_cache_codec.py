@@ -0,0 +1,161 @@
+import datetime
+import time
+import types
+
+import fakeredis
+import pytest
+
+import tennis.storage as storage
+from tennis import cache_codec
+from tennis.models import Club, Player, Match, User
+
+
+def test_codec_roundtrip_and_version_check(monkeypatch):
+    record = ["name", 1.5, None, {"a": [1, 2]}]
+    assert cache_codec.decode(cache_codec.encode(record)) == record
+
+    big = ["x" * 5000]
+    data = cache_codec.encode(big)
+    assert len(data) < 1000
+    assert cache_codec.decode(data) == big
+
+    data = cache_codec.encode(record, expires=1000)
+    assert cache_codec.decode(data, now=999) == record
+    assert cache_codec.decode(data, now=1000) is None
+
+    monkeypatch.setattr(cache_codec, "FORMAT_VERSION", cache_codec.FORMAT_VERSION + 1)
+    assert cache_codec.decode(data) is None
+    assert cache_codec.decode(b"") is None
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(storage, "_redis", client)
+    return client
+
+
+def _setup():
+    c1 = Club(club_id="c1", name="C1", leader_id="p1")
+    c2 = Club(club_id="c2", name="C2", leader_id="p3")
+    p1 = Player("p1", "P1", singles_rating=1000.0)
+    p2 = Player("p2", "P2", singles_rating=1000.0)
+    p3 = Player("p3", "P3", singles_rating=1000.0)
+    c1.members.update({"p1": p1, "p2": p2})
+    c2.members.update({"p1": p1, "p3": p3})
+    c1.matches.append(
+        Match(date=datetime.date(2023, 1, 1), player_a=p1, player_b=p2, score_a=6, score_b=3)
+    )
+    c2.matches.append(
+        Match(date=datetime.date(2023, 1, 2), player_a=p1, player_b=p3, score_a=6, score_b=4)
+    )
+    c1.pending_matches.append(
+        Match(date=datetime.date(2023, 1, 3), player_a=p2, player_b=p1, score_a=6, score_b=2, initiator="p2")
+    )
+    storage.save_club(c1)
+    storage.save_club(c2)
+    storage.increment_cache_version()
+    storage.invalidate_cache()
+
+
+def test_club_is_served_from_entity_records(fake_redis, monkeypatch):
+    _setup()
+    # the first read comes from the database and fills the Redis records
+    storage.get_club("c1")
+    storage.get_club("c2")
+    storage.invalidate_cache()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("database queried")
+
+    monkeypatch.setattr(storage, "_connect", fail)
+    club = storage.get_club("c1")
+    assert set(club.members) == {"p1", "p2"}
+    p1 = club.members["p1"]
+    assert [m.club_id for m in p1.singles_matches] == ["c1", "c2"]
+    assert club.matches[0] is p1.singles_matches[0]
+    assert club.pending_matches[0].initiator == "p2"
+    assert club.pending_matches[0].player_b is p1
+
+    other = storage.get_club("c2")
+    assert other.members["p1"] is p1
+    assert other.matches[0] is p1.singles_matches[1]
+    assert storage.get_player("p3") is other.members["p3"]
+
+
+def test_records_are_versioned_per_entity(fake_redis):
+    _setup()
+    storage.get_club("c1")
+    clubs = fake_redis.hgetall(storage.CACHE_HASHES["clubs"])
+    players = fake_redis.hgetall(storage.CACHE_HASHES["players"])
+    assert set(clubs) == {b"c1", b"c2"}
+    assert {b"p1", b"p2"} <= set(players)
+    assert all(v[0] == cache_codec.FORMAT_VERSION for v in (*clubs.values(), *players.values()))
+    assert fake_redis.ttl(storage.CACHE_HASHES["clubs"]) > 0
+
+
+def test_write_drops_outdated_history(fake_redis):
+    _setup()
+    club = storage.get_club("c1")
+    assert fake_redis.hexists(storage.CACHE_HASHES["histories"], "p1")
+
+    p1, p2 = club.members["p1"], club.members["p2"]
+    club.matches.append(
+        Match(date=datetime.date(2023, 2, 1), player_a=p1, player_b=p2, score_a=6, score_b=0)
+    )
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+
+    assert not fake_redis.hexists(storage.CACHE_HASHES["histories"], "p1")
+    storage.invalidate_cache()
+    assert len(storage.get_player("p1").singles_matches) == 3
+
+
+def test_user_record_roundtrip(fake_redis):
+    user = User("u1", "U1", password_hash="pw", max_joinable_clubs=3)
+    storage.create_user(user)
+    storage.create_message_record("u1", "hi", date=datetime.date(2024, 1, 1))
+    storage.invalidate_cache()
+    loaded = storage.get_user("u1")
+    storage.invalidate_cache()
+
+    cached = storage.get_user("u1")
+    assert cached is not loaded
+    assert cached.max_joinable_clubs == 3
+    assert [(m.date, m.text, m.read) for m in cached.messages] == [
+        (datetime.date(2024, 1, 1), "hi", False)
+    ]
+
+
+def test_records_expire_individually(fake_redis, monkeypatch):
+    _setup()
+    storage.get_club("c1")
+    assert storage._load_cache("clubs", ["c1"]) is not None
+
+    later = time.time() + storage.CACHE_TTL + 1
+    monkeypatch.setattr(storage, "time", types.SimpleNamespace(time=lambda: later))
+    assert storage._load_cache("clubs", ["c1"]) is None
+
+
+def test_edited_and_deleted_match_records_are_dropped(fake_redis):
+    _setup()
+    club = storage.get_club("c1")
+    match = club.matches[0]
+    key = storage.CACHE_HASHES["matches"]
+    assert fake_redis.hexists(key, str(match.id))
+
+    match.location = "Court 9"
+    with storage.transaction() as conn:
+        storage.update_match_record("matches", match, conn=conn)
+    assert not fake_redis.hexists(key, str(match.id))
+
+    # the next read stores the edited record again
+    storage.invalidate_cache()
+    storage.get_club("c1")
+    storage.invalidate_cache()
+    assert storage.get_club("c1").matches[0].location == "Court 9"
+
+    with storage.transaction() as conn:
+        storage.delete_match_record("matches", match.id, conn=conn)
+    assert not fake_redis.hexists(key, str(match.id))
+    assert match.id not in storage._matches_cache
@@ -0,0 +1,181 @@
+import datetime
+
+import pytest
+
+import tennis.storage as storage
+from tennis.models import Club, Player, Match, User
+
+
+@pytest.fixture
+def workers(worker):
+    """Return two independent copies of the storage module sharing Redis."""
+    c1 = Club(club_id="c1", name="C1", leader_id="p1")
+    c2 = Club(club_id="c2", name="C2", leader_id="p3")
+    p1 = Player("p1", "P1", singles_rating=1000.0)
+    p2 = Player("p2", "P2", singles_rating=1000.0)
+    p3 = Player("p3", "P3", singles_rating=1000.0)
+    c1.members.update({"p1": p1, "p2": p2})
+    c2.members.update({"p1": p1, "p3": p3})
+    c1.matches.append(
+        Match(date=datetime.date(2023, 1, 1), player_a=p1, player_b=p2, score_a=6, score_b=3)
+    )
+    storage.save_club(c1)
+    storage.save_club(c2)
+    storage.create_user(User("u1", "U1", password_hash="pw"))
+    storage.create_user(User("u2", "U2", password_hash="pw"))
+    storage.increment_cache_version()
+    storage.invalidate_cache()
+    return storage, worker
+
+
+def test_only_changed_entities_are_refreshed(workers):
+    a, b = workers
+    version = b.get_cache_version()
+    c2 = b.get_club("c2")
+    b.get_club("c1")
+    u2 = b.get_user("u2")
+    b.get_user("u1")
+
+    club = a.get_club("c1")
+    club.name = "Renamed"
+    user = a.get_user("u1")
+    user.name = "New"
+    with a.transaction() as conn:
+        a.save_club(club, conn=conn)
+        a.update_user_record(user, conn=conn)
+
+    version = b.sync_cache(version)
+    assert version == a.get_cache_version()
+    assert b.get_club("c1").name == "Renamed"
+    assert b.get_user("u1").name == "New"
+    assert b.get_club("c2") is c2
+    assert b.get_user("u2") is u2
+    stats = b.cache_stats()
+    assert stats["full_invalidations"] == 0
+    assert stats["club_refreshes"] == 1
+    assert stats["user_refreshes"] == 1
+
+
+def test_players_are_refreshed_in_place(workers):
+    a, b = workers
+    version = b.get_cache_version()
+    c2 = b.get_club("c2")
+    p1 = c2.members["p1"]
+    assert len(p1.singles_matches) == 1
+
+    club = a.get_club("c1")
+    winner, loser = club.members["p1"], club.members["p2"]
+    winner.singles_rating = 1010.0
+    club.matches.append(
+        Match(date=datetime.date(2023, 2, 1), player_a=winner, player_b=loser, score_a=6, score_b=1)
+    )
+    with a.transaction() as conn:
+        a.save_club(club, conn=conn)
+
+    b.sync_cache(version)
+    assert b.get_club("c2") is c2
+    assert c2.members["p1"] is p1
+    assert p1.singles_rating == 1010.0
+    assert len(p1.singles_matches) == 2
+    assert b.cache_stats()["player_refreshes"] >= 1
+
+
+def test_complete_cache_picks_up_new_clubs(workers):
+    a, b = workers
+    version = b.get_cache_version()
+    clubs, _ = b.load_data()
+    assert set(clubs) == {"c1", "c2"}
+
+    a.create_club(Club(club_id="c3", name="C3", leader_id="p1"))
+    a.increment_cache_version()
+
+    b.sync_cache(version)
+    assert b.get_club("c3").name == "C3"
+    clubs, _ = b.load_data()
+    assert set(clubs) == {"c1", "c2", "c3"}
+    assert b.cache_stats()["full_loads"] == 1
+
+
+def test_missing_change_record_drops_everything(workers):
+    a, b = workers
+    version = b.get_cache_version()
+    c2 = b.get_club("c2")
+
+    new = a.increment_cache_version()
+    a._redis.delete(a.CACHE_CHANGES_KEY.format(new))
+
+    assert b.sync_cache(version) == new
+    assert b.get_club("c2") is not c2
+    assert b.cache_stats()["full_invalidations"] == 1
+
+
+def test_own_writes_are_not_reloaded(workers):
+    a, _ = workers
+    version = a.get_cache_version()
+    club = a.get_club("c1")
+    club.name = "Mine"
+    with a.transaction() as conn:
+        a.save_club(club, conn=conn)
+
+    a.sync_cache(version)
+    assert a.get_club("c1") is club
+    assert a.cache_stats()["club_refreshes"] == 0
+
+
+def test_own_writes_outside_the_cache_are_reloaded(workers):
+    a, _ = workers
+    user = a.get_user("u1")
+    a.create_message_record("u1", "hello")
+
+    assert a.get_user("u1") is not user
+    assert [m.text for m in a.get_user("u1").messages] == ["hello"]
+
+
+def test_edited_matches_are_refreshed_in_place(workers):
+    a, b = workers
+    version = b.get_cache_version()
+    p1 = b.get_club("c2").members["p1"]
+    match = p1.singles_matches[0]
+
+    edited = a.get_club("c1").matches[0]
+    edited.score_b = 4
+    edited.location = "Court 2"
+    with a.transaction() as conn:
+        a.update_match_record("matches", edited, conn=conn)
+
+    b.sync_cache(version)
+    assert p1.singles_matches[0] is match
+    assert (match.score_b, match.location) == (4, "Court 2")
+
+
+class _Recorder:
+    def __init__(self):
+        self.touched = []
+        self.resets = 0
+
+    def touch(self, kind, ids):
+        self.touched.append((kind, set(ids)))
+
+    def reset(self):
+        self.resets += 1
+
+
+def test_registered_indexes_follow_writes_of_both_workers(workers, monkeypatch):
+    a, b = workers
+    monkeypatch.setattr(a, "_indexes", [])
+    version = b.get_cache_version()
+    mine, theirs = _Recorder(), _Recorder()
+    a.register_index(mine)
+    b.register_index(theirs)
+    assert b.register_index(theirs) is theirs
+
+    club = a.get_club("c1")
+    club.name = "Renamed"
+    with a.transaction() as conn:
+        a.save_club(club, conn=conn)
+    assert ("clubs", {"c1"}) in mine.touched
+    b.sync_cache(version)
+    assert theirs.touched == [("clubs", {"c1"})]
+
+    b.invalidate_cache()
+    assert (mine.resets, theirs.resets) == (0, 1)
@@ -0,0 +1,46 @@
+import datetime
+
+import tennis.models as models
+import tennis.storage as storage
+from tennis import clubstats
+from tennis.services.stats import _club_stats
+
+
+def _save(cid, *players):
+    club = models.Club(club_id=cid, name=cid.upper())
+    for p in players:
+        club.members[p.user_id] = p
+    storage.save_club(club)
+
+
+def _stats(cid):
+    return _club_stats(storage.get_club(cid))
+
+
+def test_stats_reused_until_club_or_member_changes():
+    _save("c1", models.Player("p1", "P1", singles_rating=1000.0), models.Player("p2", "P2", singles_rating=1100.0))
+    _save("c2", models.Player("p2", "P2", singles_rating=1100.0))
+    assert _stats("c1")["singles_rating_range"] == [1000.0, 1100.0]
+    _stats("c2")
+    builds = clubstats.cache_stats()["builds"]
+    stats = _stats("c1")
+    stats["singles_rating_range"].append(0)
+    assert _stats("c1")["singles_rating_range"] == [1000.0, 1100.0]
+    assert clubstats.cache_stats()["builds"] == builds
+
+    # a member's rating changes the statistics of each of their clubs
+    p2 = storage.get_club("c1").members["p2"]
+    p2.singles_rating = 1300.0
+    storage.update_player_record(p2)
+    assert _stats("c1")["singles_rating_range"] == [1000.0, 1300.0]
+    assert _stats("c2") == clubstats.compute(storage.get_club("c2"))
+    assert clubstats.cache_stats()["builds"] == builds + 2
+
+    # new members are added to the cached club, as cli.add_player does
+    p3 = models.Player("p3", "P3", singles_rating=700.0)
+    storage.get_club("c1").members["p3"] = p3
+    storage.create_player("c1", p3, joined=datetime.date(2024, 1, 1))
+    stats = _stats("c1")
+    assert stats["member_count"] == 3
+    assert stats["singles_rating_range"] == [700.0, 1300.0]
+    assert stats == clubstats.compute(storage.get_club("c1"))
@@ -0,0 +1,90 @@
+import gc
+import importlib
+import threading
+import pytest
+from fastapi.testclient import TestClient
+import tennis.storage as storage
+from tennis.models import User
+
+
+def test_connections_are_reused_and_schema_set_up_once(monkeypatch):
+    calls = []
+    orig = storage._init_schema
+    monkeypatch.setattr(storage, "_init_schema", lambda conn: calls.append(1) or orig(conn))
+
+    conn = storage._connect()
+    raw = conn._conn
+    conn.close()
+    for _ in range(3):
+        conn = storage._connect()
+        assert conn._conn is raw
+        conn.close()
+
+    assert len(calls) == 1
+    stats = storage.pool_stats()
+    assert stats["size"] == 1
+    assert stats["in_use"] == 0
+    assert stats["checkouts"] == 4
+
+
+def test_transaction_returns_connection_on_rollback():
+    with pytest.raises(RuntimeError):
+        with storage.transaction() as conn:
+            storage.create_user(User("u1", "U1", password_hash="pw"), conn=conn)
+            raise RuntimeError("fail")
+    assert storage.pool_stats()["in_use"] == 0
+
+    # the rolled back insert must not leak into the next checkout
+    conn = storage._connect()
+    row = conn.cursor().execute("SELECT user_id FROM users WHERE user_id = 'u1'").fetchone()
+    conn.close()
+    assert row is None
+
+
+def test_bounded_pool_waits_for_release(monkeypatch):
+    monkeypatch.setattr(storage, "get_db_pool_size", lambda: 1)
+    monkeypatch.setattr(storage, "get_db_pool_timeout", lambda: 0.2)
+    if not storage.IS_PG:
+        pytest.skip("SQLite keeps one unbounded pool per thread")
+
+    held = storage._connect()
+    with pytest.raises(TimeoutError):
+        storage._connect()
+
+    timer = threading.Timer(0.05, held.close)
+    timer.start()
+    conn = storage._connect()
+    conn.close()
+    timer.join()
+
+    stats = storage.pool_stats()
+    assert stats["size"] == 1
+    assert stats["waits"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["wait_time_max"] > 0
+
+
+def test_sys_metrics_endpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_FILE", tmp_path / "tennis.db")
+    api = importlib.reload(importlib.import_module("tennis.api"))
+    client = TestClient(api.app)
+    client.get("/clubs")
+
+    data = client.get("/sys/metrics").json()
+    assert data["db_pool"]["checkouts"] >= 1
+    assert "wait_time_total" in data["db_pool"]
+
+
+def test_failed_statement_returns_connection():
+    storage.create_user(User("u1", "U1", password_hash="pw"))
+    for _ in range(3):
+        with pytest.raises(Exception):
+            storage.create_user(User("u1", "U1", password_hash="pw"))
+    gc.collect()
+    stats = storage.pool_stats()
+    assert stats["in_use"] == 0
+    assert stats["size"] <= 1
+
+    conn = storage._connect()
+    assert conn.execute("SELECT COUNT(*) AS n FROM users").fetchone()["n"] == 1
+    conn.close()
@@ -0,0 +1,137 @@
+import datetime
+import json
+
+import psycopg2
+import pytest
+from fastapi import HTTPException, Response
+
+import tennis.models as models
+import tennis.storage as storage
+from tennis import cursors
+
+
+def _pages(fetch, limit):
+    """Follow ``X-Next-Cursor`` through every page of ``fetch``."""
+    pages, cursor = [], None
+    while True:
+        response = Response()
+        pages.append(fetch(response=response, limit=limit, cursor=cursor))
+        cursor = response.headers.get(cursors.HEADER)
+        if cursor is None:
+            return pages
+
+
+def _world():
+    club = models.Club(club_id="c1", name="C1", leader_id="p0")
+    for i in range(5):
+        storage.create_user(models.User(f"p{i}", f"P{i}", "pw"))
+        club.members[f"p{i}"] = models.Player(f"p{i}", f"P{i}", singles_rating=1000.0 + 10 * i, doubles_rating=900.0)
+    storage.save_club(club)
+    storage.save_club(models.Club(club_id="c2", name="Second"))
+    players = club.members
+    for day in range(1, 4):
+        m = models.Match(
+            date=datetime.date(2024, 1, day),
+            player_a=players["p0"],
+            player_b=players["p1"],
+            score_a=6,
+            score_b=day,
+            created_ts=datetime.datetime(2024, 1, day, 9),
+            approved_ts=datetime.datetime(2024, 1, 5 - day, 12),
+        )
+        storage.create_match(club.club_id, m)
+    d = models.DoublesMatch(
+        date=datetime.date(2024, 2, 1),
+        player_a1=players["p0"],
+        player_a2=players["p1"],
+        player_b1=players["p2"],
+        player_b2=players["p3"],
+        score_a=6,
+        score_b=4,
+        created_ts=datetime.datetime(2024, 2, 1, 9),
+    )
+    storage.create_match(club.club_id, d)
+
+
+def test_player_pages_follow_cursor(api):
+    _world()
+    pages = _pages(lambda **kw: api.list_all_players(club="c1", **kw), 2)
+    assert [[p["user_id"] for p in page] for page in pages] == [["p4", "p3"], ["p2", "p1"], ["p0"]]
+
+    # the cursor belongs to one list and sort order
+    response = Response()
+    api.list_all_players(response=response, limit=1)
+    cursor = response.headers[cursors.HEADER]
+    with pytest.raises(HTTPException) as exc:
+        api.list_all_players(response=Response(), doubles=True, cursor=cursor)
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException):
+        api.list_all_players(response=Response(), cursor="garbage")
+
+    # offset still works, alone or after a cursor
+    assert [p["user_id"] for p in api.list_all_players(response=Response(), limit=2, offset=3)] == ["p1", "p0"]
+    rows = api.list_all_players(response=Response(), limit=1, offset=1, cursor=cursor)
+    assert [p["user_id"] for p in rows] == ["p2"]
+
+
+def test_sys_lists_page_by_id(api):
+    _world()
+    pages = _pages(lambda **kw: api.list_all_users(None, **kw), 2)
+    assert [[u["user_id"] for u in page] for page in pages] == [["p0", "p1"], ["p2", "p3"], ["p4"]]
+
+    pages = _pages(lambda **kw: api.list_all_clubs(**kw), 1)
+    assert [[c["club_id"] for c in page] for page in pages] == [["c1"], ["c2"]]
+    assert [c["club_id"] for c in api.list_all_clubs(Response(), query="SEC")] == ["c2"]
+    assert api.list_all_clubs(Response(), query="%") == []
+
+
+def test_id_pages_sort_by_code_point():
+    if storage.IS_PG:
+        # a linguistic collation puts "b" before "B" and ignores "_" and "-";
+        # databases without ICU support keep their own collation
+        try:
+            with storage.transaction() as conn:
+                conn.execute('ALTER TABLE users ALTER COLUMN user_id TYPE TEXT COLLATE "unicode"')
+        except psycopg2.Error:
+            pass
+    ids = ["b", "B", "a_b", "aB", "ab", "_z", "Z", "a-c"]
+    for uid in ids:
+        storage.create_user(models.User(uid, uid.upper(), "pw"))
+    seen, after = [], None
+    while True:
+        page = storage.user_ids_page(after=after, limit=3)
+        if not page:
+            break
+        seen.extend(page)
+        after = page[-1]
+    assert seen == sorted(ids)
+
+
+def test_match_feeds_page_in_approval_order(api):
+    _world()
+    pages = _pages(lambda **kw: api.list_all_matches(**kw), 2)
+    assert [[m["date"] for m in page] for page in pages] == [
+        ["2024-01-01", "2024-01-02"],
+        ["2024-01-03"],
+    ]
+    first = pages[0][0]
+    assert (first["player_a"], first["a_name"], first["club_id"]) == ("p0", "P0", "c1")
+    assert [m["date"] for m in api.list_all_matches(Response(), offset=2)] == ["2024-01-03"]
+
+    doubles = api.list_all_doubles(Response())
+    assert [(d["a1"], d["b2_name"]) for d in doubles] == [("p0", "P3")]
+
+
+def test_match_exports_stream_every_record(api, monkeypatch):
+    _world()
+    monkeypatch.setattr(api, "EXPORT_BATCH", 2)
+    chunks = list(api._export_feed(False))
+    assert len(chunks) == 2
+    lines = "".join(chunks).splitlines()
+    assert [json.loads(line) for line in lines] == api.list_all_matches(Response())
+
+    response = api.export_all_doubles()
+    assert response.media_type == "application/x-ndjson"
+    assert [json.loads(line) for line in "".join(api._export_feed(True)).splitlines()] == api.list_all_doubles(
+        Response()
+    )
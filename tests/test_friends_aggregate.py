@@ -0,0 +1,60 @@
+import datetime
+
+import pytest
+
+import tennis.models as models
+import tennis.storage as storage
+from tennis.services.exceptions import ServiceError
+from tennis.services.friends import get_player_friends
+
+
+def _club():
+    club = models.Club(club_id="c1", name="C1")
+    for uid in ("p1", "p2", "p3", "p4"):
+        club.members[uid] = models.Player(uid, uid.upper())
+    storage.save_club(club)
+    return storage.get_club("c1")
+
+
+def _totals(user_id):
+    return {f["user_id"]: (f["weight"], f["wins"], f["partner_games"]) for f in storage.friend_stats(user_id)}
+
+
+def test_totals_follow_approved_matches():
+    club = _club()
+    p = club.members
+    day = datetime.date(2024, 1, 1)
+    storage.create_match("c1", models.Match(date=day, player_a=p["p1"], player_b=p["p2"], score_a=6, score_b=4))
+    storage.create_match(
+        "c1",
+        models.DoublesMatch(
+            date=day,
+            player_a1=p["p1"],
+            player_a2=p["p3"],
+            player_b1=p["p2"],
+            player_b2=p["p4"],
+            score_a=3,
+            score_b=6,
+        ),
+    )
+    # pending matches count once approved
+    storage.create_match(
+        "c1", models.Match(date=day, player_a=p["p1"], player_b=p["p4"], score_a=6, score_b=0), pending=True
+    )
+
+    assert _totals("p1") == {"p2": (2.0, 1.0, 0.0), "p3": (1.0, 0.0, 1.0), "p4": (1.0, 0.0, 0.0)}
+    assert [f["user_id"] for f in get_player_friends("p1", limit=1)] == ["p2"]
+    before = {uid: _totals(uid) for uid in p}
+    assert storage.rebuild_friends() == 12
+    assert {uid: _totals(uid) for uid in p} == before
+
+    club = storage.get_club("c1")
+    club.matches = [m for m in club.matches if isinstance(m, models.DoublesMatch)]
+    storage.save_club(club)
+    assert _totals("p1") == {"p2": (1.0, 0.0, 0.0), "p3": (1.0, 0.0, 1.0), "p4": (1.0, 0.0, 0.0)}
+    assert _totals("p2")["p4"] == (1.0, 1.0, 1.0)
+
+
+def test_unknown_player():
+    with pytest.raises(ServiceError):
+        get_player_friends("nobody")
@@ -0,0 +1,117 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException, Response
+
+import tennis.models as models
+import tennis.storage as storage
+from tennis import cursors, history
+from tennis.cli import get_player_match_cards
+
+
+def _setup():
+    """p1 plays p2 in c1 and p3 in c2, approvals out of date order."""
+    c1 = models.Club(club_id="c1", name="C1")
+    c2 = models.Club(club_id="c2", name="C2")
+    p1, p2, p3 = (models.Player(f"p{i}", f"P{i}") for i in (1, 2, 3))
+    c1.members.update(p1=p1, p2=p2)
+    c2.members.update(p1=p1, p3=p3)
+    for day in range(1, 7):
+        club, opp = (c1, p2) if day % 2 else (c2, p3)
+        m = models.Match(
+            date=datetime.date(2024, 1, day),
+            player_a=p1,
+            player_b=opp,
+            score_a=6,
+            score_b=day,
+            club_id=club.club_id,
+            approved_ts=datetime.datetime(2024, 2, 7 - day) if day > 2 else None,
+        )
+        club.matches.append(m)
+        p1.singles_matches.append(m)
+        opp.singles_matches.append(m)
+    storage.save_club(c1)
+    storage.save_club(c2)
+
+
+def _scores(cards):
+    return [c["opponent_score"] for c in cards]
+
+
+def test_history_matches_card_order():
+    _setup()
+    player = storage.get_player("p1")
+    # approved matches first, newest approval first, then unapproved by date
+    rows = history.page(player, False)
+    assert [m.score_b for _, m in rows] == [3, 4, 5, 6, 2, 1]
+    assert [m.score_b for _, m in history.page(player, False, club_ids=["c1"])] == [3, 5, 1]
+    assert [m.score_b for _, m in history.page(player, False, after=rows[1][0], limit=2)] == [5, 6]
+
+    plain = {cid: storage.get_club(cid) for cid in ("c1", "c2")}
+    cards = get_player_match_cards(storage.club_view, "c2", "p1")
+    assert cards == get_player_match_cards(plain, "c2", "p1")
+    assert _scores(cards) == [4, 6, 2]
+    assert _scores(get_player_match_cards(storage.club_view, "c2", "p1", limit=1)) == [4]
+
+
+def test_records_follow_cursor_and_new_matches(api):
+    _setup()
+    pages, cursor = [], None
+    while True:
+        response = Response()
+        pages.append(_scores(api.get_global_player_records("p1", response, limit=4, cursor=cursor)))
+        cursor = response.headers.get(cursors.HEADER)
+        if cursor is None:
+            break
+    assert pages == [[3, 4, 5, 6], [2, 1]]
+    assert _scores(api.get_player_records("c1", "p1", Response(), offset=1)) == [5, 1]
+    with pytest.raises(HTTPException):
+        api.get_player_doubles_records("c1", "p1", Response(), cursor=cursor or "x")
+
+    club = storage.get_club("c1")
+    p1, p2 = club.members["p1"], club.members["p2"]
+    m = models.Match(
+        date=datetime.date(2024, 3, 1),
+        player_a=p2,
+        player_b=p1,
+        score_a=0,
+        score_b=6,
+        club_id="c1",
+        approved_ts=datetime.datetime(2024, 3, 1),
+    )
+    club.matches.append(m)
+    p1.singles_matches.append(m)
+    p2.singles_matches.append(m)
+    storage.save_club(club)
+
+    records = api.get_global_player_records("p1", Response(), limit=2)
+    assert [(c["self_score"], c["opponent_score"], c["club_id"]) for c in records] == [(6, 0, "c1"), (6, 3, "c1")]
+    recent = api.get_global_player("p1", None, recent=3)["recent_records"]
+    assert _scores(recent) == [0, 3, 4]
+
+
+def test_recent_records_of_player_without_club(api):
+    _setup()
+    player = storage.get_player("p3")
+    assert history.page(player, False, club_ids=[]) == []
+
+    storage.remove_club_member("c2", "p3")
+    storage.invalidate_cache()
+    assert api.get_global_player("p3", None, recent=5)["recent_records"] == []
+
+
+def test_player_profile_reads_only_the_players_memberships(api, monkeypatch):
+    _setup()
+    storage.create_user(models.User("p1", "P1", password_hash="pw"))
+    storage.remove_club_member("c2", "p3")
+    storage.invalidate_cache()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("every club loaded")
+
+    monkeypatch.setattr(storage, "load_data", fail)
+    data = api.get_global_player("p1", None, recent=2)
+    assert _scores(data["recent_records"]) == [3, 4]
+    assert api.leaderboard_full(Response(), user_id="p1", include_clubs=False, include_players=False) == {
+        "joined_clubs": ["c1", "c2"]
+    }
@@ -0,0 +1,76 @@
+import datetime
+import tennis.storage as storage
+from tennis.models import Club, Player, Match
+from tennis.services.clubs import record_match_result
+
+
+def _setup():
+    c1 = Club(club_id="c1", name="C1", leader_id="p1")
+    c2 = Club(club_id="c2", name="C2", leader_id="p3")
+    p1 = Player("p1", "P1", singles_rating=1000.0)
+    p2 = Player("p2", "P2", singles_rating=1000.0)
+    p3 = Player("p3", "P3", singles_rating=1000.0)
+    c1.members.update({"p1": p1, "p2": p2})
+    c2.members.update({"p1": p1, "p3": p3})
+    c1.matches.append(
+        Match(date=datetime.date(2023, 1, 1), player_a=p1, player_b=p2, score_a=6, score_b=3)
+    )
+    c2.matches.append(
+        Match(date=datetime.date(2023, 1, 2), player_a=p1, player_b=p3, score_a=6, score_b=4)
+    )
+    storage.save_club(c1)
+    storage.save_club(c2)
+    storage.invalidate_cache()
+
+
+def _fail_full_load(monkeypatch):
+    def fail():
+        raise AssertionError("whole database loaded")
+
+    monkeypatch.setattr(storage, "load_data", fail)
+    monkeypatch.setattr(storage, "load_users", fail)
+
+
+def test_get_club_loads_only_that_club(monkeypatch):
+    _setup()
+    _fail_full_load(monkeypatch)
+
+    club = storage.get_club("c1")
+    assert set(club.members) == {"p1", "p2"}
+    assert "c2" not in storage._clubs_cache
+    # a member's history includes matches played in other clubs
+    p1 = club.members["p1"]
+    assert [m.club_id for m in p1.singles_matches] == ["c1", "c2"]
+    assert [m.club_id for m in club.members["p2"].singles_matches] == ["c1"]
+
+    other = storage.get_club("c2")
+    assert other.members["p1"] is p1
+    assert other.matches[0] is p1.singles_matches[1]
+    assert club.matches[0] is p1.singles_matches[0]
+
+
+def test_get_player_loads_history(monkeypatch):
+    _setup()
+    _fail_full_load(monkeypatch)
+
+    p3 = storage.get_player("p3")
+    assert len(p3.singles_matches) == 1
+    assert p3.singles_matches[0].player_a.user_id == "p1"
+    # the opponent is shared but only gets its history when asked for
+    p1 = storage.get_player("p1")
+    assert p1 is p3.singles_matches[0].player_a
+    assert len(p1.singles_matches) == 2
+    assert storage._clubs_cache is None
+
+
+def test_club_service_skips_full_load(monkeypatch):
+    _setup()
+    _fail_full_load(monkeypatch)
+
+    record_match_result("c1", "p1", "p2", 6, 1, datetime.date(2023, 2, 1), 1.0)
+
+    assert len(storage.get_player("p1").singles_matches) == 3
+    storage.invalidate_cache()
+    club = storage.get_club("c1")
+    assert len(club.matches) == 2
+    assert len(club.members["p1"].singles_matches) == 3
@@ -0,0 +1,133 @@
+import datetime
+
+import tennis.storage as storage
+from tennis import leaderboard
+from tennis.models import Club, Match, Player
+from tennis.rating import update_ratings
+from tennis.services.stats import get_leaderboard
+
+
+def _setup():
+    c1 = Club(club_id="c1", name="C1", leader_id="p1")
+    c2 = Club(club_id="c2", name="C2", leader_id="p3")
+    p1 = Player("p1", "P1", singles_rating=1200.0, doubles_rating=900.0, age=30, gender="M", region="SH/Pudong")
+    p2 = Player("p2", "P2", singles_rating=1000.0, doubles_rating=1100.0, age=20, gender="F", region="SH/Xuhui")
+    p3 = Player("p3", "P3", singles_rating=1100.0, age=40, gender="M", region="BJ")
+    c1.members.update({"p1": p1, "p2": p2})
+    c2.members.update({"p2": p2, "p3": p3})
+    storage.save_club(c1)
+    storage.save_club(c2)
+    return c1, c2
+
+
+def _ids(rows):
+    return [row.player.user_id for row in rows]
+
+
+def test_pages_follow_rating_order():
+    _setup()
+    assert _ids(leaderboard.page(None, False)) == ["p1", "p3", "p2"]
+    assert _ids(leaderboard.page(None, True)) == ["p2", "p1", "p3"]
+    assert _ids(leaderboard.page(None, False, offset=1, limit=1)) == ["p3"]
+    assert _ids(leaderboard.page(["c1"], False, max_rating=1150)) == ["p2"]
+    assert _ids(leaderboard.page(None, False, min_rating=1050)) == ["p1", "p3"]
+    assert _ids(leaderboard.page(None, False, max_age=34)) == ["p1", "p2"]
+
+    # a member of both clubs is listed once, under the first club asked for
+    rows = leaderboard.page(["c2", "c1"], False)
+    assert [(r.player.user_id, r.club_id) for r in rows] == [("p1", "c1"), ("p3", "c2"), ("p2", "c2")]
+
+
+def test_match_updates_ratings_and_counts_incrementally():
+    c1, _ = _setup()
+    leaderboard.page(None, False)
+    rebuilds = leaderboard.index_stats()["rebuilds"]
+
+    p1, p2 = c1.members["p1"], c1.members["p2"]
+    p1.singles_rating, p2.singles_rating = 4.0, 3.9
+    for _ in range(3):
+        match = Match(date=datetime.date.today(), player_a=p2, player_b=p1, score_a=6, score_b=0)
+        update_ratings(match)
+        c1.matches.append(match)
+    storage.save_club(c1)
+
+    assert p2.singles_rating > p1.singles_rating
+    assert _ids(leaderboard.page(["c1"], False)) == ["p2", "p1"]
+    assert _ids(leaderboard.page(None, False)) == ["p3", "p2", "p1"]
+    by_matches = leaderboard.page(None, False, sort="matches")
+    assert by_matches[0].singles_matches == 3.0
+    assert by_matches[-1].player.user_id == "p3"
+    assert leaderboard.index_stats()["rebuilds"] == rebuilds
+
+
+def test_membership_changes_move_players_between_boards():
+    c1, c2 = _setup()
+    assert _ids(leaderboard.page(["c1"], False)) == ["p1", "p2"]
+
+    del c1.members["p1"]
+    storage.save_club(c1)
+    assert _ids(leaderboard.page(["c1"], False)) == ["p2"]
+    row = leaderboard.page(None, False, limit=1)[0]
+    assert (row.player.user_id, row.club_id) == ("p1", None)
+
+    p1 = storage.get_player("p1")
+    c2.members["p1"] = p1
+    storage.save_club(c2)
+    assert _ids(leaderboard.page(["c2"], False)) == ["p1", "p3", "p2"]
+
+
+def test_combined_filters_follow_profile_edits(monkeypatch):
+    _setup()
+    assert _ids(leaderboard.page(None, False, gender="M", region="SH")) == ["p1"]
+    assert _ids(leaderboard.page(None, False, region="SH", min_age=25)) == ["p1"]
+    assert _ids(leaderboard.page(["c2"], False, gender="M", min_age=35, max_age=40)) == ["p3"]
+    assert leaderboard.page(None, False, gender="F", region="BJ") == []
+
+    p3 = storage.get_player("p3")
+    p3.region = "SH/Minhang"
+    p3.age = 28
+    storage.update_player_record(p3)
+    assert _ids(leaderboard.page(None, False, gender="M", region="SH")) == ["p1", "p3"]
+    assert _ids(leaderboard.page(None, False, max_age=29)) == ["p3", "p2"]
+
+    # walking the ranking gives the same rows as sorting the matches
+    queries = [
+        {"gender": "M"},
+        {"region": "SH", "max_rating": 1150},
+        {"min_age": 21, "sort": "matches"},
+        {"gender": "M", "offset": 1, "limit": 1},
+    ]
+    direct = [leaderboard.page(["c1", "c2"], False, **q) for q in queries]
+    monkeypatch.setattr(leaderboard, "SORT_RATIO", 0)
+    assert [leaderboard.page(["c1", "c2"], False, **q) for q in queries] == direct
+
+
+def test_get_leaderboard_uses_index_for_storage_clubs():
+    _setup()
+    result = get_leaderboard(storage.club_view, None, True)
+    assert [(p.user_id, r) for p, r in result] == [("p2", 1100.0), ("p1", 900.0)]
+    plain = {cid: storage.club_view[cid] for cid in ("c1", "c2")}
+    assert get_leaderboard(plain, "c2", False, min_age=30) == get_leaderboard(
+        storage.club_view, "c2", False, min_age=30
+    )
+
+
+def test_index_is_built_without_reloading_storage(monkeypatch):
+    c1, _ = _setup()
+    p1 = c1.members["p1"]
+    p1.singles_rating, c1.members["p2"].singles_rating = 4.0, 3.9
+    match = Match(date=datetime.date.today(), player_a=p1, player_b=c1.members["p2"], score_a=6, score_b=0)
+    update_ratings(match)
+    c1.matches.append(match)
+    storage.save_club(c1)
+
+    storage.invalidate_cache()
+    club = storage.get_club("c1")
+    monkeypatch.setattr(storage, "load_data", None)
+    rows = leaderboard.page(None, False, sort="matches")
+    assert _ids(rows)[:2] == ["p1", "p2"]
+    assert rows[0].singles_matches == 1.0
+    # the players loaded before are shared, the others are read without history
+    assert storage.get_club("c1") is club
+    assert rows[0].player is club.members["p1"]
+    assert "p3" not in storage._hydrated_players
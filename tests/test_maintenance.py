@@ -0,0 +1,84 @@
+import datetime
+
+import tennis.storage as storage
+from tennis import maintenance
+from tennis.models import Club, Match, Player, User
+from tennis.services import matches as match_service
+
+
+def test_sweep_tokens_removes_only_expired_rows():
+    now = datetime.datetime.utcnow()
+    storage.insert_token("old", "u1")
+    storage.insert_token("new", "u1")
+    with storage._connect() as conn:
+        conn.execute(
+            "UPDATE auth_tokens SET ts = ? WHERE token = ?",
+            ((now - datetime.timedelta(days=2)).isoformat(), "old"),
+        )
+        conn.commit()
+    storage.insert_refresh_token("u1", "r1", now - datetime.timedelta(seconds=1))
+    storage.insert_refresh_token("u2", "r2", now + datetime.timedelta(days=1))
+    storage.revoke_token_id("gone", now - datetime.timedelta(seconds=1))
+    storage.revoke_token_id("kept", now + datetime.timedelta(hours=1))
+
+    purged = maintenance.sweep_tokens(batch_size=1)
+    assert purged == {"auth_tokens": 1, "refresh_tokens": 1, "revoked_tokens": 1}
+    assert storage.get_token("old") is None
+    assert storage.get_token("new")[0] == "u1"
+    assert storage.get_refresh_token("r2")[0] == "u2"
+    storage.invalidate_cache()
+    assert storage.is_token_revoked("kept")
+    assert maintenance.sweep_stats()["auth_tokens"] >= 1
+
+
+def _club_with_pending():
+    today = datetime.date.today()
+    club = Club(club_id="c1", name="C1", leader_id="p1")
+    p1 = Player("p1", "P1", singles_rating=1000.0)
+    p2 = Player("p2", "P2", singles_rating=1000.0)
+    club.members.update({"p1": p1, "p2": p2})
+    stale = Match(date=today, player_a=p1, player_b=p2, score_a=6, score_b=3, initiator="p1")
+    stale.created = today - datetime.timedelta(days=8)
+    rejected = Match(date=today, player_a=p1, player_b=p2, score_a=6, score_b=4, initiator="p1")
+    rejected.status = "rejected"
+    rejected.status_date = today - datetime.timedelta(days=3)
+    fresh = Match(date=today, player_a=p1, player_b=p2, score_a=6, score_b=1, initiator="p1")
+    club.pending_matches.extend([stale, rejected, fresh])
+    storage.save_club(club)
+    storage.create_user(User("p1", "P1", password_hash="pw"))
+    storage.insert_token("tok", "p1")
+    return club
+
+
+def test_pending_list_is_a_pure_read():
+    _club_with_pending()
+    club = storage.get_club("c1")
+
+    result = match_service.list_pending_matches_service("c1", "Bearer tok")
+    assert [r["score_b"] for r in result] == [1]
+    assert len(club.pending_matches) == 3
+    assert storage.get_club("c1") is club
+
+
+def test_sweep_pending_matches_persists_removals():
+    _club_with_pending()
+    club = storage.get_club("c1")
+
+    assert maintenance.sweep_pending_matches(batch_size=2) == {"pending_matches": 2}
+    reloaded = storage.get_club("c1")
+    assert reloaded is not club
+    assert [m.score_b for m in reloaded.pending_matches] == [1]
+    storage.invalidate_cache()
+    assert len(storage.get_club("c1").pending_matches) == 1
+
+
+def test_sweeper_runs_tasks_at_their_intervals(monkeypatch):
+    calls = []
+    monkeypatch.setitem(maintenance.TASKS, "tokens", (lambda b: calls.append("tokens") or {}, None))
+    monkeypatch.setitem(maintenance.TASKS, "pending_matches", (lambda b: calls.append("pending") or {}, None))
+    sweeper = maintenance.Sweeper({"tokens": 10, "pending_matches": 60})
+
+    sweeper.run_due(now=100)
+    sweeper.run_due(now=105)
+    sweeper.run_due(now=111)
+    assert calls == ["tokens", "pending", "tokens"]
@@ -0,0 +1,157 @@
+import datetime
+import json
+import sys
+import tennis.storage as storage
+import tennis.migrations as migrations
+from tennis import cli
+
+
+def _versions():
+    conn = storage._connect()
+    rows = conn.cursor().execute("SELECT version FROM schema_version ORDER BY version").fetchall()
+    conn.close()
+    return [r["version"] for r in rows]
+
+
+def test_new_database_records_all_versions():
+    assert _versions() == [m.version for m in migrations.MIGRATIONS]
+    assert storage.migrate() == []
+
+
+def test_legacy_database_is_upgraded():
+    conn = storage._connect()
+    cur = conn.cursor()
+    cur.execute("ALTER TABLE players DROP COLUMN region")
+    cur.execute("INSERT INTO players(user_id, name, joined) VALUES ('u1', 'U1', '2020-05-01')")
+    cur.execute("INSERT INTO club_members(club_id, user_id, joined) VALUES ('c1', 'u1', NULL)")
+    cur.execute("DELETE FROM schema_version WHERE version IN (2, 3)")
+    conn.commit()
+    conn.close()
+
+    done, todo = storage.schema_status()
+    assert [m.version for m in todo] == [2, 3]
+
+    assert storage.migrate(target=2) == [2]
+    assert storage.migrate() == [3]
+
+    conn = storage._connect()
+    cur = conn.cursor()
+    cur.execute("UPDATE players SET region = 'Shanghai' WHERE user_id = 'u1'")
+    row = cur.execute(
+        "SELECT joined FROM club_members WHERE club_id = 'c1' AND user_id = 'u1'"
+    ).fetchone()
+    conn.commit()
+    conn.close()
+    assert row["joined"] == "2020-05-01"
+
+
+def test_cli_migrate_status(monkeypatch, capsys):
+    storage.migrate(target=1)
+
+    monkeypatch.setattr(sys, "argv", ["tennis", "migrate", "--status"])
+    cli.main()
+    out = capsys.readouterr().out
+    assert "   1  applied  initial schema" in out
+    assert "   2  pending " in out
+
+    monkeypatch.setattr(sys, "argv", ["tennis", "migrate"])
+    cli.main()
+    assert "Applied migration 2" in capsys.readouterr().out
+
+    monkeypatch.setattr(sys, "argv", ["tennis", "migrate"])
+    cli.main()
+    assert "up to date" in capsys.readouterr().out
+
+
+def test_match_json_is_moved_to_columns(monkeypatch):
+    storage.migrate(target=3)
+    with monkeypatch.context() as m:
+        # seed the version 3 schema without upgrading it on connect
+        m.setattr(storage, "_init_schema", lambda conn: None)
+        conn = storage._connect()
+    cur = conn.cursor()
+    cur.execute("INSERT INTO clubs(club_id, name) VALUES ('c1', 'C1')")
+    for uid in ("a", "b", "c", "d"):
+        cur.execute(
+            "INSERT INTO players(user_id, name, singles_rating, doubles_rating, joined) VALUES (?, ?, 1000, 1000, '2023-01-01')",
+            (uid, uid.upper()),
+        )
+        cur.execute(
+            "INSERT INTO club_members(club_id, user_id, joined) VALUES ('c1', ?, '2023-01-01')",
+            (uid,),
+        )
+    singles = {
+        "player_a": "a",
+        "player_b": "b",
+        "score_a": 6,
+        "score_b": 3,
+        "weight": 0.5,
+        "created_ts": "2023-01-02T10:00:00",
+        "approved_ts": "2023-01-03T09:00:00",
+        "rating_a_before": 1000.0,
+        "rating_a_after": 1010.5,
+    }
+    doubles = {
+        "a1": "a",
+        "a2": "b",
+        "b1": "c",
+        "b2": "d",
+        "score_a": 4,
+        "score_b": 6,
+        "initiator": "a",
+        "confirmed_a": True,
+        "created": "2023-02-01",
+        "status": "vetoed",
+        "status_date": "2023-02-02",
+    }
+    cur.execute(
+        "INSERT INTO matches(id, club_id, type, date, data) VALUES (1, 'c1', 'singles', '2023-01-02', ?)",
+        (json.dumps(singles),),
+    )
+    cur.execute(
+        "INSERT INTO pending_matches(id, club_id, type, date, data) VALUES (1, 'c1', 'doubles', '2023-02-01', ?)",
+        (json.dumps(doubles),),
+    )
+    conn.commit()
+    conn.close()
+
+    assert storage.migrate() == [m.version for m in migrations.MIGRATIONS if m.version > 3]
+
+    conn = storage._connect()
+    row = conn.cursor().execute(
+        "SELECT player_a1, player_b1, player_b2, weight, rating_a1_after FROM matches"
+    ).fetchone()
+    conn.close()
+    assert row["player_a1"] == "a"
+    assert row["player_b1"] == "b"
+    assert row["player_b2"] is None
+    assert row["weight"] == 0.5
+    assert row["rating_a1_after"] == 1010.5
+
+    storage.invalidate_cache()
+    clubs, _ = storage.load_data()
+    match = clubs["c1"].matches[0]
+    assert match.player_a.user_id == "a"
+    assert (match.score_a, match.score_b) == (6, 3)
+    assert match.rating_a_before == 1000.0
+    assert match.approved_ts == datetime.datetime(2023, 1, 3, 9)
+    pending = clubs["c1"].pending_matches[0]
+    assert pending.player_b2.user_id == "d"
+    assert pending.confirmed_a and not pending.confirmed_b
+    assert pending.status == "vetoed"
+    assert pending.status_date == datetime.date(2023, 2, 2)
+
+
+def test_secondary_indexes_exist():
+    conn = storage._connect()
+    cur = conn.cursor()
+    if storage.IS_PG:
+        rows = cur.execute(
+            "SELECT indexname AS name FROM pg_indexes WHERE schemaname = current_schema()"
+        ).fetchall()
+    else:
+        rows = cur.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+    conn.close()
+    names = {row["name"] for row in rows}
+    for name, _, _ in migrations.SECONDARY_INDEXES:
+        assert name in names
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import threading
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import tennis.storage as storage
+from tennis import notifications, wechat
+
+
+class _StubWeChat(BaseHTTPRequestHandler):
+    """Answer the token and subscribe-send endpoints of the WeChat API."""
+
+    replies: dict[str, list[int]] = {}
+    sent: list[str] = []
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply({"access_token": "T", "expires_in": 7200})
+
+    def do_POST(self):
+        cls = type(self)
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        threading.Event().wait(0.1)
+        with cls.lock:
+            cls.active -= 1
+            codes = cls.replies.get(payload["touser"]) or [0]
+            errcode = codes.pop(0) if len(codes) > 1 else codes[0]
+            cls.sent.append(payload["touser"])
+        self._reply({"errcode": errcode, "errmsg": "stub"})
+
+
+class _Response:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    def json(self):
+        return json.loads(self._body)
+
+
+class _UrllibClient:
+    """Async client for the stub when the bundled httpx has no AsyncClient."""
+
+    def _open(self, request, timeout):
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return _Response(resp.read())
+
+    async def get(self, url, params=None, timeout=None):
+        url = url + "?" + urllib.parse.urlencode(params or {})
+        return await asyncio.to_thread(self._open, url, timeout)
+
+    async def post(self, url, json=None, timeout=None):
+        data = __import__("json").dumps(json).encode()
+        request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+        return await asyncio.to_thread(self._open, request, timeout)
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    _StubWeChat.replies = {}
+    _StubWeChat.sent = []
+    _StubWeChat.peak = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubWeChat)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("WECHAT_API_BASE", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("WECHAT_APPID", "app")
+    monkeypatch.setenv("WECHAT_SECRET", "secret")
+    monkeypatch.setattr(wechat, "_redis", None)
+    monkeypatch.setattr(wechat, "_token", None)
+    yield _StubWeChat
+    server.shutdown()
+    server.server_close()
+
+
+def _client():
+    return None if hasattr(httpx, "AsyncClient") else _UrllibClient()
+
+
+def _statuses():
+    with storage._connect() as conn:
+        rows = conn.execute("SELECT openid, status, attempts FROM notification_outbox").fetchall()
+    return {row["openid"]: (row["status"], row["attempts"]) for row in rows}
+
+
+def test_request_path_only_enqueues(monkeypatch):
+    async def fail(*args, **kwargs):
+        raise AssertionError("sent from the request path")
+
+    monkeypatch.setattr(wechat, "_send", fail)
+    storage.add_subscribe_quota("u1", "audit")
+    wechat.send_audit_message("u1", "wx1", "audit", "type", "status", "/p")
+
+    assert _statuses() == {"wx1": ("pending", 0)}
+    assert storage.consume_subscribe_quota("u1", "audit")
+
+
+def test_dispatcher_sends_concurrently_and_retries(stub_server, monkeypatch):
+    monkeypatch.setattr(notifications, "BACKOFF_BASE", 0.0)
+    stub_server.replies = {"wx3": [45009, 0], "wx4": [43101]}
+    for uid in ("u1", "u3", "u4", "u5"):
+        storage.add_subscribe_quota(uid, "audit")
+    for uid in ("u1", "u2", "u3", "u4", "u5"):
+        wechat.send_audit_message(uid, "wx" + uid[1:], "audit", "type", "status", "/p")
+
+    dispatcher = notifications.NotificationDispatcher(concurrency=4, client=_client())
+    assert dispatcher.run_once() == 6
+
+    assert _statuses() == {
+        "wx1": ("sent", 1),
+        "wx2": ("skipped", 1),
+        "wx3": ("sent", 2),
+        "wx4": ("failed", 1),
+        "wx5": ("sent", 1),
+    }
+    assert stub_server.peak > 1
+    with storage._connect() as conn:
+        row = conn.execute("SELECT errcode FROM subscribe_log WHERE user_id = ?", ("u4",)).fetchone()
+    assert row["errcode"] == 43101
+    # the quota was taken once even though wx3 needed two attempts
+    assert not storage.consume_subscribe_quota("u3", "audit")
+
+
+def test_gives_up_after_max_attempts(stub_server, monkeypatch):
+    monkeypatch.setattr(notifications, "BACKOFF_BASE", 0.0)
+    stub_server.replies = {"wx1": [45009]}
+    storage.add_subscribe_quota("u1", "audit")
+    wechat.send_audit_message("u1", "wx1", "audit", "type", "status", "/p")
+
+    notifications.NotificationDispatcher(max_attempts=3, client=_client()).run_once()
+    assert _statuses() == {"wx1": ("failed", 3)}
+    assert stub_server.sent == ["wx1"] * 3
+
+
+def test_claims_are_exclusive():
+    storage.enqueue_notification("u1", "wx1", "audit", "t", "s", "/p")
+    first = storage.claim_notifications(10, lease=60)
+    assert [r["openid"] for r in first] == ["wx1"]
+    assert storage.claim_notifications(10, lease=60) == []
+
+
+def test_reclaimed_notification_keeps_its_quota(stub_server):
+    storage.add_subscribe_quota("u1", "audit", 2)
+    wechat.send_audit_message("u1", "wx1", "audit", "type", "status", "/p")
+    # a dispatcher took the quota, then died before sending
+    (row,) = storage.claim_notifications(10, lease=0)
+    assert storage.consume_notification_quota(row["id"], "u1", "audit")
+
+    notifications.NotificationDispatcher(client=_client()).run_once()
+    assert _statuses() == {"wx1": ("sent", 1)}
+    assert storage.consume_subscribe_quota("u1", "audit")
+    assert not storage.consume_subscribe_quota("u1", "audit")
+
+
+def test_dispatcher_reports_its_thread(stub_server):
+    dispatcher = notifications.NotificationDispatcher(interval=0.05, client=_client())
+    assert not dispatcher.is_running()
+    dispatcher.start()
+    assert dispatcher.is_running()
+    dispatcher.join(0.1)
+    assert dispatcher.is_running()
+    dispatcher.stop()
+    dispatcher.join()
+    assert not dispatcher.is_running()
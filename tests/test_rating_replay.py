@@ -0,0 +1,113 @@
+import datetime
+
+import pytest
+
+import tennis.models as models
+import tennis.storage as storage
+from tennis import rating, replay
+
+
+def _play(club, players):
+    """Record a mixed history in memory with the live rating functions."""
+    p = players
+    games = [
+        ("s", "p1", "p2", 6, 3, "6_game"),
+        ("d", ("p1", "p2", "p3", "p4"), None, 6, 4, "6_game"),
+        ("s", "p3", "p1", 4, 2, "4_game"),
+        ("s", "p2", "p4", 0, 0, "6_game"),
+        ("d", ("p1", "p3", "p2", "p4"), None, 2, 4, "4_game"),
+        ("s", "p4", "p1", 7, 5, "tb10"),
+    ]
+    for i, (kind, a, b, score_a, score_b, fmt) in enumerate(games):
+        common = dict(
+            date=datetime.date(2024, 1, 1 + i),
+            score_a=score_a,
+            score_b=score_b,
+            format_weight=rating.FORMAT_WEIGHTS[fmt],
+            format_name=fmt,
+            club_id=club.club_id,
+            approved_ts=datetime.datetime(2024, 2, 1 + i),
+        )
+        if kind == "s":
+            m = models.Match(player_a=p[a], player_b=p[b], **common)
+            rating.update_ratings(m)
+        else:
+            a1, a2, b1, b2 = (p[uid] for uid in a)
+            m = models.DoublesMatch(player_a1=a1, player_a2=a2, player_b1=b1, player_b2=b2, **common)
+            rating.update_doubles_ratings(m)
+        club.matches.append(m)
+
+
+def _fresh():
+    club = models.Club(club_id="c1", name="C1")
+    players = {
+        f"p{i}": models.Player(f"p{i}", f"P{i}", singles_rating=2.5 + i / 2, doubles_rating=3.0 + i / 4)
+        for i in range(1, 5)
+    }
+    club.members.update(players)
+    return club, players
+
+
+def test_replay_matches_stored_history():
+    club, players = _fresh()
+    _play(club, players)
+    storage.save_club(club)
+
+    result = replay.replay(replay.load())
+    report = replay.diff(result)
+    assert report == (6, 0, [])
+    numbers = {uid: i for i, uid in enumerate(result.log.players)}
+    for uid, p in players.items():
+        assert result.singles[numbers[uid]] == pytest.approx(p.singles_rating)
+        assert result.doubles[numbers[uid]] == pytest.approx(p.doubles_rating)
+        assert result.experience[numbers[uid]] == pytest.approx(p.experience)
+
+
+def test_reweighted_replay_is_written_back(monkeypatch):
+    club, players = _fresh()
+    _play(club, players)
+    storage.save_club(club)
+
+    monkeypatch.setitem(rating.FORMAT_WEIGHTS, "4_game", 0.5)
+    result = replay.replay(replay.load(reweight=True))
+    report = replay.diff(result)
+    # the two 4_game matches and p1's match after them
+    assert report.drifted_matches == 3
+    assert {d.user_id for d in report.players} == {"p1", "p2", "p3", "p4"}
+
+    expected_club, expected = _fresh()
+    _play(expected_club, expected)
+    assert replay.write(result) == 4
+    for uid, p in expected.items():
+        stored = storage.get_player(uid)
+        assert stored.singles_rating == pytest.approx(p.singles_rating)
+        assert stored.doubles_rating == pytest.approx(p.doubles_rating)
+    assert replay.diff(replay.replay(replay.load())).players == []
+    assert storage.friend_stats("p1")
+
+
+def test_written_ratings_reach_other_workers(worker, monkeypatch):
+    club, players = _fresh()
+    _play(club, players)
+    storage.save_club(club)
+    storage.increment_cache_version()
+    version = worker.get_cache_version()
+    p1 = worker.get_club("c1").members["p1"]
+    # p1 lost the last match, to p4
+    match = p1.singles_matches[-1]
+    before = match.rating_b_after
+    key = storage.CACHE_HASHES["matches"]
+    assert worker._redis.hexists(key, str(match.id))
+
+    monkeypatch.setitem(rating.FORMAT_WEIGHTS, "4_game", 0.5)
+    replay.write(replay.replay(replay.load(reweight=True)))
+    assert not worker._redis.hexists(key, str(match.id))
+
+    worker.sync_cache(version)
+    stored = storage.get_player("p1")
+    assert p1.singles_rating == stored.singles_rating
+    assert p1.singles_matches[-1] is match
+    # players store single precision ratings
+    assert match.rating_b_after == pytest.approx(stored.singles_rating)
+    assert match.rating_b_after != pytest.approx(before)
+    assert worker.cache_stats()["match_refreshes"] == 6
@@ -0,0 +1,105 @@
+import copy
+import datetime
+
+import pytest
+
+import tennis.models as models
+import tennis.storage as storage
+from tennis import rating
+from tennis.services.exceptions import ServiceError
+from tennis.services.simulator import DEFAULT_SCORES, parse_scores, simulate_match_service
+
+
+def _setup():
+    club = models.Club(club_id="c1", name="C1")
+    players = {
+        "p1": models.Player("p1", "P1", singles_rating=3.5, doubles_rating=3.25),
+        "p2": models.Player("p2", "P2", singles_rating=3.0, doubles_rating=3.5),
+        "p3": models.Player("p3", "P3", singles_rating=4.0, doubles_rating=3.0),
+        "p4": models.Player("p4", "P4", singles_rating=2.5, doubles_rating=2.75),
+        # unrated players start from the default rating
+        "p5": models.Player("p5", "P5"),
+        "p6": models.Player("p6", "P6"),
+    }
+    club.members.update(players)
+    storage.save_club(club)
+    return players
+
+
+def test_singles_grid_matches_update_ratings():
+    _setup()
+    result = simulate_match_service("p1", "p2", format="4_game")
+    assert result["type"] == "singles"
+    assert result["weight"] == rating.FORMAT_4_GAME
+    assert result["expected_score"] == rating.expected_score(3.5, 3.0)
+    assert len(result["results"]) == len(DEFAULT_SCORES) == 64
+
+    p1 = storage.get_player("p1")
+    p2 = storage.get_player("p2")
+    for row in result["results"]:
+        a, b = copy.deepcopy(p1), copy.deepcopy(p2)
+        m = models.Match(datetime.date(2024, 1, 1), a, b, row["score_a"], row["score_b"], format_weight=0.7)
+        rating.update_ratings(m)
+        assert row["ratings"] == {"p1": a.singles_rating, "p2": b.singles_rating}
+        assert row["changes"]["p1"] == pytest.approx(a.singles_rating - 3.5)
+
+
+def test_simulation_leaves_players_untouched(monkeypatch):
+    _setup()
+    p1 = storage.get_player("p1")
+    before = (p1.singles_rating, p1.experience, len(p1.singles_matches))
+    simulate_match_service("p1", "p2", scores="6-0,0-6")
+    assert (p1.singles_rating, p1.experience, len(p1.singles_matches)) == before
+
+    # histories are not loaded just to read a rating
+    monkeypatch.setattr(storage, "get_player", None)
+    result = simulate_match_service("p5", "p6", scores="6-0")
+    monkeypatch.undo()
+    assert result["ratings"] == {"p5": rating.DEFAULT_RATING, "p6": rating.DEFAULT_RATING}
+    assert result["results"][0]["changes"]["p5"] > 0
+    assert storage.get_player("p5").singles_rating is None
+    assert not storage.get_player("p5").singles_matches
+
+
+def test_doubles_scores_match_update_doubles_ratings():
+    _setup()
+    result = simulate_match_service("p1", "p4", scores="6-4,0-0", partner="p2", opponent_partner="p3")
+    assert result["type"] == "doubles"
+    assert result["ratings"] == {"p1": 3.25, "p2": 3.5, "p4": 2.75, "p3": 3.0}
+
+    a1, a2, b1, b2 = (copy.deepcopy(storage.get_player(uid)) for uid in ("p1", "p2", "p4", "p3"))
+    m = models.DoublesMatch(datetime.date(2024, 1, 1), a1, a2, b1, b2, 6, 4)
+    rating.update_doubles_ratings(m)
+    first, empty = result["results"]
+    assert first["ratings"] == {
+        "p1": a1.doubles_rating,
+        "p2": a2.doubles_rating,
+        "p4": b1.doubles_rating,
+        "p3": b2.doubles_rating,
+    }
+    assert empty["changes"] == {"p1": 0, "p2": 0, "p4": 0, "p3": 0}
+
+
+def test_parse_scores():
+    assert parse_scores("6-3, 7-5") == [(6, 3), (7, 5)]
+    assert parse_scores(None) == DEFAULT_SCORES
+    for text in ("6", "6-x", "-1-3", ",".join(["1-1"] * 101)):
+        with pytest.raises(ServiceError):
+            parse_scores(text)
+
+
+def test_simulation_errors():
+    _setup()
+    cases = [
+        (dict(user_id="p1", opponent="nobody"), 404),
+        (dict(user_id="p1", opponent="p1"), 400),
+        (dict(user_id="p1", opponent="p2", partner="p3"), 400),
+        (dict(user_id="p1", opponent="p2", format="5_game"), 400),
+        (dict(user_id="p1", opponent="p2", weight=0), 400),
+        (dict(user_id="p1", opponent="p2", weight=float("nan")), 400),
+        (dict(user_id="p1", opponent="p2", weight=float("inf")), 400),
+    ]
+    for kwargs, code in cases:
+        with pytest.raises(ServiceError) as exc:
+            simulate_match_service(**kwargs)
+        assert exc.value.status_code == code
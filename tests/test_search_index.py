@@ -0,0 +1,87 @@
+import pytest
+
+import tennis.models as models
+import tennis.storage as storage
+from tennis import search
+
+CLUBS = {
+    "c1": "Beijing Tennis Club",
+    "c2": "Shanghai Tennis",
+    "c3": "Alpha Tennis",
+    "c4": "alphabet",
+    "c5": "100%_club",
+}
+
+
+def _clubs():
+    for cid, name in CLUBS.items():
+        storage.create_club(models.Club(club_id=cid, name=name))
+    storage.create_user(models.User("u1", "Li Si", "pw"))
+    storage.create_user(models.User("u2", "Zhang San", "pw"))
+
+
+def _both(kind, query, **kwargs):
+    """Ids found by the index, checked against the database search."""
+    page = storage.club_ids_page if kind == "clubs" else storage.user_ids_page
+    found = page(query=query, **kwargs)
+    storage.SEARCH_BACKEND = "database"
+    try:
+        assert page(query=query, **kwargs) == found
+    finally:
+        storage.SEARCH_BACKEND = "memory"
+    return found
+
+
+@pytest.mark.parametrize(
+    "query, ids",
+    [
+        ("tennis", ["c1", "c2", "c3"]),
+        ("te", ["c1", "c2", "c3"]),
+        ("beijing tennis c", ["c1"]),
+        ("ALPHA", ["c3", "c4"]),
+        ("c", ["c1", "c2", "c3", "c4", "c5"]),
+        ("%_", ["c5"]),
+        ("tennisx", []),
+    ],
+)
+def test_clubs_match_database_search(query, ids):
+    _clubs()
+    assert _both("clubs", query) == ids
+
+
+def test_short_chinese_names():
+    index = search._Kind()
+    for uid, name in [("c1", "北京网球俱乐部"), ("c2", "上海网球"), ("u1", "张三"), ("u2", None)]:
+        index.add(uid, name)
+    assert index.search("网球") == {"c1", "c2"}
+    assert index.search("网") == {"c1", "c2"}
+    assert index.search("北京网球俱") == {"c1"}
+    assert index.search("张三") == {"u1"}
+    assert index.search("u") == {"u1", "u2"}
+    index.remove("c1")
+    assert index.search("网球") == {"c2"}
+    assert "北" not in index.postings
+
+
+def test_index_follows_writes():
+    _clubs()
+    assert _both("users", "si") == ["u1"]
+    assert _both("users", "san") == ["u2"]
+    assert _both("clubs", "tennis", after="c1") == ["c2", "c3"]
+    assert _both("clubs", "a", limit=1, offset=1) == ["c3"]
+    builds = search.index_stats()["builds"]
+
+    club = storage.get_club("c2")
+    club.name = "Shenzhen"
+    storage.save_club(club)
+    storage.delete_club("c1")
+    storage.create_club(models.Club(club_id="c6", name="Tennis Six"))
+    user = storage.get_user("u2")
+    user.name = "Wang Wu"
+    storage.update_user_record(user)
+
+    assert _both("clubs", "tennis") == ["c3", "c6"]
+    assert _both("clubs", "shen") == ["c2"]
+    assert _both("users", "san") == []
+    assert _both("users", "wu") == ["u2"]
+    assert search.index_stats()["builds"] == builds
@@ -0,0 +1,112 @@
+import datetime
+import importlib
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import tennis.storage as storage
+from tennis.services import auth, state
+from tennis.services import users as user_service
+from tennis.services.exceptions import ServiceError
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("TOKEN_SECRET", "s3cret")
+    monkeypatch.setattr(storage, "DB_FILE", tmp_path / "tennis.db")
+    importlib.reload(state)
+    api = importlib.reload(importlib.import_module("tennis.api"))
+    client = TestClient(api.app)
+    client.post("/users", json={"user_id": "u", "name": "U", "password": "pw", "allow_create": True})
+    return client
+
+
+def _no_db(*args, **kwargs):
+    raise AssertionError("database queried")
+
+
+def test_signed_token_is_checked_without_database(client, monkeypatch):
+    data = client.post("/login", json={"user_id": "u", "password": "pw"}).json()
+    token = data["access_token"]
+    assert auth.is_signed_token(token)
+    assert auth.require_auth(f"Bearer {token}") == "u"
+
+    monkeypatch.setattr(storage, "_connect", _no_db)
+    assert auth.require_auth(f"Bearer {token}") == "u"
+
+
+def test_tampered_and_expired_tokens_are_rejected(client, monkeypatch):
+    token = auth.issue_access_token("u")
+    payload, _, signature = token.partition(".")
+    forged = auth._b64encode(b'["admin",0,9999999999,"x"]')
+    with pytest.raises(ServiceError, match="Invalid token"):
+        auth.require_auth(f"Bearer {forged}.{signature}")
+
+    with pytest.raises(ServiceError, match="Invalid token"):
+        auth.require_auth(f"Bearer {payload}.\u00e9{signature[1:]}")
+
+    monkeypatch.setenv("TOKEN_SECRET", "other")
+    with pytest.raises(ServiceError, match="Invalid token"):
+        auth.require_auth(f"Bearer {token}")
+    monkeypatch.setenv("TOKEN_SECRET", "s3cret")
+
+    later = time.time() + state.TOKEN_TTL.total_seconds() + 1
+    monkeypatch.setattr(auth.time, "time", lambda: later)
+    with pytest.raises(ServiceError, match="Token expired"):
+        auth.require_auth(f"Bearer {token}")
+
+
+def test_logout_revokes_signed_token(client):
+    data = client.post("/login", json={"user_id": "u", "password": "pw"}).json()
+    token, refresh = data["access_token"], data["refresh_token"]
+    assert user_service.refresh_token(token) == "u"
+
+    user_service.logout(token)
+    with pytest.raises(ServiceError, match="Invalid token"):
+        auth.require_auth(f"Bearer {token}")
+    assert client.post("/refresh_token", json={"refresh_token": refresh}).status_code == 401
+
+    # a full reload reads the revocation list back from the database
+    storage.invalidate_cache()
+    with pytest.raises(ServiceError):
+        auth.require_auth(f"Bearer {token}")
+
+
+def test_refresh_issues_signed_token(client):
+    refresh = client.post("/login", json={"user_id": "u", "password": "pw"}).json()["refresh_token"]
+    token = client.post("/refresh_token", json={"refresh_token": refresh}).json()["access_token"]
+    assert auth.is_signed_token(token)
+    assert auth.require_auth(f"Bearer {token}") == "u"
+
+
+def test_revocation_reaches_other_worker(worker, monkeypatch):
+    monkeypatch.setenv("TOKEN_SECRET", "s3cret")
+
+    token = auth.issue_access_token("u")
+    token_id = auth._decode_signed(token)[3]
+    version = worker.get_cache_version()
+    assert not worker.is_token_revoked(token_id)
+
+    auth.revoke_access_token(token)
+    assert storage.is_token_revoked(token_id)
+    worker.sync_cache(version)
+    connect, worker._connect = worker._connect, _no_db
+    assert worker.is_token_revoked(token_id)
+    worker._connect = connect
+
+
+def test_expired_revocations_are_forgotten():
+    now = datetime.datetime.utcnow()
+    storage.revoke_token_id("gone", now + datetime.timedelta(seconds=1))
+    storage.revoke_token_id("kept", now + datetime.timedelta(hours=1))
+    assert storage.is_token_revoked("gone")
+
+    later = now + datetime.timedelta(seconds=2)
+    assert storage.purge_revoked_tokens(later) == 1
+    assert set(storage._revoked_tokens) == {"kept"}
+
+    storage.revoke_token_id("stale", now - datetime.timedelta(seconds=1))
+    storage.invalidate_cache()
+    assert not storage.is_token_revoked("stale")
+    assert set(storage._revoked_tokens) == {"kept"}
@@ -1,5 +1,4 @@
 import datetime
-import json
 import pytest
 import tennis.storage as storage
 from tennis.models import Club, Player, Match
@@ -21,13 +20,14 @@ def test_pending_matches_roundtrip(tmp_path, monkeypatch):
     storage.save_club(club)
 
     with storage._connect() as conn:
-        row = conn.execute("SELECT data FROM pending_matches").fetchone()
+        row = conn.execute(
+            "SELECT score_a, score_b, confirmed_a, confirmed_b FROM pending_matches"
+        ).fetchone()
         assert row is not None
-        data = json.loads(row[0])
-        assert data["score_a"] == 6
-        assert data["score_b"] == 4
-        assert data["confirmed_a"] is True
-        assert data["confirmed_b"] is False
+        assert row["score_a"] == 6
+        assert row["score_b"] == 4
+        assert row["confirmed_a"] == 1
+        assert row["confirmed_b"] == 0
 
 
 def test_shared_player_across_clubs(tmp_path, monkeypatch):
@@ -74,11 +74,10 @@ def test_load_after_member_removed(tmp_path, monkeypatch):
 
     with storage._connect() as conn:
         row = conn.execute(
-            "SELECT data FROM matches WHERE club_id = 'c'"
+            "SELECT player_a1 FROM matches WHERE club_id = 'c'"
         ).fetchone()
         assert row is not None
-        data = json.loads(row[0])
-        assert data["player_a"] == "p1"
+        assert row["player_a1"] == "p1"
         members = conn.execute(
             "SELECT user_id FROM club_members WHERE club_id = 'c'"
         ).fetchall()
@@ -108,8 +107,99 @@ def test_match_ratings_persisted(tmp_path, monkeypatch):
     storage.save_club(club)
 
     with storage._connect() as conn:
-        row = conn.execute("SELECT data FROM matches").fetchone()
+        row = conn.execute(
+            "SELECT rating_a1_before, rating_a1_after FROM matches"
+        ).fetchone()
         assert row is not None
-        data = json.loads(row[0])
-        assert data["rating_a_before"] == pytest.approx(match.rating_a_before)
-        assert data["rating_a_after"] == pytest.approx(match.rating_a_after)
+        assert row["rating_a1_before"] == pytest.approx(match.rating_a_before)
+        assert row["rating_a1_after"] == pytest.approx(match.rating_a_after)
+
+
+def _club_with_history(n: int) -> Club:
+    club = Club(club_id="c", name="Club")
+    p1 = Player("p1", "P1", singles_rating=1000.0)
+    p2 = Player("p2", "P2", singles_rating=1000.0)
+    club.members[p1.user_id] = p1
+    club.members[p2.user_id] = p2
+    for i in range(n):
+        club.matches.append(
+            Match(date=datetime.date(2023, 1, 1 + i), player_a=p1, player_b=p2, score_a=6, score_b=i)
+        )
+    return club
+
+
+def test_save_club_keeps_match_ids():
+    club = _club_with_history(3)
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+    ids = [m.id for m in club.matches]
+    assert None not in ids
+
+    p1, p2 = club.members["p1"], club.members["p2"]
+    pending = Match(date=datetime.date(2023, 2, 1), player_a=p1, player_b=p2, score_a=6, score_b=3)
+    club.pending_matches.append(pending)
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+    pending_id = pending.id
+
+    club.pending_matches.remove(pending)
+    club.matches.append(pending)
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+
+    assert [m.id for m in club.matches[:3]] == ids
+    conn = storage._connect()
+    cur = conn.cursor()
+    rows = cur.execute("SELECT id FROM matches WHERE club_id = 'c' ORDER BY id").fetchall()
+    assert sorted(r["id"] for r in rows) == sorted(m.id for m in club.matches)
+    assert cur.execute(
+        "SELECT id FROM pending_matches WHERE id = ?", (pending_id,)
+    ).fetchone() is None
+    conn.close()
+
+
+def test_save_club_skips_unchanged_history():
+    club = _club_with_history(2)
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+
+    # mark the stored history; an unchanged save must not rewrite these rows
+    conn = storage._connect()
+    conn.cursor().execute("UPDATE matches SET date = '1999-01-01' WHERE club_id = 'c'")
+    conn.commit()
+    conn.close()
+
+    club.name = "Renamed"
+    club.members["p1"].singles_rating = 1100.0
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+
+    conn = storage._connect()
+    cur = conn.cursor()
+    rows = cur.execute("SELECT date FROM matches WHERE club_id = 'c'").fetchall()
+    assert [r["date"] for r in rows] == ["1999-01-01", "1999-01-01"]
+    assert cur.execute("SELECT name FROM clubs WHERE club_id = 'c'").fetchone()["name"] == "Renamed"
+    row = cur.execute("SELECT singles_rating FROM players WHERE user_id = 'p1'").fetchone()
+    assert row["singles_rating"] == pytest.approx(1100.0)
+    conn.close()
+
+
+def test_save_club_without_cached_state():
+    club = _club_with_history(2)
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+    ids = sorted(m.id for m in club.matches)
+
+    # a club object from another worker has no local state to diff against
+    storage._club_states.clear()
+    club.members.pop("p2")
+    with storage.transaction() as conn:
+        storage.save_club(club, conn=conn)
+
+    conn = storage._connect()
+    cur = conn.cursor()
+    rows = cur.execute("SELECT id FROM matches WHERE club_id = 'c'").fetchall()
+    assert sorted(r["id"] for r in rows) == ids
+    members = cur.execute("SELECT user_id FROM club_members WHERE club_id = 'c'").fetchall()
+    assert [m["user_id"] for m in members] == ["p1"]
+    conn.close()
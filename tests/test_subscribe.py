@@ -2,6 +2,7 @@ import importlib
 from fastapi.testclient import TestClient
 import tennis.storage as storage
 import tennis.services.state as state
+from tennis import notifications
 
 
 def test_subscribe_quota_and_log(tmp_path, monkeypatch):
@@ -27,12 +28,13 @@ def test_subscribe_quota_and_log(tmp_path, monkeypatch):
         ).fetchone()
         assert row is not None and row[0] == 1
 
-    async def fake_send(openid, audit_type, audit_status, page):
+    async def fake_send(openid, audit_type, audit_status, page, client=None):
         return {"errcode": 43101, "errmsg": "fail"}
 
     monkeypatch.setattr(wechat, "_send", fake_send)
 
     wechat.send_audit_message("u1", "wx", "audit", "type", "status", "p")
+    notifications.NotificationDispatcher(client=object()).run_once()
 
     with storage._connect() as conn:
         row = conn.execute(
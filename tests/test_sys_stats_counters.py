@@ -0,0 +1,134 @@
+import datetime
+
+import tennis.migrations as migrations
+import tennis.models as models
+import tennis.storage as storage
+
+
+def _recount():
+    """Counters computed from scratch, as the dashboards used to."""
+    conn = storage._connect()
+    rows = conn.execute("SELECT date, COUNT(*) AS n FROM matches GROUP BY date").fetchall()
+    matches = {r["date"]: r["n"] for r in rows}
+    members: dict[str, int] = {}
+    rows = conn.execute(
+        "SELECT MIN(COALESCE(cm.joined, p.joined)) AS day FROM club_members cm "
+        "LEFT JOIN players p ON p.user_id = cm.user_id GROUP BY cm.user_id"
+    ).fetchall()
+    for r in rows:
+        members[r["day"]] = members.get(r["day"], 0) + 1
+    conn.close()
+    return matches, members
+
+
+def _counters():
+    conn = storage._connect()
+    result: dict[str, dict[str, int]] = {"matches": {}, "members": {}}
+    for r in conn.execute("SELECT name, day, n FROM stats_daily WHERE day <> '' AND n <> 0").fetchall():
+        result[r["name"]][r["day"]] = r["n"]
+    conn.close()
+    assert storage.stat_total("matches") == sum(result["matches"].values())
+    assert storage.stat_total("members") == sum(result["members"].values())
+    return result["matches"], result["members"]
+
+
+def _club(cid, joined, *uids):
+    club = models.Club(club_id=cid, name=cid.upper())
+    for uid in uids:
+        club.members[uid] = storage.get_player(uid) or models.Player(uid, uid.upper())
+        club.member_joined[uid] = joined
+    storage.save_club(club)
+    return storage.get_club(cid)
+
+
+def test_counters_follow_writes():
+    day = datetime.date(2024, 3, 1)
+    c1 = _club("c1", day, "p1", "p2", "p3")
+    c2 = _club("c2", day - datetime.timedelta(days=3), "p3", "p4")
+    p = c1.members
+    for offset in range(3):
+        date = day + datetime.timedelta(days=offset)
+        c1.matches.append(models.Match(date=date, player_a=p["p1"], player_b=p["p2"], score_a=6, score_b=3))
+    storage.save_club(c1)
+    assert _counters() == _recount()
+    assert storage.stat_total("members") == 4
+    assert storage.daily_stats("matches", day, day) == {day: 1}
+
+    # a removed match, a changed join date and a member leaving
+    c1 = storage.get_club("c1")
+    c1.matches.pop()
+    c1.member_joined["p2"] = day - datetime.timedelta(days=10)
+    del c1.members["p1"]
+    storage.save_club(c1)
+    assert _counters() == _recount()
+
+    storage.delete_club("c2")
+    assert _counters() == _recount()
+    assert storage.stat_total("members") == 2
+    # matches outlive their club
+    storage.delete_club("c1")
+    assert storage.stat_total("matches") == 2
+    assert _counters() == _recount()
+
+
+def test_dashboards_read_counters(api):
+    today = datetime.date.today()
+    c1 = _club("c1", today - datetime.timedelta(days=20), "p1", "p2")
+    _club("c2", today - datetime.timedelta(days=2), "p3")
+    p = c1.members
+    date = today - datetime.timedelta(days=1)
+    c1.matches.append(models.Match(date=date, player_a=p["p1"], player_b=p["p2"], score_a=6, score_b=1))
+    storage.save_club(c1)
+
+    assert api.system_stats()["total_matches"] == 1
+    trend = api.system_user_trend(7)
+    assert [row["count"] for row in trend] == [2, 2, 2, 2, 3, 3, 3]
+    activity = api.system_match_activity(7)
+    assert [row["count"] for row in activity] == [0, 0, 0, 0, 0, 1, 0]
+
+    # a full rewrite recounts from the rows it wrote
+    storage.save_data(storage.load_data()[0])
+    assert api.system_user_trend(7) == trend
+    assert api.system_match_activity(7) == activity
+
+
+def test_members_without_join_date_count_from_player_join():
+    day = datetime.date(2024, 3, 1)
+    _club("c1", day, "p1", "p2")
+    with storage._connect() as conn:
+        conn.execute("UPDATE club_members SET joined = NULL WHERE user_id = ?", ("p2",))
+        conn.execute("UPDATE players SET joined = ? WHERE user_id = ?", ("2024-01-05", "p2"))
+        # the backfill of migration 9
+        conn.execute("DELETE FROM member_first_join")
+        conn.execute("DELETE FROM stats_daily")
+        for statement in migrations.STATS_BACKFILL:
+            conn.execute(statement)
+        conn.commit()
+    storage.invalidate_cache()
+
+    assert _counters() == _recount()
+    assert _counters()[1] == {"2024-03-01": 1, "2024-01-05": 1}
+
+    # a later membership of p2 keeps the earlier fallback day
+    _club("c2", day + datetime.timedelta(days=5), "p2")
+    assert _counters() == _recount()
+    assert storage.stat_total("members") == 2
+
+
+def test_system_stats_loads_no_club_or_user(api, monkeypatch):
+    today = datetime.date.today()
+    c1 = _club("c1", today, "p1", "p2")
+    _club("c2", today, "p3")
+    p = c1.members
+    c1.pending_members["p9"] = models.JoinApplication(reason="hi")
+    c1.pending_matches.append(models.Match(date=today, player_a=p["p1"], player_b=p["p2"], score_a=6, score_b=2))
+    storage.save_club(c1)
+    storage.create_user(models.User("u1", "U1", password_hash="pw"))
+    storage.invalidate_cache()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("everything loaded")
+
+    monkeypatch.setattr(storage, "load_data", fail)
+    monkeypatch.setattr(storage, "load_users", fail)
+    assert api.system_stats() == {"total_users": 1, "total_matches": 0, "total_clubs": 2, "pending_items": 2}
@@ -0,0 +1,68 @@
+import datetime
+
+import pytest
+
+import tennis.storage as storage
+from tennis.models import User
+from tennis.services import auth
+
+
+@pytest.fixture
+def workers(worker):
+    """Return two copies of the storage module sharing a fake Redis server."""
+    storage.create_user(User("u1", "U1", password_hash="pw"))
+    storage.insert_token("tok", "u1")
+    return storage, worker
+
+
+def _no_db(*args, **kwargs):
+    raise AssertionError("database queried")
+
+
+def test_valid_token_is_served_from_memory(workers, monkeypatch):
+    assert auth.require_auth("Bearer tok") == "u1"
+
+    monkeypatch.setattr(storage, "_connect", _no_db)
+    assert auth.require_auth("Bearer tok") == "u1"
+    stats = storage.token_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_unknown_tokens_are_not_cached(workers):
+    a, _ = workers
+    assert a.get_token("nope") is None
+    assert a.get_token("nope") is None
+    assert a.token_cache_stats()["misses"] == 2
+    assert a.token_cache_stats()["size"] == 0
+
+
+def test_logout_revokes_in_other_worker(workers):
+    a, b = workers
+    version = b.get_cache_version()
+    assert b.get_token("tok")[0] == "u1"
+    connect, b._connect = b._connect, _no_db
+    assert b.get_token("tok")[0] == "u1"
+    b._connect = connect
+
+    a.get_token("tok")
+    a.delete_token("tok")
+    assert a.get_token("tok") is None
+
+    b.sync_cache(version)
+    assert b.get_token("tok") is None
+
+
+def test_cache_is_bounded_and_expires(monkeypatch):
+    cache = storage.TokenCache(max_size=2, ttl=60)
+    info = ("u1", datetime.datetime(2024, 1, 1))
+    for key in ("a", "b", "c"):
+        cache.put(key, info)
+    assert cache.get("a") is None
+    assert cache.get("b") == info
+    assert cache.stats()["evictions"] == 1
+
+    now = storage.time.monotonic()
+    monkeypatch.setattr(storage.time, "monotonic", lambda: now + 61)
+    assert cache.get("b") is None
+    assert cache.stats()["size"] == 1
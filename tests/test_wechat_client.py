@@ -0,0 +1,117 @@
+import asyncio
+import types
+
+import fakeredis
+import pytest
+
+from tennis import wechat
+
+
+class _Response:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class _FakeClient:
+    """Answer token requests slowly so concurrent callers overlap."""
+
+    def __init__(self):
+        self.fetches = 0
+        self.posts = 0
+        self.closed = False
+
+    async def get(self, url, params=None, timeout=None):
+        self.fetches += 1
+        await asyncio.sleep(0.05)
+        return _Response({"access_token": f"T{self.fetches}", "expires_in": 7200})
+
+    async def post(self, url, json=None, timeout=None):
+        self.posts += 1
+        return _Response({"errcode": 0, "errmsg": "ok"})
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setenv("WECHAT_APPID", "app")
+    monkeypatch.setenv("WECHAT_SECRET", "secret")
+    monkeypatch.setattr(wechat, "_redis", None)
+    monkeypatch.setattr(wechat, "_token", None)
+    monkeypatch.setattr(wechat, "_token_expires", 0.0)
+    monkeypatch.setattr(wechat, "_client", None)
+    monkeypatch.setattr(wechat, "_stats", dict.fromkeys(wechat._stats, 0))
+
+
+def test_concurrent_callers_share_one_refresh():
+    client = _FakeClient()
+
+    async def main():
+        return await asyncio.gather(*(wechat._get_access_token(client) for _ in range(20)))
+
+    assert asyncio.run(main()) == ["T1"] * 20
+    assert client.fetches == 1
+    assert asyncio.run(wechat._get_access_token(client)) == "T1"
+    stats = wechat.client_stats()
+    assert stats["token_fetches"] == 1
+    assert stats["token_hits"] == 20
+
+
+def test_token_is_refreshed_early():
+    client = _FakeClient()
+    wechat._store_token("OLD", wechat.TOKEN_REFRESH_MARGIN - 10)
+
+    async def main():
+        refresh = asyncio.create_task(wechat._get_access_token(client))
+        await asyncio.sleep(0)
+        # the old token is still valid while the refresh is running
+        during = await wechat._get_access_token(client)
+        return during, await refresh
+
+    assert asyncio.run(main()) == ("OLD", "T1")
+    assert client.fetches == 1
+
+    wechat.drop_access_token()
+    assert asyncio.run(wechat._get_access_token(client)) == "T2"
+
+
+def test_token_shared_through_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(wechat, "_redis", fakeredis.FakeRedis(server=server))
+    client = _FakeClient()
+    assert asyncio.run(wechat._get_access_token(client)) == "T1"
+
+    # another worker starts with an empty in-memory cache
+    monkeypatch.setattr(wechat, "_token", None)
+    other = _FakeClient()
+    assert asyncio.run(wechat._get_access_token(other)) == "T1"
+    assert other.fetches == 0
+    assert wechat.client_stats()["token_redis_hits"] == 1
+
+
+def test_send_reuses_pooled_client_and_records_latency(monkeypatch):
+    created = []
+
+    def factory(**kwargs):
+        created.append(_FakeClient())
+        return created[-1]
+
+    monkeypatch.setattr(wechat, "httpx", types.SimpleNamespace(AsyncClient=factory))
+
+    async def main():
+        for _ in range(3):
+            assert (await wechat._send("wx", "type", "status", "/p"))["errcode"] == 0
+        await wechat.close_client()
+
+    asyncio.run(main())
+    assert len(created) == 1
+    assert created[0].fetches == 1 and created[0].posts == 3
+    assert created[0].closed
+    stats = wechat.client_stats()
+    assert stats["sends"] == 3
+    assert stats["send_errors"] == 0
+    assert stats["send_max_seconds"] >= stats["send_avg_seconds"] > 0